@@ -0,0 +1,372 @@
+"""Benchmark of manifest rendering and deploy orchestration.
+
+Synthetic `DeployPumpWood` stacks are built from the real microservice
+classes (Postgres, PGBouncer, Auth, Datalake and Streamlit dashboards
+cycled with unique names) and measured for:
+
+- **import:** time to import `pumpwood_deploy.deploy` at a new interpreter.
+- **create_deployment_file:** time to render all microservices objects.
+- **create_deploy_files:** time and peak memory (`tracemalloc`) to render
+  and write all deploy files, with the size of the files written.
+- **orchestration:** time of `run_deploy_commmands` applying all commands
+  against a fake cluster (`pumpwood_deploy.test_aux.fake_kubectl`) with
+  `--latency` seconds for each apply. Sleep of the deploy items is set to
+  zero, only orchestration overhead, apply latency and readiness
+  (`--wait-mode ready --ready-delay`) are measured.
+
+Results are saved as JSON at `benchmarks/results/<version>.json`, use
+`--compare` with the results of other version to print the time ratios.
+
+Example:
+```bash
+python benchmarks/bench_deploy.py --sizes 10 100 1000
+python benchmarks/bench_deploy.py --sizes 10 100 \
+    --compare benchmarks/results/1.32.1.json
+```
+"""
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess # NOQA
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import List, Callable
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_PATH = os.path.join(REPO_PATH, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.microservices.postgres.deploy import (
+    PostgresDatabase, PGBouncerDatabase)
+from pumpwood_deploy.microservices.pumpwood_auth.deploy import (
+    PumpWoodAuthMicroservice)
+from pumpwood_deploy.microservices.pumpwood_datalake.deploy import (
+    PumpWoodDatalakeMicroservice)
+from pumpwood_deploy.microservices.streamlit.deploy import (
+    PumpwoodStreamlitMicroservices)
+from pumpwood_deploy.test_aux.fake_kubectl import FakeCluster
+
+
+def _microservice(i: int):
+    """Create the i-th microservice of the synthetic stack."""
+    kind = i % 5
+    if kind == 0:
+        return PostgresDatabase(
+            name='postgres-{}'.format(i), db_username='pumpwood',
+            db_password='pumpwood', disk_name='disk-{}'.format(i),  # NOQA
+            disk_size='10Gi')
+    if kind == 1:
+        return PGBouncerDatabase(
+            name='pgbouncer-{}'.format(i),
+            postgres_secret='postgres-{}'.format(i - 1),
+            postgres_database='pumpwood',
+            postgres_host='postgres-{}'.format(i - 1))
+    if kind == 2:
+        return PumpWoodAuthMicroservice(
+            secret_key='secret', email_host_user='user',  # NOQA
+            email_host_password='password', bucket_name='bucket',  # NOQA
+            app_version='1.0', static_version='1.0',
+            db_host='pgbouncer-{}'.format(i - 1))
+    if kind == 3:
+        return PumpWoodDatalakeMicroservice(
+            bucket_name='bucket', app_version='1.0', worker_version='1.0',
+            db_host='pgbouncer-{}'.format(i - 2))
+    return PumpwoodStreamlitMicroservices(dashboard_images=[{
+        'image': 'dashboard', 'version': '1.0',
+        'deployment_name': 'dashboard-{}'.format(i)}])
+
+
+def build_stack(size: int, output_path: str) -> DeployPumpWood:
+    """Build a deploy with `size` microservice objects.
+
+    Args:
+        size (int):
+            Number of microservice objects, including standard
+            microservices added by `DeployPumpWood`.
+        output_path (str):
+            Output path of the deploy, Postgres certificates are kept at
+            its keystore. Use a temporary directory.
+
+    Returns:
+        DeployPumpWood object with the synthetic stack.
+    """
+    deploy = DeployPumpWood(
+        model_user_password='password', rabbitmq_secret='password',  # NOQA
+        hash_salt='salt', kong_db_disk_name='kong-disk',
+        kong_db_disk_size='10Gi', k8_provider='aws',
+        k8_deploy_args={'region': 'us-east-1', 'cluster_name': 'benchmark'},
+        storage_type='aws_s3', storage_deploy_args={
+            'access_key_id': 'key', 'secret_access_key': 'secret'},  # NOQA
+        k8_namespace='benchmark', output_path=output_path)
+    for i in range(size - 1):
+        deploy.add_microservice(_microservice(i))
+    return deploy
+
+
+def _timings(function: Callable, repeat: int) -> dict:
+    """Run a function `repeat` times and summarize the times."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            function()
+        runs.append(time.perf_counter() - start)
+    return {
+        'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+
+def bench_import(repeat: int) -> dict:
+    """Time to import `pumpwood_deploy.deploy` at a new interpreter."""
+    code = (
+        "import time\nstart = time.perf_counter()\n"
+        "import pumpwood_deploy.deploy\n"
+        "print(time.perf_counter() - start)")
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SRC_PATH + os.pathsep + env.get('PYTHONPATH', '')
+    runs = []
+    for _ in range(repeat):
+        process = subprocess.run(  # NOQA
+            [sys.executable, '-c', code], env=env, check=True,
+            stdout=subprocess.PIPE)
+        runs.append(float(process.stdout.decode().strip()))
+    return {
+        'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+
+def bench_create_deployment_file(deploy: DeployPumpWood,
+                                 repeat: int) -> dict:
+    """Time to call `create_deployment_file` of all microservices."""
+    def render():
+        for microservice in deploy.microsservices_to_deploy:
+            microservice.create_deployment_file(
+                kube_client=deploy.kube_client)
+    return _timings(render, repeat=repeat)
+
+
+def bench_create_deploy_files(deploy: DeployPumpWood, repeat: int,
+                              render_workers: int) -> dict:
+    """Time, peak memory and written bytes of `create_deploy_files`."""
+    result = _timings(
+        lambda: deploy.create_deploy_files(render_workers=render_workers),
+        repeat=repeat)
+
+    tracemalloc.start()
+    with redirect_stdout(io.StringIO()):
+        deploy_cmds = deploy.create_deploy_files(
+            render_workers=render_workers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    written_bytes = 0
+    n_files = 0
+    for directory in ['outputs/deploy_output', 'outputs/services_output']:
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                n_files += 1
+                written_bytes += os.path.getsize(
+                    os.path.join(root, file_name))
+    result.update({
+        'peak_memory_bytes': peak, 'written_bytes': written_bytes,
+        'n_files': n_files,
+        'n_commands': (
+            len(deploy_cmds['service_cmds']) +
+            len(deploy_cmds['microservice_cmds']))})
+    return result
+
+
+def bench_orchestration(deploy: DeployPumpWood, latency: float,
+                        max_workers: int, wait_mode: str = "sleep",
+                        ready_delay: float = 0.0) -> dict:
+    """Time to run all deploy commands against a fake cluster."""
+    with redirect_stdout(io.StringIO()):
+        deploy_cmds = deploy.create_deploy_files()
+    cmds = deploy_cmds['service_cmds'] + deploy_cmds['microservice_cmds']
+    for cmd in cmds:
+        cmd['sleep'] = 0
+
+    cluster = FakeCluster(
+        state_dir='outputs/fake_cluster', apply_latency=latency,
+        pvc_bind_delay=ready_delay, ready_delay=ready_delay)
+    with cluster.on_path():
+        deploy.kube_client.login_cache.ttl = 0
+        deploy.kube_client._connected = False
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            deploy.kube_client.run_deploy_commmands(
+                cmds, max_workers=max_workers, wait_mode=wait_mode)
+        total = time.perf_counter() - start
+    return {
+        'time': total, 'n_commands': len(cmds),
+        'n_applied_objects': len(cluster.applied()), 'latency': latency,
+        'max_workers': max_workers, 'wait_mode': wait_mode,
+        'ready_delay': ready_delay}
+
+
+def run(sizes: List[int], repeat: int = 3, latency: float = 0.01,
+        max_workers: int = 4, render_workers: int = 4,
+        orchestration_max_size: int = 1000, wait_mode: str = "sleep",
+        ready_delay: float = 0.0) -> dict:
+    """Run all benchmarks.
+
+    Args:
+        sizes (List[int]):
+            Number of microservice objects of the synthetic stacks.
+        repeat (int):
+            Number of times each timing is repeated.
+        latency (float):
+            Seconds each apply takes at the fake cluster.
+        max_workers (int):
+            `max_workers` used at orchestration benchmark.
+        render_workers (int):
+            `render_workers` used at `create_deploy_files`.
+        orchestration_max_size (int):
+            Orchestration is benchmarked only for stacks up to this size.
+        wait_mode (str):
+            `wait_mode` used at orchestration benchmark.
+        ready_delay (float):
+            Seconds claims and workloads take to be ready at the fake
+            cluster.
+
+    Returns:
+        Dictionary with results of each size.
+    """
+    with open(os.path.join(REPO_PATH, 'VERSION'), 'r') as file:
+        version = file.read().strip().split('=')[-1]
+
+    results = {
+        'version': version, 'python': platform.python_version(),
+        'platform': platform.platform(), 'time': time.time(),
+        'parameters': {
+            'repeat': repeat, 'latency': latency,
+            'max_workers': max_workers, 'render_workers': render_workers,
+            'wait_mode': wait_mode, 'ready_delay': ready_delay},
+        'import': bench_import(repeat=repeat), 'sizes': {}}
+    print('## import: %.3fs' % results['import']['min'])
+
+    base_dir = os.getcwd()
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as work_dir:
+            os.chdir(work_dir)
+            try:
+                deploy = build_stack(
+                    size, output_path=os.path.join(work_dir, 'outputs'))
+                size_results = {
+                    'create_deployment_file': bench_create_deployment_file(
+                        deploy, repeat=repeat),
+                    'create_deploy_files': bench_create_deploy_files(
+                        deploy, repeat=repeat,
+                        render_workers=render_workers)}
+                if size <= orchestration_max_size:
+                    size_results['orchestration'] = bench_orchestration(
+                        deploy, latency=latency, max_workers=max_workers,
+                        wait_mode=wait_mode, ready_delay=ready_delay)
+            finally:
+                os.chdir(base_dir)
+        results['sizes'][str(size)] = size_results
+        print(format_size_results(size, size_results))
+    return results
+
+
+def format_size_results(size: int, size_results: dict) -> str:
+    """Create a text line with the results of a stack size."""
+    files = size_results['create_deploy_files']
+    line = (
+        '## size {}: create_deployment_file {:.3f}s, '
+        'create_deploy_files {:.3f}s (peak {:.1f}MB, {} files)').format(
+            size, size_results['create_deployment_file']['min'],
+            files['min'], files['peak_memory_bytes'] / 2 ** 20,
+            files['n_files'])
+    orchestration = size_results.get('orchestration')
+    if orchestration is not None:
+        line += ', orchestration {:.3f}s ({} commands)'.format(
+            orchestration['time'], orchestration['n_commands'])
+    return line
+
+
+def compare(results: dict, other: dict) -> str:
+    """Compare timings of two benchmark results.
+
+    Args:
+        results (dict):
+            Results of current version.
+        other (dict):
+            Results of other version.
+
+    Returns:
+        Text table with the ratio current/other of each timing, ratios
+        greater than one indicate regressions.
+    """
+    rows = [('import', 'min', results['import'], other['import'])]
+    for size, size_results in results['sizes'].items():
+        other_size = other['sizes'].get(size)
+        if other_size is None:
+            continue
+        for step, step_results in size_results.items():
+            if step not in other_size:
+                continue
+            key = 'time' if step == 'orchestration' else 'min'
+            rows.append((
+                '{} {}'.format(size, step), key, step_results,
+                other_size[step]))
+
+    lines = ['## Comparing {} with {}'.format(
+        results['version'], other['version'])]
+    lines.append('{:<32} {:>10} {:>10} {:>8}'.format(
+        'step', 'current', 'other', 'ratio'))
+    for name, key, current, previous in rows:
+        lines.append('{:<32} {:>10.3f} {:>10.3f} {:>8.2f}'.format(
+            name, current[key], previous[key],
+            current[key] / previous[key] if previous[key] else float('nan')))
+    return '\n'.join(lines)
+
+
+def main():
+    """Run benchmarks from command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--render-workers', type=int, default=4)
+    parser.add_argument('--orchestration-max-size', type=int, default=1000)
+    parser.add_argument(
+        '--wait-mode', default='sleep', choices=['sleep', 'ready'])
+    parser.add_argument('--ready-delay', type=float, default=0.0)
+    parser.add_argument(
+        '--output', default=None,
+        help='Results path, default benchmarks/results/<version>.json')
+    parser.add_argument(
+        '--compare', default=None, help='Results of other version')
+    args = parser.parse_args()
+
+    results = run(
+        sizes=args.sizes, repeat=args.repeat, latency=args.latency,
+        max_workers=args.max_workers, render_workers=args.render_workers,
+        orchestration_max_size=args.orchestration_max_size,
+        wait_mode=args.wait_mode, ready_delay=args.ready_delay)
+    output = args.output
+    if output is None:
+        output = os.path.join(
+            REPO_PATH, 'benchmarks', 'results',
+            '{}.json'.format(results['version']))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print('## Results saved at: ' + output)
+
+    if args.compare is not None:
+        with open(args.compare, 'r') as file:
+            print(compare(results, json.load(file)))
+
+
+if __name__ == '__main__':
+    main()
@@ -27,11 +27,16 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     package_dir={"": "src"},
-    package_data={'': ['*.yml', '*.sh']},
+    package_data={'': ['*.yml', '*.sh', '*.json']},
     install_requires=[
         'jinja2',
+        'pyyaml',
         'simplejson>=3.19.3'
     ],
+    extras_require={
+        'api': ['kubernetes'],
+        'certificates': ['cryptography'],
+    },
     packages=setuptools.find_packages(where="src"),
     python_requires=">=3.6",
 )
@@ -1,24 +1,19 @@
 """PumpWood DataLake Microservice Deploy."""
 import os
 import base64
-import pkg_resources
+from pumpwood_deploy.template_registry import get_template
 
 
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'airflow/resources/deploy__webserver.yml').read().decode()
-scheduler_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'airflow/resources/deploy__scheduler.yml').read().decode()
-worker_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'airflow/resources/deploy__worker.yml').read().decode()
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'airflow/resources/secrets.yml').read().decode()
-service_account = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'airflow/resources/service_account.yml').read().decode()
+app_deployment = get_template(
+    'airflow/resources/deploy__webserver.yml')
+scheduler_deployment = get_template(
+    'airflow/resources/deploy__scheduler.yml')
+worker_deployment = get_template(
+    'airflow/resources/deploy__worker.yml')
+secrets = get_template(
+    'airflow/resources/secrets.yml')
+service_account = get_template(
+    'airflow/resources/service_account.yml')
 
 
 class AirflowMicroservice:
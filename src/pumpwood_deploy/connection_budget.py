@@ -0,0 +1,406 @@
+"""Database connection budget of the stack.
+
+Apps connect to the database set at `DB_HOST`, usually a PgBouncer
+(`PGBouncerDatabase` or the bouncer of the test databases) that connects to
+a Postgres (`PostgresDatabase`, started with `max_connections=1000`). Each
+worker of each replica keeps its own connections, so the sum over the stack
+may exceed what the bouncers and Postgres accept.
+
+The planner builds the connection graph from the rendered manifests:
+
+- **Clients:** containers with a `DB_HOST` env variable, with
+  `workers * connections_per_worker * max_replicas` peak connections.
+  Workers are taken from `N_WORKERS` (1 if not set) and max replicas from
+  the HPA or KEDA ScaledObject of the deployment, if autoscaled.
+- **PgBouncer:** peak client connections are checked against
+  `max_client_conn` of each replica, and server connections are the
+  clients limited to `default_pool_size` of each replica. Values are read
+  from `PGBOUNCER_MAX_CLIENT_CONN` and `PGBOUNCER_DEFAULT_POOL_SIZE` env
+  variables of the bouncer container if set.
+- **Postgres:** peak server connections of its bouncers and of the clients
+  that connect to it directly are checked against `max_connections`, read
+  from the container args (Postgres default is used if not set), minus the
+  reserved connections.
+
+Hosts that are not services of the stack (ex.: managed databases) are
+reported, but not checked, since their `max_connections` is not known.
+
+The budget is opt-in, it is set at `DeployPumpWood.set_connection_budget`
+and checked when the deploy files are created. Exceeded budgets are
+returned at `connection_problems` of `create_deploy_files`, or raise if
+the budget is strict.
+
+Example:
+```python
+deploy.set_connection_budget(ConnectionBudget(strict=True))
+deploy.connections_report()
+```
+"""
+import math
+import re
+from typing import Dict, List, Tuple, Union
+from pumpwood_deploy.manifest import Manifest, K8sObject, Container
+from pumpwood_deploy.sizing import pod_component
+from pumpwood_deploy.workers import autoscaled_replicas, container_workers
+
+
+LOCAL_HOSTS = ['0.0.0.0', 'localhost', '127.0.0.1']  # NOQA
+"""Hosts of a Postgres running at the same pod of the bouncer."""
+
+POSTGRES_DEFAULT_MAX_CONNECTIONS = 100
+"""Postgres `max_connections` if it is not set at the container args."""
+
+MAX_CONNECTIONS_PATTERN = re.compile(r'max_connections=(\d+)')
+"""Pattern of `max_connections` at the Postgres container args."""
+
+
+def _container_env(container: Container) -> Dict[str, str]:
+    """Env variables of the container with a literal value."""
+    return {
+        var['name']: str(var['value'])
+        for var in container.data.get('env') or [] if 'value' in var}
+
+
+def _is_pgbouncer(container: Container) -> bool:
+    """Check if the container is a PgBouncer."""
+    return 'pgbouncer' in (container.data.get('image') or '') or \
+        container.name == 'pgbouncer'
+
+
+def _max_replicas(obj: K8sObject, autoscaled: dict) -> int:
+    """Maximum replicas of a deployment."""
+    replicas = (obj.data.get('spec') or {}).get('replicas', 1)
+    return autoscaled.get(obj.name, (replicas, replicas))[1]
+
+
+class ConnectionBudget:
+    """Check database connections of the stack against the limits."""
+
+    connections_per_worker: int
+    """Connections opened by each worker of the clients."""
+    max_client_conn: int
+    """PgBouncer `max_client_conn` if not set at the container env."""
+    default_pool_size: int
+    """PgBouncer `default_pool_size` if not set at the container env."""
+    reserved_connections: int
+    """Postgres connections reserved for superusers and maintenance."""
+    strict: bool
+    """If an exceeded budget raises instead of being returned."""
+
+    def __init__(self, connections_per_worker: int = 1,
+                 max_client_conn: int = 100, default_pool_size: int = 20,
+                 reserved_connections: int = 3, strict: bool = False):
+        """__init__.
+
+        Args:
+            connections_per_worker (int):
+                Connections opened by each worker of the clients, set it
+                to the size of the connection pool of the apps if they use
+                one.
+            max_client_conn (int):
+                PgBouncer `max_client_conn` used if not set at the bouncer
+                env, default is PgBouncer default.
+            default_pool_size (int):
+                PgBouncer `default_pool_size` used if not set at the
+                bouncer env, default is PgBouncer default.
+            reserved_connections (int):
+                Postgres connections not available to clients
+                (`superuser_reserved_connections`).
+            strict (bool):
+                If True `check` raises when a budget is exceeded, else it
+                returns the exceeded budgets.
+        """
+        self.connections_per_worker = connections_per_worker
+        self.max_client_conn = max_client_conn
+        self.default_pool_size = default_pool_size
+        self.reserved_connections = reserved_connections
+        self.strict = strict
+
+    @classmethod
+    def from_arg(cls, budget: Union['ConnectionBudget', dict, None]
+                 ) -> 'ConnectionBudget':
+        """Create budget from an object, a dictionary or None (defaults)."""
+        if isinstance(budget, cls):
+            return budget
+        return cls(**(budget or {}))
+
+    def plan(self, manifests: List[Tuple[str, str]]) -> dict:
+        """Build the connection graph of the stack and check its limits.
+
+        Args:
+            manifests (List[Tuple[str, str]]):
+                List of tuples (microservice, content) with the rendered
+                manifests of the stack.
+
+        Returns:
+            Dictionary with keys:
+            - **clients:** List with `microservice`, `deployment`,
+              `container`, `host`, `workers`, `max_replicas` and
+              `connections` of each client container.
+            - **pgbouncers:** Dictionary by deployment name with
+              `replicas`, `max_client_conn`, `pool_size`,
+              `client_connections`, `server_connections` and `postgres`.
+            - **postgres:** Dictionary by deployment name (host for
+              external databases) with `max_connections`,
+              `server_connections`, `pgbouncers` and `clients` connected
+              directly.
+            - **problems:** Budgets exceeded.
+            - **suggestions:** Changes to fit the budgets.
+        """
+        deployments = []
+        services = {}
+        for microservice, content in manifests:
+            manifest = Manifest.parse(content)
+            autoscaled = autoscaled_replicas(manifest)
+            for obj in manifest:
+                if obj.kind in ['Deployment', 'StatefulSet']:
+                    deployments.append((microservice, obj, autoscaled))
+                elif obj.kind == 'Service':
+                    services[obj.name] = obj
+
+        pgbouncers = {}
+        postgres = {}
+
+        def postgres_node(name: str, container: Container = None) -> dict:
+            if name not in postgres:
+                max_connections = None
+                if container is not None:
+                    args = ' '.join(
+                        str(x) for x in (container.data.get('command') or []) +
+                        (container.data.get('args') or []))
+                    match = MAX_CONNECTIONS_PATTERN.search(args)
+                    max_connections = (
+                        int(match.group(1)) if match else
+                        POSTGRES_DEFAULT_MAX_CONNECTIONS)
+                postgres[name] = {
+                    'max_connections': max_connections,
+                    'server_connections': 0, 'pgbouncers': [],
+                    'clients': []}
+            return postgres[name]
+
+        def resolve(host: str, port: str):
+            """Deployment and container that receive connections."""
+            service = services.get(host.split('.')[0])
+            if service is None:
+                return None
+            spec = service.data.get('spec') or {}
+            selector = spec.get('selector') or {}
+            ports = spec.get('ports') or []
+            target_port = None
+            for service_port in ports:
+                if str(service_port.get('port')) == str(port):
+                    target_port = service_port.get(
+                        'targetPort', service_port.get('port'))
+                    break
+            for _, obj, autoscaled in deployments:
+                template = (obj.data.get('spec') or {}).get('template') or {}
+                labels = (template.get('metadata') or {}).get('labels') or {}
+                if not selector or any(
+                        labels.get(k) != v for k, v in selector.items()):
+                    continue
+                containers = obj.containers()
+                for container in containers:
+                    container_ports = [
+                        p.get('containerPort')
+                        for p in container.data.get('ports') or []]
+                    if target_port in container_ports:
+                        return obj, container, autoscaled
+                return obj, containers[0], autoscaled
+            return None
+
+        # PgBouncers and their Postgres
+        for _, obj, autoscaled in deployments:
+            for container in obj.containers():
+                if not _is_pgbouncer(container):
+                    continue
+                env = _container_env(container)
+                host = env.get('POSTGRES_HOST', env.get('POSTGRESQL_HOST'))
+                port = env.get(
+                    'POSTGRES_PORT', env.get('POSTGRESQL_PORT', '5432'))
+                if host is None:
+                    continue
+                if host in LOCAL_HOSTS:
+                    local = [
+                        c for c in obj.containers() if not _is_pgbouncer(c)]
+                    upstream = postgres_node(
+                        obj.name, local[0] if local else None)
+                    upstream_name = obj.name
+                else:
+                    target = resolve(host, port)
+                    if target is None:
+                        upstream_name = host
+                        upstream = postgres_node(host)
+                    else:
+                        upstream_name = target[0].name
+                        upstream = postgres_node(upstream_name, target[1])
+                upstream['pgbouncers'].append(obj.name)
+                pgbouncers[obj.name] = {
+                    'replicas': _max_replicas(obj, autoscaled),
+                    'max_client_conn': int(env.get(
+                        'PGBOUNCER_MAX_CLIENT_CONN', self.max_client_conn)),
+                    'pool_size': int(env.get(
+                        'PGBOUNCER_DEFAULT_POOL_SIZE',
+                        self.default_pool_size)),
+                    'client_connections': 0, 'server_connections': 0,
+                    'postgres': upstream_name}
+
+        # Clients
+        clients = []
+        for microservice, obj, autoscaled in deployments:
+            if pod_component(obj) == 'db':
+                continue
+            for container in obj.containers():
+                env = _container_env(container)
+                host = env.get('DB_HOST')
+                if host is None:
+                    continue
+                workers = container_workers(container)
+                max_replicas = _max_replicas(obj, autoscaled)
+                client = {
+                    'microservice': microservice, 'deployment': obj.name,
+                    'container': container.name, 'host': host,
+                    'workers': workers, 'max_replicas': max_replicas,
+                    'connections': (
+                        workers * self.connections_per_worker *
+                        max_replicas)}
+                clients.append(client)
+
+                target = resolve(host, env.get('DB_PORT', '5432'))
+                if target is None:
+                    postgres_node(host)['clients'].append(client)
+                elif _is_pgbouncer(target[1]) and \
+                        target[0].name in pgbouncers:
+                    pgbouncers[target[0].name]['client_connections'] += \
+                        client['connections']
+                else:
+                    postgres_node(target[0].name, target[1])[
+                        'clients'].append(client)
+
+        # Check limits
+        problems = []
+        suggestions = []
+        for name, bouncer in pgbouncers.items():
+            bouncer['server_connections'] = min(
+                bouncer['client_connections'],
+                bouncer['pool_size'] * bouncer['replicas'])
+            postgres[bouncer['postgres']]['server_connections'] += \
+                bouncer['server_connections']
+            client_limit = bouncer['max_client_conn'] * bouncer['replicas']
+            if bouncer['client_connections'] > client_limit:
+                problems.append((
+                    'PgBouncer [{}] peak client connections {} exceed '
+                    'max_client_conn {} x {} replicas').format(
+                        name, bouncer['client_connections'],
+                        bouncer['max_client_conn'], bouncer['replicas']))
+                suggestions.append((
+                    'Set PGBOUNCER_MAX_CLIENT_CONN of [{}] to at least '
+                    '{}').format(name, math.ceil(
+                        bouncer['client_connections'] /
+                        bouncer['replicas'])))
+
+        for name, server in postgres.items():
+            direct = sum(c['connections'] for c in server['clients'])
+            server['server_connections'] += direct
+            if server['max_connections'] is None:
+                continue
+            available = server['max_connections'] - self.reserved_connections
+            if server['server_connections'] <= available:
+                continue
+            problems.append((
+                'Postgres [{}] peak server connections {} exceed '
+                'max_connections {} with {} reserved').format(
+                    name, server['server_connections'],
+                    server['max_connections'], self.reserved_connections))
+            bouncer_replicas = sum(
+                pgbouncers[b]['replicas'] for b in server['pgbouncers']
+                if pgbouncers[b]['client_connections'])
+            pool_size = (
+                (available - direct) // bouncer_replicas
+                if bouncer_replicas else 0)
+            if pool_size >= 1:
+                suggestions.append((
+                    'Set PGBOUNCER_DEFAULT_POOL_SIZE of {} to at most '
+                    '{}').format(sorted(
+                        b for b in server['pgbouncers']
+                        if pgbouncers[b]['client_connections']),
+                        pool_size))
+            else:
+                suggestions.append((
+                    'Connect clients of [{}] through a PgBouncer or set '
+                    'its max_connections to at least {}').format(
+                        name, server['server_connections'] +
+                        self.reserved_connections))
+        return {
+            'clients': clients, 'pgbouncers': pgbouncers,
+            'postgres': postgres, 'problems': problems,
+            'suggestions': suggestions}
+
+    def check(self, plan: dict) -> List[str]:
+        """Check if a budget of the plan is exceeded.
+
+        Args:
+            plan (dict):
+                Plan returned by `plan`.
+
+        Returns:
+            List of the budgets exceeded, suggestions of the plan are not
+            included.
+
+        Raises:
+            Exception:
+                'Database connection budget exceeded: ...'. If `strict` is
+                True and a budget is exceeded.
+        """
+        if plan['problems'] and self.strict:
+            raise Exception(
+                'Database connection budget exceeded: {}. Suggestions: '
+                '{}'.format(
+                    '; '.join(plan['problems']),
+                    '; '.join(plan['suggestions'])))
+        return plan['problems']
+
+
+def format_connections_report(plan: dict) -> str:
+    """Format a connection plan as a table.
+
+    Args:
+        plan (dict):
+            Plan returned by `ConnectionBudget.plan`.
+
+    Returns:
+        Table with peak connections of each client, PgBouncer and Postgres.
+    """
+    header = ['node', 'target', 'connections', 'limit']
+    rows = []
+    for client in plan['clients']:
+        rows.append([
+            '{}/{}'.format(client['microservice'], client['container']),
+            client['host'], '{} x {}'.format(
+                client['workers'], client['max_replicas']),
+            str(client['connections'])])
+    for name, bouncer in plan['pgbouncers'].items():
+        rows.append([
+            'pgbouncer/{}'.format(name), bouncer['postgres'],
+            '{} -> {}'.format(
+                bouncer['client_connections'],
+                bouncer['server_connections']),
+            '{} x {}'.format(bouncer['max_client_conn'], bouncer['replicas'])])
+    for name, server in plan['postgres'].items():
+        rows.append([
+            'postgres/{}'.format(name), '-',
+            str(server['server_connections']),
+            '-' if server['max_connections'] is None else
+            str(server['max_connections'])])
+
+    widths = [
+        max([len(header[i])] + [len(r[i]) for r in rows])
+        for i in range(len(header))]
+    lines = ['### Database connections report (peak)']
+    for row in [header] + rows:
+        lines.append('  '.join(
+            cell.ljust(width) for cell, width in zip(row, widths)))
+    for problem in plan['problems']:
+        lines.append('!! {} !!'.format(problem))
+    for suggestion in plan['suggestions']:
+        lines.append('## {}'.format(suggestion))
+    return '\n'.join(lines)
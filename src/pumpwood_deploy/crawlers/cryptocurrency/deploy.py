@@ -1,13 +1,15 @@
 """Crawler for CryptoCurrency."""
 import os
 import base64
-from pumpwood_deploy.microservices.postgres.postgres import \
-    create_ssl_key_ssl_crt
+from typing import Union
+from pumpwood_deploy.microservices.postgres.postgres import (
+    create_ssl_key_ssl_crt, KEYSTORE_PATH)
 from jinja2 import Template
 from pumpwood_deploy.crawlers.cryptocurrency.resources.yml__resources import (
     app_deployment, worker_candle_deployment,
     worker_balance_deployment, worker_order_deployment,
     deployment_postgres, secrets, services__load_balancer)
+from pumpwood_deploy.kubernets.autoscale import AppAutoscale
 
 
 class CrawlerCryptoCurrency:
@@ -57,7 +59,9 @@ class CrawlerCryptoCurrency:
                  db_username: str = "pumpwood",
                  db_host: str = "postgres-crawler-cryptocurrency",
                  db_port: str = "5432",
-                 db_database: str = "pumpwood"):
+                 db_database: str = "pumpwood",
+                 app_autoscale: Union[AppAutoscale, dict] = None,
+                 keystore_path: str = None):
         """
         __init__: Class constructor.
 
@@ -80,6 +84,13 @@ class CrawlerCryptoCurrency:
             postgres_public_ip (str): Postgres public IP.
             firewall_ips (list): List the IPs allowed to connect to datalake.
             workers_timeout (str): Time to workout time for guicorn workers.
+            app_autoscale (Union[AppAutoscale, dict]): Autoscale settings of
+                the application, if set a HorizontalPodAutoscaler is created
+                and `app_replicas` is not used.
+            keystore_path (str): Path of the local keystore with the
+                Postgres certificate, created at the first render. If None,
+                `DeployPumpWood.add_microservice` sets it under its
+                `output_path`.
         Returns:
           PumpWoodETLMicroservice: New Object
 
@@ -90,7 +101,7 @@ class CrawlerCryptoCurrency:
           No example yet.
 
         """
-        postgres_certificates = create_ssl_key_ssl_crt()
+        self.keystore_path = keystore_path
         self._db_password = base64.b64encode(db_password.encode()).decode()
         self._microservice_password = base64.b64encode(
             microservice_password.encode()).decode()
@@ -99,11 +110,6 @@ class CrawlerCryptoCurrency:
         self._bitfinex_api_secret = base64.b64encode(
             bitfinex_api_secret.encode()).decode()
 
-        self._ssl_crt = base64.b64encode(
-            postgres_certificates['ssl_crt'].encode()).decode()
-        self._ssl_key = base64.b64encode(
-            postgres_certificates['ssl_key'].encode()).decode()
-
         self.postgres_public_ip = postgres_public_ip
         self.firewall_ips = firewall_ips
 
@@ -116,6 +122,7 @@ class CrawlerCryptoCurrency:
         # App
         self.app_version = app_version
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_debug = app_debug
         self.app_timeout = app_timeout
         self.app_workers = app_workers
@@ -159,14 +166,21 @@ class CrawlerCryptoCurrency:
 
     def create_deployment_file(self, kube_client):
         """create_deployment_file."""
+        # Certificate is kept at keystore and reused between renders
+        postgres_certificates = create_ssl_key_ssl_crt(
+            name="postgres-crawler-cryptocurrency",
+            keystore_path=self.keystore_path or KEYSTORE_PATH)
+
         # Secrets
         secrets_text_formated = secrets.format(
             db_password=self._db_password,
             microservice_password=self._microservice_password,
             bitfinex_api_key=self._bitfinex_api_key,
             bitfinex_api_secret=self._bitfinex_api_secret,
-            ssl_key=self._ssl_key,
-            ssl_crt=self._ssl_crt)
+            ssl_key=base64.b64encode(
+                postgres_certificates['ssl_key'].encode()).decode(),
+            ssl_crt=base64.b64encode(
+                postgres_certificates['ssl_crt'].encode()).decode())
 
         # Postgres
         volume_postgres_text_f = None
@@ -208,6 +222,9 @@ class CrawlerCryptoCurrency:
                 requests_cpu=self.app_requests_cpu,
                 limits_memory=self.app_limits_memory,
                 limits_cpu=self.app_limits_cpu)
+        if self.app_autoscale is not None:
+            deployment_text_frmtd = self.app_autoscale.autoscale_deployment(
+                deployment_text_frmtd)
 
         # Worker
         worker_candle_deployment_frmted = worker_candle_deployment.format(
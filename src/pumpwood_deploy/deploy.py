@@ -1,32 +1,99 @@
 """Pumpwood Deploy."""
 import os
 import stat
+import time
 import shutil
-import pkg_resources
-from typing import List
+import threading
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, List, Iterator, Union
 from pumpwood_deploy.microservices.standard.deploy import (
     StandardMicroservices)
 from pumpwood_deploy.kubernets.kubernets import Kubernets
-from jinja2 import Template
+from pumpwood_deploy.kubernets.dependency_graph import (
+    DependencyGraph, manifest_references)
+from pumpwood_deploy.kubernets.readiness import WAIT_DEFAULT_TIMEOUT
+from pumpwood_deploy.kubernets.login_cache import LOGIN_CACHE_TTL
+from pumpwood_deploy.kubernets.diff import DiffPlanner, format_plan
+from pumpwood_deploy.kubernets.autoscale import check_autoscaled_requests
+from pumpwood_deploy.kubernets.rollout_watcher import (
+    RolloutWatcher, watch_source, format_rollout_report)
+from pumpwood_deploy.kubernets.file_objects import (
+    secret_from_files, configmap_from_file, to_manifest)
+from pumpwood_deploy.kubernets.manifest_cache import (
+    ManifestCache, DeployCheckpoint, deploy_item_hash)
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.trace import DeployTracer
+from pumpwood_deploy.pipeline import iter_manifests, ManifestSink
+from pumpwood_deploy.manifest import ManifestPatch, patch_deploy_item
+from pumpwood_deploy.sizing import SizingPatch, SizingProfile
+from pumpwood_deploy.workers import (
+    AutoWorkersPatch, WorkersFormula, manifest_workers,
+    format_workers_report)
+from pumpwood_deploy.connection_budget import (
+    ConnectionBudget, format_connections_report)
 
 
-create_kube_cmd = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'kubernets/bash_templates/kubectl_apply.sh').read().decode()
+create_kube_cmd = get_template(
+    'kubernets/bash_templates/kubectl_apply.sh')
 """@private"""
-secret_file_template = Template(pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'kubernets/bash_templates/secret_file.sh').read().decode())
-"""@private"""
-configmap_template = Template(pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'kubernets/bash_templates/configmap.sh').read().decode())
-"""@private"""
-configmap_keyname_template = Template(pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'kubernets/bash_templates/configmap_keyname.sh').read().decode())
+server_side_apply_template = get_template(
+    'kubernets/bash_templates/kubectl_apply_server_side.sh')
 """@private"""
 
+FILE_OBJECTS_FIELD_MANAGER = 'pumpwood-deploy'
+"""Field manager used to apply secrets and config maps created from files,
+   server-side apply is used since files may be larger than the
+   last-applied-configuration annotation limit."""
+
+
+def _render_microservice(microservice, kube_client: Kubernets,
+                         namespace: str,
+                         patches: List[ManifestPatch] = None,
+                         render_cache=None) -> dict:
+    """Render deploy items of a microservice.
+
+    Module level function so it can be used with a process pool, time spent
+    is returned to be recorded at the deploy trace.
+
+    Args:
+        microservice (Microservice object):
+            Microservice object to be rendered.
+        kube_client (Kubernets):
+            Kubernets client used to create provider specific manifests.
+        namespace (str):
+            Default namespace of the deploy.
+        patches (List[ManifestPatch]):
+            Patches applied to the rendered manifests.
+        render_cache (RenderCache):
+            Cache of the deploy items shared between deploys, check
+            `pumpwood_deploy.fanout.RenderCache`.
+
+    Returns:
+        Return a dictionary with key `items` with a list of tuples
+        (deploy_item, cmd_info) with the deploy item and its references and
+        content hash, and keys `start`, `end`, `pid` and `tid` with the
+        time and worker of the render.
+    """
+    start = time.time()
+    if render_cache is not None:
+        deploy_items = render_cache.deployment_items(
+            microservice, kube_client=kube_client)
+    else:
+        deploy_items = microservice.create_deployment_file(
+            kube_client=kube_client)
+    items = []
+    for d in deploy_items:
+        d = patch_deploy_item(d, patches)
+        check_autoscaled_requests(d)
+        cmd_info = manifest_references(deploy_item=d, namespace=namespace)
+        cmd_info['hash'] = deploy_item_hash(
+            deploy_item=d, namespace=namespace)
+        items.append((d, cmd_info))
+    return {
+        'items': items, 'start': start, 'end': time.time(),
+        'pid': os.getpid(), 'tid': threading.get_ident()}
+
 
 class DeployPumpWood():
     """Class to perform PumpWood Deploy."""
@@ -41,6 +108,23 @@ class DeployPumpWood():
        application."""
     base_path: str
     """Base path that will be used to create manifest file and bash scripts."""
+    output_path: str
+    """Directory where deploy files are created."""
+    render_cache: object
+    """Cache of the rendered deploy items shared between deploys, check
+       `pumpwood_deploy.fanout.RenderCache`. If None, microservices are
+       rendered on each call."""
+    sizing: dict
+    """Sizing profile of each component for all microservices, check
+       `set_sizing`."""
+    microservice_sizing: dict
+    """Sizing profiles that override `sizing` by microservice id."""
+    workers_formula: WorkersFormula
+    """Formula of the number of app workers, None to use `app_workers` of
+       the microservices. Check `set_auto_workers`."""
+    connection_budget: ConnectionBudget
+    """Budget of database connections checked before deploy, None to not
+       check. Check `set_connection_budget`."""
 
     def __init__(self, model_user_password: str,
                  rabbitmq_secret: str,
@@ -50,7 +134,11 @@ class DeployPumpWood():
                  k8_deploy_args: dict, storage_type: str,
                  storage_deploy_args: str, k8_namespace="pumpwood",
                  gateway_health_url: str = "health-check/pumpwood-auth-app/",
-                 kong_repository: str = "gcr.io/repositorio-geral-170012"):
+                 kong_repository: str = "gcr.io/repositorio-geral-170012",
+                 k8_backend: str = "kubectl", kubeconfig: str = None,
+                 login_cache_ttl: float = LOGIN_CACHE_TTL,
+                 output_path: str = "outputs",
+                 login_cache_path: str = None):
         """__init__.
 
         Args:
@@ -105,11 +193,33 @@ class DeployPumpWood():
                 deploy for Pumpwood.
             kong_repository (str):
                 Kong service mesh custom image repository.
+            k8_backend (str):
+                Backend used to apply manifests, `kubectl` to run the bash
+                scripts or `api` to apply directly at the API server.
+                Check `Kubernets`.
+            kubeconfig (str):
+                Path to kubeconfig used to login and apply manifests, if not
+                set default kubeconfig is used.
+            login_cache_ttl (float):
+                Time in seconds a login to the cluster is reused without
+                calling the cloud CLI. Login is only performed when the
+                first command is applied.
+            output_path (str):
+                Directory where deploy files (manifests and bash scripts)
+                are created.
+            login_cache_path (str):
+                Path of the state file with the logins to the clusters,
+                default `{output_path}/login_cache.json`.
         """
+        if login_cache_path is None:
+            login_cache_path = os.path.join(output_path, 'login_cache.json')
+
         self.deploy = []
         self.kube_client = Kubernets(
             k8_namespace=k8_namespace, k8_provider=k8_provider,
-            k8_deploy_args=k8_deploy_args)
+            k8_deploy_args=k8_deploy_args, k8_backend=k8_backend,
+            kubeconfig=kubeconfig, login_cache_path=login_cache_path,
+            login_cache_ttl=login_cache_ttl)
         self.namespace = k8_namespace
 
         standard_microservices = StandardMicroservices(
@@ -124,6 +234,13 @@ class DeployPumpWood():
 
         self.microsservices_to_deploy = [
             standard_microservices]
+        self.patches = []
+        self.sizing = {}
+        self.microservice_sizing = {}
+        self.workers_formula = None
+        self.connection_budget = None
+        self.output_path = output_path
+        self.render_cache = None
         self.base_path = os.getcwd()
 
     def add_microservice(self, microservice):
@@ -131,18 +248,177 @@ class DeployPumpWood():
 
         Args:
             microservice (Microservice object):
-                A microservice object to be added to deployment stack.
+                A microservice object to be added to deployment stack. If
+                it has a `keystore_path` not set, certificates are kept
+                at `{output_path}/keystore`.
         """
+        if getattr(microservice, 'keystore_path', False) is None:
+            microservice.keystore_path = os.path.join(
+                self.output_path, 'keystore')
         self.microsservices_to_deploy.append(microservice)
 
-    def create_deploy_files(self):
+    def add_patch(self, patch: ManifestPatch):
+        """Add a patch applied to the manifests of all microservices.
+
+        Patches are applied in the order they were added, after each
+        microservice is rendered. Check `pumpwood_deploy.manifest`.
+
+        Args:
+            patch (ManifestPatch):
+                Structured patch, ex.: `ResourcesPatch`, `EnvPatch`,
+                `AffinityPatch`, `ReplicasPatch`.
+        """
+        self.patches.append(patch)
+
+    def set_sizing(self, app: Union[str, SizingProfile] = None,
+                   worker: Union[str, SizingProfile] = None,
+                   db: Union[str, SizingProfile] = None,
+                   microservice=None):
+        """Set sizing profiles of the components of the microservices.
+
+        Profiles replace the requests and limits of the templates, they are
+        applied before the patches added with `add_patch`. Check
+        `pumpwood_deploy.sizing`.
+
+        Args:
+            app (Union[str, SizingProfile]):
+                Profile of the app pods, `small`, `medium`, `large`,
+                `guaranteed` or a custom `SizingProfile`. If None, it is not
+                changed.
+            worker (Union[str, SizingProfile]):
+                Profile of the worker pods.
+            db (Union[str, SizingProfile]):
+                Profile of the database pods (postgres, pgbouncer and test
+                databases).
+            microservice (Microservice object):
+                If set, profiles are used only for this microservice and
+                override the profiles set for all microservices.
+        """
+        profiles = {
+            component: profile for component, profile in [
+                ('app', app), ('worker', worker), ('db', db)]
+            if profile is not None}
+        # Validate profiles before setting them
+        SizingPatch(profiles)
+        if microservice is None:
+            self.sizing.update(profiles)
+        else:
+            self.microservice_sizing.setdefault(
+                id(microservice), {}).update(profiles)
+
+    def set_auto_workers(self, formula: Union[WorkersFormula, dict] = None):
+        """Compute the number of workers of the apps from their resources.
+
+        `N_WORKERS` of the app containers is set using their CPU and memory
+        after sizing profiles are applied, instead of `app_workers`. Check
+        `pumpwood_deploy.workers`.
+
+        Args:
+            formula (Union[WorkersFormula, dict]):
+                Formula of the number of workers or a dictionary with its
+                `__init__` arguments, if None default formula is used.
+        """
+        self.workers_formula = WorkersFormula.from_arg(formula)
+
+    def set_connection_budget(
+            self, budget: Union[ConnectionBudget, dict, bool] = True):
+        """Set the database connection budget checked before deploy.
+
+        Budget is not checked by default. If set, it is checked when the
+        deploy files are created and exceeded budgets are returned at
+        `connection_problems` of `create_deploy_files`. Check
+        `pumpwood_deploy.connection_budget`.
+
+        Args:
+            budget (Union[ConnectionBudget, dict, bool]):
+                Budget or a dictionary with its `__init__` arguments, ex.:
+                `{'strict': True}` to raise if it is exceeded. True uses
+                default budget and False disables the check.
+        """
+        if budget is False:
+            self.connection_budget = None
+        elif budget is True:
+            self.connection_budget = ConnectionBudget()
+        else:
+            self.connection_budget = ConnectionBudget.from_arg(budget)
+
+    def microservice_patches(self, microservice) -> List[ManifestPatch]:
+        """Patches applied to the manifests of a microservice.
+
+        Args:
+            microservice (Microservice object):
+                Microservice of the deploy.
+
+        Returns:
+            Sizing patch of the microservice, if any sizing was set, and
+            auto workers patch, if set, followed by the patches added with
+            `add_patch`.
+        """
+        patches = []
+        profiles = dict(
+            self.sizing, **self.microservice_sizing.get(id(microservice), {}))
+        if profiles:
+            patches.append(SizingPatch(profiles))
+        if self.workers_formula is not None:
+            patches.append(AutoWorkersPatch(self.workers_formula))
+        if not patches:
+            return self.patches
+        return patches + self.patches
+
+    def create_deploy_files(self, render_workers: int = 4,
+                            render_pool: str = "thread",
+                            tracer: DeployTracer = None):
         """Create all deployment manifests and scripts.
 
         Interate over `microsservices_to_deploy` creating deploy files at
-        `./outputs/` folder.
+        `output_path` folder (default `./outputs/`).
+
+        Manifests of the microservices are rendered concurrently, results
+        are merged in the order the microservices were added so file
+        counters and ordering do not change between runs. Files are
+        written serially after rendering.
+
+        Each command returned has the objects that are created (`provides`)
+        and referenced (`requires`) by the deploy item, they are used to
+        build the dependency graph when applying commands concurrently. It
+        also has a content `hash` used by incremental deploys.
+
+        Args:
+            render_workers (int):
+                Number of microservices rendered at the same time, setting
+                it to 1 will render them serially.
+            render_pool (str):
+                Pool used to render, `thread` or `process`. Process pool
+                requires microservices to be picklable, `kube_client` is
+                sent to the render processes without its connection.
+            tracer (DeployTracer):
+                Tracer to record render and write time of each
+                microservice.
+
+        Returns:
+            Return a dictionary with keys `service_cmds` and
+            `microservice_cmds` with the commands to apply the services
+            and the microservices manifests, and `connection_problems`
+            with the database connection budgets exceeded (empty if no
+            budget is set, check `set_connection_budget`).
+
+        Raises:
+            NotImplementedError:
+                'Render pool not implemented: %s'. Indicates that
+                `render_pool` is not `thread` or `process`.
         """
+        tracer = DeployTracer(enabled=False) if tracer is None else tracer
+        pool_class = {
+            'thread': ThreadPoolExecutor,
+            'process': ProcessPoolExecutor}.get(render_pool)
+        if pool_class is None:
+            raise NotImplementedError('Render pool not implemented: %s' % (
+                render_pool, ))
         sevice_cmds = []
         deploy_cmds = []
+        deploy_output = os.path.join(self.output_path, 'deploy_output') + '/'
+        services_output = (
+            os.path.join(self.output_path, 'services_output') + '/')
 
         counter = 0
         service_counter = 0
@@ -150,27 +426,52 @@ class DeployPumpWood():
         ###################################################################
         # Limpa o deploy anterior e cria as pastas para receber os arquivos
         # do novo deploy
-        if os.path.exists('outputs/deploy_output'):
-            shutil.rmtree('outputs/deploy_output')
-        os.makedirs('outputs/deploy_output')
-        os.makedirs('outputs/deploy_output/resources/')
-
-        if os.path.exists('outputs/services_output'):
-            shutil.rmtree('outputs/services_output')
-        os.makedirs('outputs/services_output')
-        os.makedirs('outputs/services_output/resources/')
+        if os.path.exists(deploy_output):
+            shutil.rmtree(deploy_output)
+        os.makedirs(deploy_output + 'resources/')
+
+        if os.path.exists(services_output):
+            shutil.rmtree(services_output)
+        os.makedirs(services_output + 'resources/')
         ###################################################################
 
         #####################################################################
         # Usa os arqivos de template e subistitui com as variáveis para criar
         # os templates de deploy
+        print('### Rendering microservices manifests')
+        render_args = (
+            self.microsservices_to_deploy, repeat(self.kube_client),
+            repeat(self.namespace),
+            [self.microservice_patches(m)
+             for m in self.microsservices_to_deploy],
+            repeat(self.render_cache if render_pool == 'thread' else None))
+        if render_workers <= 1:
+            rendered = list(map(_render_microservice, *render_args))
+        else:
+            with pool_class(max_workers=render_workers) as executor:
+                rendered = list(executor.map(
+                    _render_microservice, *render_args))
+
+        connection_problems = []
+        if self.connection_budget is not None:
+            print('### Checking database connection budget')
+            connection_problems = self.connection_budget.check(
+                self.connection_budget.plan([
+                    (type(m).__name__, d['content'])
+                    for m, m_rendered in zip(
+                        self.microsservices_to_deploy, rendered)
+                    for d, _ in m_rendered['items']
+                    if d['type'] in ['deploy', 'services']]))
+
         print('### Creating microservices files:')
-        # m = self.microsservices_to_deploy[0]
-        for m in self.microsservices_to_deploy:
+        for m, m_rendered in zip(self.microsservices_to_deploy, rendered):
             print('\nProcessing: ' + str(m))
-            temp_deployments = m.create_deployment_file(
-                kube_client=self.kube_client)
-            for d in temp_deployments:
+            tracer.add_span(
+                str(m), category='render', start=m_rendered['start'],
+                end=m_rendered['end'], pid=m_rendered['pid'],
+                tid=m_rendered['tid'])
+            write_start = time.time()
+            for d, cmd_info in m_rendered['items']:
                 # Create a counter to order the files in the deploy
                 str_counter = "%03d" % (counter, )
                 str_service_counter = "%03d" % (service_counter, )
@@ -182,12 +483,11 @@ class DeployPumpWood():
                         counter=str_counter, name=d['name'])
 
                     print('Creating deploy: ' + file_name)
-                    with open('outputs/deploy_output/' +
+                    with open(deploy_output +
                               file_name, 'w') as file:
                         file.write(d['content'])
 
-                    file_name_sh_temp = (
-                        'outputs/deploy_output/{counter}__{name}.sh')
+                    file_name_sh_temp = deploy_output + '{counter}__{name}.sh'
                     file_name_sh = file_name_sh_temp.format(
                         counter=str_counter, name=d['name'])
 
@@ -200,73 +500,91 @@ class DeployPumpWood():
 
                     deploy_cmds.append({
                         'command': 'run', 'file': file_name_sh,
-                        'sleep': d.get('sleep')})
+                        'sleep': d.get('sleep'), 'timeout': d.get('timeout'),
+                        'name': d['name'], 'namespace': deploy_namespace,
+                        'type': d['type'],
+                        'manifest': deploy_output + file_name,
+                        **cmd_info})
                     counter = counter + 1
 
-                # Create a secret from a file
+                # Create a secret from a file, it is rendered as a manifest
+                # with files content and applied without deleting the
+                # secret
                 elif d['type'] == 'secrets_file':
-                    # Legacy path set as string
-                    if type(d["path"]) is str:
-                        d["path"] = [d["path"]]
+                    # Legacy path set as string, deploy item is not changed
+                    # since it may be shared by a render cache
+                    paths = d["path"]
+                    if type(paths) is str:
+                        paths = [paths]
 
                     deploy_namespace = d.get("namespace", self.namespace)
-                    command_formated = secret_file_template.render(
-                        name=d["name"], paths=d["path"],
-                        namespace=deploy_namespace)
-                    file_name_temp = (
-                        'outputs/deploy_output/{counter}__{name}.sh')
-                    file_name = file_name_temp.format(
+                    file_name = 'resources/{counter}__{name}.yml'.format(
                         counter=str_counter, name=d['name'])
-
                     print('Creating secrets_file: ' + file_name)
-                    with open(file_name, 'w') as file:
-                        file.write(command_formated)
-                    os.chmod(file_name, stat.S_IRWXU)
+                    with open(deploy_output + file_name, 'w') as file:
+                        file.write(to_manifest(secret_from_files(
+                            name=d['name'], paths=paths)))
+
+                    file_name_sh = deploy_output + '{}__{}.sh'.format(
+                        str_counter, d['name'])
+                    with open(file_name_sh, 'w') as file:
+                        file.write(server_side_apply_template.format(
+                            file=file_name, namespace=deploy_namespace,
+                            field_manager=FILE_OBJECTS_FIELD_MANAGER))
+                    os.chmod(file_name_sh, stat.S_IRWXU)
                     deploy_cmds.append({
-                        'command': 'run', 'file': file_name,
-                        'sleep': d.get('sleep')})
+                        'command': 'run', 'file': file_name_sh,
+                        'sleep': d.get('sleep'), 'timeout': d.get('timeout'),
+                        'name': d['name'], 'namespace': deploy_namespace,
+                        'type': d['type'],
+                        'manifest': deploy_output + file_name,
+                        **cmd_info})
                     counter = counter + 1
 
-                # Create ConfigMap from a file
+                # Create ConfigMap from a file, it is rendered as a manifest
+                # with file content and applied without deleting the
+                # config map
                 elif d['type'] == 'configmap_file':
                     file_name_resource_temp = 'resources/{name}'
                     file_name_resource = file_name_resource_temp.format(
                         name=d['file_name'])
 
                     if 'content' in d.keys():
-                        with open('outputs/deploy_output/' +
+                        with open(deploy_output +
                                   file_name_resource, 'w') as file:
                             file.write(d['content'])
                     elif 'file_path' in d.keys():
                         with open(d['file_path'], 'rb') as file:
                             file_data = file.read()
-                        with open('outputs/deploy_output/' +
+                        with open(deploy_output +
                                   file_name_resource, 'wb') as file:
                             file.write(file_data)
 
-                    command_formated = None
                     deploy_namespace = d.get("namespace", self.namespace)
-                    if d.get('keyname') is None:
-                        command_formated = configmap_template.format(
-                            name=d['name'], file_name=file_name_resource,
-                            namespace=deploy_namespace)
-                    else:
-                        command_formated = configmap_keyname_template.format(
-                            name=d['name'], file_name=file_name_resource,
-                            keyname=d['keyname'], namespace=deploy_namespace)
-
-                    file_name_temp = (
-                        'outputs/deploy_output/{counter}__{name}.sh')
-                    file_name = file_name_temp.format(
+                    file_name = 'resources/{counter}__{name}.yml'.format(
                         counter=str_counter, name=d['name'])
-
                     print('Creating configmap: ' + file_name)
-                    with open(file_name, 'w') as file:
-                        file.write(command_formated)
+                    with open(deploy_output +
+                              file_name, 'w') as file:
+                        file.write(to_manifest(configmap_from_file(
+                            name=d['name'],
+                            path=deploy_output + file_name_resource,
+                            keyname=d.get('keyname'))))
+
+                    file_name_sh = deploy_output + '{}__{}.sh'.format(
+                        str_counter, d['name'])
+                    with open(file_name_sh, 'w') as file:
+                        file.write(server_side_apply_template.format(
+                            file=file_name, namespace=deploy_namespace,
+                            field_manager=FILE_OBJECTS_FIELD_MANAGER))
+                    os.chmod(file_name_sh, stat.S_IRWXU)
                     deploy_cmds.append({
-                        'command': 'run', 'file': file_name,
-                        'sleep': d.get('sleep')})
-                    os.chmod(file_name, stat.S_IRWXU)
+                        'command': 'run', 'file': file_name_sh,
+                        'sleep': d.get('sleep'), 'timeout': d.get('timeout'),
+                        'name': d['name'], 'namespace': deploy_namespace,
+                        'type': d['type'],
+                        'manifest': deploy_output + file_name,
+                        **cmd_info})
                     counter = counter + 1
 
                 # Create services and load-balacers
@@ -277,13 +595,12 @@ class DeployPumpWood():
                         name=d['name'])
 
                     print('Creating services: ' + file_name)
-                    with open('outputs/services_output/' +
+                    with open(services_output +
                               file_name, 'w') as file:
                         file.write(d['content'])
 
                     file_name_sh_temp = \
-                        'outputs/services_output/' +\
-                        '{service_counter}__{name}.sh'
+                        services_output + '{service_counter}__{name}.sh'
                     file_name_sh = file_name_sh_temp .format(
                         service_counter=str_service_counter,
                         name=d['name'])
@@ -297,25 +614,473 @@ class DeployPumpWood():
                     os.chmod(file_name_sh, stat.S_IRWXU)
                     sevice_cmds.append({
                         'command': 'run', 'file': file_name_sh,
-                        'sleep': d.get('sleep')})
+                        'sleep': d.get('sleep'), 'timeout': d.get('timeout'),
+                        'name': d['name'], 'namespace': deploy_namespace,
+                        'type': d['type'],
+                        'manifest': services_output + file_name,
+                        **cmd_info})
                     service_counter = service_counter + 1
 
                 elif d['type'] == 'endpoint_services':
                     raise Exception('Not used anymore')
                 else:
                     raise Exception('Type not implemented: %s' % (d['type'], ))
+            tracer.add_span(
+                str(m), category='write', start=write_start, end=time.time())
 
         return {
             'service_cmds': sevice_cmds,
-            'microservice_cmds': deploy_cmds}
-
-    def deploy_microservices(self):
-        """Create deploy files and apply them to de cluster."""
-        deploy_cmds = self.create_deploy_files()
-        print('\n\n###Deploying Services:')
-        self.kube_client.run_deploy_commmands(
-            deploy_cmds['service_cmds'])
-
-        print('\n\n###Deploying Microservices:')
-        self.kube_client.run_deploy_commmands(
-            deploy_cmds['microservice_cmds'])
+            'microservice_cmds': deploy_cmds,
+            'connection_problems': connection_problems}
+
+    def iter_manifests(self) -> Iterator[dict]:
+        """Render microservices yielding one manifest at a time.
+
+        Unlike `create_deploy_files`, the whole stack is never kept in
+        memory and no file is written. Check
+        `pumpwood_deploy.pipeline.iter_manifests`.
+
+        Yields:
+            Rendered manifests with keys `name`, `type`, `namespace`,
+            `content`, `sleep`, `timeout`, `provides`, `requires` and
+            `hash`.
+        """
+        return iter_manifests(
+            self.microsservices_to_deploy, kube_client=self.kube_client,
+            namespace=self.namespace, patches_of=self.microservice_patches)
+
+    def workers_report(self, print_report: bool = True
+                       ) -> Dict[str, List[dict]]:
+        """Report workers and concurrency of the apps of each microservice.
+
+        Manifests are rendered with the patches of the deploy, nothing is
+        applied to the cluster.
+
+        Args:
+            print_report (bool):
+                If the report table should be printed.
+
+        Returns:
+            Results of `pumpwood_deploy.workers.manifest_workers` for the
+            manifests of each microservice, by microservice class name.
+        """
+        report = {}
+        for microservice in self.microsservices_to_deploy:
+            results = report.setdefault(type(microservice).__name__, [])
+            for manifest in iter_manifests(
+                    [microservice], kube_client=self.kube_client,
+                    namespace=self.namespace,
+                    patches_of=self.microservice_patches):
+                if manifest['type'] == 'deploy':
+                    results.extend(manifest_workers(manifest['content']))
+        if print_report:
+            print(format_workers_report(report))
+        return report
+
+    def connections_report(self, print_report: bool = True) -> dict:
+        """Report peak database connections of the stack.
+
+        Manifests are rendered with the patches of the deploy, nothing is
+        applied to the cluster. Budget is not checked, problems are only
+        reported.
+
+        Args:
+            print_report (bool):
+                If the report table should be printed.
+
+        Returns:
+            Plan returned by `ConnectionBudget.plan`.
+        """
+        budget = self.connection_budget or ConnectionBudget()
+        manifests = []
+        for microservice in self.microsservices_to_deploy:
+            for manifest in iter_manifests(
+                    [microservice], kube_client=self.kube_client,
+                    namespace=self.namespace,
+                    patches_of=self.microservice_patches):
+                if manifest['type'] in ['deploy', 'services']:
+                    manifests.append(
+                        (type(microservice).__name__, manifest['content']))
+        plan = budget.plan(manifests)
+        if print_report:
+            print(format_connections_report(plan))
+        return plan
+
+    def stream_manifests(self, sinks: List[ManifestSink]) -> int:
+        """Render microservices sending each manifest to the sinks.
+
+        Sinks are closed at the end, when using `ApplySink` the call
+        returns after all manifests are applied.
+
+        Args:
+            sinks (List[ManifestSink]):
+                Sinks that will receive the manifests, check
+                `pumpwood_deploy.pipeline`.
+
+        Returns:
+            Number of manifests rendered.
+        """
+        count = 0
+        try:
+            for manifest in self.iter_manifests():
+                for sink in sinks:
+                    sink.write(manifest)
+                count += 1
+        finally:
+            for sink in sinks:
+                sink.close()
+        return count
+
+    def create_bulk_files(self, cmds: List[dict],
+                          field_manager: str = "pumpwood-deploy"
+                          ) -> List[dict]:
+        """Create bulk server-side apply files for the deploy commands.
+
+        Manifests of the commands are concatenated in a single multi-document
+        file for each namespace, following dependency order, and applied
+        with one `kubectl apply --server-side` call. This avoids one
+        kubectl process (API discovery, TLS handshake...) for each resource
+        of the stack. Secrets and config maps created from files are
+        rendered as manifests too, so every command created by
+        `create_deploy_files` is included at the bulk files. Commands
+        without a `manifest` are kept and will run before the bulk apply.
+
+        Files are created at `bulk_output` folder inside `output_path`.
+
+        Args:
+            cmds (List[dict]):
+                Commands returned by `create_deploy_files`.
+            field_manager (str):
+                Field manager used on server-side apply.
+
+        Returns:
+            List of commands to be used with
+            `Kubernets.run_deploy_commmands`.
+        """
+        bulk_output = os.path.join(self.output_path, 'bulk_output') + '/'
+        if os.path.exists(bulk_output):
+            shutil.rmtree(bulk_output)
+        os.makedirs(bulk_output + 'resources/')
+
+        script_cmds = [c for c in cmds if c.get('manifest') is None]
+        manifest_cmds = [c for c in cmds if c.get('manifest') is not None]
+
+        namespace_cmds = {}
+        graph = DependencyGraph(manifest_cmds)
+        for i in graph.topological_order():
+            c = manifest_cmds[i]
+            namespace = c.get('namespace', self.namespace)
+            namespace_cmds.setdefault(namespace, []).append(c)
+
+        bulk_cmds = []
+        for counter, (namespace, ns_cmds) in enumerate(
+                namespace_cmds.items()):
+            name = "{counter}__bulk__{namespace}".format(
+                counter="%03d" % (counter, ), namespace=namespace)
+            file_name = 'resources/{name}.yml'.format(name=name)
+            print('Creating bulk apply: ' + file_name)
+            documents = []
+            for c in ns_cmds:
+                with open(c['manifest'], 'r') as file:
+                    documents.append(file.read().strip())
+            with open(bulk_output + file_name, 'w') as file:
+                file.write("\n---\n".join(documents) + "\n")
+
+            file_name_sh = bulk_output + '{name}.sh'.format(name=name)
+            with open(file_name_sh, 'w') as file:
+                file.write(server_side_apply_template.format(
+                    file=file_name, namespace=namespace,
+                    field_manager=field_manager))
+            os.chmod(file_name_sh, stat.S_IRWXU)
+
+            provides = [p for c in ns_cmds for p in c['provides']]
+            bulk_cmds.append({
+                'command': 'run', 'file': file_name_sh, 'sleep': 0,
+                'timeout': max(
+                    [c['timeout'] for c in ns_cmds
+                     if c.get('timeout') is not None], default=None),
+                'name': 'bulk__' + namespace, 'namespace': namespace,
+                'names': [c['name'] for c in ns_cmds],
+                'manifest': bulk_output + file_name,
+                'provides': list(dict.fromkeys(provides)), 'requires': []})
+        return script_cmds + bulk_cmds
+
+    def plan(self, deploy_cmds: dict = None, max_workers: int = 8) -> dict:
+        """Compare rendered manifests with the objects at the cluster.
+
+        Objects at the cluster are fetched with one list call for each
+        kind and namespace, so plan is fast enough to run on every CI
+        merge. Only the fields set at the manifests are compared, fields
+        defaulted by the cluster are ignored.
+
+        Args:
+            deploy_cmds (dict):
+                Commands returned by `create_deploy_files`, if not set
+                deploy files will be created.
+            max_workers (int):
+                Number of list calls made at the same time.
+
+        Returns:
+            Return plan with keys `changes` (action and different fields
+            of each object), `drifted_cmds` (commands with objects to be
+            created or updated) and `unchanged_cmds`. Check
+            `pumpwood_deploy.kubernets.diff.DiffPlanner.plan`.
+        """
+        if deploy_cmds is None:
+            deploy_cmds = self.create_deploy_files()
+        planner = DiffPlanner(
+            list_objects=self.kube_client.list_objects,
+            max_workers=max_workers)
+        plan = planner.plan(
+            deploy_cmds['service_cmds'] + deploy_cmds['microservice_cmds'],
+            namespace=self.kube_client.k8_namespace)
+        print(format_plan(plan))
+        return plan
+
+    def watch_rollouts(self, cmds: List[dict],
+                       timeout: int = WAIT_DEFAULT_TIMEOUT,
+                       tracer: DeployTracer = None) -> dict:
+        """Watch workloads of the commands until they are ready.
+
+        Deployments, Pods and Events are watched and the startup of each
+        pod is broken down into scheduling, image pull, container start and
+        readiness probe time. Check
+        `pumpwood_deploy.kubernets.rollout_watcher`.
+
+        Args:
+            cmds (List[dict]):
+                Commands returned by `create_deploy_files` that were
+                applied.
+            timeout (int):
+                Maximum time in seconds to wait all workloads to be ready.
+            tracer (DeployTracer):
+                Tracer to record the rollout time of each workload.
+
+        Returns:
+            Rollout report by workload, check
+            `RolloutWatcher.watch_rollouts`.
+
+        Raises:
+            TimeoutError:
+                'Workloads not ready after %s seconds: %s'. Indicates that
+                some workloads did not get ready before timeout.
+        """
+        workloads = list(dict.fromkeys(
+            tuple(p) for c in cmds for p in c.get('provides', [])))
+        start = time.time()
+        watcher = RolloutWatcher(watch=watch_source(self.kube_client))
+        report = watcher.run(workloads, timeout=timeout)
+        print(format_rollout_report(report))
+        if tracer is not None:
+            for key, result in report.items():
+                if result['ready']:
+                    tracer.add_span(
+                        key, category='rollout', start=start,
+                        end=start + result['time_to_ready'])
+        not_ready = [k for k, r in report.items() if not r['ready']]
+        if not_ready:
+            msg = 'Workloads not ready after %s seconds: %s' % (
+                timeout, not_ready)
+            raise TimeoutError(msg)
+        return report
+
+    def deploy_microservices(self, max_workers: int = 1,
+                             wait_mode: str = "sleep",
+                             wait_timeout: int = WAIT_DEFAULT_TIMEOUT,
+                             bulk: bool = False,
+                             incremental: bool = False,
+                             state_path: str = None,
+                             drift_only: bool = False,
+                             trace_path: str = None,
+                             save_trace: bool = True,
+                             checkpoint_path: str = None,
+                             resume: bool = False):
+        """Create deploy files and apply them to de cluster.
+
+        Commands are applied following a dependency graph built from the
+        deploy items: secrets, config maps and volumes are applied before the
+        deployments that use them and PGBouncers before the applications that
+        have them as `DB_HOST`. If `max_workers` is greater than one,
+        independent commands are applied concurrently.
+
+        Each command applied with success is saved at a checkpoint with its
+        content hash, the checkpoint is removed when all commands are
+        applied. If the deploy fails midway it can be continued with
+        `resume`.
+
+        Args:
+            max_workers (int):
+                Maximum number of commands applied at the same time. Default
+                1 applies the commands sequentially in the order they were
+                added to deploy. If greater than one, a failed command
+                raises and the commands that depend on it are not applied.
+            wait_mode (str):
+                How to wait after each command. `sleep` will wait the fixed
+                time set on each deploy item, `ready` will wait only until
+                the objects created are ready (volume claims bound, rollouts
+                complete, objects created).
+                `watch` will apply all commands without waiting and then
+                watch the rollouts until all workloads are ready, printing
+                the startup time of the pods (check `watch_rollouts`).
+            wait_timeout (int):
+                Time in seconds to wait for each command objects to be
+                ready when `wait_mode="ready"`, or for all workloads when
+                `wait_mode="watch"`. Deploy items can set their own time
+                using `timeout` key.
+            bulk (bool):
+                If True, all manifests will be applied using a single
+                server-side apply for each namespace. Check
+                `create_bulk_files`.
+            incremental (bool):
+                If True, only commands which content changed since the last
+                successful apply will be run. Content hashes are persisted
+                at `state_path`.
+            state_path (str):
+                Path of the state file with the content hashes applied to
+                the cluster, default `{output_path}/deploy_state.json`.
+            drift_only (bool):
+                If True, objects at the cluster are compared with the
+                rendered manifests and only commands with drifted objects
+                (missing or different at the cluster) are run. Check
+                `plan`.
+            trace_path (str):
+                Path of Chrome trace JSON file with the time of each deploy
+                step (render, write, apply and wait of each resource),
+                default `{output_path}/deploy_trace.json`. A summary with
+                the slowest steps is printed at the end of the deploy.
+            save_trace (bool):
+                If False, the trace is not saved, only its summary is
+                printed.
+            checkpoint_path (str):
+                Path of the checkpoint with the commands applied by an
+                unfinished deploy, default
+                `{output_path}/deploy_checkpoint.json`.
+            resume (bool):
+                If True, commands at the checkpoint with the same content
+                hash are not applied again. Check `resume`.
+        """
+        if state_path is None:
+            state_path = os.path.join(self.output_path, 'deploy_state.json')
+        if trace_path is None:
+            trace_path = os.path.join(self.output_path, 'deploy_trace.json')
+        if checkpoint_path is None:
+            checkpoint_path = os.path.join(
+                self.output_path, 'deploy_checkpoint.json')
+
+        tracer = DeployTracer()
+        try:
+            with tracer.span('deploy_microservices', category='total'):
+                self._deploy_microservices(
+                    max_workers=max_workers, wait_mode=wait_mode,
+                    wait_timeout=wait_timeout, bulk=bulk,
+                    incremental=incremental, state_path=state_path,
+                    drift_only=drift_only, tracer=tracer,
+                    checkpoint=DeployCheckpoint(path=checkpoint_path),
+                    resume=resume)
+        finally:
+            if save_trace:
+                tracer.save(trace_path)
+            print(tracer.summary())
+
+    def resume(self, **kwargs):
+        """Continue a deploy that failed midway.
+
+        Deploy files are rendered again and commands applied with the same
+        content hash by the failed deploy (saved at the checkpoint) are
+        skipped, including their waits. Commands that failed, were not
+        applied or changed since are applied.
+
+        Args:
+            **kwargs:
+                Arguments of `deploy_microservices`, they should be the same
+                used at the failed deploy.
+        """
+        self.deploy_microservices(resume=True, **kwargs)
+
+    def _deploy_microservices(self, max_workers: int, wait_mode: str,
+                              wait_timeout: int, bulk: bool,
+                              incremental: bool, state_path: str,
+                              drift_only: bool, tracer: DeployTracer,
+                              checkpoint: DeployCheckpoint, resume: bool):
+        """Deploy microservices recording steps at tracer."""
+        manifest_cache = ManifestCache(path=state_path)
+        deploy_cmds = self.create_deploy_files(tracer=tracer)
+        if resume:
+            for key in ['service_cmds', 'microservice_cmds']:
+                pending_cmds = checkpoint.pending(deploy_cmds[key])
+                print('### Resuming %s: %d of %d commands already applied' % (
+                    key, len(deploy_cmds[key]) - len(pending_cmds),
+                    len(deploy_cmds[key])))
+                deploy_cmds[key] = pending_cmds
+        else:
+            checkpoint.clear()
+        if incremental:
+            for key in ['service_cmds', 'microservice_cmds']:
+                changed_cmds = manifest_cache.changed(deploy_cmds[key])
+                print('### %s: %d of %d commands changed' % (
+                    key, len(changed_cmds), len(deploy_cmds[key])))
+                deploy_cmds[key] = changed_cmds
+        if drift_only:
+            with tracer.span('plan', category='plan'):
+                plan = self.plan(deploy_cmds=deploy_cmds)
+            drifted_ids = set(id(c) for c in plan['drifted_cmds'])
+            for key in ['service_cmds', 'microservice_cmds']:
+                deploy_cmds[key] = [
+                    c for c in deploy_cmds[key] if id(c) in drifted_ids]
+
+        def on_success(cmd: dict):
+            manifest_cache.update(cmd)
+            checkpoint.update(cmd)
+
+        if bulk:
+            item_cmds = {
+                manifest_cache.cmd_key(c): c
+                for c in deploy_cmds['service_cmds'] +
+                deploy_cmds['microservice_cmds']}
+
+            def update_bulk_cache(cmd: dict):
+                names = cmd.get('names')
+                if names is None:
+                    on_success(cmd)
+                    return
+                for name in names:
+                    key = '{}/{}'.format(cmd['namespace'], name)
+                    if key in item_cmds:
+                        on_success(item_cmds[key])
+
+            cmds = self.create_bulk_files(
+                deploy_cmds['service_cmds'] +
+                deploy_cmds['microservice_cmds'])
+            print('\n\n###Deploying bulk:')
+            self.kube_client.run_deploy_commmands(
+                cmds, max_workers=1, wait_mode=wait_mode,
+                wait_timeout=wait_timeout, on_success=update_bulk_cache,
+                tracer=tracer)
+            if wait_mode == 'watch':
+                self.watch_rollouts(cmds, timeout=wait_timeout, tracer=tracer)
+        else:
+            print('\n\n###Deploying Services:')
+            self.kube_client.run_deploy_commmands(
+                deploy_cmds['service_cmds'], max_workers=max_workers,
+                wait_mode=wait_mode, wait_timeout=wait_timeout,
+                on_success=on_success, tracer=tracer)
+
+            print('\n\n###Deploying Microservices:')
+            self.kube_client.run_deploy_commmands(
+                deploy_cmds['microservice_cmds'], max_workers=max_workers,
+                wait_mode=wait_mode, wait_timeout=wait_timeout,
+                on_success=on_success, tracer=tracer)
+            if wait_mode == 'watch':
+                self.watch_rollouts(
+                    deploy_cmds['microservice_cmds'], timeout=wait_timeout,
+                    tracer=tracer)
+
+        # Commands that failed without raising (wait_mode="sleep") keep the
+        # checkpoint so the deploy can be resumed
+        failed_cmds = checkpoint.pending(
+            deploy_cmds['service_cmds'] + deploy_cmds['microservice_cmds'])
+        if failed_cmds:
+            print('!! %d commands failed, fix them and call resume: %s !!' % (
+                len(failed_cmds), [c['name'] for c in failed_cmds]))
+        else:
+            checkpoint.clear()
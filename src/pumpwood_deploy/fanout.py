@@ -0,0 +1,369 @@
+"""Deploy the same stack to many namespaces or clusters concurrently.
+
+One stack definition (`DeployPumpWood`) is deployed to N targets, each
+target may override namespace, cluster (provider, deploy args and
+kubeconfig), add patches and extra microservices (ex.: an `IngressALB` with
+the tenant host). Targets are deployed concurrently and a failure at one
+target does not stop the others.
+
+Microservices are rendered once for all targets with the same provider
+settings, rendered deploy items are shared using a `RenderCache`. Deploy
+files of each target are created at `{output_path}/{target name}/`.
+
+Example:
+```python
+fanout = FanOutDeploy(deploy, targets=[
+    DeployTarget('dev', k8_namespace='dev'),
+    DeployTarget('client1', k8_namespace='client1', microservices=[
+        IngressALB(..., host='client1.mysite.com')])])
+report = fanout.deploy(wait_mode='ready')
+```
+"""
+import os
+import copy
+import shutil
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+from pumpwood_deploy.manifest import ManifestPatch
+
+
+class RenderCache:
+    """Thread safe cache of the deploy items of the microservices.
+
+    Items are cached by microservice object and `Kubernets.render_key`, the
+    microservice is rendered only once even if many targets ask for it at
+    the same time. Microservices with `namespaced_render` set as True are
+    rendered once for each namespace.
+    """
+
+    def __init__(self):
+        """__init__."""
+        self.hits = 0
+        self.misses = 0
+        self._items = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def deployment_items(self, microservice,
+                         kube_client: Kubernets) -> List[dict]:
+        """Return deploy items of the microservice, rendering on first use.
+
+        Args:
+            microservice (Microservice object):
+                Microservice object to be rendered.
+            kube_client (Kubernets):
+                Kubernets client used to create provider specific
+                manifests.
+
+        Returns:
+            Deploy items returned by `create_deployment_file`, they are
+            shared and must not be changed.
+        """
+        key = (id(microservice), kube_client.render_key(
+            namespaced=getattr(microservice, 'namespaced_render', False)))
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            cached = self._items.get(key)
+            if cached is None:
+                items = microservice.create_deployment_file(
+                    kube_client=kube_client)
+                with self._lock:
+                    # Keep a reference to the microservice so its id is
+                    # not reused while cached
+                    self._items[key] = (microservice, items)
+                    self.misses += 1
+                return items
+        with self._lock:
+            self.hits += 1
+        return cached[1]
+
+
+class DeployTarget:
+    """Target of a fan-out deploy and its overrides of the stack."""
+
+    name: str
+    """Name of the target, used at the report and output directory."""
+    k8_namespace: str
+    """Namespace of the target."""
+    k8_provider: str
+    """Provider of the target cluster, if None stack provider is used."""
+    k8_deploy_args: dict
+    """Arguments of the target cluster, if None stack arguments are used."""
+    kubeconfig: str
+    """Kubeconfig of the target, if None it is set by `FanOutDeploy`."""
+    patches: List[ManifestPatch]
+    """Patches applied after the stack patches."""
+    microservices: list
+    """Microservices deployed only at this target."""
+
+    def __init__(self, name: str, k8_namespace: str = None,
+                 k8_provider: str = None, k8_deploy_args: dict = None,
+                 kubeconfig: str = None, k8_backend: str = None,
+                 patches: List[ManifestPatch] = None,
+                 microservices: list = None):
+        """__init__.
+
+        Args:
+            name (str):
+                Name of the target, must be unique at the fan-out.
+            k8_namespace (str):
+                Namespace of the target, if None target name is used.
+            k8_provider (str):
+                Provider of the target cluster, if None the provider of the
+                stack is used.
+            k8_deploy_args (dict):
+                Arguments of the target cluster, if None the arguments of
+                the stack are used.
+            kubeconfig (str):
+                Kubeconfig used to login and apply manifests at the target.
+            k8_backend (str):
+                Backend used to apply the manifests, if None the backend of
+                the stack is used.
+            patches (List[ManifestPatch]):
+                Patches applied to the target manifests after the stack
+                patches, ex.: `ReplicasPatch` for a bigger tenant.
+            microservices (list):
+                Microservices deployed only at this target, ex.: ingress
+                with the target host.
+        """
+        self.name = name
+        self.k8_namespace = name if k8_namespace is None else k8_namespace
+        self.k8_provider = k8_provider
+        self.k8_deploy_args = k8_deploy_args
+        self.kubeconfig = kubeconfig
+        self.k8_backend = k8_backend
+        self.patches = [] if patches is None else patches
+        self.microservices = [] if microservices is None else microservices
+
+
+class FanOutDeploy:
+    """Deploy a stack to many targets concurrently."""
+
+    stack: DeployPumpWood
+    """Stack deployed to all targets."""
+    targets: List[DeployTarget]
+    """Targets of the deploy."""
+    output_path: str
+    """Directory with a sub-directory of deploy files for each target."""
+    render_cache: RenderCache
+    """Deploy items shared between targets."""
+
+    def __init__(self, stack: DeployPumpWood, targets: List[DeployTarget],
+                 output_path: str = 'outputs/targets'):
+        """__init__.
+
+        Args:
+            stack (DeployPumpWood):
+                Stack definition deployed to all targets.
+            targets (List[DeployTarget]):
+                Targets of the deploy.
+            output_path (str):
+                Directory where each target deploy files, state, trace and
+                kubeconfig are created.
+
+        Raises:
+            Exception:
+                'Target names must be unique'.
+            Exception:
+                'Targets [{}] and [{}] deploy to the same namespace'.
+        """
+        names = [t.name for t in targets]
+        if len(set(names)) != len(names):
+            raise Exception('Target names must be unique')
+        self.stack = stack
+        self.targets = targets
+        self.output_path = output_path
+        self.render_cache = RenderCache()
+        self._deploys = {}
+
+        seen = {}
+        for target in targets:
+            deploy = self.target_deploy(target)
+            kube_client = deploy.kube_client
+            key = (
+                kube_client.kube_client.cluster_key(),
+                kube_client.k8_namespace)
+            if key in seen:
+                raise Exception(
+                    'Targets [{}] and [{}] deploy to the same '
+                    'namespace'.format(seen[key], target.name))
+            seen[key] = target.name
+
+        # kubectl keeps the current context at the kubeconfig, targets at
+        # different clusters must not share it while applying concurrently
+        clusters = set(
+            d.kube_client.kube_client.cluster_key()
+            for d in self._deploys.values())
+        if len(clusters) > 1:
+            for target in targets:
+                if target.kubeconfig is None:
+                    self._isolate_kubeconfig(self._deploys[target.name])
+
+    def _target_path(self, target: DeployTarget) -> str:
+        """Directory of the deploy files of the target."""
+        return os.path.join(self.output_path, target.name)
+
+    def _isolate_kubeconfig(self, deploy: DeployPumpWood):
+        """Set a kubeconfig for the target copied from default kubeconfig."""
+        kubeconfig = os.path.join(deploy.output_path, 'kubeconfig')
+        if not os.path.exists(kubeconfig):
+            os.makedirs(deploy.output_path, exist_ok=True)
+            default = os.environ.get('KUBECONFIG', '').split(os.pathsep)[0]
+            default = default or os.path.expanduser('~/.kube/config')
+            if os.path.exists(default):
+                shutil.copyfile(default, kubeconfig)
+        deploy.kube_client.kubeconfig = os.path.abspath(kubeconfig)
+
+    def target_deploy(self, target: DeployTarget) -> DeployPumpWood:
+        """Return the deploy of a target, created on first call.
+
+        Args:
+            target (DeployTarget):
+                Target of the deploy.
+
+        Returns:
+            A copy of the stack with target namespace, cluster, patches,
+            microservices and output path. Microservices of the stack are
+            shared with the other targets.
+        """
+        deploy = self._deploys.get(target.name)
+        if deploy is not None:
+            return deploy
+
+        stack_client = self.stack.kube_client
+        target_path = self._target_path(target)
+        kube_client = Kubernets(
+            k8_provider=target.k8_provider or stack_client.k8_provider,
+            k8_deploy_args=(
+                stack_client.k8_deploy_args
+                if target.k8_deploy_args is None
+                else target.k8_deploy_args),
+            k8_namespace=target.k8_namespace,
+            k8_backend=target.k8_backend or stack_client.k8_backend,
+            kubeconfig=target.kubeconfig or stack_client.kubeconfig,
+            login_cache_path=os.path.join(target_path, 'login_cache.json'),
+            login_cache_ttl=stack_client.login_cache.ttl)
+
+        deploy = copy.copy(self.stack)
+        deploy.kube_client = kube_client
+        deploy.namespace = target.k8_namespace
+        deploy.microsservices_to_deploy = (
+            list(self.stack.microsservices_to_deploy) + target.microservices)
+        deploy.patches = list(self.stack.patches) + target.patches
+        deploy.sizing = dict(self.stack.sizing)
+        deploy.microservice_sizing = dict(self.stack.microservice_sizing)
+        deploy.workers_formula = self.stack.workers_formula
+        deploy.connection_budget = self.stack.connection_budget
+        deploy.output_path = target_path
+        deploy.render_cache = self.render_cache
+        self._deploys[target.name] = deploy
+        return deploy
+
+    def _run_target(self, target: DeployTarget, method: str,
+                    kwargs: dict) -> dict:
+        """Run a method of the target deploy recording its result."""
+        deploy = self.target_deploy(target)
+        result = {
+            'target': target.name, 'namespace': target.k8_namespace,
+            'output_path': deploy.output_path, 'start': time.time()}
+        print('## [{}] {} started'.format(target.name, method))
+        try:
+            result['result'] = getattr(deploy, method)(**kwargs)
+            result['status'] = 'ok'
+            print('## [{}] {} finished'.format(target.name, method))
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = str(e)
+            result['traceback'] = traceback.format_exc()
+            print('!! [{}] {} failed: {} !!'.format(target.name, method, e))
+        result['end'] = time.time()
+        result['duration'] = result['end'] - result['start']
+        return result
+
+    def _run(self, method: str, kwargs: Dict[str, dict],
+             max_targets: int) -> Dict[str, dict]:
+        """Run a method at all targets concurrently."""
+        with ThreadPoolExecutor(max_workers=max_targets) as executor:
+            futures = [
+                executor.submit(
+                    self._run_target, target, method, kwargs[target.name])
+                for target in self.targets]
+            report = {}
+            for future in futures:
+                result = future.result()
+                report[result['target']] = result
+        return report
+
+    def create_deploy_files(self, max_targets: int = 4
+                            ) -> Dict[str, dict]:
+        """Create deploy files of all targets.
+
+        Args:
+            max_targets (int):
+                Number of targets processed at the same time.
+
+        Returns:
+            Report with a dictionary for each target with keys `status`
+            (`ok` or `failed`), `result` (commands returned by
+            `DeployPumpWood.create_deploy_files`), `error`, `start`, `end`
+            and `duration`.
+        """
+        kwargs = {t.name: {} for t in self.targets}
+        return self._run('create_deploy_files', kwargs, max_targets)
+
+    def deploy(self, max_targets: int = 4,
+               **deploy_kwargs) -> Dict[str, dict]:
+        """Deploy the stack to all targets concurrently.
+
+        Deploy state, trace and checkpoint of each target are saved at its
+        output directory. A report is printed at the end.
+
+        Args:
+            max_targets (int):
+                Number of targets deployed at the same time.
+            **deploy_kwargs:
+                Arguments passed to `DeployPumpWood.deploy_microservices`
+                of each target, ex.: `wait_mode`, `incremental`.
+
+        Returns:
+            Report with a dictionary for each target with keys `status`
+            (`ok` or `failed`), `error`, `traceback`, `start`, `end` and
+            `duration`.
+        """
+        kwargs = {t.name: dict(deploy_kwargs) for t in self.targets}
+        report = self._run('deploy_microservices', kwargs, max_targets)
+        print(self.format_report(report))
+        return report
+
+    def format_report(self, report: Dict[str, dict]) -> str:
+        """Format a fan-out report as a table.
+
+        Args:
+            report (Dict[str, dict]):
+                Report returned by `deploy` or `create_deploy_files`.
+
+        Returns:
+            Text table with status and duration of each target and the
+            render cache usage.
+        """
+        lines = [
+            '### Fan-out report',
+            '{:<20} {:<20} {:<8} {:>10}  {}'.format(
+                'target', 'namespace', 'status', 'duration', 'error')]
+        for result in report.values():
+            lines.append('{:<20} {:<20} {:<8} {:>9.1f}s  {}'.format(
+                result['target'], result['namespace'], result['status'],
+                result['duration'], result.get('error', '')))
+        failed = sum(1 for r in report.values() if r['status'] != 'ok')
+        lines.append(
+            '{} of {} targets failed, rendered {} microservices and '
+            'reused {}'.format(
+                failed, len(report), self.render_cache.misses,
+                self.render_cache.hits))
+        return '\n'.join(lines)
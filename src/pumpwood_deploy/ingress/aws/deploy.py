@@ -1,22 +1,16 @@
 """Create AWS Aplication LoadBalancer Ingress."""
 import os
-import pkg_resources
-from jinja2 import Template
+from pumpwood_deploy.template_registry import get_template
 
 
-aws_alb_ingress_host = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'ingress/aws/resources/ingress__aws_alb.yml').read().decode()
-aws_alb_ingress_path = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'ingress/aws/resources/ingress__aws_alb_path.yml').read().decode()
-aws_nlb_healthcheck = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'ingress/aws/resources/deploy__aws_alb_healthcheck.yml').read().decode()
-aws_nlb_healthcheck_ingress = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'ingress/aws/resources/ingress__aws_alb_healthcheck_path.yml'
-    ).read().decode()
+aws_alb_ingress_host = get_template(
+    'ingress/aws/resources/ingress__aws_alb.yml')
+aws_alb_ingress_path = get_template(
+    'ingress/aws/resources/ingress__aws_alb_path.yml')
+aws_nlb_healthcheck = get_template(
+    'ingress/aws/resources/deploy__aws_alb_healthcheck.yml')
+aws_nlb_healthcheck_ingress = get_template(
+    'ingress/aws/resources/ingress__aws_alb_healthcheck_path.yml')
 
 
 class IngressALB:
@@ -69,15 +63,13 @@ class IngressALB:
 
         No args
         """
-        template = Template(aws_nlb_healthcheck_ingress)
-        aws_nlb_healthcheck_ingress_frm = template.render(
+        aws_nlb_healthcheck_ingress_frm = aws_nlb_healthcheck_ingress.render(
             alb_name=self._alb_name, group_name=self._group_name,
             certificate_arn=self._certificate_arn)
 
         aws_alb_ingress_frm = None
         if self._host is None:
-            template = Template(aws_alb_ingress_path)
-            aws_alb_ingress_frm = template.render(
+            aws_alb_ingress_frm = aws_alb_ingress_path.render(
                 alb_name=self._alb_name, group_name=self._group_name,
                 health_check_url=self._health_check_url,
                 certificate_arn=self._certificate_arn,
@@ -86,8 +78,7 @@ class IngressALB:
                 service_port=self._service_port)
 
         else:
-            template = Template(aws_alb_ingress_host)
-            aws_alb_ingress_frm = template.render(
+            aws_alb_ingress_frm = aws_alb_ingress_host.render(
                 alb_name=self._alb_name, group_name=self._group_name,
                 health_check_url=self._health_check_url,
                 certificate_arn=self._certificate_arn,
@@ -97,7 +88,7 @@ class IngressALB:
 
         return [
             {'type': 'deploy', 'name': 'aws_nlb_healthcheck__deploy',
-             'content': aws_nlb_healthcheck, 'sleep': 0,
+             'content': aws_nlb_healthcheck.read(), 'sleep': 0,
              'namespace': 'healthcheck'},
             {'type': 'deploy', 'name': 'aws_nlb_healthcheck_ingress__deploy',
              'content': aws_nlb_healthcheck_ingress_frm, 'sleep': 0,
@@ -0,0 +1,299 @@
+"""In-process client for Kubernets API server.
+
+Backend used by `Kubernets` when `k8_backend="api"`. It talks directly with
+the API server using the official `kubernetes` package, reusing kubeconfig
+credentials (including exec plugins used by `gcloud`, `az` and `aws`) and
+a single pooled HTTP connection shared by all applies. This avoids a
+`kubectl` process spawn, API discovery and TLS handshake for each resource.
+
+`kubernetes` is an optional dependency, install it with
+`pip install pumpwood-deploy[api]`.
+"""
+import threading
+import yaml
+from typing import List, Iterator
+from pumpwood_deploy.kubernets.file_objects import (
+    secret_from_files, configmap_from_file)
+
+
+def _import_kubernetes():
+    """Import kubernetes package with a friendly error if not installed."""
+    try:
+        from kubernetes import config, dynamic
+    except ImportError:
+        msg = (
+            "kubernetes package is necessary to use k8_backend='api', "
+            "install it with `pip install pumpwood-deploy[api]`")
+        raise ImportError(msg)
+    return config, dynamic
+
+
+class KubernetsApiClient:
+    """Apply manifests using a pooled connection to the API server."""
+
+    namespace: str
+    """Default namespace for namespaced objects."""
+    field_manager: str
+    """Field manager used on server-side apply."""
+
+    def __init__(self, namespace: str, kubeconfig: str = None,
+                 context: str = None,
+                 field_manager: str = "pumpwood-deploy"):
+        """__init__.
+
+        Args:
+            namespace (str):
+                Default namespace for namespaced objects.
+            kubeconfig (str):
+                Path to kubeconfig file, if not set default kubeconfig
+                (`KUBECONFIG` enviroment variable or `~/.kube/config`) is
+                used.
+            context (str):
+                Context of the kubeconfig, if not set current context will
+                be used.
+            field_manager (str):
+                Field manager used on server-side apply.
+        """
+        config, dynamic = _import_kubernetes()
+        self.namespace = namespace
+        self.field_manager = field_manager
+        api_client = config.new_client_from_config(
+            config_file=kubeconfig, context=context)
+        self._client = dynamic.DynamicClient(api_client)
+        self._exceptions = dynamic.exceptions
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def current_context(kubeconfig: str = None) -> str:
+        """Return the current context of a kubeconfig.
+
+        Args:
+            kubeconfig (str):
+                Path to kubeconfig file, if not set default kubeconfig is
+                used.
+
+        Returns:
+            Name of the current context or None if not set.
+        """
+        config, _ = _import_kubernetes()
+        try:
+            _, active_context = config.list_kube_config_contexts(
+                config_file=kubeconfig)
+        except config.ConfigException:
+            return None
+        return (active_context or {}).get('name')
+
+    def _resource(self, kind: str, api_version: str = None):
+        """Get API resource of a kind using cached discovery.
+
+        Args:
+            kind (str):
+                Kind of the resource.
+            api_version (str):
+                API version of the kind (ex.: `apps/v1`). If None, the
+                preferred version of the group that serves the kind is
+                used.
+
+        Raises:
+            Exception:
+                'Kind not found at API server: {} {}'.
+            Exception:
+                'Kind {} is served by more than one API group {}, set its
+                api_version'. Indicates that `api_version` is None and
+                the kind is ambiguous (ex.: `Event`).
+        """
+        key = (api_version, kind)
+        with self._lock:
+            if key not in self._resources:
+                kwargs = {'kind': kind}
+                if api_version is not None:
+                    kwargs['api_version'] = api_version
+                resources = self._client.resources.search(**kwargs)
+                # Subresources (ex.: deployments/status) share the kind
+                resources = [
+                    r for r in resources
+                    if '/' not in getattr(r, 'name', '')]
+                if not resources:
+                    msg = "Kind not found at API server: {} {}".format(
+                        api_version, kind)
+                    raise Exception(msg)
+                if api_version is None:
+                    resources = [
+                        r for r in resources if r.preferred] or resources
+                    group_versions = sorted(set(
+                        r.group_version for r in resources))
+                    if len(group_versions) > 1:
+                        msg = (
+                            "Kind {} is served by more than one API group "
+                            "{}, set its api_version").format(
+                                kind, group_versions)
+                        raise Exception(msg)
+                self._resources[key] = resources[0]
+            return self._resources[key]
+
+    def create_namespace(self, namespace: str):
+        """Create a namespace if it does not exist.
+
+        Args:
+            namespace (str):
+                Name of the namespace.
+        """
+        resource = self._resource('Namespace', 'v1')
+        try:
+            resource.create(body={
+                'apiVersion': 'v1', 'kind': 'Namespace',
+                'metadata': {'name': namespace}})
+        except self._exceptions.ConflictError:
+            pass
+
+    def apply_object(self, body: dict, namespace: str = None) -> dict:
+        """Apply an object using server-side apply.
+
+        Args:
+            body (dict):
+                Kubernets object.
+            namespace (str):
+                Namespace used if not set at object metadata.
+
+        Returns:
+            Object returned by API server.
+        """
+        namespace = self.namespace if namespace is None else namespace
+        resource = self._resource(body['kind'], body['apiVersion'])
+        response = self._client.server_side_apply(
+            resource, body=body, namespace=namespace,
+            field_manager=self.field_manager, force_conflicts=True)
+        return response.to_dict()
+
+    def apply_manifest(self, content: str, namespace: str = None):
+        """Apply all documents of a yml manifest.
+
+        Args:
+            content (str):
+                Multi-document yml manifest.
+            namespace (str):
+                Namespace used if not set at object metadata.
+        """
+        for document in yaml.safe_load_all(content):
+            if isinstance(document, dict):
+                self.apply_object(document, namespace=namespace)
+
+    def apply_secret_from_files(self, name: str, paths: List[str],
+                                namespace: str = None):
+        """Create or update a secret with data from files.
+
+        Args:
+            name (str):
+                Name of the secret.
+            paths (List[str]):
+                Path of the files, it is possible to set the key using
+                `key=path` as in `kubectl --from-file`. If key is not set
+                file base name is used.
+            namespace (str):
+                Namespace of the secret.
+        """
+        self.apply_object(
+            secret_from_files(name=name, paths=paths), namespace=namespace)
+
+    def apply_configmap_from_file(self, name: str, path: str,
+                                  keyname: str = None,
+                                  namespace: str = None):
+        """Create or update a config map with data from a file.
+
+        Args:
+            name (str):
+                Name of the config map.
+            path (str):
+                Path of the file.
+            keyname (str):
+                Key of the file at config map, if not set file base name
+                is used.
+            namespace (str):
+                Namespace of the config map.
+        """
+        self.apply_object(
+            configmap_from_file(name=name, path=path, keyname=keyname),
+            namespace=namespace)
+
+    def get_object(self, kind: str, name: str, namespace: str = None,
+                   api_version: str = None) -> dict:
+        """Fetch an object from the cluster.
+
+        Args:
+            kind (str):
+                Kind of the object.
+            name (str):
+                Name of the object.
+            namespace (str):
+                Namespace of the object.
+            api_version (str):
+                API version of the kind, if not set the preferred version
+                is used. It must be set for kinds served by more than one
+                API group.
+
+        Returns:
+            Return the object as a dictionary or None if not found.
+        """
+        namespace = self.namespace if namespace is None else namespace
+        resource = self._resource(kind, api_version)
+        kwargs = {'name': name}
+        if resource.namespaced:
+            kwargs['namespace'] = namespace
+        try:
+            return resource.get(**kwargs).to_dict()
+        except self._exceptions.NotFoundError:
+            return None
+
+    def list_objects(self, kind: str, namespace: str = None,
+                     api_version: str = None) -> List[dict]:
+        """List all objects of a kind using one API call.
+
+        Args:
+            kind (str):
+                Kind of the objects.
+            namespace (str):
+                Namespace of the objects, ignored for cluster scoped kinds.
+            api_version (str):
+                API version of the kind, if not set the preferred version
+                is used. It must be set for kinds served by more than one
+                API group.
+
+        Returns:
+            List of the objects as dictionaries.
+        """
+        namespace = self.namespace if namespace is None else namespace
+        resource = self._resource(kind, api_version)
+        kwargs = {}
+        if resource.namespaced:
+            kwargs['namespace'] = namespace
+        return resource.get(**kwargs).to_dict().get('items') or []
+
+    def watch_objects(self, kind: str, namespace: str = None,
+                      timeout: int = None,
+                      api_version: str = None) -> Iterator[dict]:
+        """Watch changes of the objects of a kind.
+
+        Args:
+            kind (str):
+                Kind of the objects.
+            namespace (str):
+                Namespace of the objects, ignored for cluster scoped kinds.
+            timeout (int):
+                Time in seconds the API server keeps the watch open, if
+                None server default is used.
+            api_version (str):
+                API version of the kind, if not set the preferred version
+                is used.
+
+        Yields:
+            Watch events with keys `type` (`ADDED`, `MODIFIED`, `DELETED`)
+            and `object` as a dictionary.
+        """
+        namespace = self.namespace if namespace is None else namespace
+        resource = self._resource(kind, api_version)
+        kwargs = {'timeout': timeout}
+        if resource.namespaced:
+            kwargs['namespace'] = namespace
+        for event in resource.watch(**kwargs):
+            yield {'type': event['type'], 'object': event['raw_object']}
@@ -0,0 +1,375 @@
+"""Autoscale of the app and worker deployments.
+
+Apps receive an `app_autoscale` argument, if set an `autoscaling/v2`
+HorizontalPodAutoscaler is created next to each Deployment of the app
+manifest. Utilization targets are relative to the resources requests of the
+containers, they must be set at the app (ex.: `app_requests_cpu`) or by a
+sizing profile. The default `1m` CPU requests of the apps would keep any
+load above the target and the HPA at `max_replicas`, CPU requests below
+`min_cpu_request` are rejected. Requests are checked by
+`check_autoscaled_requests` after the manifest patches are applied.
+
+Queue workers receive a `worker_autoscale` argument (or one for each
+worker, ex.: `raw_autoscale`), if set a KEDA `ScaledObject` scales the
+worker by the number of messages at its RabbitMQ queues, down to zero pods
+when idle. It needs KEDA installed at the cluster and the
+`TriggerAuthentication` created by `StandardMicroservices` with
+`rabbitmq_keda=True`.
+
+In both cases `spec.replicas` is removed from the Deployment, so applying
+the manifest again does not reset the number of replicas set by the
+autoscaler.
+
+Example:
+```python
+PumpWoodDatalakeMicroservice(
+    ...,
+    app_requests_cpu="1000m", app_requests_memory="1Gi",
+    app_autoscale=AppAutoscale(
+        min_replicas=2, max_replicas=10, cpu_utilization=70),
+    worker_autoscale=WorkerAutoscale(
+        queue_name='datalake_dataloader', max_replicas=20))
+```
+"""
+from typing import Union, List
+from pumpwood_deploy.manifest import Manifest, K8sObject
+from pumpwood_deploy.kubernets.diff import parse_quantity
+from pumpwood_deploy.template_registry import get_template
+
+
+hpa_template = get_template('kubernets/resources/hpa.yml')
+"""@private"""
+scaled_object_template = get_template(
+    'kubernets/resources/keda__scaled_object.yml')
+"""@private"""
+
+KEDA_RABBITMQ_AUTH = 'rabbitmq-main-keda'
+"""Name of the KEDA TriggerAuthentication with RabbitMQ connection."""
+
+MIN_CPU_REQUEST_ANNOTATION = 'pumpwood-deploy/min-cpu-request'
+"""Annotation of the HPA with `min_cpu_request` of its settings."""
+
+
+class _Autoscale:
+    """Base class of the autoscale settings of a deployment."""
+
+    @classmethod
+    def from_arg(cls, autoscale: Union['_Autoscale', dict, None]
+                 ) -> '_Autoscale':
+        """Create settings from the autoscale argument of the microservices.
+
+        Args:
+            autoscale (Union[_Autoscale, dict, None]):
+                Settings object, dictionary with `__init__` arguments or
+                None if the deployment is not autoscaled.
+
+        Returns:
+            Autoscale settings or None if `autoscale` is None.
+        """
+        if autoscale is None or isinstance(autoscale, cls):
+            return autoscale
+        return cls(**autoscale)
+
+    def create_autoscaler_yml(self, deployment_name: str) -> str:
+        """Create yml of the autoscaler of a deployment."""
+        raise NotImplementedError(
+            'create_autoscaler_yml must be implemented by the settings')
+
+    def autoscale_deployment(self, content: str) -> str:
+        """Add an autoscaler to each Deployment of a manifest.
+
+        Args:
+            content (str):
+                Manifest with one or more Deployments.
+
+        Returns:
+            Manifest with `spec.replicas` removed from the Deployments
+            and an autoscaler for each one.
+        """
+        manifest = Manifest.parse(content)
+        autoscalers = []
+        for obj in manifest:
+            if obj.kind != 'Deployment':
+                continue
+            obj.data.setdefault('spec', {}).pop('replicas', None)
+            manifest.changed = True
+            autoscalers.append(self.create_autoscaler_yml(obj.name))
+        if not autoscalers:
+            return content
+        return '\n---\n'.join([manifest.to_yaml()] + autoscalers)
+
+
+class AppAutoscale(_Autoscale):
+    """Autoscale settings of an app deployment."""
+
+    min_replicas: int
+    """Minimum number of replicas."""
+    max_replicas: int
+    """Maximum number of replicas."""
+    cpu_utilization: int
+    """Target of CPU utilization (% of requests), None to not use."""
+    memory_utilization: int
+    """Target of memory utilization (% of requests), None to not use."""
+    min_cpu_request: str
+    """Minimum CPU requests of the containers scaled by CPU."""
+
+    def __init__(self, min_replicas: int = 1, max_replicas: int = 4,
+                 cpu_utilization: int = 70, memory_utilization: int = None,
+                 scale_up_stabilization: int = 0, scale_up_pods: int = 4,
+                 scale_up_percent: int = 100, scale_up_period: int = 15,
+                 scale_down_stabilization: int = 300,
+                 scale_down_percent: int = 50,
+                 scale_down_period: int = 60,
+                 min_cpu_request: str = '100m'):
+        """__init__.
+
+        Args:
+            min_replicas (int):
+                Minimum number of replicas.
+            max_replicas (int):
+                Maximum number of replicas.
+            cpu_utilization (int):
+                Average CPU utilization of the pods, as percentage of the
+                CPU requests, the HPA keeps. None to not scale by CPU.
+            memory_utilization (int):
+                Average memory utilization of the pods, as percentage of
+                the memory requests, the HPA keeps. None to not scale by
+                memory.
+            scale_up_stabilization (int):
+                Seconds of metrics considered before scaling up, 0 scales
+                up at once on load spikes.
+            scale_up_pods (int):
+                Pods that can be added each `scale_up_period`.
+            scale_up_percent (int):
+                Percentage of the current pods that can be added each
+                `scale_up_period`, the policy that adds more pods is used.
+            scale_up_period (int):
+                Period in seconds of the scale up policies.
+            scale_down_stabilization (int):
+                Seconds of metrics considered before scaling down, avoids
+                removing pods between close spikes.
+            scale_down_percent (int):
+                Percentage of the current pods that can be removed each
+                `scale_down_period`.
+            scale_down_period (int):
+                Period in seconds of the scale down policy.
+            min_cpu_request (str):
+                Minimum CPU requests, K8s quantity, of the containers when
+                scaling by CPU. Utilization of tiny requests is always
+                above the target and the HPA would keep `max_replicas`.
+                None to not check.
+
+        Raises:
+            Exception:
+                'min_replicas must be at least 1 and not greater than
+                max_replicas'.
+            Exception:
+                'At least one of cpu_utilization and memory_utilization
+                must be set'.
+            Exception:
+                'min_cpu_request must be a K8s quantity'.
+        """
+        if min_replicas < 1 or max_replicas < min_replicas:
+            raise Exception(
+                'min_replicas must be at least 1 and not greater than '
+                'max_replicas')
+        if cpu_utilization is None and memory_utilization is None:
+            raise Exception(
+                'At least one of cpu_utilization and memory_utilization '
+                'must be set')
+        if min_cpu_request is not None and \
+                parse_quantity(min_cpu_request) is None:
+            raise Exception('min_cpu_request must be a K8s quantity')
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.cpu_utilization = cpu_utilization
+        self.memory_utilization = memory_utilization
+        self.scale_up_stabilization = scale_up_stabilization
+        self.scale_up_pods = scale_up_pods
+        self.scale_up_percent = scale_up_percent
+        self.scale_up_period = scale_up_period
+        self.scale_down_stabilization = scale_down_stabilization
+        self.scale_down_percent = scale_down_percent
+        self.scale_down_period = scale_down_period
+        self.min_cpu_request = min_cpu_request
+
+    def targets(self) -> list:
+        """List of (resource, utilization) scaled by the HPA."""
+        targets = [
+            ('cpu', self.cpu_utilization),
+            ('memory', self.memory_utilization)]
+        return [x for x in targets if x[1] is not None]
+
+    def create_autoscaler_yml(self, deployment_name: str) -> str:
+        """Create HorizontalPodAutoscaler yml of a deployment.
+
+        Args:
+            deployment_name (str):
+                Name of the deployment, also used as HPA name.
+
+        Returns:
+            Yml of the `autoscaling/v2` HorizontalPodAutoscaler.
+        """
+        return hpa_template.render(
+            name=deployment_name, min_replicas=self.min_replicas,
+            max_replicas=self.max_replicas, targets=self.targets(),
+            scale_up_stabilization=self.scale_up_stabilization,
+            scale_up_pods=self.scale_up_pods,
+            scale_up_percent=self.scale_up_percent,
+            scale_up_period=self.scale_up_period,
+            scale_down_stabilization=self.scale_down_stabilization,
+            scale_down_percent=self.scale_down_percent,
+            scale_down_period=self.scale_down_period,
+            min_cpu_request=(
+                self.min_cpu_request if self.cpu_utilization is not None
+                else None))
+
+
+class WorkerAutoscale(_Autoscale):
+    """Autoscale settings of a queue worker deployment."""
+
+    queue_names: List[str]
+    """RabbitMQ queues consumed by the worker."""
+    queue_length: int
+    """Target of messages waiting at the queues for each pod."""
+    min_replicas: int
+    """Minimum number of replicas, 0 to scale to zero when idle."""
+    max_replicas: int
+    """Maximum number of replicas."""
+
+    def __init__(self, queue_name: Union[str, List[str]],
+                 queue_length: int = 20, min_replicas: int = 0,
+                 max_replicas: int = 4, activation_queue_length: int = 0,
+                 polling_interval: int = 30, cooldown_period: int = 300):
+        """__init__.
+
+        Args:
+            queue_name (Union[str, List[str]]):
+                Name of the RabbitMQ queue consumed by the worker or a list
+                if it consumes more than one queue, the queue with more
+                messages sets the number of replicas.
+            queue_length (int):
+                Target of messages waiting at the queue for each pod.
+            min_replicas (int):
+                Minimum number of replicas, if 0 worker is scaled to zero
+                when the queues are empty.
+            max_replicas (int):
+                Maximum number of replicas.
+            activation_queue_length (int):
+                Worker is scaled from zero only when the queue has more
+                messages than this.
+            polling_interval (int):
+                Interval in seconds the queues are checked.
+            cooldown_period (int):
+                Seconds after the last message before scaling to zero.
+
+        Raises:
+            Exception:
+                'min_replicas must not be negative or greater than
+                max_replicas'.
+            Exception:
+                'queue_name must be set'.
+        """
+        if min_replicas < 0 or max_replicas < max(min_replicas, 1):
+            raise Exception(
+                'min_replicas must not be negative or greater than '
+                'max_replicas')
+        queue_names = (
+            [queue_name] if isinstance(queue_name, str) else
+            list(queue_name or []))
+        if not queue_names:
+            raise Exception('queue_name must be set')
+        self.queue_names = queue_names
+        self.queue_length = queue_length
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.activation_queue_length = activation_queue_length
+        self.polling_interval = polling_interval
+        self.cooldown_period = cooldown_period
+
+    def create_autoscaler_yml(self, deployment_name: str) -> str:
+        """Create KEDA ScaledObject yml of a deployment.
+
+        Args:
+            deployment_name (str):
+                Name of the deployment, also used as ScaledObject name.
+
+        Returns:
+            Yml of the `keda.sh/v1alpha1` ScaledObject with a RabbitMQ
+            trigger for each queue.
+        """
+        return scaled_object_template.render(
+            name=deployment_name, min_replicas=self.min_replicas,
+            max_replicas=self.max_replicas,
+            polling_interval=self.polling_interval,
+            cooldown_period=self.cooldown_period,
+            queue_names=self.queue_names, queue_length=self.queue_length,
+            activation_queue_length=self.activation_queue_length,
+            authentication_name=KEDA_RABBITMQ_AUTH)
+
+
+def _check_hpa_requests(hpa: K8sObject, obj: K8sObject):
+    """Check requests of the containers of a Deployment scaled by an HPA."""
+    spec = hpa.data.get('spec') or {}
+    resources = [
+        (m.get('resource') or {}).get('name')
+        for m in spec.get('metrics') or [] if m.get('type') == 'Resource']
+    annotations = (hpa.data.get('metadata') or {}).get('annotations') or {}
+    min_cpu_request = annotations.get(MIN_CPU_REQUEST_ANNOTATION)
+    for container in obj.containers():
+        requests = (
+            (container.data.get('resources') or {}).get('requests') or {})
+        for resource in resources:
+            if not requests.get(resource):
+                msg = (
+                    'Deployment [{}] container [{}] has no {} requests, '
+                    'it is needed by HPA utilization target').format(
+                        obj.name, container.name, resource)
+                raise Exception(msg)
+
+        if 'cpu' in resources and min_cpu_request is not None:
+            cpu = parse_quantity(requests['cpu'])
+            if cpu is None or cpu < parse_quantity(min_cpu_request):
+                msg = (
+                    'Deployment [{}] container [{}] CPU requests [{}] are '
+                    'below min_cpu_request [{}], set app_requests_cpu or '
+                    'an app sizing profile').format(
+                        obj.name, container.name, requests['cpu'],
+                        min_cpu_request)
+                raise Exception(msg)
+
+
+def check_autoscaled_requests(deploy_item: dict):
+    """Check requests of the Deployments scaled by HPAs of a deploy item.
+
+    It must be called with the patched deploy item, since sizing profiles
+    and patches may change the requests set at the microservice.
+
+    Args:
+        deploy_item (dict):
+            Deploy item returned by `create_deployment_file` of the
+            microservices, items without HorizontalPodAutoscalers are not
+            checked.
+
+    Raises:
+        Exception:
+            'Deployment [{}] container [{}] has no {} requests, it is
+            needed by HPA utilization target'.
+        Exception:
+            'Deployment [{}] container [{}] CPU requests [{}] are below
+            min_cpu_request [{}], set app_requests_cpu or an app sizing
+            profile'.
+    """
+    content = deploy_item.get('content')
+    if not isinstance(content, str) or \
+            'HorizontalPodAutoscaler' not in content:
+        return
+    manifest = Manifest.parse(content)
+    hpas = {}
+    for obj in manifest:
+        if obj.kind == 'HorizontalPodAutoscaler':
+            target = (obj.data.get('spec') or {}).get('scaleTargetRef') or {}
+            hpas[target.get('name')] = obj
+    for obj in manifest:
+        if obj.kind == 'Deployment' and obj.name in hpas:
+            _check_hpa_requests(hpas[obj.name], obj)
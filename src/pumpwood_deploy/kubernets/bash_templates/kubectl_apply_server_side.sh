@@ -0,0 +1,2 @@
+SCRIPTPATH="$( cd "$(dirname "$0")" ; pwd -P )"
+kubectl apply --server-side --force-conflicts --field-manager={field_manager} -f $SCRIPTPATH/{file} --namespace={namespace}
@@ -0,0 +1,338 @@
+"""Dependency graph to apply deploy commands concurrently.
+
+Deploy items returned by `create_deployment_file` are parsed to find which
+Kubernets objects they create and which objects they reference (secrets,
+config maps, volume claims, services used as database hosts...). Using this
+information a DAG is built and independent items are applied concurrently
+using a bounded worker pool, so deploy time follows the critical path of the
+stack instead of the sum of all steps.
+"""
+import re
+import yaml
+from concurrent.futures import (
+    ThreadPoolExecutor, wait, FIRST_COMPLETED)
+from typing import List, Tuple, Callable, Set, Dict
+
+
+CLUSTER_SCOPED_KINDS = [
+    'Namespace', 'PersistentVolume', 'ClusterRole', 'ClusterRoleBinding',
+    'StorageClass', 'ClusterTriggerAuthentication']
+"""Kinds that are not namespaced, references to them ignore namespace."""
+
+HOST_ENV_PATTERN = re.compile(r'^[A-Z0-9_]*_HOST$')
+"""Enviroment variables that point to a service name at the cluster, ex.:
+   `DB_HOST`, `POSTGRES_HOST`, `RABBITMQ_HOST`."""
+
+SERVICE_NAME_PATTERN = re.compile(r'^[a-z0-9]([-a-z0-9]*[a-z0-9])?$')
+"""A valid K8s service name, values with dots or ports are not services
+   created at the same namespace."""
+
+
+def object_key(kind: str, name: str, namespace: str) -> Tuple[str, str, str]:
+    """Build key used to identify an object at the cluster.
+
+    Args:
+        kind (str):
+            Kind of the object, ex.: `Secret`, `Service`.
+        name (str):
+            Name of the object.
+        namespace (str):
+            Namespace of the object, ignored for cluster scoped kinds.
+
+    Returns:
+        Return a tuple (namespace, kind, name).
+    """
+    if kind in CLUSTER_SCOPED_KINDS:
+        namespace = None
+    return (namespace, kind, name)
+
+
+def _pod_spec_references(pod_spec: dict) -> List[Tuple[str, str]]:
+    """Return (kind, name) referenced by a pod spec."""
+    references = []
+    for volume in pod_spec.get('volumes') or []:
+        secret = volume.get('secret') or {}
+        if secret.get('secretName') is not None:
+            references.append(('Secret', secret['secretName']))
+        config_map = volume.get('configMap') or {}
+        if config_map.get('name') is not None:
+            references.append(('ConfigMap', config_map['name']))
+        claim = volume.get('persistentVolumeClaim') or {}
+        if claim.get('claimName') is not None:
+            references.append(('PersistentVolumeClaim', claim['claimName']))
+
+    service_account = pod_spec.get('serviceAccountName')
+    if service_account is not None:
+        references.append(('ServiceAccount', service_account))
+
+    containers = (
+        (pod_spec.get('containers') or []) +
+        (pod_spec.get('initContainers') or []))
+    for container in containers:
+        for env_from in container.get('envFrom') or []:
+            secret_ref = env_from.get('secretRef') or {}
+            if secret_ref.get('name') is not None:
+                references.append(('Secret', secret_ref['name']))
+            config_map_ref = env_from.get('configMapRef') or {}
+            if config_map_ref.get('name') is not None:
+                references.append(('ConfigMap', config_map_ref['name']))
+
+        for env in container.get('env') or []:
+            value_from = env.get('valueFrom') or {}
+            secret_ref = value_from.get('secretKeyRef') or {}
+            if secret_ref.get('name') is not None:
+                references.append(('Secret', secret_ref['name']))
+            config_map_ref = value_from.get('configMapKeyRef') or {}
+            if config_map_ref.get('name') is not None:
+                references.append(('ConfigMap', config_map_ref['name']))
+
+            # Hosts pointing to services deployed at the stack, ex.: apps
+            # with DB_HOST set to a PGBouncer service
+            value = env.get('value')
+            is_host = (
+                HOST_ENV_PATTERN.match(env.get('name') or '') and
+                isinstance(value, str) and
+                SERVICE_NAME_PATTERN.match(value))
+            if is_host:
+                references.append(('Service', value))
+    return references
+
+
+def _document_references(document: dict) -> List[Tuple[str, str]]:
+    """Return (kind, name) referenced by a K8s object."""
+    kind = document.get('kind')
+    spec = document.get('spec') or {}
+    references = []
+    if kind == 'Pod':
+        references.extend(_pod_spec_references(spec))
+    elif 'template' in spec:
+        pod_spec = (spec.get('template') or {}).get('spec') or {}
+        references.extend(_pod_spec_references(pod_spec))
+    elif kind == 'CronJob':
+        pod_spec = (
+            ((spec.get('jobTemplate') or {}).get('spec') or {})
+            .get('template') or {}).get('spec') or {}
+        references.extend(_pod_spec_references(pod_spec))
+
+    if kind == 'PersistentVolumeClaim':
+        if spec.get('volumeName') is not None:
+            references.append(('PersistentVolume', spec['volumeName']))
+
+    if kind == 'Ingress':
+        default_backend = (
+            (spec.get('defaultBackend') or {}).get('service') or {})
+        if default_backend.get('name') is not None:
+            references.append(('Service', default_backend['name']))
+        for rule in spec.get('rules') or []:
+            for path in (rule.get('http') or {}).get('paths') or []:
+                service = (path.get('backend') or {}).get('service') or {}
+                if service.get('name') is not None:
+                    references.append(('Service', service['name']))
+
+    if kind in ['HorizontalPodAutoscaler', 'ScaledObject']:
+        target_ref = spec.get('scaleTargetRef') or {}
+        if target_ref.get('name') is not None:
+            references.append(
+                (target_ref.get('kind', 'Deployment'), target_ref['name']))
+        for trigger in spec.get('triggers') or []:
+            auth_ref = trigger.get('authenticationRef') or {}
+            if auth_ref.get('name') is not None:
+                references.append((
+                    auth_ref.get('kind', 'TriggerAuthentication'),
+                    auth_ref['name']))
+
+    if kind in ['RoleBinding', 'ClusterRoleBinding']:
+        role_ref = document.get('roleRef') or {}
+        if role_ref.get('name') is not None:
+            references.append((role_ref.get('kind'), role_ref['name']))
+        for subject in document.get('subjects') or []:
+            if subject.get('kind') == 'ServiceAccount':
+                references.append(('ServiceAccount', subject.get('name')))
+    return references
+
+
+def manifest_references(deploy_item: dict, namespace: str) -> dict:
+    """Extract objects provided and required by a deploy item.
+
+    Args:
+        deploy_item (dict):
+            A deploy item returned by `create_deployment_file` function of
+            the microservices objects.
+        namespace (str):
+            Default namespace that will be used if not set at
+            `deploy_item`.
+
+    Returns:
+        Return a dictionary with keys `provides` and `requires` with a
+        list of objects keys (namespace, kind, name).
+    """
+    item_namespace = deploy_item.get('namespace', namespace)
+    provides = []
+    requires = []
+
+    if deploy_item['type'] == 'secrets_file':
+        provides.append(object_key(
+            'Secret', deploy_item['name'], item_namespace))
+    elif deploy_item['type'] == 'configmap_file':
+        provides.append(object_key(
+            'ConfigMap', deploy_item['name'], item_namespace))
+    else:
+        documents = yaml.safe_load_all(deploy_item['content'])
+        for document in documents:
+            if not isinstance(document, dict):
+                continue
+            metadata = document.get('metadata') or {}
+            doc_namespace = metadata.get('namespace', item_namespace)
+            provides.append(object_key(
+                document.get('kind'), metadata.get('name'), doc_namespace))
+            for kind, name in _document_references(document):
+                requires.append(object_key(kind, name, doc_namespace))
+
+    # Objects created by the item itself are not dependencies
+    requires = [x for x in requires if x not in provides]
+    return {
+        'provides': list(dict.fromkeys(provides)),
+        'requires': list(dict.fromkeys(requires))}
+
+
+class DependencyGraph:
+    """DAG of deploy commands built from provided/required objects."""
+
+    nodes: List[dict]
+    """Deploy commands, position on the list is the node id."""
+    dependencies: Dict[int, Set[int]]
+    """Nodes that must be applied before each node."""
+    dependents: Dict[int, Set[int]]
+    """Nodes that are waiting for each node to be applied."""
+
+    def __init__(self, cmds: List[dict]):
+        """__init__.
+
+        If any of the commands does not have `provides` and `requires`
+        keys (commands created by legacy code) the graph will chain all
+        commands in the order they were passed.
+
+        Args:
+            cmds (List[dict]):
+                Deploy commands created by
+                `DeployPumpWood.create_deploy_files`.
+
+        Raises:
+            Exception:
+                'Dependency cycle found between deploy commands: %s'.
+                Indicates that deploy items reference each other and it is
+                not possible to find an order to apply them.
+        """
+        self.nodes = list(cmds)
+        self.dependencies = {i: set() for i in range(len(self.nodes))}
+        self.dependents = {i: set() for i in range(len(self.nodes))}
+
+        has_references = all(
+            ('provides' in c) and ('requires' in c) for c in self.nodes)
+        if not has_references:
+            for i in range(1, len(self.nodes)):
+                self._add_edge(i - 1, i)
+        else:
+            providers = {}
+            for i, c in enumerate(self.nodes):
+                for key in c['provides']:
+                    key = tuple(key)
+                    # Objects created more than once must keep the order
+                    # they were added to the stack
+                    if key in providers:
+                        self._add_edge(providers[key], i)
+                    providers[key] = i
+            for i, c in enumerate(self.nodes):
+                for key in c['requires']:
+                    provider = providers.get(tuple(key))
+                    if provider is not None and provider != i:
+                        self._add_edge(provider, i)
+        self.topological_order()
+
+    def _add_edge(self, before: int, after: int):
+        """Set that node `before` must be applied before `after`."""
+        self.dependencies[after].add(before)
+        self.dependents[before].add(after)
+
+    def topological_order(self) -> List[int]:
+        """Return nodes in an order that respect dependencies.
+
+        Ties are broken using the order the commands were added, so a stack
+        without references between items keep its original order.
+
+        Returns:
+            List of node ids.
+        """
+        missing = {i: len(d) for i, d in self.dependencies.items()}
+        ready = sorted(i for i, n in missing.items() if n == 0)
+        order = []
+        while ready:
+            node = ready.pop(0)
+            order.append(node)
+            for dependent in self.dependents[node]:
+                missing[dependent] -= 1
+                if missing[dependent] == 0:
+                    ready.append(dependent)
+            ready.sort()
+
+        if len(order) != len(self.nodes):
+            cycle_nodes = [
+                self.nodes[i].get('file') for i in missing
+                if i not in order]
+            msg = 'Dependency cycle found between deploy commands: %s' % (
+                cycle_nodes, )
+            raise Exception(msg)
+        return order
+
+    def critical_path_length(self) -> int:
+        """Return the number of steps on the longest dependency chain."""
+        depth = {}
+        for node in self.topological_order():
+            depth[node] = 1 + max(
+                [depth[d] for d in self.dependencies[node]], default=0)
+        return max(depth.values(), default=0)
+
+    def run(self, apply_function: Callable[[dict], None],
+            max_workers: int = 4):
+        """Apply the commands respecting the dependencies.
+
+        Nodes are submitted to a thread pool as soon as all their
+        dependencies were applied. If a node fails, no new node is
+        submitted, running nodes are awaited and the error is raised.
+
+        Args:
+            apply_function (Callable[[dict], None]):
+                Function that will receive a deploy command and apply it
+                to the cluster.
+            max_workers (int):
+                Maximum number of commands applied at the same time.
+        """
+        missing = {i: len(d) for i, d in self.dependencies.items()}
+        ready = sorted(i for i, n in missing.items() if n == 0)
+        running = {}
+        errors = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while ready or running:
+                while ready and not errors:
+                    node = ready.pop(0)
+                    future = executor.submit(
+                        apply_function, self.nodes[node])
+                    running[future] = node
+                if not running:
+                    break
+
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        errors.append(error)
+                        continue
+                    for dependent in self.dependents[node]:
+                        missing[dependent] -= 1
+                        if missing[dependent] == 0:
+                            ready.append(dependent)
+                ready.sort()
+
+        if errors:
+            raise errors[0]
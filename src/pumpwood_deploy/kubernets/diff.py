@@ -0,0 +1,349 @@
+"""Plan the changes between rendered manifests and the live cluster.
+
+Current state of the objects is fetched using one list call for each kind
+and namespace of the rendered stack. Each rendered object is compared to
+the live object:
+
+- **create:** object does not exist at the cluster.
+- **update:** a field set at the manifest has a different value at the
+  cluster, or the manifest differs from the last applied configuration
+  (fields removed from the manifest).
+- **unchanged:** object at the cluster matches the manifest.
+
+Kinds that are not served by the cluster (ex.: `ScaledObject` before KEDA
+is installed) have no live objects, all objects of the kind are planned
+to be created.
+
+Fields that are defaulted or managed by the cluster are not compared since
+only the fields set at the manifest are checked. Resource quantities are
+compared by value (`12000m` == `12`) and Secrets `stringData` is compared
+with the encoded `data` at the cluster.
+"""
+import re
+import json
+import base64
+import yaml
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Callable, Tuple
+from pumpwood_deploy.kubernets.dependency_graph import object_key
+
+
+LAST_APPLIED_ANNOTATION = (
+    'kubectl.kubernetes.io/last-applied-configuration')
+"""Annotation with the last configuration applied by kubectl."""
+
+KIND_NOT_FOUND_PATTERN = re.compile(
+    r"Kind not found at API server|doesn't have a resource type")
+"""Error of listing a kind that is not served by the cluster, raised by
+   `KubernetsApiClient` and kubectl."""
+
+QUANTITY_PATTERN = re.compile(
+    r'^(?P<number>[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?)'
+    r'(?P<suffix>Ki|Mi|Gi|Ti|Pi|Ei|m|k|M|G|T|P|E)?$')
+"""K8s resource quantity, ex.: `500m`, `1Gi`, `1.5`."""
+
+QUANTITY_SUFFIXES = {
+    None: Decimal(1), 'm': Decimal('0.001'), 'k': Decimal(10) ** 3,
+    'M': Decimal(10) ** 6, 'G': Decimal(10) ** 9, 'T': Decimal(10) ** 12,
+    'P': Decimal(10) ** 15, 'E': Decimal(10) ** 18,
+    'Ki': Decimal(2) ** 10, 'Mi': Decimal(2) ** 20, 'Gi': Decimal(2) ** 30,
+    'Ti': Decimal(2) ** 40, 'Pi': Decimal(2) ** 50, 'Ei': Decimal(2) ** 60}
+"""Multiplier of each quantity suffix."""
+
+QUANTITY_FIELDS = ['resources', 'capacity', 'hard']
+"""Fields that have resource quantities as values."""
+
+
+def parse_quantity(value) -> Decimal:
+    """Parse a K8s quantity to a decimal.
+
+    Args:
+        value (str|int|float):
+            Quantity, ex.: `500m`, `1Gi`, `2`.
+
+    Returns:
+        Return the value as a Decimal or None if it is not a quantity.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    if not isinstance(value, str):
+        return None
+    match = QUANTITY_PATTERN.match(value.strip())
+    if match is None:
+        return None
+    return (
+        Decimal(match.group('number')) *
+        QUANTITY_SUFFIXES[match.group('suffix')])
+
+
+def _normalize_secret(document: dict) -> dict:
+    """Move `stringData` of a Secret to `data` as stored by the cluster."""
+    if document.get('kind') != 'Secret' or not document.get('stringData'):
+        return document
+    document = dict(document)
+    data = dict(document.get('data') or {})
+    for key, value in document.pop('stringData').items():
+        data[key] = base64.b64encode(str(value).encode()).decode()
+    document['data'] = data
+    return document
+
+
+def field_differences(desired, live, path: str = '',
+                      is_quantity: bool = False) -> List[str]:
+    """List fields set at desired object that differ at live object.
+
+    Fields that are present only at live object are ignored, they are
+    defaulted or managed by the cluster. Lists must have the same length.
+
+    Args:
+        desired (any):
+            Value at the rendered manifest.
+        live (any):
+            Value at the cluster.
+        path (str):
+            Path of the value, used on the differences.
+        is_quantity (bool):
+            If values are resource quantities.
+
+    Returns:
+        List of the paths with different values.
+    """
+    if isinstance(desired, dict):
+        if not isinstance(live, dict):
+            return [path or '.']
+        differences = []
+        for key, value in desired.items():
+            if value is None:
+                continue
+            differences.extend(field_differences(
+                value, live.get(key), path=path + '.' + str(key),
+                is_quantity=is_quantity or key in QUANTITY_FIELDS))
+        return differences
+
+    if isinstance(desired, list):
+        if not isinstance(live, list) or len(desired) != len(live):
+            return [path]
+        differences = []
+        for i, (desired_item, live_item) in enumerate(zip(desired, live)):
+            differences.extend(field_differences(
+                desired_item, live_item, path='%s[%d]' % (path, i),
+                is_quantity=is_quantity))
+        return differences
+
+    if desired == live:
+        return []
+    if is_quantity:
+        desired_quantity = parse_quantity(desired)
+        if desired_quantity is not None and \
+                desired_quantity == parse_quantity(live):
+            return []
+    # Values set as strings at yml may return with other types
+    if live is not None and str(desired) == str(live) and \
+            not isinstance(desired, bool):
+        return []
+    return [path]
+
+
+def object_drift(desired: dict, live: dict) -> Tuple[str, List[str]]:
+    """Compare a rendered object with the object at the cluster.
+
+    Args:
+        desired (dict):
+            Object at the rendered manifest.
+        live (dict):
+            Object at the cluster, None if it does not exist.
+
+    Returns:
+        Return a tuple with action (`create`, `update`, `unchanged`) and
+        the list of different fields.
+    """
+    if live is None:
+        return ('create', [])
+    desired = _normalize_secret(desired)
+    differences = field_differences(
+        {k: v for k, v in desired.items() if k != 'status'}, live)
+
+    # Fields removed from manifest are kept at the cluster, they are found
+    # comparing with the last applied configuration
+    annotations = (live.get('metadata') or {}).get('annotations') or {}
+    last_applied = annotations.get(LAST_APPLIED_ANNOTATION)
+    if last_applied is not None:
+        try:
+            last_applied = _normalize_secret(json.loads(last_applied))
+        except ValueError:
+            last_applied = None
+    if last_applied is not None:
+        for field in field_differences(last_applied, desired):
+            # Namespace is set by kubectl from command line arguments
+            if field != '.metadata.namespace' and field not in differences:
+                differences.append(field)
+
+    if differences:
+        return ('update', differences)
+    return ('unchanged', [])
+
+
+class DiffPlanner:
+    """Compare rendered deploy commands with the live cluster."""
+
+    list_objects: Callable[[str, str, str], List[dict]]
+    """Function that receives (kind, namespace, api_version) and return all
+       objects of the kind at the namespace."""
+    max_workers: int
+    """Number of list calls made at the same time."""
+
+    def __init__(self, list_objects: Callable[[str, str, str], List[dict]],
+                 max_workers: int = 8):
+        """__init__.
+
+        Args:
+            list_objects (Callable[[str, str, str], List[dict]]):
+                Function that receives (kind, namespace, api_version) and
+                return all objects of the kind at the namespace, namespace
+                is None for cluster scoped kinds.
+            max_workers (int):
+                Number of list calls made at the same time.
+        """
+        self.list_objects = list_objects
+        self.max_workers = max_workers
+
+    @staticmethod
+    def desired_objects(cmd: dict, namespace: str) -> List[tuple]:
+        """List objects of a command manifest.
+
+        Args:
+            cmd (dict):
+                Deploy command with `manifest` key.
+            namespace (str):
+                Namespace used if not set at command or object.
+
+        Returns:
+            List of tuples (key, document) with the object key
+            (namespace, kind, name) and the object.
+        """
+        with open(cmd['manifest'], 'r') as file:
+            documents = list(yaml.safe_load_all(file.read()))
+        cmd_namespace = cmd.get('namespace') or namespace
+        objects = []
+        for document in documents:
+            if not isinstance(document, dict):
+                continue
+            metadata = document.get('metadata') or {}
+            key = object_key(
+                document.get('kind'), metadata.get('name'),
+                metadata.get('namespace', cmd_namespace))
+            objects.append((key, document))
+        return objects
+
+    def plan(self, cmds: List[dict], namespace: str) -> dict:
+        """Create the change set of the deploy commands.
+
+        Args:
+            cmds (List[dict]):
+                Commands created by `DeployPumpWood.create_deploy_files`.
+            namespace (str):
+                Default namespace of the deploy.
+
+        Returns:
+            Return a dictionary with keys:
+            - **changes:** List of dictionaries with `name` (command
+              name), `key` (namespace, kind, name), `action` and `fields`
+              (different fields) for each object.
+            - **drifted_cmds:** Commands that have objects to be created or
+              updated, commands without manifest are always considered
+              drifted. Objects of kinds not served by the cluster are
+              considered to be created.
+            - **unchanged_cmds:** Commands with all objects unchanged.
+        """
+        cmd_objects = []
+        list_keys = {}
+        for cmd in cmds:
+            objects = None
+            if cmd.get('manifest') is not None:
+                objects = self.desired_objects(cmd, namespace)
+                for (obj_namespace, kind, _), document in objects:
+                    list_keys[(obj_namespace, kind)] = \
+                        document.get('apiVersion')
+            cmd_objects.append((cmd, objects))
+
+        def fetch(list_key: tuple) -> tuple:
+            (obj_namespace, kind), api_version = list_key
+            try:
+                items = self.list_objects(kind, obj_namespace, api_version)
+            except Exception as e:
+                if KIND_NOT_FOUND_PATTERN.search(str(e)) is None:
+                    raise
+                print((
+                    "### Kind [{}] not found at cluster, its objects will "
+                    "be created").format(kind))
+                items = []
+            return {
+                object_key(kind, (i.get('metadata') or {}).get('name'),
+                           obj_namespace): i
+                for i in items}
+
+        live_objects = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for result in executor.map(fetch, list_keys.items()):
+                live_objects.update(result)
+
+        changes = []
+        drifted_cmds = []
+        unchanged_cmds = []
+        for cmd, objects in cmd_objects:
+            if objects is None:
+                changes.append({
+                    'name': cmd['name'], 'key': None, 'action': 'unknown',
+                    'fields': []})
+                drifted_cmds.append(cmd)
+                continue
+
+            is_drifted = False
+            for key, document in objects:
+                action, fields = object_drift(
+                    document, live_objects.get(key))
+                changes.append({
+                    'name': cmd['name'], 'key': key, 'action': action,
+                    'fields': fields})
+                is_drifted = is_drifted or action != 'unchanged'
+            if is_drifted:
+                drifted_cmds.append(cmd)
+            else:
+                unchanged_cmds.append(cmd)
+        return {
+            'changes': changes, 'drifted_cmds': drifted_cmds,
+            'unchanged_cmds': unchanged_cmds}
+
+
+def format_plan(plan: dict) -> str:
+    """Create a text table with the changes of a plan.
+
+    Args:
+        plan (dict):
+            Plan returned by `DiffPlanner.plan`.
+
+    Returns:
+        Text with one line for each object that will be changed.
+    """
+    counts = {}
+    lines = []
+    for change in plan['changes']:
+        counts[change['action']] = counts.get(change['action'], 0) + 1
+        if change['action'] == 'unchanged':
+            continue
+        if change['key'] is None:
+            description = change['name']
+        else:
+            description = '{}/{}'.format(change['key'][1], change['key'][2])
+        line = '{:<10} {}'.format(change['action'], description)
+        if change['fields']:
+            line += ' ' + ', '.join(change['fields'][:5])
+            if len(change['fields']) > 5:
+                line += ', ...'
+        lines.append(line)
+    header = '## Plan: ' + ', '.join(
+        '{} {}'.format(v, k) for k, v in sorted(counts.items()))
+    return '\n'.join([header] + lines)
@@ -0,0 +1,134 @@
+"""Declarative Secrets and ConfigMaps created from local files.
+
+Objects are rendered as manifests with the file contents and a checksum
+annotation, so they can be applied idempotently (unchanged files do not
+change the object) and changed files update the object atomically, without
+deleting it first.
+"""
+import os
+import base64
+import hashlib
+import yaml
+from typing import List, Tuple
+
+
+CHECKSUM_ANNOTATION = 'pumpwood-deploy/content-checksum'
+"""Annotation with the sha256 of the object data."""
+
+
+def _read_files(paths: List[str]) -> List[Tuple[str, bytes]]:
+    """Read files using `kubectl --from-file` syntax (`key=path`)."""
+    files = []
+    for path in paths:
+        key, path = (
+            path.split('=', 1) if '=' in path
+            else (os.path.basename(path), path))
+        with open(path, 'rb') as file:
+            files.append((key, file.read()))
+    return files
+
+
+def _checksum(files: List[Tuple[str, bytes]]) -> str:
+    """Calculate sha256 of the keys and contents of the files."""
+    hash_obj = hashlib.sha256()
+    for key, data in sorted(files):
+        hash_obj.update(key.encode())
+        hash_obj.update(b'\0')
+        hash_obj.update(hashlib.sha256(data).digest())
+    return hash_obj.hexdigest()
+
+
+def secret_from_files(name: str, paths: List[str],
+                      namespace: str = None) -> dict:
+    """Create a Secret object with data from files.
+
+    Args:
+        name (str):
+            Name of the secret.
+        paths (List[str]):
+            Path of the files, it is possible to set the key using
+            `key=path` as in `kubectl --from-file`. If key is not set file
+            base name is used.
+        namespace (str):
+            Namespace of the secret, if None it is not set at metadata.
+
+    Returns:
+        Secret object as a dictionary.
+    """
+    files = _read_files(paths)
+    metadata = {
+        'name': name,
+        'annotations': {CHECKSUM_ANNOTATION: _checksum(files)}}
+    if namespace is not None:
+        metadata['namespace'] = namespace
+    return {
+        'apiVersion': 'v1', 'kind': 'Secret', 'type': 'Opaque',
+        'metadata': metadata,
+        'data': {
+            key: base64.b64encode(data).decode() for key, data in files}}
+
+
+def configmap_from_content(name: str, keyname: str, content,
+                           namespace: str = None) -> dict:
+    """Create a ConfigMap object with a file content.
+
+    Content that is not UTF-8 text is set as `binaryData`.
+
+    Args:
+        name (str):
+            Name of the config map.
+        keyname (str):
+            Key of the content at config map.
+        content (str|bytes):
+            Content of the file.
+        namespace (str):
+            Namespace of the config map, if None it is not set at metadata.
+
+    Returns:
+        ConfigMap object as a dictionary.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    metadata = {
+        'name': name,
+        'annotations': {CHECKSUM_ANNOTATION: _checksum([(keyname, content)])}}
+    if namespace is not None:
+        metadata['namespace'] = namespace
+    body = {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': metadata}
+    try:
+        body['data'] = {keyname: content.decode('utf-8')}
+    except UnicodeDecodeError:
+        body['binaryData'] = {keyname: base64.b64encode(content).decode()}
+    return body
+
+
+def configmap_from_file(name: str, path: str, keyname: str = None,
+                        namespace: str = None) -> dict:
+    """Create a ConfigMap object with data from a file.
+
+    Files that are not UTF-8 text are set as `binaryData`.
+
+    Args:
+        name (str):
+            Name of the config map.
+        path (str):
+            Path of the file.
+        keyname (str):
+            Key of the file at config map, if not set file base name is
+            used.
+        namespace (str):
+            Namespace of the config map, if None it is not set at metadata.
+
+    Returns:
+        ConfigMap object as a dictionary.
+    """
+    keyname = os.path.basename(path) if keyname is None else keyname
+    with open(path, 'rb') as file:
+        content = file.read()
+    return configmap_from_content(
+        name=name, keyname=keyname, content=content, namespace=namespace)
+
+
+def to_manifest(body: dict) -> str:
+    """Dump an object as a yml manifest."""
+    return yaml.safe_dump(body, default_flow_style=False, sort_keys=False)
@@ -1,21 +1,29 @@
 """Interface with kubernets."""
 import os
+import time
+import json
+import threading
 import subprocess  # NOQA
-import pkg_resources
-from typing import List
-
-
-volume_gcp = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'kubernets/resources/volume__gcp.yml').read().decode()
+from functools import partial
+from typing import List, Callable
+from pumpwood_deploy.kubernets.dependency_graph import DependencyGraph
+from pumpwood_deploy.kubernets.readiness import (
+    ReadinessWaiter, WAIT_DEFAULT_TIMEOUT)
+from pumpwood_deploy.kubernets.api_client import KubernetsApiClient
+from pumpwood_deploy.kubernets.login_cache import (
+    LoginCache, LOGIN_CACHE_TTL)
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.trace import DeployTracer
+
+
+volume_gcp = get_template(
+    'kubernets/resources/volume__gcp.yml')
 """@private"""
-volume_azure = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'kubernets/resources/volume__azure.yml').read().decode()
+volume_azure = get_template(
+    'kubernets/resources/volume__azure.yml')
 """@private"""
-volume_aws = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'kubernets/resources/volume__aws.yml').read().decode()
+volume_aws = get_template(
+    'kubernets/resources/volume__aws.yml')
 """@private"""
 
 
@@ -32,11 +40,30 @@ class Kubernets:
     """K8s provider, possible values ['gcp', 'azure', 'aws']."""
     kube_client: object
     """Object of the corresponding K8s class associated with `k8_provider`."""
+    k8_backend: str
+    """Backend used to apply manifests, possible values ['kubectl', 'api']."""
+    api_client: KubernetsApiClient
+    """Client used to apply manifests when `k8_backend="api"`, it is created
+       on connection."""
+    kubeconfig: str
+    """Path to kubeconfig, if None default kubeconfig is used."""
+    login_cache: LoginCache
+    """Cache of the logins to the clusters."""
+    context: str
+    """Kubeconfig context of the cluster, set on connection."""
 
     def __init__(self, k8_provider: str, k8_deploy_args: dict,
-                 k8_namespace: str = "default"):
+                 k8_namespace: str = "default",
+                 k8_backend: str = "kubectl", kubeconfig: str = None,
+                 login_cache_path: str = 'outputs/login_cache.json',
+                 login_cache_ttl: float = LOGIN_CACHE_TTL):
         """__init__.
 
+        Connection to the cluster is lazy, login at the provider and
+        namespace creation are performed by `connect` only when the first
+        command is applied. Creating the object to render deploy files does
+        not call any cloud CLI.
+
         Args:
             k8_provider (str):
                 Provider name.
@@ -44,14 +71,35 @@ class Kubernets:
                 Arguments to deploy k8s cluster.
             k8_namespace (str):
                 Name of the namespaces that will be used at deploy.
+            k8_backend (str):
+                Backend used to apply the manifests. `kubectl` will run
+                the bash scripts created at deploy, `api` will apply the
+                manifests directly at the API server using a single pooled
+                connection (`kubernetes` package must be installed). Bash
+                scripts are created for auditing on both backends.
+            kubeconfig (str):
+                Path to kubeconfig used to login and apply the manifests,
+                if not set the default kubeconfig is used.
+            login_cache_path (str):
+                Path of the state file with the logins to the clusters.
+            login_cache_ttl (float):
+                Time in seconds a login to the cluster is reused without
+                calling the cloud CLI, set 0 to always login.
 
         Raises:
             NotImplementedError:
                 Error for not implemented deploy options.
         """
+        if k8_backend not in ['kubectl', 'api']:
+            msg = "Kubernets backend [{}] not implemented".format(
+                k8_backend)
+            raise NotImplementedError(msg)
+
         self.k8_namespace = k8_namespace
         self.k8_deploy_args = k8_deploy_args
         self.k8_provider = k8_provider
+        self.k8_backend = k8_backend
+        self.kubeconfig = kubeconfig
 
         self.kube_client = None
         if k8_provider == "gcp":
@@ -65,24 +113,106 @@ class Kubernets:
                 k8_provider)
             raise NotImplementedError(msg)
 
-        print('## Creating k8_namespace')
-        cmd = "kubectl create namespace {k8_namespace}"
-        cmd_formated = cmd.format(k8_namespace=k8_namespace)
-        # Commands associated with deploy are generated at the deploy package
-        process = subprocess.Popen( # NOQA
-            cmd_formated.split(), stdout=subprocess.PIPE)
-        process.communicate()
+        self.api_client = None
+        self.context = None
+        self.login_cache = LoginCache(
+            path=login_cache_path, ttl=login_cache_ttl)
+        self._connected = False
+        self._connect_lock = threading.Lock()
 
-        print('## Setting new k8_namespace [{k8_namespace}] as default'.format(
-            k8_namespace=k8_namespace))
-        cmd = (
-            "kubectl config set-context --current "
-            "--namespace={k8_namespace}")
-        cmd_formated = cmd.format(k8_namespace=k8_namespace)
+    def __getstate__(self) -> dict:
+        """State used to pickle the client, ex.: to a render process.
+
+        Lock and API client can not be pickled, the unpickled client is
+        not connected and connects again on the first command.
+        """
+        state = self.__dict__.copy()
+        del state['_connect_lock']
+        state['api_client'] = None
+        state['context'] = None
+        state['_connected'] = False
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restore pickled state creating a new connection lock."""
+        self.__dict__.update(state)
+        self._connect_lock = threading.Lock()
+
+    def subprocess_env(self) -> dict:
+        """Enviroment used on kubectl and cloud CLI calls."""
+        env = dict(os.environ)
+        if self.kubeconfig is not None:
+            env['KUBECONFIG'] = self.kubeconfig
+        return env
+
+    def _run_kubectl(self, args: List[str]) -> subprocess.CompletedProcess:
+        """Run a kubectl command capturing its output."""
+        cmd = ["kubectl"] + args
         # Commands associated with deploy are generated at the deploy package
-        process = subprocess.Popen( # NOQA
-            cmd_formated.split(), stdout=subprocess.PIPE)
-        process.communicate()
+        return subprocess.run( # NOQA
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            env=self.subprocess_env())
+
+    def _current_context(self) -> str:
+        """Return current kubeconfig context."""
+        if self.k8_backend == "api":
+            return KubernetsApiClient.current_context(
+                kubeconfig=self.kubeconfig)
+        process = self._run_kubectl(["config", "current-context"])
+        if process.returncode != 0:
+            return None
+        return process.stdout.decode().strip() or None
+
+    def connect(self):
+        """Login to the cluster and create the namespace.
+
+        Only the first call will connect to the cluster. If there is a
+        login to the same cluster inside the TTL at `login_cache`, its
+        kubeconfig context is used and no cloud CLI is called.
+        """
+        if self._connected:
+            return
+        with self._connect_lock:
+            if self._connected:
+                return
+
+            cluster_key = "{kubeconfig}:{cluster}".format(
+                kubeconfig=self.kubeconfig or "default",
+                cluster=self.kube_client.cluster_key())
+            env = self.subprocess_env()
+            context = self.login_cache.get_context(cluster_key)
+            is_cached = context is not None
+            if is_cached:
+                print('## Using cached login to kubernets cluster [{}]'.format(
+                    context))
+            else:
+                self.kube_client.login(env=env)
+                context = self._current_context()
+                if context is not None:
+                    self.login_cache.update(cluster_key, context)
+            self.context = context
+
+            if self.k8_backend == "api":
+                print('## Creating k8_namespace')
+                self.api_client = KubernetsApiClient(
+                    namespace=self.k8_namespace, kubeconfig=self.kubeconfig,
+                    context=context)
+                self.api_client.create_namespace(self.k8_namespace)
+                self._connected = True
+                return
+
+            if is_cached:
+                self._run_kubectl(["config", "use-context", context])
+
+            print('## Creating k8_namespace')
+            self._run_kubectl(["create", "namespace", self.k8_namespace])
+
+            print('## Setting new k8_namespace [{}] as default'.format(
+                self.k8_namespace))
+            self._run_kubectl([
+                "config", "set-context", "--current",
+                "--namespace={}".format(self.k8_namespace)])
+            self._connected = True
 
     def create_volume_yml(self, disk_name: str, disk_size: str,
                           volume_claim_name: str) -> str:
@@ -104,45 +234,282 @@ class Kubernets:
             disk_name=disk_name, disk_size=disk_size,
             volume_claim_name=volume_claim_name)
 
-    def run_deploy_commmands(self, cmds: List[dict]):
+    def render_key(self, namespaced: bool = False) -> str:
+        """Key of the settings that change rendered manifests.
+
+        Provider specific manifests (volumes) depend only on provider and
+        `k8_deploy_args`, clients with the same key render the same
+        manifests whatever the namespace, backend or kubeconfig.
+
+        Args:
+            namespaced (bool):
+                If True, namespace is part of the key. Used for
+                microservices that render the namespace at the manifests.
+        """
+        key = [self.k8_provider, self.k8_deploy_args]
+        if namespaced:
+            key.append(self.k8_namespace)
+        return json.dumps(key, sort_keys=True, default=str)
+
+    def get_object(self, kind: str, name: str, namespace: str) -> dict:
+        """Fetch an object from the cluster.
+
+        Args:
+            kind (str):
+                Kind of the object, ex.: `Deployment`, `Secret`.
+            name (str):
+                Name of the object.
+            namespace (str):
+                Namespace of the object, if None `k8_namespace` is used.
+
+        Returns:
+            Return the object as a dictionary or None if not found.
+        """
+        self.connect()
+        namespace = self.k8_namespace if namespace is None else namespace
+        if self.api_client is not None:
+            return self.api_client.get_object(
+                kind=kind, name=name, namespace=namespace)
+
+        process = self._run_kubectl([
+            "get", kind.lower(), name,
+            "--namespace={}".format(namespace), "--output=json",
+            "--ignore-not-found"])
+        if process.returncode != 0 or not process.stdout.strip():
+            return None
+        return json.loads(process.stdout)
+
+    def list_objects(self, kind: str, namespace: str = None,
+                     api_version: str = None) -> List[dict]:
+        """List all objects of a kind at a namespace using one call.
+
+        Args:
+            kind (str):
+                Kind of the objects, ex.: `Deployment`, `Secret`.
+            namespace (str):
+                Namespace of the objects, if None `k8_namespace` is used.
+            api_version (str):
+                API version of the kind, used only by API backend.
+
+        Returns:
+            Return the objects as dictionaries.
+        """
+        self.connect()
+        namespace = self.k8_namespace if namespace is None else namespace
+        if self.api_client is not None:
+            return self.api_client.list_objects(
+                kind=kind, namespace=namespace, api_version=api_version)
+
+        process = self._run_kubectl([
+            "get", kind.lower(), "--namespace={}".format(namespace),
+            "--output=json"])
+        if process.returncode != 0:
+            msg = "Error listing {} at namespace {}:\n{}".format(
+                kind, namespace, process.stderr.decode())
+            raise Exception(msg)
+        return json.loads(process.stdout).get('items') or []
+
+    def run_deploy_commmands(self, cmds: List[dict], max_workers: int = 1,
+                             wait_mode: str = "sleep",
+                             wait_timeout: int = WAIT_DEFAULT_TIMEOUT,
+                             on_success: Callable[[dict], None] = None,
+                             tracer: DeployTracer = None):
         """Deploy commands.
 
         Create bash files to apply manifests to k8s cluster and run them. It is
         set a sleep time after each deployment, permiting finishing of cluster
         changes before move on.
 
+        If `max_workers` is greater than one, a dependency graph is built
+        using `provides` and `requires` keys of the commands and independent
+        commands are applied concurrently. The sleep of each command will
+        only hold back the commands that depend on it. A failed command
+        raises in any `wait_mode`, so the commands that depend on it are
+        not applied.
+
         Args:
             cmds (List[dict]):
                 List of commands to be applied at the k8s cluster.
+            max_workers (int):
+                Maximum number of commands that will be applied at the same
+                time. Default 1 will apply the commands sequentially in
+                the order they were passed.
+            wait_mode (str):
+                How to wait after each command, `sleep` will sleep for the
+                time set at command `sleep` key, `ready` will wait until
+                the objects created by the command are ready (volume claims
+                bound, deployments rollout complete, objects created...).
+                `watch` will not wait, rollouts are awaited after all
+                commands are applied (check `DeployPumpWood.watch_rollouts`).
+            wait_timeout (int):
+                Time in seconds to wait objects to get ready when
+                `wait_mode="ready"`. It is possible to set a timeout for
+                each command using `timeout` key.
+            on_success (Callable[[dict], None]):
+                Function called with each command that was applied with
+                success, it may be called from different threads.
+            tracer (DeployTracer):
+                Tracer to record apply and wait time of each command.
 
         Raises:
             NotImplementedError:
                 'Command not implemented: %s'. Indicates that command
                 associated with deploy was not implemented yet. So far,
                 only `run` was implemented.
+            NotImplementedError:
+                'Wait mode not implemented: %s'. Indicates that `wait_mode`
+                is not `sleep`, `ready` or `watch`.
+            Exception:
+                'Error running deploy file: %s'. Indicates that a command
+                failed when applying concurrently (`max_workers` greater
+                than one).
         """
         for c in cmds:
-            if c['command'] == 'run':
-                sleep_time = c.get('sleep', 5)
-                if sleep_time is None:
-                    sleep_time = 5
-
-                print('### Running file: ' + c['file'])
-                print('##### Slepping for %s seconds after' % (sleep_time, ))
-                with open(c['file'], 'r') as file:
-                    file_cmd = file.read()
-
-                # Colocando o shebangs no inicio do arquivo
-                with open(c['file'], 'w') as file:
-                    file.write(
-                        "#!/bin/sh\n" + file_cmd + "\nsleep %s" % (
-                            sleep_time, ))
-                # Commands associated with deploy are generated at the deploy
-                # package
-                subprocess.call(c['file']) # NOQA
-            else:
+            if c['command'] != 'run':
                 raise NotImplementedError('Command not implemented: %s' % (
                     c['command'],))
+        if wait_mode not in ['sleep', 'ready', 'watch']:
+            raise NotImplementedError('Wait mode not implemented: %s' % (
+                wait_mode,))
+        if not cmds:
+            return
+        # Connect before starting the workers
+        self.connect()
+
+        def run_command(cmd: dict, raise_error: bool = False):
+            success = self.run_deploy_command(
+                cmd, wait_mode=wait_mode, wait_timeout=wait_timeout,
+                tracer=tracer)
+            if not success and raise_error:
+                # Dependency graph stops scheduling when a command raises
+                raise Exception(
+                    'Error running deploy file: %s' % (cmd['file'], ))
+            if success and on_success is not None:
+                on_success(cmd)
+
+        if max_workers <= 1:
+            for c in cmds:
+                run_command(c)
+        else:
+            graph = DependencyGraph(cmds)
+            print('### Applying %d commands, critical path of %d steps' % (
+                len(cmds), graph.critical_path_length()))
+            graph.run(
+                partial(run_command, raise_error=True),
+                max_workers=max_workers)
+
+    def run_deploy_command(self, cmd: dict, wait_mode: str = "sleep",
+                           wait_timeout: int = WAIT_DEFAULT_TIMEOUT,
+                           tracer: DeployTracer = None) -> bool:
+        """Run one deploy command at the k8s cluster.
+
+        Args:
+            cmd (dict):
+                Command created by `DeployPumpWood.create_deploy_files`.
+            wait_mode (str):
+                How to wait after the command, `sleep`, `ready` or `watch`.
+                Check `run_deploy_commmands`.
+            wait_timeout (int):
+                Time in seconds to wait objects to get ready if `timeout`
+                is not set at the command.
+            tracer (DeployTracer):
+                Tracer to record apply and wait time of the command.
+
+        Returns:
+            Return True if the command was applied without errors.
+
+        Raises:
+            Exception:
+                'Error running deploy file: %s'. Indicates that bash script
+                returned an error code or API server refused the objects,
+                raised only when `wait_mode="ready"`.
+        """
+        self.connect()
+        tracer = DeployTracer(enabled=False) if tracer is None else tracer
+        with tracer.span(cmd['name'], category='apply', file=cmd['file']):
+            if self.api_client is not None:
+                success = self.apply_api_command(cmd)
+            else:
+                success = self.run_bash_command(cmd)
+        if not success:
+            msg = 'Error running deploy file: %s' % (cmd['file'], )
+            if wait_mode == 'ready':
+                raise Exception(msg)
+            print('!! ' + msg + ' !!')
+
+        if wait_mode == 'watch':
+            return success
+        if wait_mode == 'ready':
+            timeout = cmd.get('timeout')
+            timeout = wait_timeout if timeout is None else timeout
+            print('##### Waiting objects to be ready: ' + cmd['file'])
+            with tracer.span(cmd['name'], category='wait', mode=wait_mode):
+                ReadinessWaiter(get_object=self.get_object).wait(
+                    cmd, timeout=timeout)
+        else:
+            sleep_time = cmd.get('sleep', 5)
+            if sleep_time is None:
+                sleep_time = 5
+            print('##### Slepping for %s seconds after' % (sleep_time, ))
+            with tracer.span(cmd['name'], category='wait', mode=wait_mode):
+                time.sleep(sleep_time)
+        return success
+
+    def run_bash_command(self, cmd: dict) -> bool:
+        """Run the bash script of a deploy command.
+
+        Args:
+            cmd (dict):
+                Command created by `DeployPumpWood.create_deploy_files`.
+
+        Returns:
+            Return True if the bash script returned code 0.
+        """
+        with open(cmd['file'], 'r') as file:
+            file_cmd = file.read()
+
+        # Colocando o shebangs no inicio do arquivo
+        if not file_cmd.startswith("#!"):
+            with open(cmd['file'], 'w') as file:
+                file.write("#!/bin/sh\n" + file_cmd)
+
+        print('### Running file: ' + cmd['file'])
+        # Commands associated with deploy are generated at the deploy
+        # package
+        return_code = subprocess.call( # NOQA
+            cmd['file'], env=self.subprocess_env())
+        return return_code == 0
+
+    def apply_api_command(self, cmd: dict) -> bool:
+        """Apply a deploy command directly at the API server.
+
+        Manifests are applied with server-side apply.
+
+        Args:
+            cmd (dict):
+                Command created by `DeployPumpWood.create_deploy_files` or
+                `DeployPumpWood.create_bulk_files`.
+
+        Returns:
+            Return True if all objects were applied.
+        """
+        namespace = cmd.get('namespace', self.k8_namespace)
+        print('### Applying using API: ' + cmd['file'])
+        try:
+            if cmd.get('manifest') is not None:
+                with open(cmd['manifest'], 'r') as file:
+                    self.api_client.apply_manifest(
+                        file.read(), namespace=namespace)
+            else:
+                msg = 'Command can not be applied using API: %s' % (
+                    cmd['file'], )
+                raise NotImplementedError(msg)
+        except NotImplementedError:
+            raise
+        except Exception as e:
+            print('!! Error applying [{}]: {} !!'.format(cmd['file'], e))
+            return False
+        return True
 
 
 class KubernetsGCP:
@@ -156,8 +523,8 @@ class KubernetsGCP:
                  **kwargs):
         """Create a KubernetsGCP object.
 
-        Constructor will create object and connect to k8s cluster using
-        kubectl.
+        Constructor does not connect to the cluster, login is performed by
+        `login` when `Kubernets` connects to the cluster.
 
         Args:
             cluster_name (str):
@@ -169,6 +536,23 @@ class KubernetsGCP:
                 Google project name.
             **kwargs (dict):
                 Other parameters for compatibility with other versions.
+        """
+        self.cluster_name = cluster_name
+        self.zone = zone
+        self.project = project
+
+    def cluster_key(self) -> str:
+        """Key that identifies the cluster at login cache."""
+        return "gcp/{project}/{zone}/{cluster_name}".format(
+            project=self.project, zone=self.zone,
+            cluster_name=self.cluster_name)
+
+    def login(self, env: dict = None):
+        """Connect to k8s cluster writing credentials to kubeconfig.
+
+        Args:
+            env (dict):
+                Enviroment variables used on gcloud call.
 
         Raises:
             Exception:
@@ -176,18 +560,15 @@ class KubernetsGCP:
                 that it was not possible to connect with k8s cluster using
                 arguments passed.
         """
-        self.cluster_name = cluster_name
-        self.zone = zone
-        self.project = project
-
         cmd = (
             "gcloud container clusters get-credentials {cluster_name} "
             " --zone {zone} --project {project}")
         cmd_formated = cmd.format(
-            cluster_name=cluster_name, zone=zone, project=project)
+            cluster_name=self.cluster_name, zone=self.zone,
+            project=self.project)
 
         print('## Loging to kubernets cluster')
-        status_code = os.system(cmd_formated) # NOQA
+        status_code = subprocess.call(cmd_formated.split(), env=env) # NOQA
         if status_code != 0:
             raise Exception("!! Error loging to k8s cluster, check logs !!")
 
@@ -234,8 +615,8 @@ class KubernetsAzure:
                  **kwargs):
         """Create a KubernetsAzure object.
 
-        Constructor will create object and connect to k8s cluster using
-        kubectl.
+        Constructor does not connect to the cluster, login is performed by
+        `login` when `Kubernets` connects to the cluster.
 
         Args:
             subscription (str):
@@ -252,37 +633,51 @@ class KubernetsAzure:
                 Name of the K8s resource.
             **kwargs (dict):
                 Other parameters for compatibility with other versions.
-
-        Raises:
-            Exception:
-                '!! Error loging to k8s cluster, check logs !!'. Indicates that
-                it was not possible to connect with k8s cluster.
         """
         self.subscription = subscription
         self.resource_group = resource_group
         self.k8s_resource_group = k8s_resource_group
         self.aks_resource = aks_resource
 
+    def cluster_key(self) -> str:
+        """Key that identifies the cluster at login cache."""
+        return "azure/{subscription}/{resource_group}/{aks_resource}".format(
+            subscription=self.subscription,
+            resource_group=self.resource_group,
+            aks_resource=self.aks_resource)
+
+    def login(self, env: dict = None):
+        """Connect to k8s cluster writing credentials to kubeconfig.
+
+        Args:
+            env (dict):
+                Enviroment variables used on az calls.
+
+        Raises:
+            Exception:
+                '!! Error setting Azure subscription, check logs !!'.
+                Indicates that it was not possible to set subscription.
+            Exception:
+                '!! Error loging to k8s cluster, check logs !!'. Indicates that
+                it was not possible to connect with k8s cluster.
+        """
         print('## Setting az client subscription')
         cmd = "az account set --subscription {subscription}"
-        cmd_formated = cmd.format(subscription=subscription)
-        status_code = os.system(cmd_formated) # NOQA
+        cmd_formated = cmd.format(subscription=self.subscription)
+        status_code = subprocess.call(cmd_formated.split(), env=env) # NOQA
         if status_code != 0:
             raise Exception(
                 "!! Error setting Azure subscription, check logs !!")
 
-        process = subprocess.Popen(cmd_formated.split()) # NOQA
-        process.communicate()
-
         print('## Loging to kubernets cluster')
         cmd = (
             "az aks get-credentials --overwrite-existing "
             "--resource-group {resource_group} "
-            "--name {aks_resource} \n")
+            "--name {aks_resource}")
         cmd_formated = cmd.format(
-            resource_group=resource_group,
-            aks_resource=aks_resource)
-        status_code = os.system(cmd_formated)  # NOQA
+            resource_group=self.resource_group,
+            aks_resource=self.aks_resource)
+        status_code = subprocess.call(cmd_formated.split(), env=env) # NOQA
         if status_code != 0:
             raise Exception("!! Error loging to k8s cluster, check logs !!")
 
@@ -324,8 +719,8 @@ class KubernetsAWS:
     def __init__(self, region: str, cluster_name: str, **kwargs):
         """Create a KubernetsAWS object.
 
-        Constructor will create object and connect to k8s cluster using
-        kubectl.
+        Constructor does not connect to the cluster, login is performed by
+        `login` when `Kubernets` connects to the cluster.
 
         Args:
             region (str):
@@ -338,13 +733,30 @@ class KubernetsAWS:
         self.region = region
         self.cluster_name = cluster_name
 
+    def cluster_key(self) -> str:
+        """Key that identifies the cluster at login cache."""
+        return "aws/{region}/{cluster_name}".format(
+            region=self.region, cluster_name=self.cluster_name)
+
+    def login(self, env: dict = None):
+        """Connect to k8s cluster writing credentials to kubeconfig.
+
+        Args:
+            env (dict):
+                Enviroment variables used on aws call.
+
+        Raises:
+            Exception:
+                '!! Error loging to k8s cluster, check logs !!'. Indicates
+                that it was not possible to connect with k8s cluster.
+        """
         print('## Loging to kubernets cluster')
         cmd = (
             "aws eks --region {region} "
             "update-kubeconfig --name {cluster_name}")
         cmd_formated = cmd.format(
-            region=region, cluster_name=cluster_name)
-        status_code = os.system(cmd_formated)  # NOQA
+            region=self.region, cluster_name=self.cluster_name)
+        status_code = subprocess.call(cmd_formated.split(), env=env) # NOQA
         if status_code != 0:
             raise Exception("!! Error loging to k8s cluster, check logs !!")
 
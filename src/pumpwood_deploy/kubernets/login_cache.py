@@ -0,0 +1,95 @@
+"""Cache of the logins to the K8s clusters.
+
+Cloud CLIs (`gcloud`, `az`, `aws`) write cluster credentials to kubeconfig.
+The time of each successful login and the kubeconfig context created by it
+are kept at a state file, while the login is inside the TTL the context is
+reused without calling the cloud CLI again.
+"""
+import os
+import json
+import time
+import threading
+
+
+LOGIN_CACHE_TTL = 3600
+"""Default time in seconds a login is reused."""
+
+
+class LoginCache:
+    """Persistent state of the logins to K8s clusters."""
+
+    path: str
+    """Path of the state file."""
+    ttl: float
+    """Time in seconds a login is reused."""
+    logins: dict
+    """Login information (`context`, `time`) by cluster key."""
+
+    def __init__(self, path: str = 'outputs/login_cache.json',
+                 ttl: float = LOGIN_CACHE_TTL):
+        """__init__.
+
+        Args:
+            path (str):
+                Path of the state file.
+            ttl (float):
+                Time in seconds a login is reused, set 0 to always login.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.logins = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                self.logins = json.load(file).get('logins', {})
+
+    def __getstate__(self) -> dict:
+        """State used to pickle the cache, the lock is not pickled."""
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restore pickled state creating a new lock."""
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get_context(self, key: str) -> str:
+        """Return context of a valid login to the cluster.
+
+        Args:
+            key (str):
+                Key of the cluster, check `cluster_key` of provider
+                classes.
+
+        Returns:
+            Return the kubeconfig context of the cluster or None if there
+            is not a login inside the TTL.
+        """
+        login = self.logins.get(key)
+        if login is None or login.get('context') is None:
+            return None
+        if time.time() - login.get('time', 0) >= self.ttl:
+            return None
+        return login['context']
+
+    def update(self, key: str, context: str):
+        """Register a login to the cluster and persist state file.
+
+        Args:
+            key (str):
+                Key of the cluster.
+            context (str):
+                Kubeconfig context created by the login.
+        """
+        with self._lock:
+            self.logins[key] = {'context': context, 'time': time.time()}
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as file:
+                json.dump(
+                    {'logins': self.logins}, file, indent=2,
+                    sort_keys=True)
+            os.replace(temp_path, self.path)
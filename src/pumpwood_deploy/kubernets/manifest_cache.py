@@ -0,0 +1,180 @@
+"""Cache of the manifests applied to the cluster.
+
+A state file keeps a content hash of every manifest (and files used to create
+secrets and config maps) applied to the cluster, by namespace and resource
+name. On later deploys only the resources with changed content are applied.
+"""
+import os
+import json
+import hashlib
+import threading
+from typing import List
+
+
+def _file_paths(deploy_item: dict) -> List[str]:
+    """Return the local files used by a deploy item."""
+    if deploy_item['type'] == 'secrets_file':
+        paths = deploy_item['path']
+        paths = [paths] if isinstance(paths, str) else paths
+        # kubectl --from-file accepts `key=path` syntax
+        return [p.split('=', 1)[-1] for p in paths]
+    if deploy_item['type'] == 'configmap_file':
+        if 'file_path' in deploy_item:
+            return [deploy_item['file_path']]
+    return []
+
+
+def deploy_item_hash(deploy_item: dict, namespace: str) -> str:
+    """Calculate the content hash of a deploy item.
+
+    Hash takes into account the type, namespace, rendered content and the
+    content of the files used to create secrets and config maps.
+
+    Args:
+        deploy_item (dict):
+            A deploy item returned by `create_deployment_file` function of
+            the microservices objects.
+        namespace (str):
+            Namespace used if it is not set at `deploy_item`.
+
+    Returns:
+        Return sha256 hex digest of the deploy item.
+    """
+    sha256 = hashlib.sha256()
+    header = json.dumps([
+        deploy_item['type'], deploy_item.get('namespace', namespace),
+        deploy_item['name'], deploy_item.get('keyname'),
+        deploy_item.get('file_name'), deploy_item.get('path')])
+    sha256.update(header.encode())
+
+    content = deploy_item.get('content')
+    if content is not None:
+        sha256.update(content.encode())
+    for path in _file_paths(deploy_item):
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class ManifestCache:
+    """Persistent state of the content applied for each resource."""
+
+    path: str
+    """Path of the state file."""
+    resources: dict
+    """Content hash applied for each `{namespace}/{name}` resource."""
+
+    def __init__(self, path: str):
+        """__init__.
+
+        Args:
+            path (str):
+                Path of the state file, it is not removed when deploy files
+                are recreated.
+        """
+        self.path = path
+        self.resources = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                self.resources = json.load(file).get('resources', {})
+
+    @staticmethod
+    def cmd_key(cmd: dict) -> str:
+        """Key used to store the command hash."""
+        return '{}/{}'.format(cmd.get('namespace'), cmd['name'])
+
+    def is_changed(self, cmd: dict) -> bool:
+        """Check if command content is different from last applied.
+
+        Args:
+            cmd (dict):
+                Command created by `DeployPumpWood.create_deploy_files`.
+
+        Returns:
+            Return True if command must be applied.
+        """
+        cmd_hash = cmd.get('hash')
+        if cmd_hash is None:
+            return True
+        return self.resources.get(self.cmd_key(cmd)) != cmd_hash
+
+    def changed(self, cmds: List[dict]) -> List[dict]:
+        """Filter commands which content changed since last apply.
+
+        Args:
+            cmds (List[dict]):
+                Commands created by `DeployPumpWood.create_deploy_files`.
+
+        Returns:
+            List of commands that must be applied.
+        """
+        return [c for c in cmds if self.is_changed(c)]
+
+    def update(self, cmd: dict):
+        """Register that command was applied and persist state file.
+
+        It is thread safe and can be used as callback of concurrent
+        applies.
+
+        Args:
+            cmd (dict):
+                Command that was applied with success.
+        """
+        if cmd.get('hash') is None:
+            return
+        with self._lock:
+            self.resources[self.cmd_key(cmd)] = cmd['hash']
+            self._save()
+
+    def _save(self):
+        """Write state file atomically."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(
+                {'resources': self.resources}, file, indent=2,
+                sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+class DeployCheckpoint(ManifestCache):
+    """Checkpoint of the commands applied by an unfinished deploy.
+
+    Unlike `ManifestCache`, that keeps what is at the cluster across
+    deploys, the checkpoint keeps only the steps completed by the current
+    deploy and is cleared when it finishes. If a deploy fails midway, it
+    can be resumed skipping the steps already applied with the same
+    content hash.
+    """
+
+    def __init__(self, path: str):
+        """__init__.
+
+        Args:
+            path (str):
+                Path of the checkpoint file.
+        """
+        super().__init__(path=path)
+
+    def pending(self, cmds: List[dict]) -> List[dict]:
+        """Filter commands not completed or changed since the checkpoint.
+
+        Args:
+            cmds (List[dict]):
+                Commands created by `DeployPumpWood.create_deploy_files`.
+
+        Returns:
+            List of commands that must be applied to finish the deploy.
+        """
+        return self.changed(cmds)
+
+    def clear(self):
+        """Remove checkpoint, used when a deploy starts or finishes."""
+        with self._lock:
+            self.resources = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,175 @@
+"""Readiness conditions used to gate deploy commands.
+
+Instead of sleeping a fixed amount of time after each deploy command, it is
+possible to wait only until the objects created by the command are ready:
+
+- **PersistentVolumeClaim:** claim is `Bound`.
+- **Deployment/StatefulSet/DaemonSet:** rollout is complete, all replicas
+  are updated and available.
+- **Service:** endpoints have at least one ready address, only checked if
+  the workload behind the service is applied on the same command.
+- **Other objects (Secret, ConfigMap, ...):** object exists at the cluster.
+"""
+import time
+from typing import List, Tuple, Callable
+
+
+WORKLOAD_KINDS = ['Deployment', 'StatefulSet', 'DaemonSet']
+"""Kinds that have a rollout to be awaited."""
+
+WAIT_DEFAULT_TIMEOUT = 300
+"""Default time in seconds to wait for an object to be ready."""
+
+
+def workload_is_ready(obj: dict) -> bool:
+    """Check if a workload rollout is complete.
+
+    Args:
+        obj (dict):
+            Deployment, StatefulSet or DaemonSet object fetched from
+            the cluster.
+
+    Returns:
+        Return True if rollout has finished.
+    """
+    metadata = obj.get('metadata') or {}
+    spec = obj.get('spec') or {}
+    status = obj.get('status') or {}
+    generation = metadata.get('generation', 0)
+    if status.get('observedGeneration', 0) < generation:
+        return False
+
+    if obj.get('kind') == 'DaemonSet':
+        desired = status.get('desiredNumberScheduled', 0)
+        return (
+            status.get('updatedNumberScheduled', 0) >= desired and
+            status.get('numberAvailable', 0) >= desired)
+
+    replicas = spec.get('replicas', 1)
+    return (
+        status.get('updatedReplicas', 0) >= replicas and
+        status.get('availableReplicas', 0) >= replicas and
+        status.get('replicas', 0) <= replicas)
+
+
+def claim_is_bound(obj: dict) -> bool:
+    """Check if a PersistentVolumeClaim is bound to a volume."""
+    return (obj.get('status') or {}).get('phase') == 'Bound'
+
+
+def endpoints_are_ready(obj: dict) -> bool:
+    """Check if a Endpoints object has at least one ready address."""
+    for subset in obj.get('subsets') or []:
+        if subset.get('addresses'):
+            return True
+    return False
+
+
+def object_is_ready(kind: str, obj: dict) -> bool:
+    """Check if an object fetched from the cluster is ready.
+
+    Args:
+        kind (str):
+            Kind of the object that was fetched, `Endpoints` are fetched
+            to check Services readiness.
+        obj (dict):
+            Object fetched from the cluster, None if it was not found.
+
+    Returns:
+        Return True if object is ready.
+    """
+    if obj is None:
+        return False
+    if kind in WORKLOAD_KINDS:
+        return workload_is_ready(obj)
+    if kind == 'PersistentVolumeClaim':
+        return claim_is_bound(obj)
+    if kind == 'Endpoints':
+        return endpoints_are_ready(obj)
+    return True
+
+
+def readiness_targets(cmd: dict) -> List[Tuple[str, str, str]]:
+    """List the objects that must be ready for a command to be finished.
+
+    Args:
+        cmd (dict):
+            Deploy command with `provides` key created by
+            `DeployPumpWood.create_deploy_files`.
+
+    Returns:
+        List of (namespace, kind, name) to be awaited. Services are mapped
+        to their `Endpoints`.
+    """
+    provides = [tuple(x) for x in cmd.get('provides', [])]
+    has_workload = any(x[1] in WORKLOAD_KINDS for x in provides)
+
+    targets = []
+    for namespace, kind, name in provides:
+        # Persistent volumes are checked by the claim that binds them
+        if kind == 'PersistentVolume':
+            continue
+        # Services applied before their pods will have no endpoints
+        if kind == 'Service':
+            if has_workload:
+                targets.append((namespace, 'Endpoints', name))
+            continue
+        targets.append((namespace, kind, name))
+    return targets
+
+
+class ReadinessWaiter:
+    """Poll the cluster until objects created by a command are ready."""
+
+    get_object: Callable[[str, str, str], dict]
+    """Function that receives (kind, name, namespace) and return the object
+       at the cluster or None if not found."""
+    poll_interval: float
+    """Time in seconds between checks."""
+
+    def __init__(self, get_object: Callable[[str, str, str], dict],
+                 poll_interval: float = 2.0):
+        """__init__.
+
+        Args:
+            get_object (Callable[[str, str, str], dict]):
+                Function that receives (kind, name, namespace) and return
+                the object at the cluster or None if not found.
+            poll_interval (float):
+                Time in seconds between checks.
+        """
+        self.get_object = get_object
+        self.poll_interval = poll_interval
+
+    def wait(self, cmd: dict, timeout: float = WAIT_DEFAULT_TIMEOUT):
+        """Wait until all objects of the command are ready.
+
+        Args:
+            cmd (dict):
+                Deploy command with `provides` key.
+            timeout (float):
+                Maximum time in seconds to wait for the objects.
+
+        Raises:
+            TimeoutError:
+                'Objects not ready after %s seconds: %s'. Indicates that
+                some of the objects did not get ready before timeout.
+        """
+        pending = readiness_targets(cmd)
+        deadline = time.monotonic() + timeout
+        while True:
+            pending = [
+                (namespace, kind, name)
+                for namespace, kind, name in pending
+                if not object_is_ready(
+                    kind, self.get_object(kind, name, namespace))]
+            if not pending:
+                return
+
+            if time.monotonic() >= deadline:
+                not_ready = ['{}/{}'.format(kind, name)
+                             for _, kind, name in pending]
+                msg = 'Objects not ready after %s seconds: %s' % (
+                    timeout, not_ready)
+                raise TimeoutError(msg)
+            time.sleep(self.poll_interval)
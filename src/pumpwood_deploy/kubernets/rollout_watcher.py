@@ -0,0 +1,422 @@
+"""Watch rollouts of the applied workloads reporting pod startup times.
+
+Deployments, Pods and Events of the namespaces are watched concurrently
+using asyncio (Kubernetes watch API, through `kubectl get --watch` or the
+`kubernetes` package). Watch ends as soon as all workloads are ready and
+the startup of each pod is broken down into:
+
+- **scheduling:** pod creation until it is scheduled to a node.
+- **image_pull:** first `Pulling` event until last `Pulled` event, zero if
+  images were already at the node.
+- **container_start:** images ready until containers are running.
+- **readiness:** containers running until pod is `Ready` (readiness
+  probes).
+
+Example:
+```python
+watcher = RolloutWatcher(watch=watch_source(kube_client))
+report = watcher.run(
+    [('pumpwood', 'Deployment', 'pumpwood-auth-app')], timeout=600)
+print(format_rollout_report(report))
+```
+"""
+import json
+import time
+import asyncio
+import codecs
+import threading
+import statistics
+import subprocess  # NOQA
+from datetime import datetime
+from typing import List, Tuple, Dict, Callable, AsyncIterator
+from pumpwood_deploy.kubernets.readiness import (
+    WORKLOAD_KINDS, WAIT_DEFAULT_TIMEOUT, workload_is_ready)
+
+
+STARTUP_PHASES = ['scheduling', 'image_pull', 'container_start', 'readiness']
+"""Phases of the pod startup, in order."""
+
+
+def parse_timestamp(value: str) -> float:
+    """Convert a K8s RFC 3339 timestamp to epoch time.
+
+    Args:
+        value (str):
+            Timestamp, ex.: `2024-01-01T10:00:00Z`.
+
+    Returns:
+        Epoch time in seconds or None if value is not set.
+    """
+    if not value:
+        return None
+    value = value.replace('Z', '+00:00')
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _condition_time(pod: dict, condition_type: str) -> float:
+    """Time a pod condition became True."""
+    for condition in (pod.get('status') or {}).get('conditions') or []:
+        if condition.get('type') == condition_type and \
+                condition.get('status') == 'True':
+            return parse_timestamp(condition.get('lastTransitionTime'))
+    return None
+
+
+def _event_times(events: List[dict], reason: str) -> List[float]:
+    """Times of the events with a reason."""
+    times = []
+    for event in events:
+        if event.get('reason') != reason:
+            continue
+        event_time = parse_timestamp(
+            event.get('eventTime') or event.get('firstTimestamp') or
+            event.get('lastTimestamp'))
+        if event_time is not None:
+            times.append(event_time)
+    return times
+
+
+def pod_startup_breakdown(pod: dict, events: List[dict] = None) -> dict:
+    """Break pod startup time into phases.
+
+    Args:
+        pod (dict):
+            Pod object fetched from the cluster.
+        events (List[dict]):
+            Events with the pod as involved object, used to measure image
+            pull time.
+
+    Returns:
+        Dictionary with `name`, time in seconds of each phase at
+        `STARTUP_PHASES` and `total` (creation until ready). Phases that
+        did not happen yet are None.
+    """
+    events = events or []
+    metadata = pod.get('metadata') or {}
+    status = pod.get('status') or {}
+    created = parse_timestamp(metadata.get('creationTimestamp'))
+    scheduled = _condition_time(pod, 'PodScheduled')
+    ready = _condition_time(pod, 'Ready')
+
+    started_times = [
+        parse_timestamp(
+            ((c.get('state') or {}).get('running') or {}).get('startedAt'))
+        for c in status.get('containerStatuses') or []]
+    started = (
+        max(started_times)
+        if started_times and None not in started_times else None)
+
+    pulling = _event_times(events, 'Pulling')
+    pulled = _event_times(events, 'Pulled')
+    if pulling and pulled:
+        image_pull = max(0.0, max(pulled) - min(pulling))
+        images_ready = max(pulled)
+    else:
+        image_pull = 0.0 if scheduled is not None else None
+        images_ready = scheduled
+
+    def elapsed(start: float, end: float) -> float:
+        if start is None or end is None:
+            return None
+        return max(0.0, end - start)
+
+    if images_ready is not None and scheduled is not None:
+        images_ready = max(images_ready, scheduled)
+    return {
+        'name': metadata.get('name'),
+        'scheduling': elapsed(created, scheduled),
+        'image_pull': image_pull,
+        'container_start': elapsed(images_ready, started),
+        'readiness': elapsed(started, ready),
+        'total': elapsed(created, ready)}
+
+
+def _selector_matches(workload: dict, pod: dict) -> bool:
+    """Check if a pod is selected by a workload `matchLabels`."""
+    selector = ((workload.get('spec') or {}).get('selector') or {}).get(
+        'matchLabels')
+    if not selector:
+        return False
+    labels = (pod.get('metadata') or {}).get('labels') or {}
+    return all(labels.get(k) == v for k, v in selector.items())
+
+
+async def kubectl_watch(kind: str, namespace: str,
+                        env: dict = None) -> AsyncIterator[dict]:
+    """Watch objects of a kind using `kubectl get --watch`.
+
+    Args:
+        kind (str):
+            Kind of the objects.
+        namespace (str):
+            Namespace of the objects.
+        env (dict):
+            Enviroment of the kubectl process (ex.: `KUBECONFIG`).
+
+    Yields:
+        Watch events with keys `type` (`ADDED`, `MODIFIED`, `DELETED`) and
+        `object`.
+    """
+    # Commands associated with deploy are generated at the deploy package
+    process = await asyncio.create_subprocess_exec(
+        'kubectl', 'get', kind, '--namespace={}'.format(namespace),
+        '--watch', '--output-watch-events', '--output=json',
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env)
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    try:
+        while True:
+            chunk = await process.stdout.read(65536)
+            if not chunk:
+                return
+            buffer += text_decoder.decode(chunk)
+            while True:
+                buffer = buffer.lstrip()
+                if not buffer:
+                    break
+                try:
+                    event, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    # Incomplete object, wait for more output
+                    break
+                buffer = buffer[end:]
+                yield event
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def api_watch(api_client, kind: str,
+                    namespace: str) -> AsyncIterator[dict]:
+    """Watch objects of a kind using the API client.
+
+    The blocking watch of the `kubernetes` package runs at a daemon thread
+    and events are passed to the event loop.
+
+    Args:
+        api_client (KubernetsApiClient):
+            API client connected to the cluster.
+        kind (str):
+            Kind of the objects.
+        namespace (str):
+            Namespace of the objects.
+
+    Yields:
+        Watch events with keys `type` and `object`.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(event):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:
+            # Event loop was closed, watch is no longer used
+            stop.set()
+
+    def run():
+        try:
+            for event in api_client.watch_objects(kind, namespace):
+                if stop.is_set():
+                    return
+                put(event)
+        finally:
+            put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                return
+            yield event
+    finally:
+        stop.set()
+
+
+def watch_source(kube_client) -> Callable[[str, str], AsyncIterator[dict]]:
+    """Return the watch function of a `Kubernets` client.
+
+    Args:
+        kube_client (Kubernets):
+            Client connected to the cluster, API backend is used if it has
+            an `api_client`.
+
+    Returns:
+        Function that receives (kind, namespace) and returns an async
+        iterator of watch events.
+    """
+    kube_client.connect()
+    if kube_client.api_client is not None:
+        return lambda kind, namespace: api_watch(
+            kube_client.api_client, kind, namespace)
+    env = kube_client.subprocess_env()
+    return lambda kind, namespace: kubectl_watch(kind, namespace, env=env)
+
+
+class RolloutWatcher:
+    """Watch workloads until ready and collect pod startup times."""
+
+    watch: Callable[[str, str], AsyncIterator[dict]]
+    """Function that receives (kind, namespace) and returns an async
+       iterator of watch events."""
+
+    def __init__(self, watch: Callable[[str, str], AsyncIterator[dict]]):
+        """__init__.
+
+        Args:
+            watch (Callable[[str, str], AsyncIterator[dict]]):
+                Function that receives (kind, namespace) and returns an
+                async iterator of watch events with keys `type` and
+                `object`, check `watch_source`.
+        """
+        self.watch = watch
+
+    async def _consume(self, kind: str, namespace: str,
+                       handler: Callable[[str, dict], None]):
+        """Pass watch events of a kind to a handler."""
+        async for event in self.watch(kind, namespace):
+            obj = event.get('object') or {}
+            handler(event.get('type'), obj)
+
+    async def watch_rollouts(self, workloads: List[Tuple[str, str, str]],
+                             timeout: float = WAIT_DEFAULT_TIMEOUT) -> dict:
+        """Watch workloads until all are ready or timeout.
+
+        Args:
+            workloads (List[Tuple[str, str, str]]):
+                Workloads as (namespace, kind, name), kinds not at
+                `WORKLOAD_KINDS` are ignored.
+            timeout (float):
+                Maximum time in seconds to watch.
+
+        Returns:
+            Dictionary by `{namespace}/{kind}/{name}` with keys `ready`,
+            `time_to_ready` (seconds since watch started) and `pods` with
+            the startup breakdown of each pod, check
+            `pod_startup_breakdown`.
+        """
+        workloads = [
+            tuple(w) for w in workloads if w[1] in WORKLOAD_KINDS]
+        start = time.time()
+        state = {
+            w: {'object': None, 'ready_time': None} for w in workloads}
+        pods = {}
+        events = {}
+        all_ready = asyncio.Event()
+        if not workloads:
+            all_ready.set()
+
+        def on_workload(namespace: str, kind: str, event_type: str,
+                        obj: dict):
+            name = (obj.get('metadata') or {}).get('name')
+            key = (namespace, kind, name)
+            if key not in state or event_type == 'DELETED':
+                return
+            state[key]['object'] = obj
+            if state[key]['ready_time'] is None and workload_is_ready(obj):
+                state[key]['ready_time'] = time.time()
+                if all(s['ready_time'] is not None for s in state.values()):
+                    all_ready.set()
+
+        def on_pod(namespace: str, kind: str, event_type: str, obj: dict):
+            name = (obj.get('metadata') or {}).get('name')
+            if event_type == 'DELETED':
+                pods.pop((namespace, name), None)
+            else:
+                pods[(namespace, name)] = obj
+
+        def on_event(namespace: str, kind: str, event_type: str,
+                     obj: dict):
+            involved = obj.get('involvedObject') or {}
+            if involved.get('kind') != 'Pod' or event_type == 'DELETED':
+                return
+            events.setdefault(
+                (namespace, involved.get('name')), []).append(obj)
+
+        tasks = []
+        for namespace in sorted(set(w[0] for w in workloads)):
+            kinds = sorted(set(w[1] for w in workloads if w[0] == namespace))
+            handlers = [(k, on_workload) for k in kinds] + [
+                ('Pod', on_pod), ('Event', on_event)]
+            for kind, handler in handlers:
+                tasks.append(asyncio.ensure_future(self._consume(
+                    kind, namespace,
+                    lambda t, o, n=namespace, k=kind, h=handler:
+                        h(n, k, t, o))))
+        try:
+            await asyncio.wait_for(all_ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        report = {}
+        for (namespace, kind, name), workload_state in state.items():
+            workload = workload_state['object'] or {}
+            ready_time = workload_state['ready_time']
+            report['{}/{}/{}'.format(namespace, kind, name)] = {
+                'ready': ready_time is not None,
+                'time_to_ready': (
+                    None if ready_time is None else ready_time - start),
+                'pods': [
+                    pod_startup_breakdown(
+                        pod, events.get((pod_namespace, pod_name)))
+                    for (pod_namespace, pod_name), pod in sorted(
+                        pods.items())
+                    if pod_namespace == namespace and
+                    _selector_matches(workload, pod)]}
+        return report
+
+    def run(self, workloads: List[Tuple[str, str, str]],
+            timeout: float = WAIT_DEFAULT_TIMEOUT) -> dict:
+        """Run `watch_rollouts` at a new event loop."""
+        return asyncio.run(self.watch_rollouts(workloads, timeout=timeout))
+
+
+def format_rollout_report(report: Dict[str, dict]) -> str:
+    """Format a rollout report as a table.
+
+    Args:
+        report (Dict[str, dict]):
+            Report returned by `RolloutWatcher.watch_rollouts`.
+
+    Returns:
+        Table with time to ready of each workload and the maximum time of
+        each startup phase of its pods, slowest workloads first.
+    """
+    header = ['workload', 'ready', 'pods'] + STARTUP_PHASES + ['total']
+    rows = []
+    for key, result in report.items():
+        row = [
+            key, '{:.1f}s'.format(result['time_to_ready'])
+            if result['ready'] else 'NOT READY', str(len(result['pods']))]
+        for phase in STARTUP_PHASES + ['total']:
+            values = [
+                p[phase] for p in result['pods'] if p[phase] is not None]
+            row.append(
+                '{:.1f}s'.format(max(values)) if values else '-')
+        rows.append((result['time_to_ready'] or float('inf'), row))
+    rows.sort(key=lambda x: -x[0])
+
+    widths = [
+        max([len(header[i])] + [len(r[1][i]) for r in rows])
+        for i in range(len(header))]
+    lines = ['### Rollout report (max of pods)']
+    for row in [header] + [r[1] for r in rows]:
+        lines.append('  '.join(
+            cell.ljust(width) for cell, width in zip(row, widths)))
+    not_ready = [r for r in report.values() if not r['ready']]
+    times = [
+        r['time_to_ready'] for r in report.values() if r['ready']]
+    if times:
+        lines.append('median time to ready {:.1f}s'.format(
+            statistics.median(times)))
+    if not_ready:
+        lines.append('!! {} workloads not ready !!'.format(len(not_ready)))
+    return '\n'.join(lines)
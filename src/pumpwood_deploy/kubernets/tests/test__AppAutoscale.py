@@ -0,0 +1,109 @@
+"""Test HorizontalPodAutoscaler of the app deployments."""
+import unittest
+import yaml
+from pumpwood_deploy.kubernets.autoscale import (
+    AppAutoscale, check_autoscaled_requests, MIN_CPU_REQUEST_ANNOTATION)
+from pumpwood_deploy.test_aux.kubenets import validate_k8s_yml
+from pumpwood_deploy.test_aux.microservices import auth_microservice
+
+
+DEPLOYMENT = """
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app
+spec:
+  replicas: 3
+  selector:
+    matchLabels:
+      app: app
+  template:
+    metadata:
+      labels:
+        app: app
+    spec:
+      containers:
+      - name: app
+        image: app:1.0
+        resources:
+          requests:
+            cpu: 100m
+---
+apiVersion: v1
+kind: Service
+metadata:
+  name: app
+spec:
+  ports:
+  - port: 80
+"""
+
+
+class TestAppAutoscale(unittest.TestCase):
+    """Test HorizontalPodAutoscaler of the app deployments."""
+
+    def test__autoscale_deployment(self):
+        autoscale = AppAutoscale.from_arg({
+            'min_replicas': 2, 'max_replicas': 10,
+            'scale_down_stabilization': 600})
+        content = autoscale.autoscale_deployment(DEPLOYMENT)
+        validate_k8s_yml(content)
+
+        documents = list(yaml.safe_load_all(content))
+        self.assertEqual(
+            [d['kind'] for d in documents],
+            ['Deployment', 'Service', 'HorizontalPodAutoscaler'])
+        self.assertNotIn('replicas', documents[0]['spec'])
+        hpa = documents[2]['spec']
+        self.assertEqual(hpa['scaleTargetRef']['name'], 'app')
+        self.assertEqual(
+            (hpa['minReplicas'], hpa['maxReplicas']), (2, 10))
+        self.assertEqual(
+            [m['resource']['name'] for m in hpa['metrics']], ['cpu'])
+        self.assertEqual(
+            hpa['behavior']['scaleDown']['stabilizationWindowSeconds'], 600)
+        self.assertEqual(
+            documents[2]['metadata']['annotations'],
+            {MIN_CPU_REQUEST_ANNOTATION: '100m'})
+
+    def test__missing_requests(self):
+        autoscale = AppAutoscale(memory_utilization=80)
+        deploy_item = {
+            'type': 'deploy', 'name': 'app__deploy',
+            'content': autoscale.autoscale_deployment(DEPLOYMENT)}
+        with self.assertRaisesRegex(Exception, 'has no memory requests'):
+            check_autoscaled_requests(deploy_item)
+
+    def test__default_requests(self):
+        # Default app_requests_cpu is 1m, HPA would stay at max_replicas
+        auth = auth_microservice(
+            app_autoscale={'min_replicas': 2, 'max_replicas': 8})
+        app = [
+            x for x in auth.create_deployment_file()
+            if x['name'] == 'pumpwood_auth_app__deploy'][0]
+        with self.assertRaisesRegex(Exception, 'set app_requests_cpu'):
+            check_autoscaled_requests(app)
+
+        def check(autoscale: AppAutoscale, content: str):
+            check_autoscaled_requests({
+                'type': 'deploy', 'name': 'app__deploy',
+                'content': autoscale.autoscale_deployment(content)})
+
+        content = DEPLOYMENT.replace('cpu: 100m', 'cpu: 50m')
+        with self.assertRaisesRegex(Exception, 'below min_cpu_request'):
+            check(AppAutoscale(), content)
+        check(AppAutoscale(min_cpu_request='50m'), content)
+        check(AppAutoscale(min_cpu_request=None), content)
+        # Memory only targets do not check CPU requests
+        memory_only = AppAutoscale(
+            cpu_utilization=None, memory_utilization=80)
+        check(memory_only, content.replace(
+            'cpu: 50m', 'cpu: 50m\n            memory: 1Gi'))
+
+    def test__invalid_settings(self):
+        with self.assertRaisesRegex(Exception, 'min_replicas'):
+            AppAutoscale(min_replicas=4, max_replicas=2)
+        with self.assertRaisesRegex(Exception, 'At least one'):
+            AppAutoscale(cpu_utilization=None)
+        with self.assertRaisesRegex(Exception, 'min_cpu_request'):
+            AppAutoscale(min_cpu_request='fast')
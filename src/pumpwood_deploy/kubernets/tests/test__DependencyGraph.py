@@ -0,0 +1,121 @@
+"""Test dependency graph used to apply deploy commands."""
+import time
+import threading
+import unittest
+from pumpwood_deploy.microservices.postgres.deploy import PGBouncerDatabase
+from pumpwood_deploy.microservices.pumpwood_datalake.deploy import (
+    PumpWoodDatalakeMicroservice)
+from pumpwood_deploy.kubernets.dependency_graph import (
+    DependencyGraph, manifest_references)
+
+
+def create_cmds(items: list) -> list:
+    """Create commands as `DeployPumpWood.create_deploy_files`."""
+    cmds = []
+    for d in items:
+        cmds.append({
+            'command': 'run', 'file': d['name'], 'name': d['name'],
+            **manifest_references(deploy_item=d, namespace='pumpwood')})
+    return cmds
+
+
+class TestDependencyGraph(unittest.TestCase):
+    """Test dependency graph."""
+
+    def create_stack_items(self):
+        """Create datalake items added before its PGBouncer."""
+        datalake = PumpWoodDatalakeMicroservice(
+            bucket_name="test-pumpwood",
+            app_version="0.0", worker_version="0.0",
+            db_host="pgbouncer-datalake")
+        pgbouncer = PGBouncerDatabase(
+            name="pgbouncer-datalake", postgres_secret="postgres-main",
+            postgres_database="pumpwood_datalake",
+            postgres_host="postgres-main")
+        return (
+            datalake.create_deployment_file() +
+            pgbouncer.create_deployment_file(kube_client=None))
+
+    def test__manifest_references(self):
+        items = self.create_stack_items()
+        references = manifest_references(items[1], namespace='pumpwood')
+        self.assertIn(
+            ('pumpwood', 'Deployment', 'pumpwood-datalake-app'),
+            references['provides'])
+        self.assertIn(
+            ('pumpwood', 'Secret', 'pumpwood-datalake'),
+            references['requires'])
+        self.assertIn(
+            ('pumpwood', 'Service', 'pgbouncer-datalake'),
+            references['requires'])
+
+        secrets_file = manifest_references(
+            {'type': 'secrets_file', 'name': 'gcp--storage-key',
+             'path': 'key-storage.json'}, namespace='pumpwood')
+        self.assertEqual(
+            secrets_file['provides'],
+            [('pumpwood', 'Secret', 'gcp--storage-key')])
+
+    def test__topological_order(self):
+        cmds = create_cmds(self.create_stack_items())
+        graph = DependencyGraph(cmds)
+        order = [cmds[i]['name'] for i in graph.topological_order()]
+
+        # PGBouncer was added last, but apps use it as DB_HOST
+        self.assertLess(
+            order.index('pgbouncer__pgbouncer-datalake'),
+            order.index('pumpwood_datalake__deploy'))
+        self.assertLess(
+            order.index('pumpwood_datalake__secrets'),
+            order.index('pumpwood_datalake__deploy'))
+        self.assertEqual(graph.critical_path_length(), 2)
+
+    def test__legacy_commands_are_chained(self):
+        cmds = [{'command': 'run', 'file': str(i)} for i in range(5)]
+        graph = DependencyGraph(cmds)
+        self.assertEqual(graph.topological_order(), [0, 1, 2, 3, 4])
+        self.assertEqual(graph.critical_path_length(), 5)
+
+    def test__cycle(self):
+        cmds = [
+            {'command': 'run', 'file': 'a', 'provides': [('ns', 'A', 'a')],
+             'requires': [('ns', 'B', 'b')]},
+            {'command': 'run', 'file': 'b', 'provides': [('ns', 'B', 'b')],
+             'requires': [('ns', 'A', 'a')]}]
+        with self.assertRaises(Exception):
+            DependencyGraph(cmds)
+
+    def test__run_concurrently(self):
+        cmds = create_cmds(self.create_stack_items())
+        graph = DependencyGraph(cmds)
+        lock = threading.Lock()
+        applied = []
+
+        def apply_function(cmd):
+            time.sleep(0.05)
+            with lock:
+                applied.append(cmd['name'])
+
+        start = time.time()
+        graph.run(apply_function, max_workers=4)
+        elapsed = time.time() - start
+        self.assertEqual(sorted(applied), sorted(c['name'] for c in cmds))
+        self.assertLess(
+            applied.index('pgbouncer__pgbouncer-datalake'),
+            applied.index('pumpwood_datalake__deploy'))
+        # Two levels of 50ms, sequential apply would take 200ms
+        self.assertLess(elapsed, 0.18)
+
+    def test__run_stops_on_error(self):
+        cmds = [{'command': 'run', 'file': str(i)} for i in range(3)]
+        graph = DependencyGraph(cmds)
+        applied = []
+
+        def apply_function(cmd):
+            if cmd['file'] == '1':
+                raise Exception('apply failed')
+            applied.append(cmd['file'])
+
+        with self.assertRaises(Exception):
+            graph.run(apply_function, max_workers=2)
+        self.assertEqual(applied, ['0'])
@@ -0,0 +1,166 @@
+"""Test planning of the changes between manifests and the cluster."""
+import os
+import json
+import tempfile
+import unittest
+from pumpwood_deploy.kubernets.diff import (
+    DiffPlanner, object_drift, parse_quantity, LAST_APPLIED_ANNOTATION)
+
+
+DEPLOYMENT_MANIFEST = """
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app
+spec:
+  replicas: 1
+  template:
+    spec:
+      containers:
+      - name: app
+        image: app:1
+        resources:
+          limits:
+            cpu: "12000m"
+            memory: "1024Mi"
+---
+apiVersion: v1
+kind: Secret
+metadata:
+  name: app-secrets
+type: Opaque
+stringData:
+  password: "abc"
+"""
+
+
+def live_deployment(**kwargs) -> dict:
+    """Deployment as returned by the cluster with defaulted fields."""
+    container = {
+        'name': 'app', 'image': 'app:1', 'imagePullPolicy': 'IfNotPresent',
+        'resources': {'limits': {'cpu': '12', 'memory': '1Gi'}}}
+    container.update(kwargs)
+    return {
+        'apiVersion': 'apps/v1', 'kind': 'Deployment',
+        'metadata': {'name': 'app', 'namespace': 'pw', 'uid': '1'},
+        'spec': {
+            'replicas': 1, 'revisionHistoryLimit': 10,
+            'template': {'spec': {'containers': [container]}}},
+        'status': {'readyReplicas': 1}}
+
+
+class TestDiffPlanner(unittest.TestCase):
+    """Test drift of objects and plan of deploy commands."""
+
+    def test__parse_quantity(self):
+        self.assertEqual(parse_quantity('12000m'), parse_quantity('12'))
+        self.assertEqual(parse_quantity('1Gi'), parse_quantity('1024Mi'))
+        self.assertEqual(parse_quantity(2), parse_quantity('2000m'))
+        self.assertIsNone(parse_quantity('not-a-quantity'))
+
+    def test__object_drift(self):
+        desired = {
+            'apiVersion': 'apps/v1', 'kind': 'Deployment',
+            'metadata': {'name': 'app'},
+            'spec': {'replicas': 1, 'template': {'spec': {'containers': [{
+                'name': 'app', 'image': 'app:1', 'resources': {
+                    'limits': {'cpu': '12000m', 'memory': '1024Mi'}}}]}}}}
+        self.assertEqual(object_drift(desired, None), ('create', []))
+        self.assertEqual(
+            object_drift(desired, live_deployment()), ('unchanged', []))
+        self.assertEqual(
+            object_drift(desired, live_deployment(image='app:2')),
+            ('update', ['.spec.template.spec.containers[0].image']))
+
+        # Field removed from manifest is found using last applied
+        live = live_deployment()
+        last_applied = json.loads(json.dumps(desired))
+        last_applied['spec']['minReadySeconds'] = 10
+        live['metadata']['annotations'] = {
+            LAST_APPLIED_ANNOTATION: json.dumps(last_applied)}
+        self.assertEqual(
+            object_drift(desired, live), ('update', ['.spec.minReadySeconds']))
+
+    def test__secret_string_data(self):
+        desired = {
+            'apiVersion': 'v1', 'kind': 'Secret', 'metadata': {'name': 's'},
+            'stringData': {'password': 'abc'}}
+        live = {
+            'apiVersion': 'v1', 'kind': 'Secret', 'metadata': {'name': 's'},
+            'data': {'password': 'YWJj'}}
+        self.assertEqual(object_drift(desired, live), ('unchanged', []))
+        live['data']['password'] = 'eHl6'
+        self.assertEqual(
+            object_drift(desired, live), ('update', ['.data.password']))
+
+    def test__plan(self):
+        list_calls = []
+        live = {
+            ('pw', 'Deployment'): [live_deployment()],
+            ('pw', 'Secret'): []}
+
+        def list_objects(kind, namespace, api_version):
+            list_calls.append((kind, namespace, api_version))
+            return live[(namespace, kind)]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = os.path.join(temp_dir, 'app.yml')
+            with open(manifest, 'w') as file:
+                file.write(DEPLOYMENT_MANIFEST)
+            cmds = [
+                {'name': 'app', 'manifest': manifest},
+                {'name': 'app-other', 'manifest': manifest},
+                {'name': 'config-file', 'type': 'configmap_file'}]
+            plan = DiffPlanner(list_objects).plan(cmds, namespace='pw')
+
+        # One list call for each kind and namespace
+        self.assertEqual(sorted(list_calls), [
+            ('Deployment', 'pw', 'apps/v1'), ('Secret', 'pw', 'v1')])
+        self.assertEqual(
+            [(c['name'], c['action']) for c in plan['changes']], [
+                ('app', 'unchanged'), ('app', 'create'),
+                ('app-other', 'unchanged'), ('app-other', 'create'),
+                ('config-file', 'unknown')])
+        self.assertEqual(
+            [c['name'] for c in plan['drifted_cmds']],
+            ['app', 'app-other', 'config-file'])
+
+        live[('pw', 'Secret')] = [{
+            'apiVersion': 'v1', 'kind': 'Secret',
+            'metadata': {'name': 'app-secrets'},
+            'type': 'Opaque', 'data': {'password': 'YWJj'}}]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = os.path.join(temp_dir, 'app.yml')
+            with open(manifest, 'w') as file:
+                file.write(DEPLOYMENT_MANIFEST)
+            plan = DiffPlanner(list_objects).plan(
+                [{'name': 'app', 'manifest': manifest}], namespace='pw')
+        self.assertEqual(plan['drifted_cmds'], [])
+        self.assertEqual(
+            [c['name'] for c in plan['unchanged_cmds']], ['app'])
+
+    def test__plan_kind_not_found(self):
+        def list_objects(kind, namespace, api_version):
+            if kind == 'Secret':
+                raise Exception(
+                    'Kind not found at API server: {} {}'.format(
+                        api_version, kind))
+            return [live_deployment()]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = os.path.join(temp_dir, 'app.yml')
+            with open(manifest, 'w') as file:
+                file.write(DEPLOYMENT_MANIFEST)
+            cmds = [{'name': 'app', 'manifest': manifest}]
+            plan = DiffPlanner(list_objects).plan(cmds, namespace='pw')
+            self.assertEqual(
+                [c['action'] for c in plan['changes']],
+                ['unchanged', 'create'])
+            self.assertEqual(plan['drifted_cmds'], cmds)
+
+            # Other list errors are raised
+            def list_error(kind, namespace, api_version):
+                raise Exception('Error listing {}: forbidden'.format(kind))
+
+            with self.assertRaisesRegex(Exception, 'forbidden'):
+                DiffPlanner(list_error).plan(cmds, namespace='pw')
@@ -0,0 +1,123 @@
+"""Test objects applied using the API backend."""
+import os
+import base64
+import tempfile
+import threading
+import unittest
+from pumpwood_deploy.kubernets.api_client import KubernetsApiClient
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+
+
+class RecordApiClient(KubernetsApiClient):
+    """Client that records objects instead of sending to the cluster."""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.applied = []
+
+    def apply_object(self, body: dict, namespace: str = None) -> dict:
+        self.applied.append((namespace, body))
+        return body
+
+
+class DiscoveryApiClient(KubernetsApiClient):
+    """Client with discovery results set at the test."""
+
+    def __init__(self, resources: list):
+        self.namespace = 'pumpwood'
+        self._resources = {}
+        self._lock = threading.Lock()
+        search = (
+            lambda kind, api_version=None: [
+                r for r in resources if r.kind == kind and
+                api_version in [None, r.group_version]])
+        self._client = type('Client', (), {
+            'resources': type('Resources', (), {
+                'search': staticmethod(search)})})
+
+
+class TestKubernetsApiClient(unittest.TestCase):
+    """Test API backend objects and command routing."""
+
+    def test__apply_manifest(self):
+        client = RecordApiClient(namespace='pumpwood')
+        client.apply_manifest(
+            "kind: Secret\napiVersion: v1\nmetadata:\n  name: a\n---\n"
+            "kind: ConfigMap\napiVersion: v1\nmetadata:\n  name: b\n---\n",
+            namespace='other')
+        self.assertEqual(
+            [(n, b['kind']) for n, b in client.applied],
+            [('other', 'Secret'), ('other', 'ConfigMap')])
+
+    def test__apply_file_objects(self):
+        client = RecordApiClient(namespace='pumpwood')
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'key-storage.json')
+            with open(path, 'wb') as file:
+                file.write(b'{"key": 1}')
+            client.apply_secret_from_files(
+                name='storage', paths=['key=' + path, path])
+            client.apply_configmap_from_file(
+                name='config', path=path, keyname='config.json')
+
+        secret = client.applied[0][1]
+        self.assertEqual(
+            sorted(secret['data'].keys()), ['key', 'key-storage.json'])
+        self.assertEqual(
+            base64.b64decode(secret['data']['key']), b'{"key": 1}')
+        config_map = client.applied[1][1]
+        self.assertEqual(config_map['data'], {'config.json': '{"key": 1}'})
+
+    def test__run_deploy_command_api(self):
+        kubernets = Kubernets.__new__(Kubernets)
+        kubernets.k8_namespace = 'pumpwood'
+        kubernets.api_client = RecordApiClient(namespace='pumpwood')
+        kubernets._connected = True
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = os.path.join(temp_dir, 'secret.yml')
+            with open(manifest, 'w') as file:
+                file.write("kind: Secret\napiVersion: v1\n"
+                           "metadata:\n  name: a\n")
+            success = kubernets.run_deploy_command({
+                'command': 'run', 'file': 'secret.sh', 'sleep': 0,
+                'name': 'a', 'namespace': 'other', 'type': 'secrets',
+                'manifest': manifest})
+            self.assertTrue(success)
+            self.assertEqual(len(kubernets.api_client.applied), 1)
+
+            # Errors at API are returned as failed command
+            success = kubernets.run_deploy_command({
+                'command': 'run', 'file': 'secret.sh', 'sleep': 0,
+                'name': 'a', 'namespace': 'other', 'type': 'secrets',
+                'manifest': os.path.join(temp_dir, 'missing.yml')})
+            self.assertFalse(success)
+
+    def test__resource_discovery(self):
+        def resource(group, api_version, kind, name, preferred=True):
+            # Attributes of kubernetes.dynamic discovery resources
+            return type('Resource', (), {
+                'kind': kind, 'name': name, 'preferred': preferred,
+                'group_version': (
+                    group + '/' + api_version if group else api_version)})
+
+        client = DiscoveryApiClient([
+            resource(None, 'v1', 'Event', 'events'),
+            resource('events.k8s.io', 'v1', 'Event', 'events'),
+            resource('apps', 'v1', 'Deployment', 'deployments'),
+            resource(
+                'apps', 'v1beta1', 'Deployment', 'deployments',
+                preferred=False),
+            resource('apps', 'v1', 'Deployment', 'deployments/status')])
+        # Preferred version of the group is used
+        self.assertEqual(
+            client._resource('Deployment').group_version, 'apps/v1')
+        self.assertEqual(
+            client._resource('Deployment', 'apps/v1beta1').group_version,
+            'apps/v1beta1')
+
+        # Kinds served by more than one group need the api version
+        with self.assertRaises(Exception):
+            client._resource('Event')
+        self.assertEqual(
+            client._resource('Event', 'events.k8s.io/v1').group_version,
+            'events.k8s.io/v1')
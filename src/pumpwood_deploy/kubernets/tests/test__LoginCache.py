@@ -0,0 +1,60 @@
+"""Test lazy connection and cache of logins to the clusters."""
+import os
+import tempfile
+import unittest
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.kubernets.kubernets import Kubernets, KubernetsAWS
+from pumpwood_deploy.kubernets.login_cache import LoginCache
+
+
+class TestLoginCache(unittest.TestCase):
+    """Test login cache."""
+
+    def test__login_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'login_cache.json')
+            login_cache = LoginCache(path=path, ttl=3600)
+            self.assertIsNone(login_cache.get_context('aws/us-east-1/k8s'))
+            login_cache.update('aws/us-east-1/k8s', 'context-k8s')
+
+            login_cache = LoginCache(path=path, ttl=3600)
+            self.assertEqual(
+                login_cache.get_context('aws/us-east-1/k8s'), 'context-k8s')
+            login_cache = LoginCache(path=path, ttl=0)
+            self.assertIsNone(login_cache.get_context('aws/us-east-1/k8s'))
+
+    def test__lazy_connection(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            kubernets = Kubernets(
+                k8_provider='aws', k8_namespace='pumpwood',
+                k8_deploy_args={
+                    'region': 'us-east-1', 'cluster_name': 'k8s'},
+                login_cache_path=os.path.join(temp_dir, 'login.json'))
+            self.assertIsInstance(kubernets.kube_client, KubernetsAWS)
+            self.assertFalse(kubernets._connected)
+            self.assertEqual(kubernets.kube_client.cluster_key(),
+                             'aws/us-east-1/k8s')
+            volume = kubernets.create_volume_yml(
+                disk_name='vol-1', disk_size='10Gi',
+                volume_claim_name='postgres-data')
+            self.assertIn('vol-1', volume)
+
+            # No commands, no connection
+            kubernets.run_deploy_commmands([])
+            self.assertFalse(kubernets._connected)
+
+    def test__deploy_login_cache_path(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, 'outputs')
+            deploy = DeployPumpWood(
+                model_user_password='model', rabbitmq_secret='rabbit',
+                hash_salt='salt', kong_db_disk_name='kong-db',
+                kong_db_disk_size='10Gi', k8_provider='aws',
+                k8_deploy_args={
+                    'region': 'us-east-1', 'cluster_name': 'k8s'},
+                storage_type='google_bucket', storage_deploy_args={
+                    'credential_file': 'key-storage.json'},
+                output_path=output_path)
+            self.assertEqual(
+                deploy.kube_client.login_cache.path,
+                os.path.join(output_path, 'login_cache.json'))
@@ -0,0 +1,49 @@
+"""Test cache of manifests applied to the cluster."""
+import os
+import tempfile
+import unittest
+from pumpwood_deploy.kubernets.manifest_cache import (
+    ManifestCache, deploy_item_hash)
+
+
+class TestManifestCache(unittest.TestCase):
+    """Test incremental deploy state."""
+
+    def test__deploy_item_hash(self):
+        item = {'type': 'deploy', 'name': 'app', 'content': 'kind: Secret'}
+        item_hash = deploy_item_hash(item, namespace='pumpwood')
+        self.assertEqual(item_hash, deploy_item_hash(item, 'pumpwood'))
+        self.assertNotEqual(item_hash, deploy_item_hash(item, 'other'))
+        changed = dict(item, content='kind: ConfigMap')
+        self.assertNotEqual(item_hash, deploy_item_hash(changed, 'pumpwood'))
+
+    def test__deploy_item_hash_secret_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'key-storage.json')
+            with open(path, 'w') as file:
+                file.write('{"key": 1}')
+            item = {
+                'type': 'secrets_file', 'name': 'gcp--storage-key',
+                'path': ['key=' + path]}
+            item_hash = deploy_item_hash(item, namespace='pumpwood')
+            with open(path, 'w') as file:
+                file.write('{"key": 2}')
+            self.assertNotEqual(
+                item_hash, deploy_item_hash(item, namespace='pumpwood'))
+
+    def test__changed(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'state', 'deploy_state.json')
+            cmds = [
+                {'name': 'a', 'namespace': 'pumpwood', 'hash': '1'},
+                {'name': 'b', 'namespace': 'pumpwood', 'hash': '2'},
+                {'name': 'legacy', 'namespace': 'pumpwood'}]
+            cache = ManifestCache(path=path)
+            self.assertEqual(cache.changed(cmds), cmds)
+            for c in cmds:
+                cache.update(c)
+
+            cache = ManifestCache(path=path)
+            self.assertEqual(cache.changed(cmds), [cmds[2]])
+            cmds[1]['hash'] = '3'
+            self.assertEqual(cache.changed(cmds), [cmds[1], cmds[2]])
@@ -0,0 +1,77 @@
+"""Test readiness conditions used to gate deploy commands."""
+import unittest
+from pumpwood_deploy.kubernets.readiness import (
+    ReadinessWaiter, readiness_targets, object_is_ready)
+
+
+class TestReadinessWaiter(unittest.TestCase):
+    """Test readiness conditions."""
+
+    cmd = {
+        'command': 'run', 'file': 'postgres.sh',
+        'provides': [
+            ('pumpwood', 'Deployment', 'postgres'),
+            ('pumpwood', 'Service', 'postgres'),
+            (None, 'PersistentVolume', 'disk'),
+            ('pumpwood', 'PersistentVolumeClaim', 'postgres-data')]}
+
+    def test__readiness_targets(self):
+        targets = readiness_targets(self.cmd)
+        self.assertEqual(targets, [
+            ('pumpwood', 'Deployment', 'postgres'),
+            ('pumpwood', 'Endpoints', 'postgres'),
+            ('pumpwood', 'PersistentVolumeClaim', 'postgres-data')])
+
+        # Services without workloads have no endpoints until the
+        # deployment is applied
+        service_cmd = {'provides': [('pumpwood', 'Service', 'gateway')]}
+        self.assertEqual(readiness_targets(service_cmd), [])
+
+    def test__object_is_ready(self):
+        deployment = {
+            'kind': 'Deployment', 'metadata': {'generation': 2},
+            'spec': {'replicas': 2},
+            'status': {
+                'observedGeneration': 2, 'replicas': 3,
+                'updatedReplicas': 2, 'availableReplicas': 2}}
+        self.assertFalse(object_is_ready('Deployment', deployment))
+        deployment['status']['replicas'] = 2
+        self.assertTrue(object_is_ready('Deployment', deployment))
+        deployment['metadata']['generation'] = 3
+        self.assertFalse(object_is_ready('Deployment', deployment))
+
+        self.assertFalse(object_is_ready(
+            'PersistentVolumeClaim', {'status': {'phase': 'Pending'}}))
+        self.assertTrue(object_is_ready(
+            'PersistentVolumeClaim', {'status': {'phase': 'Bound'}}))
+        self.assertFalse(object_is_ready('Endpoints', {'subsets': []}))
+        self.assertTrue(object_is_ready(
+            'Endpoints', {'subsets': [{'addresses': [{'ip': '10.0.0.1'}]}]}))
+        self.assertFalse(object_is_ready('Secret', None))
+        self.assertTrue(object_is_ready('Secret', {'kind': 'Secret'}))
+
+    def test__wait(self):
+        calls = {'n': 0}
+
+        def get_object(kind, name, namespace):
+            calls['n'] += 1
+            if kind == 'PersistentVolumeClaim':
+                phase = 'Bound' if calls['n'] > 4 else 'Pending'
+                return {'status': {'phase': phase}}
+            if kind == 'Endpoints':
+                return {'subsets': [{'addresses': [{'ip': '10.0.0.1'}]}]}
+            return {
+                'kind': kind, 'spec': {'replicas': 1},
+                'status': {'updatedReplicas': 1, 'availableReplicas': 1,
+                           'replicas': 1}}
+
+        waiter = ReadinessWaiter(get_object=get_object, poll_interval=0.01)
+        waiter.wait(self.cmd, timeout=5)
+        self.assertGreater(calls['n'], 4)
+
+    def test__wait_timeout(self):
+        waiter = ReadinessWaiter(
+            get_object=lambda kind, name, namespace: None,
+            poll_interval=0.01)
+        with self.assertRaises(TimeoutError):
+            waiter.wait(self.cmd, timeout=0.05)
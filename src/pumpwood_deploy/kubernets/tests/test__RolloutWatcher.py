@@ -0,0 +1,130 @@
+"""Test rollout watcher and pod startup breakdown."""
+import os
+import stat
+import asyncio
+import tempfile
+import unittest
+from pumpwood_deploy.kubernets.rollout_watcher import (
+    RolloutWatcher, pod_startup_breakdown, kubectl_watch,
+    format_rollout_report)
+
+
+def pod(name: str, ready: bool = True) -> dict:
+    """Pod created at 10:00:00 and ready at 10:00:20."""
+    conditions = [{
+        'type': 'PodScheduled', 'status': 'True',
+        'lastTransitionTime': '2024-01-01T10:00:02Z'}]
+    if ready:
+        conditions.append({
+            'type': 'Ready', 'status': 'True',
+            'lastTransitionTime': '2024-01-01T10:00:20Z'})
+    return {
+        'kind': 'Pod',
+        'metadata': {
+            'name': name, 'labels': {'app': 'auth'},
+            'creationTimestamp': '2024-01-01T10:00:00Z'},
+        'status': {
+            'conditions': conditions,
+            'containerStatuses': [{'state': {'running': {
+                'startedAt': '2024-01-01T10:00:12Z'}}}]}}
+
+
+def event(pod_name: str, reason: str, timestamp: str) -> dict:
+    return {
+        'kind': 'Event', 'reason': reason, 'firstTimestamp': timestamp,
+        'involvedObject': {'kind': 'Pod', 'name': pod_name}}
+
+
+def deployment(ready: bool) -> dict:
+    return {
+        'kind': 'Deployment',
+        'metadata': {'name': 'auth', 'generation': 1},
+        'spec': {'replicas': 1, 'selector': {'matchLabels': {'app': 'auth'}}},
+        'status': {
+            'observedGeneration': 1, 'replicas': 1,
+            'updatedReplicas': 1, 'availableReplicas': 1 if ready else 0}}
+
+
+class FakeWatch:
+    """Watch streams with events sent after delays, kept open after."""
+
+    def __init__(self, streams: dict):
+        self.streams = streams
+
+    async def __call__(self, kind: str, namespace: str):
+        for delay, event_type, obj in self.streams.get(kind, []):
+            await asyncio.sleep(delay)
+            yield {'type': event_type, 'object': obj}
+        await asyncio.sleep(3600)
+
+
+class TestRolloutWatcher(unittest.TestCase):
+    """Test rollout watcher and pod startup breakdown."""
+
+    def test__pod_startup_breakdown(self):
+        breakdown = pod_startup_breakdown(pod('auth-1'), [
+            event('auth-1', 'Pulling', '2024-01-01T10:00:03Z'),
+            event('auth-1', 'Pulled', '2024-01-01T10:00:10Z')])
+        self.assertEqual(breakdown, {
+            'name': 'auth-1', 'scheduling': 2.0, 'image_pull': 7.0,
+            'container_start': 2.0, 'readiness': 8.0, 'total': 20.0})
+
+        # Image already at the node and pod not ready
+        breakdown = pod_startup_breakdown(pod('auth-1', ready=False))
+        self.assertEqual(breakdown['image_pull'], 0.0)
+        self.assertEqual(breakdown['container_start'], 10.0)
+        self.assertIsNone(breakdown['readiness'])
+
+    def test__watch_until_ready(self):
+        watch = FakeWatch({
+            'Deployment': [
+                (0, 'ADDED', deployment(ready=False)),
+                (0.05, 'MODIFIED', deployment(ready=True))],
+            'Pod': [
+                (0, 'ADDED', pod('old-1')),
+                (0, 'DELETED', pod('old-1')),
+                (0, 'ADDED', pod('auth-1'))],
+            'Event': [
+                (0, 'ADDED', event(
+                    'auth-1', 'Pulling', '2024-01-01T10:00:03Z')),
+                (0, 'ADDED', event(
+                    'auth-1', 'Pulled', '2024-01-01T10:00:04Z'))]})
+        report = RolloutWatcher(watch=watch).run([
+            ('pw', 'Deployment', 'auth'), ('pw', 'Secret', 'auth')],
+            timeout=5)
+        result = report['pw/Deployment/auth']
+        self.assertEqual(list(report.keys()), ['pw/Deployment/auth'])
+        self.assertTrue(result['ready'])
+        self.assertLess(result['time_to_ready'], 1)
+        self.assertEqual([p['name'] for p in result['pods']], ['auth-1'])
+        self.assertEqual(result['pods'][0]['image_pull'], 1.0)
+        self.assertIn('pw/Deployment/auth', format_rollout_report(report))
+
+    def test__timeout(self):
+        watch = FakeWatch({
+            'Deployment': [(0, 'ADDED', deployment(ready=False))]})
+        report = RolloutWatcher(watch=watch).run(
+            [('pw', 'Deployment', 'auth')], timeout=0.1)
+        self.assertFalse(report['pw/Deployment/auth']['ready'])
+        self.assertIn('NOT READY', format_rollout_report(report))
+
+    def test__kubectl_watch(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            script = os.path.join(temp_dir, 'kubectl')
+            with open(script, 'w') as file:
+                file.write(
+                    '#!/bin/sh\n'
+                    'printf \'{"type": "ADDED", "object": {"kind": "Po\'\n'
+                    'sleep 0.05\n'
+                    'printf \'d"}}\\n{"type": "DELETED", "object": {}}\'\n')
+            os.chmod(script, stat.S_IRWXU)
+            env = dict(os.environ)
+            env['PATH'] = temp_dir + os.pathsep + env['PATH']
+
+            async def collect():
+                return [
+                    e async for e in kubectl_watch('Pod', 'pw', env=env)]
+            events = asyncio.run(collect())
+        self.assertEqual(events, [
+            {'type': 'ADDED', 'object': {'kind': 'Pod'}},
+            {'type': 'DELETED', 'object': {}}])
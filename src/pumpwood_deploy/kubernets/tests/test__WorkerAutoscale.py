@@ -0,0 +1,87 @@
+"""Test KEDA autoscale of the queue workers."""
+import unittest
+import yaml
+from pumpwood_deploy.kubernets.autoscale import (
+    WorkerAutoscale, KEDA_RABBITMQ_AUTH)
+from pumpwood_deploy.kubernets.dependency_graph import manifest_references
+from pumpwood_deploy.microservices.pumpwood_datalake.deploy import (
+    PumpWoodDatalakeMicroservice)
+from pumpwood_deploy.microservices.pumpwood_graph_datalake.deploy import (
+    PumpWoodGraphDatalakeMicroservice)
+from pumpwood_deploy.test_aux.kubenets import validate_k8s_yml
+
+
+class TestWorkerAutoscale(unittest.TestCase):
+    """Test KEDA autoscale of the queue workers."""
+
+    def test__autoscale_deployment(self):
+        deploy_obj = PumpWoodDatalakeMicroservice(
+            bucket_name="test-pumpwood", app_version="0.1",
+            worker_version="0.1", worker_autoscale={
+                'queue_name': ['dataloader', 'dataloader_priority'],
+                'queue_length': 50, 'max_replicas': 10})
+        worker = [
+            x for x in deploy_obj.create_deployment_file()
+            if x['name'] == 'pumpwood_datalake_dataloader__worker'][0]
+        validate_k8s_yml(worker['content'])
+
+        documents = list(yaml.safe_load_all(worker['content']))
+        self.assertEqual(
+            [d['kind'] for d in documents], ['Deployment', 'ScaledObject'])
+        self.assertNotIn('replicas', documents[0]['spec'])
+        spec = documents[1]['spec']
+        self.assertEqual(
+            spec['scaleTargetRef']['name'],
+            'pumpwood-datalake-dataloader-worker')
+        self.assertEqual(
+            (spec['minReplicaCount'], spec['maxReplicaCount']), (0, 10))
+        self.assertEqual(
+            [t['metadata']['queueName'] for t in spec['triggers']],
+            ['dataloader', 'dataloader_priority'])
+        self.assertEqual(spec['triggers'][0]['metadata']['value'], '50')
+
+        # Scaled object is applied after the TriggerAuthentication
+        references = manifest_references(worker, namespace='pumpwood')
+        self.assertIn(
+            ('pumpwood', 'TriggerAuthentication', KEDA_RABBITMQ_AUTH),
+            references['requires'])
+
+    def test__graph_datalake_workers(self):
+        deploy_obj = PumpWoodGraphDatalakeMicroservice(
+            bucket_name="test-pumpwood", app_version="0.1",
+            worker_num_version="0.1", worker_text_version="0.1",
+            worker_num_requests_cpu="100m", worker_text_requests_cpu="200m",
+            worker_num_autoscale={'queue_name': 'num_edges'},
+            worker_text_autoscale={'queue_name': 'text_edges'})
+        workers = {
+            x['name']: list(yaml.safe_load_all(x['content']))
+            for x in deploy_obj.create_deployment_file(kube_client=None)
+            if x['name'].endswith('__worker')}
+
+        # Each autoscale and settings are set at the worker of its name
+        expected = {
+            'pumpwood_graph_datalake_num_dataloader__worker': (
+                'pumpwood-graph-datalake-worker-dataloader-edge',
+                'num_edges', '100m'),
+            'pumpwood_graph_datalake_text_dataloader__worker': (
+                'pumpwood-graph-datalake-worker-dataloader-text-edge',
+                'text_edges', '200m')}
+        for name, (deployment, queue, cpu) in expected.items():
+            documents = workers[name]
+            self.assertEqual(
+                [d['kind'] for d in documents],
+                ['Deployment', 'ScaledObject'])
+            self.assertEqual(documents[0]['metadata']['name'], deployment)
+            container = \
+                documents[0]['spec']['template']['spec']['containers'][0]
+            self.assertEqual(container['resources']['requests']['cpu'], cpu)
+            spec = documents[1]['spec']
+            self.assertEqual(spec['scaleTargetRef']['name'], deployment)
+            self.assertEqual(
+                spec['triggers'][0]['metadata']['queueName'], queue)
+
+    def test__invalid_settings(self):
+        with self.assertRaisesRegex(Exception, 'queue_name'):
+            WorkerAutoscale(queue_name=[])
+        with self.assertRaisesRegex(Exception, 'min_replicas'):
+            WorkerAutoscale(queue_name='q', min_replicas=2, max_replicas=1)
@@ -0,0 +1,65 @@
+"""Test declarative secrets and config maps created from files."""
+import os
+import base64
+import tempfile
+import unittest
+import yaml
+from pumpwood_deploy.kubernets.file_objects import (
+    secret_from_files, configmap_from_file, to_manifest, CHECKSUM_ANNOTATION)
+
+
+class TestFileObjects(unittest.TestCase):
+    """Test objects are created from files with content checksum."""
+
+    def test__secret_from_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'key.json')
+            with open(path, 'wb') as file:
+                file.write(b'{"key": 1}')
+            secret = secret_from_files(
+                name='storage', paths=['id_rsa=' + path, path],
+                namespace='pw')
+            same_secret = secret_from_files(
+                name='storage', paths=['id_rsa=' + path, path],
+                namespace='pw')
+            with open(path, 'wb') as file:
+                file.write(b'{"key": 2}')
+            changed_secret = secret_from_files(
+                name='storage', paths=['id_rsa=' + path, path],
+                namespace='pw')
+
+        self.assertEqual(secret['metadata']['namespace'], 'pw')
+        self.assertEqual(
+            sorted(secret['data'].keys()), ['id_rsa', 'key.json'])
+        self.assertEqual(
+            base64.b64decode(secret['data']['id_rsa']), b'{"key": 1}')
+
+        # Checksum changes only if content changes
+        checksum = secret['metadata']['annotations'][CHECKSUM_ANNOTATION]
+        self.assertEqual(
+            same_secret['metadata']['annotations'][CHECKSUM_ANNOTATION],
+            checksum)
+        self.assertNotEqual(
+            changed_secret['metadata']['annotations'][CHECKSUM_ANNOTATION],
+            checksum)
+
+    def test__configmap_from_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            text_path = os.path.join(temp_dir, 'config.json')
+            with open(text_path, 'w') as file:
+                file.write('{"a": 1}')
+            binary_path = os.path.join(temp_dir, 'catalog.zip')
+            with open(binary_path, 'wb') as file:
+                file.write(b'PK\x03\x04\xff\xfe')
+            config_map = configmap_from_file(name='config', path=text_path)
+            binary_config_map = configmap_from_file(
+                name='catalog', path=binary_path, keyname='catalog')
+
+        self.assertEqual(config_map['data'], {'config.json': '{"a": 1}'})
+        self.assertNotIn('namespace', config_map['metadata'])
+        self.assertEqual(
+            base64.b64decode(binary_config_map['binaryData']['catalog']),
+            b'PK\x03\x04\xff\xfe')
+        self.assertEqual(
+            yaml.safe_load(to_manifest(binary_config_map)),
+            binary_config_map)
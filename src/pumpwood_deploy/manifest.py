@@ -0,0 +1,505 @@
+"""Object model of the rendered manifests and structured patches.
+
+Rendered manifests are parsed once into `Manifest` objects with a
+`K8sObject` for each document. Patches change the objects in place, so
+cross-cutting settings (resources, env, affinity, replicas) are applied to
+all microservices of a deploy in one pass, without editing the templates.
+
+Example:
+```python
+deploy.add_patch(ResourcesPatch(
+    requests={'cpu': '100m'}, selector=Selector(names=['pumpwood-*'])))
+deploy.add_patch(EnvPatch({'N_WORKERS': '4'}, containers=['*-app']))
+deploy.add_patch(ReplicasPatch(2, selector=Selector(
+    labels={'function': 'app'})))
+```
+"""
+import copy
+import fnmatch
+import yaml
+from typing import List, Iterator
+
+
+_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+POD_TEMPLATE_KINDS = [
+    'Deployment', 'StatefulSet', 'DaemonSet', 'ReplicaSet', 'Job']
+"""Kinds with a pod template at `spec.template`."""
+
+REPLICAS_KINDS = ['Deployment', 'StatefulSet', 'ReplicaSet']
+"""Kinds with `spec.replicas`."""
+
+PATCHABLE_TYPES = ['secrets', 'deploy', 'volume', 'configmap', 'services']
+"""Types of deploy items with yml content that are patched."""
+
+
+class Container:
+    """View of a container of a pod spec."""
+
+    __slots__ = ('data', )
+
+    def __init__(self, data: dict):
+        """__init__.
+
+        Args:
+            data (dict):
+                Container at the pod spec, changes are made in place.
+        """
+        self.data = data
+
+    @property
+    def name(self) -> str:
+        """Name of the container."""
+        return self.data.get('name')
+
+    def set_resources(self, requests: dict = None,
+                      limits: dict = None) -> bool:
+        """Set resource requests and limits of the container.
+
+        Args:
+            requests (dict):
+                Requests to be set, ex.: `{'cpu': '100m'}`. Other
+                resources are kept.
+            limits (dict):
+                Limits to be set. Other resources are kept.
+
+        Returns:
+            Return True if the container was changed.
+        """
+        changed = False
+        resources = self.data.setdefault('resources', {})
+        for key, values in [('requests', requests), ('limits', limits)]:
+            if not values:
+                continue
+            current = resources.setdefault(key, {})
+            for resource, value in values.items():
+                if current.get(resource) != value:
+                    current[resource] = value
+                    changed = True
+        return changed
+
+    def set_env(self, env: dict) -> bool:
+        """Set enviroment variables of the container.
+
+        Args:
+            env (dict):
+                Variables to be set by name, existing variables with the
+                same name are replaced.
+
+        Returns:
+            Return True if the container was changed.
+        """
+        changed = False
+        container_env = self.data.setdefault('env', [])
+        for name, value in env.items():
+            new_var = {'name': name, 'value': str(value)}
+            for i, var in enumerate(container_env):
+                if var.get('name') == name:
+                    if var != new_var:
+                        container_env[i] = new_var
+                        changed = True
+                    break
+            else:
+                container_env.append(new_var)
+                changed = True
+        return changed
+
+
+class K8sObject:
+    """K8s object of a manifest document."""
+
+    __slots__ = ('data', )
+
+    def __init__(self, data: dict):
+        """__init__.
+
+        Args:
+            data (dict):
+                Parsed document, changes are made in place.
+        """
+        self.data = data
+
+    @property
+    def kind(self) -> str:
+        """Kind of the object."""
+        return self.data.get('kind')
+
+    @property
+    def name(self) -> str:
+        """Name of the object."""
+        return (self.data.get('metadata') or {}).get('name')
+
+    @property
+    def labels(self) -> dict:
+        """Labels of the object."""
+        return (self.data.get('metadata') or {}).get('labels') or {}
+
+    def pod_spec(self) -> dict:
+        """Pod spec of the object or None if it has no pod template."""
+        spec = self.data.get('spec') or {}
+        if self.kind in POD_TEMPLATE_KINDS:
+            return (spec.get('template') or {}).get('spec')
+        if self.kind == 'CronJob':
+            job_spec = (spec.get('jobTemplate') or {}).get('spec') or {}
+            return (job_spec.get('template') or {}).get('spec')
+        if self.kind == 'Pod':
+            return spec
+        return None
+
+    def containers(self, init: bool = False) -> List[Container]:
+        """Containers of the object pod spec.
+
+        Args:
+            init (bool):
+                If True, init containers are also returned.
+
+        Returns:
+            List of containers, empty if object has no pod spec.
+        """
+        pod_spec = self.pod_spec()
+        if pod_spec is None:
+            return []
+        keys = ['containers', 'initContainers'] if init else ['containers']
+        return [
+            Container(c) for key in keys for c in pod_spec.get(key) or []]
+
+
+class Manifest:
+    """Parsed multi-document manifest."""
+
+    __slots__ = ('objects', 'content', 'changed')
+
+    def __init__(self, objects: List[K8sObject], content: str = None):
+        """__init__.
+
+        Args:
+            objects (List[K8sObject]):
+                Objects of the manifest.
+            content (str):
+                Text the manifest was parsed from, returned by `to_yaml`
+                if the objects were not changed.
+        """
+        self.objects = objects
+        self.content = content
+        self.changed = False
+
+    @classmethod
+    def parse(cls, content: str) -> 'Manifest':
+        """Parse a yml manifest.
+
+        Args:
+            content (str):
+                Multi-document yml manifest.
+
+        Returns:
+            Manifest with the documents that are objects.
+        """
+        objects = [
+            K8sObject(d) for d in yaml.load_all(content, Loader=_LOADER)
+            if isinstance(d, dict)]
+        return cls(objects, content=content)
+
+    def __iter__(self) -> Iterator[K8sObject]:
+        """Iterate over manifest objects."""
+        return iter(self.objects)
+
+    def to_yaml(self) -> str:
+        """Dump manifest as yml, original text is kept if not changed."""
+        if not self.changed and self.content is not None:
+            return self.content
+        return yaml.dump_all(
+            [o.data for o in self.objects], Dumper=_DUMPER,
+            default_flow_style=False, sort_keys=False)
+
+    def apply_patches(self, patches: List['ManifestPatch']) -> bool:
+        """Apply patches to all objects of the manifest.
+
+        Args:
+            patches (List[ManifestPatch]):
+                Patches applied in order.
+
+        Returns:
+            Return True if any object was changed.
+        """
+        for obj in self.objects:
+            for patch in patches:
+                if patch.selector.match(obj) and patch.apply(obj):
+                    self.changed = True
+        return self.changed
+
+
+class Selector:
+    """Select objects that a patch will be applied to."""
+
+    __slots__ = ('kinds', 'names', 'labels')
+
+    def __init__(self, kinds: List[str] = None, names: List[str] = None,
+                 labels: dict = None):
+        """__init__.
+
+        Args:
+            kinds (List[str]):
+                Kinds of the objects, if None all kinds are selected.
+            names (List[str]):
+                Shell-style patterns of the object names (ex.:
+                `pumpwood-*`), if None all names are selected.
+            labels (dict):
+                Labels the objects must have, if None labels are not
+                checked.
+        """
+        self.kinds = kinds
+        self.names = names
+        self.labels = labels
+
+    def match(self, obj: K8sObject) -> bool:
+        """Check if an object is selected."""
+        if self.kinds is not None and obj.kind not in self.kinds:
+            return False
+        if self.names is not None and not any(
+                fnmatch.fnmatchcase(obj.name or '', p) for p in self.names):
+            return False
+        if self.labels is not None:
+            labels = obj.labels
+            if any(labels.get(k) != v for k, v in self.labels.items()):
+                return False
+        return True
+
+
+class ManifestPatch:
+    """Base class of the structured patches."""
+
+    __slots__ = ('selector', )
+
+    def __init__(self, selector: Selector = None):
+        """__init__.
+
+        Args:
+            selector (Selector):
+                Objects the patch will be applied to, if None all objects
+                are selected.
+        """
+        self.selector = Selector() if selector is None else selector
+
+    def apply(self, obj: K8sObject) -> bool:
+        """Apply patch to an object.
+
+        Args:
+            obj (K8sObject):
+                Object selected by `selector`.
+
+        Returns:
+            Return True if the object was changed.
+        """
+        raise NotImplementedError('apply must be implemented by the patch')
+
+
+class _ContainersPatch(ManifestPatch):
+    """Patch applied to containers selected by name."""
+
+    __slots__ = ('containers', )
+
+    def __init__(self, containers: List[str] = None,
+                 selector: Selector = None):
+        """__init__.
+
+        Args:
+            containers (List[str]):
+                Shell-style patterns of the container names, if None all
+                containers are patched.
+            selector (Selector):
+                Objects the patch will be applied to.
+        """
+        super().__init__(selector=selector)
+        self.containers = containers
+
+    def selected_containers(self, obj: K8sObject) -> List[Container]:
+        """Containers of the object selected by `containers` patterns."""
+        return [
+            c for c in obj.containers()
+            if self.containers is None or any(
+                fnmatch.fnmatchcase(c.name or '', p)
+                for p in self.containers)]
+
+
+class ResourcesPatch(_ContainersPatch):
+    """Set resource requests and limits of containers."""
+
+    __slots__ = ('requests', 'limits')
+
+    def __init__(self, requests: dict = None, limits: dict = None,
+                 containers: List[str] = None, selector: Selector = None):
+        """__init__.
+
+        Args:
+            requests (dict):
+                Requests to be set, ex.: `{'cpu': '100m', 'memory': '1Gi'}`.
+            limits (dict):
+                Limits to be set.
+            containers (List[str]):
+                Shell-style patterns of the container names, if None all
+                containers are patched.
+            selector (Selector):
+                Objects the patch will be applied to.
+        """
+        super().__init__(containers=containers, selector=selector)
+        self.requests = requests
+        self.limits = limits
+
+    def apply(self, obj: K8sObject) -> bool:
+        """Set resources of the selected containers."""
+        changed = False
+        for container in self.selected_containers(obj):
+            changed = container.set_resources(
+                requests=self.requests, limits=self.limits) or changed
+        return changed
+
+
+class EnvPatch(_ContainersPatch):
+    """Set enviroment variables of containers."""
+
+    __slots__ = ('env', )
+
+    def __init__(self, env: dict, containers: List[str] = None,
+                 selector: Selector = None):
+        """__init__.
+
+        Args:
+            env (dict):
+                Variables to be set by name, existing variables with the
+                same name are replaced.
+            containers (List[str]):
+                Shell-style patterns of the container names, if None all
+                containers are patched.
+            selector (Selector):
+                Objects the patch will be applied to.
+        """
+        super().__init__(containers=containers, selector=selector)
+        self.env = env
+
+    def apply(self, obj: K8sObject) -> bool:
+        """Set env of the selected containers."""
+        changed = False
+        for container in self.selected_containers(obj):
+            changed = container.set_env(self.env) or changed
+        return changed
+
+
+class AffinityPatch(ManifestPatch):
+    """Set affinity, node selector and tolerations of pods."""
+
+    __slots__ = ('affinity', 'node_selector', 'tolerations')
+
+    def __init__(self, affinity: dict = None, node_selector: dict = None,
+                 tolerations: List[dict] = None, selector: Selector = None):
+        """__init__.
+
+        Args:
+            affinity (dict):
+                Pod affinity, replaces the affinity of the pods.
+            node_selector (dict):
+                Node labels merged to the pods node selector.
+            tolerations (List[dict]):
+                Tolerations added to the pods if not present.
+            selector (Selector):
+                Objects the patch will be applied to.
+        """
+        super().__init__(selector=selector)
+        self.affinity = affinity
+        self.node_selector = node_selector
+        self.tolerations = tolerations
+
+    def apply(self, obj: K8sObject) -> bool:
+        """Set scheduling constraints of the object pods."""
+        pod_spec = obj.pod_spec()
+        if pod_spec is None:
+            return False
+        changed = False
+        if self.affinity is not None and \
+                pod_spec.get('affinity') != self.affinity:
+            pod_spec['affinity'] = copy.deepcopy(self.affinity)
+            changed = True
+        if self.node_selector:
+            node_selector = pod_spec.setdefault('nodeSelector', {})
+            for key, value in self.node_selector.items():
+                if node_selector.get(key) != value:
+                    node_selector[key] = value
+                    changed = True
+        for toleration in self.tolerations or []:
+            tolerations = pod_spec.setdefault('tolerations', [])
+            if toleration not in tolerations:
+                tolerations.append(copy.deepcopy(toleration))
+                changed = True
+        return changed
+
+
+class ReplicasPatch(ManifestPatch):
+    """Set number of replicas of workloads."""
+
+    __slots__ = ('replicas', )
+
+    def __init__(self, replicas: int, selector: Selector = None):
+        """__init__.
+
+        Args:
+            replicas (int):
+                Number of replicas.
+            selector (Selector):
+                Objects the patch will be applied to, only kinds with
+                `spec.replicas` are changed.
+        """
+        super().__init__(selector=selector)
+        self.replicas = replicas
+
+    def apply(self, obj: K8sObject) -> bool:
+        """Set replicas of the workload."""
+        if obj.kind not in REPLICAS_KINDS:
+            return False
+        spec = obj.data.setdefault('spec', {})
+        if spec.get('replicas') == self.replicas:
+            return False
+        spec['replicas'] = self.replicas
+        return True
+
+
+def patch_content(content: str, patches: List[ManifestPatch]) -> str:
+    """Apply patches to a yml manifest.
+
+    Args:
+        content (str):
+            Multi-document yml manifest.
+        patches (List[ManifestPatch]):
+            Patches applied in order.
+
+    Returns:
+        Patched manifest, the original content is returned if no object
+        was changed.
+    """
+    if not patches:
+        return content
+    manifest = Manifest.parse(content)
+    manifest.apply_patches(patches)
+    return manifest.to_yaml()
+
+
+def patch_deploy_item(deploy_item: dict,
+                      patches: List[ManifestPatch]) -> dict:
+    """Apply patches to the content of a deploy item.
+
+    Args:
+        deploy_item (dict):
+            A deploy item returned by `create_deployment_file` function of
+            the microservices objects.
+        patches (List[ManifestPatch]):
+            Patches applied in order.
+
+    Returns:
+        Deploy item with patched content, items without yml content
+        (created from files) are returned unchanged.
+    """
+    if not patches or deploy_item['type'] not in PATCHABLE_TYPES:
+        return deploy_item
+    content = patch_content(deploy_item['content'], patches)
+    if content is deploy_item['content']:
+        return deploy_item
+    return dict(deploy_item, content=content)
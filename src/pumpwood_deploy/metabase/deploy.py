@@ -1,21 +1,17 @@
 """PumpWood DataLake Microservice Deploy."""
 import os
 import base64
-import pkg_resources
+from pumpwood_deploy.template_registry import get_template
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'metabase/resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'metabase/resources/deploy__app.yml').read().decode()
-config_map = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'metabase/resources/config_map.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'metabase/resources/postgres__test.yml').read().decode()
+secrets = get_template(
+    'metabase/resources/secrets.yml')
+app_deployment = get_template(
+    'metabase/resources/deploy__app.yml')
+config_map = get_template(
+    'metabase/resources/config_map.yml')
+test_postgres = get_template(
+    'metabase/resources/postgres__test.yml')
 
 
 class MetabaseMicroservice:
@@ -21,12 +21,12 @@ class TestMetabaseMicroservice(unittest.TestCase):
             db_usename="xxx",
             db_host="xxx",
             db_database="xxx",
-            db_port="xxx",
-            app_replicas="xxx",
-            app_limits_memory="xxx",
-            app_limits_cpu="xxx",
-            app_requests_memory="xxx",
-            app_requests_cpu="xxx")
+            db_port="5432",
+            app_replicas=1,
+            app_limits_memory="6Gi",
+            app_limits_cpu="2000m",
+            app_requests_memory="20Mi",
+            app_requests_cpu="1m")
 
         results = deploy_obj.create_deployment_file()
         self.assertEqual(len(results), 3)
@@ -35,19 +35,19 @@ class TestMetabaseMicroservice(unittest.TestCase):
 
     def test__create_files_with_test_database(self):
         deploy_obj = MetabaseMicroservice(
-        metabase_site_url="xxx",
+            metabase_site_url="xxx",
             db_password="xxxx",
             embedding_secret_key="xxx",
             encryption_secret_key="xxx",
             db_usename="xxx",
             db_host="xxx",
             db_database="xxx",
-            db_port="xxx",
-            app_replicas="xxx",
-            app_limits_memory="xxx",
-            app_limits_cpu="xxx",
-            app_requests_memory="xxx",
-            app_requests_cpu="xxx",
+            db_port="5432",
+            app_replicas=1,
+            app_limits_memory="6Gi",
+            app_limits_cpu="2000m",
+            app_requests_memory="20Mi",
+            app_requests_cpu="1m",
             test_db_version="xxx",
             test_db_repository="xxx")
 
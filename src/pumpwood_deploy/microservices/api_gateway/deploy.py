@@ -1,31 +1,25 @@
 """load_balancer.py."""
 import os
 import ipaddress
-import pkg_resources
-from jinja2 import Template
 from typing import List
+from pumpwood_deploy.template_registry import get_template
 
 
-nginx_gateway_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+nginx_gateway_deployment = get_template(
     'microservices/api_gateway/'
-    'resources/deploy__nginx_certbot.yml').read().decode()
-nginx_gateway_no_ssl_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__nginx_certbot.yml')
+nginx_gateway_no_ssl_deployment = get_template(
     'microservices/api_gateway/'
-    'resources/deploy__nginx_no_ssl.yml').read().decode()
-nginx_gateway_secrets_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__nginx_no_ssl.yml')
+nginx_gateway_secrets_deployment = get_template(
     'microservices/api_gateway/'
-    'resources/deploy__nginx_secrets.yml').read().decode()
-external_service = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__nginx_secrets.yml')
+external_service = get_template(
     'microservices/api_gateway/'
-    'resources/service__external.yml').read().decode()
-internal_service = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/service__external.yml')
+internal_service = get_template(
     'microservices/api_gateway/'
-    'resources/service__internal.yml').read().decode()
+    'resources/service__internal.yml')
 
 
 class ApiGatewayCertbot:
@@ -104,8 +98,7 @@ class ApiGatewayCertbot:
             service__formated = internal_service.format(
                 public_ip=self.gateway_public_ip)
         else:
-            external_service_template = Template(external_service)
-            service__formated = external_service_template.render(
+            service__formated = external_service.render(
                 public_ip=self.gateway_public_ip,
                 firewall_ips=self.souce_ranges)
 
@@ -1,18 +1,16 @@
 """Class to deploy Frontend Microservices."""
 import os
-import pkg_resources
 import base64
+from pumpwood_deploy.template_registry import get_template
 
 
-deployment_yml = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+deployment_yml = get_template(
     'microservices/frontend/'
-    'resources/deploy__frontend.yml').read().decode()
+    'resources/deploy__frontend.yml')
 
-secrets_yml = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets_yml = get_template(
     'microservices/frontend/'
-    'resources/secrets.yml').read().decode()
+    'resources/secrets.yml')
 
 
 class PumpwoodFrontEndMicroservice:
@@ -1,16 +1,14 @@
 """Deploy Neo4J database."""
 import base64
-import pkg_resources
+from pumpwood_deploy.template_registry import get_template
 
 
-deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+deployment = get_template(
     'microservices/neo4j/'
-    'resources/deploy.yml').read().decode()
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy.yml')
+secrets = get_template(
     'microservices/neo4j/'
-    'resources/secrets.yml').read().decode()
+    'resources/secrets.yml')
 
 
 class Neo4jDatabase:
@@ -1,22 +1,19 @@
 """Deploy Postgres."""
 import base64
-import pkg_resources
-from pumpwood_deploy.microservices.postgres.postgres import \
-    create_ssl_key_ssl_crt
+from pumpwood_deploy.microservices.postgres.postgres import (
+    create_ssl_key_ssl_crt, KEYSTORE_PATH)
+from pumpwood_deploy.template_registry import get_template
 
 
-pgbouncer_deploy = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+pgbouncer_deploy = get_template(
     'microservices/postgres/'
-    'resources/deploy__pgbouncer.yml').read().decode()
-deployment_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__pgbouncer.yml')
+deployment_postgres = get_template(
     'microservices/postgres/'
-    'resources/deploy__postgres.yml').read().decode()
-secrets_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__postgres.yml')
+secrets_postgres = get_template(
     'microservices/postgres/'
-    'resources/secrets.yml').read().decode()
+    'resources/secrets.yml')
 
 
 class PostgresDatabase:
@@ -34,7 +31,8 @@ class PostgresDatabase:
                  postgres_requests_cpu: str = "1m",
                  postgres_public_ip: str = None,
                  firewall_ips: list = None,
-                 image: str = 'postgis/postgis:15-3.3-alpine'):
+                 image: str = 'postgis/postgis:15-3.3-alpine',
+                 keystore_path: str = None):
         """Deploy a postgres server not associated with other microservices.
 
         Username is "pumpwood" and password is set as parameter.
@@ -66,14 +64,15 @@ class PostgresDatabase:
                 to database.
             image (str):
                 Image used on deploy.
+            keystore_path (str):
+                Path of the local keystore with the TLS certificate of the
+                database, created at the first render. If None,
+                `DeployPumpWood.add_microservice` sets it under its
+                `output_path`.
         """
-        postgres_certificates = create_ssl_key_ssl_crt()
+        self.keystore_path = keystore_path
         self._db_username = base64.b64encode(db_username.encode()).decode()
         self._db_password = base64.b64encode(db_password.encode()).decode()
-        self._ssl_crt = base64.b64encode(
-            postgres_certificates['ssl_crt'].encode()).decode()
-        self._ssl_key = base64.b64encode(
-            postgres_certificates['ssl_key'].encode()).decode()
 
         self.name = name
         self.postgres_public_ip = postgres_public_ip
@@ -96,10 +95,17 @@ class PostgresDatabase:
           kube_client:
             Client to communicate with Kubernets cluster.
         """
+        # Certificate is kept at keystore and reused between renders
+        postgres_certificates = create_ssl_key_ssl_crt(
+            name=self.name,
+            keystore_path=self.keystore_path or KEYSTORE_PATH)
         secrets_text_f = secrets_postgres.format(
             name=self.name, db_username=self._db_username,
-            db_password=self._db_password, ssl_key=self._ssl_key,
-            ssl_crt=self._ssl_crt)
+            db_password=self._db_password,
+            ssl_key=base64.b64encode(
+                postgres_certificates['ssl_key'].encode()).decode(),
+            ssl_crt=base64.b64encode(
+                postgres_certificates['ssl_crt'].encode()).decode())
 
         volume_claim_name = "{name}-data".format(name=self.name)
         volume_postgres_text_f = kube_client.create_volume_yml(
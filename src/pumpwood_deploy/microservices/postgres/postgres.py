@@ -1,33 +1,151 @@
 """Postgres deploy fuctions."""
 import os
+import datetime
+import tempfile
+import threading
 import subprocess # NOQA
 
 
-def create_ssl_key_ssl_crt():
-    """Create SSL key and Certificate for Postgres connections."""
-    dir_temp_path = 'temp/'
-    if not os.path.exists(dir_temp_path):
-        os.makedirs(dir_temp_path)
+KEYSTORE_PATH = 'outputs/keystore'
+"""Default path to keep certificates created for each database."""
 
-    key_path = dir_temp_path + 'server.key'
-    cert_path = dir_temp_path + 'server.crt'
+_keystore_lock = threading.Lock()
+"""@private"""
 
-    bash_cmd_text = """openssl req -new -x509 -days 365 -nodes -text """ +\
-                    """-out {out} -keyout {keyout} -subj """ +\
-                    """/CN=pumpwood.murabei.com"""
-    bash_cmd_1 = bash_cmd_text.format(
-        keyout=key_path, out=cert_path)
 
-    process = subprocess.Popen( # NOQA
-        bash_cmd_1.split(), stdout=subprocess.PIPE)
-    output, error = process.communicate()
+def _generate_ssl_key_ssl_crt(common_name: str, days: int) -> dict:
+    """Create a self-signed key and certificate.
 
-    with open(key_path, 'r') as file:
-        ssl_key = file.read()
+    Certificate is created in-process using `cryptography` package if it
+    is installed, if not `openssl` is called using a temporary directory.
+    """
+    try:
+        from cryptography import x509
+        from cryptography.x509.oid import NameOID
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+    except ImportError:
+        x509 = None
 
-    with open(cert_path, 'r') as file:
-        ssl_crt = file.read()
+    if x509 is None:
+        with tempfile.TemporaryDirectory() as dir_temp_path:
+            key_path = os.path.join(dir_temp_path, 'server.key')
+            cert_path = os.path.join(dir_temp_path, 'server.crt')
+            bash_cmd = [
+                "openssl", "req", "-new", "-x509", "-days", str(days),
+                "-nodes", "-text", "-out", cert_path, "-keyout", key_path,
+                "-subj", "/CN=" + common_name]
+            subprocess.run( # NOQA
+                bash_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                check=True)
+            with open(key_path, 'r') as file:
+                ssl_key = file.read()
+            with open(cert_path, 'r') as file:
+                ssl_crt = file.read()
+        return {'ssl_key': ssl_key, 'ssl_crt': ssl_crt}
 
-    os.remove(key_path)
-    os.remove(cert_path)
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    subject = x509.Name([
+        x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = x509.CertificateBuilder()\
+        .subject_name(subject)\
+        .issuer_name(subject)\
+        .public_key(key.public_key())\
+        .serial_number(x509.random_serial_number())\
+        .not_valid_before(now)\
+        .not_valid_after(now + datetime.timedelta(days=days))\
+        .sign(key, hashes.SHA256())
+    ssl_key = key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()).decode()
+    ssl_crt = certificate.public_bytes(serialization.Encoding.PEM).decode()
     return {'ssl_key': ssl_key, 'ssl_crt': ssl_crt}
+
+
+def _certificate_is_valid(cert_path: str, renew_before_days: int) -> bool:
+    """Check if certificate will not expire in `renew_before_days`."""
+    seconds = int(renew_before_days * 24 * 60 * 60)
+    try:
+        from cryptography import x509
+    except ImportError:
+        x509 = None
+
+    if x509 is None:
+        # openssl return 0 if certificate will not expire in seconds
+        bash_cmd = [
+            "openssl", "x509", "-checkend", str(seconds), "-noout",
+            "-in", cert_path]
+        process = subprocess.run( # NOQA
+            bash_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return process.returncode == 0
+
+    with open(cert_path, 'rb') as file:
+        certificate = x509.load_pem_x509_certificate(file.read())
+    # cryptography>=42 has timezone aware `not_valid_after_utc`
+    not_valid_after = getattr(certificate, 'not_valid_after_utc', None)
+    if not_valid_after is None:
+        not_valid_after = certificate.not_valid_after.replace(
+            tzinfo=datetime.timezone.utc)
+    limit = datetime.datetime.now(datetime.timezone.utc) + \
+        datetime.timedelta(seconds=seconds)
+    return limit < not_valid_after
+
+
+def create_ssl_key_ssl_crt(name: str = None,
+                           keystore_path: str = KEYSTORE_PATH,
+                           days: int = 365,
+                           renew_before_days: int = 30) -> dict:
+    """Create SSL key and Certificate for Postgres connections.
+
+    If `name` is set, certificate is kept at a local keystore and reused
+    until it is near expiry, so the secret of the database does not change
+    between deploys and Postgres is not restarted.
+
+    Args:
+        name (str):
+            Name of the database used as key at keystore, if not set a new
+            certificate is created at each call.
+        keystore_path (str):
+            Path of the local keystore, certificates are saved at
+            `{keystore_path}/{name}/`.
+        days (int):
+            Number of days the certificate is valid.
+        renew_before_days (int):
+            A new certificate is created if the one at keystore expires
+            in less than this number of days.
+
+    Returns:
+        Return a dictionary with keys `ssl_key` and `ssl_crt` with the
+        PEM content of the key and certificate.
+    """
+    common_name = 'pumpwood.murabei.com'
+    if name is None:
+        return _generate_ssl_key_ssl_crt(common_name=common_name, days=days)
+
+    dir_path = os.path.join(keystore_path, name)
+    key_path = os.path.join(dir_path, 'server.key')
+    cert_path = os.path.join(dir_path, 'server.crt')
+    with _keystore_lock:
+        is_cached = (
+            os.path.exists(key_path) and os.path.exists(cert_path) and
+            _certificate_is_valid(cert_path, renew_before_days))
+        if is_cached:
+            with open(key_path, 'r') as file:
+                ssl_key = file.read()
+            with open(cert_path, 'r') as file:
+                ssl_crt = file.read()
+            return {'ssl_key': ssl_key, 'ssl_crt': ssl_crt}
+
+        certificates = _generate_ssl_key_ssl_crt(
+            common_name=common_name, days=days)
+        os.makedirs(dir_path, exist_ok=True)
+        # Private key must be readable only by the user
+        key_fd = os.open(
+            key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(key_fd, 'w') as file:
+            file.write(certificates['ssl_key'])
+        with open(cert_path, 'w') as file:
+            file.write(certificates['ssl_crt'])
+        return certificates
@@ -0,0 +1,69 @@
+"""Test Postgres database deploy."""
+import os
+import base64
+import tempfile
+import unittest
+import yaml
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+from pumpwood_deploy.microservices.postgres.deploy import PostgresDatabase
+
+
+class TestPostgresDatabase(unittest.TestCase):
+    """Test certificates of the database are kept at the keystore."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.kube_client = Kubernets(
+            k8_provider='aws',
+            k8_deploy_args={'region': 'us-east-1', 'cluster_name': 'pw'},
+            k8_namespace='pumpwood', login_cache_path=os.path.join(
+                self.temp_dir.name, 'login_cache.json'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def ssl_crt(self, database: PostgresDatabase) -> str:
+        content = database.create_deployment_file(
+            self.kube_client)[0]['content']
+        secret = [
+            d for d in yaml.safe_load_all(content)
+            if 'ssl_crt' in (d.get('data') or {})][0]
+        return base64.b64decode(secret['data']['ssl_crt']).decode()
+
+    def test__keystore_path(self):
+        cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        try:
+            database = PostgresDatabase(
+                db_username='pumpwood', db_password='pumpwood',  # NOQA
+                name='postgres-main', disk_size='10Gi',
+                disk_name='postgres-main')
+            # Nothing is written when the object is created
+            self.assertEqual(os.listdir(self.temp_dir.name), [])
+        finally:
+            os.chdir(cwd)
+
+        deploy = DeployPumpWood.__new__(DeployPumpWood)
+        deploy.microsservices_to_deploy = []
+        deploy.output_path = os.path.join(self.temp_dir.name, 'deploy')
+        deploy.add_microservice(database)
+        self.assertEqual(
+            database.keystore_path,
+            os.path.join(self.temp_dir.name, 'deploy', 'keystore'))
+
+        ssl_crt = self.ssl_crt(database)
+        cert_path = os.path.join(
+            database.keystore_path, 'postgres-main', 'server.crt')
+        with open(cert_path) as file:
+            self.assertEqual(file.read(), ssl_crt)
+        # Certificate is reused between renders
+        self.assertEqual(self.ssl_crt(database), ssl_crt)
+
+        # Keystore set by the caller is kept
+        other = PostgresDatabase(
+            db_username='pumpwood', db_password='pumpwood',  # NOQA
+            name='postgres-main', keystore_path=os.path.join(
+                self.temp_dir.name, 'other'))
+        deploy.add_microservice(other)
+        self.assertNotEqual(self.ssl_crt(other), ssl_crt)
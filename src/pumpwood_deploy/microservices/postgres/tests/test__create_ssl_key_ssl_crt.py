@@ -0,0 +1,32 @@
+"""Test certificates created for Postgres connections."""
+import os
+import tempfile
+import unittest
+from pumpwood_deploy.microservices.postgres.postgres import (
+    create_ssl_key_ssl_crt)
+
+
+class TestCreateSslKeySslCrt(unittest.TestCase):
+    """Test certificate keystore."""
+
+    def test__keystore(self):
+        with tempfile.TemporaryDirectory() as keystore_path:
+            certificates = create_ssl_key_ssl_crt(
+                name='postgres-main', keystore_path=keystore_path)
+            self.assertIn('PRIVATE KEY', certificates['ssl_key'])
+            self.assertIn('BEGIN CERTIFICATE', certificates['ssl_crt'])
+            key_path = os.path.join(
+                keystore_path, 'postgres-main', 'server.key')
+            self.assertEqual(os.stat(key_path).st_mode & 0o777, 0o600)
+
+            # Same certificate is reused until near expiry
+            cached = create_ssl_key_ssl_crt(
+                name='postgres-main', keystore_path=keystore_path)
+            self.assertEqual(certificates, cached)
+            renewed = create_ssl_key_ssl_crt(
+                name='postgres-main', keystore_path=keystore_path,
+                days=365, renew_before_days=400)
+            self.assertNotEqual(certificates, renewed)
+            other = create_ssl_key_ssl_crt(
+                name='postgres-other', keystore_path=keystore_path)
+            self.assertNotEqual(renewed, other)
@@ -1,30 +1,26 @@
 """PumpWood Auth Module."""
-import pkg_resources
 import os
 import base64
-from typing import List
+from typing import List, Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import AppAutoscale
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_auth/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_auth/'
-    'resources/deploy__app.yml').read().decode()
-auth_admin_static = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+auth_admin_static = get_template(
     'microservices/pumpwood_auth/'
-    'resources/deploy__static.yml').read().decode()
-auth_log_worker = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__static.yml')
+auth_log_worker = get_template(
     'microservices/pumpwood_auth/'
-    'resources/deploy__log_worker.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__log_worker.yml')
+test_postgres = get_template(
     'microservices/pumpwood_auth/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodAuthMicroservice:
@@ -108,7 +104,8 @@ class PumpWoodAuthMicroservice:
                  sso__authorization_url: str = "",
                  sso__token_url: str = "",
                  sso__client_id: str = "",
-                 sso__secret: str = ""):
+                 sso__secret: str = "",
+                 app_autoscale: Union[AppAutoscale, dict] = None):
         """Deploy PumpWood Auth Microservice.
 
         Args:
@@ -162,6 +159,10 @@ class PumpWoodAuthMicroservice:
                 Auth application CPU request.
             app_replicas (int):
                 Number of replicas for application deployment.
+            app_autoscale (Union[AppAutoscale, dict]):
+                Autoscale settings of the application, if set a
+                HorizontalPodAutoscaler is created and `app_replicas` is
+                not used. Check `kubernets.autoscale.AppAutoscale`.
 
             static_version (str):
                 Version of the image with static file for service javascript,
@@ -263,6 +264,7 @@ class PumpWoodAuthMicroservice:
         self.app_version = app_version
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.app_limits_memory = app_limits_memory
@@ -367,6 +369,10 @@ class PumpWoodAuthMicroservice:
             sso__provider=self.sso__provider,
             sso__authorization_url=self.sso__authorization_url,
             sso__token_url=self.sso__token_url)
+        if self.app_autoscale is not None:
+            deployment_auth_app_text_f = \
+                self.app_autoscale.autoscale_deployment(
+                    deployment_auth_app_text_f)
 
         deployment_auth_admin_static_f = \
             auth_admin_static.format(
@@ -1,5 +1,6 @@
 """Login tests."""
 import unittest
+import yaml
 from pumpwood_deploy.microservices.pumpwood_auth.deploy import (
     PumpWoodAuthMicroservice)
 from pumpwood_deploy.test_aux.kubenets import validate_k8s_yml
@@ -51,3 +52,28 @@ class TestPumpWoodAuthMicroservice(unittest.TestCase):
             validate_k8s_yml(
                 x["content"],
                 microservice_name="pumpwood-auth")
+
+    def test__create_files_with_autoscale(self):
+        deploy_obj = PumpWoodAuthMicroservice(
+            secret_key="8540",
+            email_host_user="teste1",
+            email_host_password="teste2",
+            bucket_name="test-pumpwood",
+            app_version="0.90",
+            static_version="0.5",
+            app_requests_cpu="500m",
+            app_autoscale={'min_replicas': 2, 'max_replicas': 8})
+        results = deploy_obj.create_deployment_file()
+        app = [
+            x for x in results
+            if x['name'] == 'pumpwood_auth_app__deploy'][0]
+        validate_k8s_yml(app["content"], microservice_name="pumpwood-auth")
+        documents = list(yaml.safe_load_all(app["content"]))
+        self.assertEqual(
+            [d['kind'] for d in documents],
+            ['Deployment', 'Service', 'HorizontalPodAutoscaler'])
+        self.assertNotIn('replicas', documents[0]['spec'])
+        self.assertEqual(documents[2]['spec']['minReplicas'], 2)
+        self.assertEqual(
+            documents[2]['spec']['scaleTargetRef']['name'],
+            'pumpwood-auth-app')
@@ -4,27 +4,25 @@ Complex datalake stores unstrukturated data such as images, texts, audio and
 video. It also permits anotating the database, permiting training models
 using this data.
 """
-import pkg_resources
 import os
 import base64
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import AppAutoscale
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_complex_datalake/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_complex_datalake/'
-    'resources/deploy__app.yml').read().decode()
-worker_datalake_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+worker_datalake_deployment = get_template(
     'microservices/pumpwood_complex_datalake/'
-    'resources/worker__datalake.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/worker__datalake.yml')
+test_postgres = get_template(
     'microservices/pumpwood_complex_datalake/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodComplexDatalakeMicroservice:
@@ -61,7 +59,8 @@ class PumpWoodComplexDatalakeMicroservice:
                  datalake_dataloader_limits_memory: str = "60Gi",
                  datalake_dataloader_limits_cpu: str = "12000m",
                  datalake_dataloader_requests_memory: str = "20Mi",
-                 datalake_dataloader_requests_cpu: str = "1m"):
+                 datalake_dataloader_requests_cpu: str = "1m",
+                 app_autoscale: Union[AppAutoscale, dict] = None):
         """__init__: Class constructor.
 
         Args:
@@ -106,6 +105,10 @@ class PumpWoodComplexDatalakeMicroservice:
             app_replicas (int):
                 Number of replicas associated with
                 dataloader.
+            app_autoscale (Union[AppAutoscale, dict]):
+                Autoscale settings of the application, if set a
+                HorizontalPodAutoscaler is created and `app_replicas` is
+                not used. Check `kubernets.autoscale.AppAutoscale`.
             app_n_chunks (str):
                 n chunks working o data loader.
             app_chunk_size (str):
@@ -173,6 +176,7 @@ class PumpWoodComplexDatalakeMicroservice:
 
         # App
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.app_limits_memory = app_limits_memory
@@ -236,6 +240,9 @@ class PumpWoodComplexDatalakeMicroservice:
                 db_host=self.db_host,
                 db_port=self.db_port,
                 db_database=self.db_database)
+        if self.app_autoscale is not None:
+            app_deployment_frmtd = self.app_autoscale.autoscale_deployment(
+                app_deployment_frmtd)
 
         worker_datalake_deployment_frmted = \
             worker_datalake_deployment.format(
@@ -13,11 +13,9 @@ class TestPumpWoodComplexDatalakeMicroservice(unittest.TestCase):
             microservice_password="xxxx",
             bucket_name="xxxx",
             app_version="xxxx",
-            worker_datalake_dataloader_version="xxxx",
-            worker_simple_dataloader_version="xxxx",
-            worker_complex_dataloader_version="xxxx",)
+            worker_datalake_dataloader_version="xxxx")
         results = deploy_obj.create_deployment_file()
-        self.assertEqual(len(results), 5)
+        self.assertEqual(len(results), 3)
         for x in results:
             validate_k8s_yml(
                 x["content"],
@@ -29,12 +27,10 @@ class TestPumpWoodComplexDatalakeMicroservice(unittest.TestCase):
             bucket_name="xxxx",
             app_version="xxxx",
             worker_datalake_dataloader_version="xxxx",
-            worker_simple_dataloader_version="xxxx",
-            worker_complex_dataloader_version="xxxx",
             test_db_version='xxx')
 
         results = deploy_obj.create_deployment_file()
-        self.assertEqual(len(results), 6)
+        self.assertEqual(len(results), 4)
         for x in results:
             validate_k8s_yml(
                 x["content"],
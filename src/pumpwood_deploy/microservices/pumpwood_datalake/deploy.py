@@ -6,26 +6,25 @@ define modeling units the main dimension for storing information on
 Pumpwood
 """
 import os
-import pkg_resources
 import base64
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import (
+    AppAutoscale, WorkerAutoscale)
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_datalake/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_datalake/'
-    'resources/deploy__app.yml').read().decode()
-worker_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+worker_deployment = get_template(
     'microservices/pumpwood_datalake/'
-    'resources/deploy__worker.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker.yml')
+test_postgres = get_template(
     'microservices/pumpwood_datalake/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodDatalakeMicroservice:
@@ -62,7 +61,9 @@ class PumpWoodDatalakeMicroservice:
                  worker_limits_memory: str = "60Gi",
                  worker_limits_cpu: str = "12000m",
                  worker_requests_memory: str = "20Mi",
-                 worker_requests_cpu: str = "1m"):
+                 worker_requests_cpu: str = "1m",
+                 app_autoscale: Union[AppAutoscale, dict] = None,
+                 worker_autoscale: Union[WorkerAutoscale, dict] = None):
         """
         Class Constructor.
 
@@ -98,6 +99,10 @@ class PumpWoodDatalakeMicroservice:
                 If application is set as DEBUG mode. Values 'TRUE'/'FALSE'.
             app_replicas [int]:
                 Number of replicas for application pods.
+            app_autoscale [Union[AppAutoscale, dict]]:
+                Autoscale settings of the application, if set a
+                HorizontalPodAutoscaler is created and `app_replicas` is
+                not used. Check `kubernets.autoscale.AppAutoscale`.
             app_timeout [int]:
                 Timeout in seconds for requests at application.
             app_workers [int]:
@@ -116,6 +121,10 @@ class PumpWoodDatalakeMicroservice:
                 If worker is set as DEBUG mode. Values 'TRUE'/'FALSE'.
             worker_replicas [int]:
                 Number of pods that will be deployed for worker.
+            worker_autoscale [Union[WorkerAutoscale, dict]]:
+                Autoscale settings of the worker by RabbitMQ queue length, if
+                set a KEDA ScaledObject is created and `worker_replicas` is not
+                used. Check `kubernets.autoscale.WorkerAutoscale`.
             worker_n_parallel [int]:
                 Number of parallel requests that will be performed to
                 upload data to datalake.
@@ -148,6 +157,7 @@ class PumpWoodDatalakeMicroservice:
         self.repository = repository.rstrip("/")
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.app_version = app_version
@@ -165,6 +175,7 @@ class PumpWoodDatalakeMicroservice:
         # Worker
         self.worker_debug = worker_debug
         self.worker_replicas = worker_replicas
+        self.worker_autoscale = WorkerAutoscale.from_arg(worker_autoscale)
         self.worker_n_parallel = worker_n_parallel
         self.worker_chunk_size = worker_chunk_size
         self.worker_query_limit = worker_query_limit
@@ -215,6 +226,9 @@ class PumpWoodDatalakeMicroservice:
                 db_host=self.db_host,
                 db_port=self.db_port,
                 db_database=self.db_database)
+        if self.app_autoscale is not None:
+            app_deployment_frmtd = self.app_autoscale.autoscale_deployment(
+                app_deployment_frmtd)
 
         worker_deployment_text_frmted = worker_deployment.format(
             repository=self.repository,
@@ -233,6 +247,10 @@ class PumpWoodDatalakeMicroservice:
             limits_cpu=self.worker_limits_cpu,
             limits_memory=self.worker_limits_memory,
             debug=self.worker_debug)
+        if self.worker_autoscale is not None:
+            worker_deployment_text_frmted = \
+                self.worker_autoscale.autoscale_deployment(
+                    worker_deployment_text_frmted)
 
         list_return = [{
             'type': 'secrets', 'name': 'pumpwood_datalake__secrets',
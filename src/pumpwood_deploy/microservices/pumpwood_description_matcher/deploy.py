@@ -4,23 +4,22 @@ Desription Microservice is used to integrate different Pumpwood
 deploy in other to dimenstions between them can be shared and variables
 transfered between DataLakes.
 """
-import pkg_resources
 import os
 import base64
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import AppAutoscale
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_description_matcher/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_description_matcher/'
-    'resources/deploy__app.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+test_postgres = get_template(
     'microservices/pumpwood_description_matcher/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodDescriptionMatcherMicroservice:
@@ -45,7 +44,8 @@ class PumpWoodDescriptionMatcherMicroservice:
                  app_limits_memory: str = "60Gi",
                  app_limits_cpu: str = "12000m",
                  app_requests_memory: str = "20Mi",
-                 app_requests_cpu: str = "1m"):
+                 app_requests_cpu: str = "1m",
+                 app_autoscale: Union[AppAutoscale, dict] = None):
         """
         __init__: Class constructor.
 
@@ -79,6 +79,10 @@ class PumpWoodDescriptionMatcherMicroservice:
                 If application is set as DEBUG mode. Values 'TRUE'/'FALSE'.
             app_replicas [int]:
                 Number of replicas for application pods.
+            app_autoscale [Union[AppAutoscale, dict]]:
+                Autoscale settings of the application, if set a
+                HorizontalPodAutoscaler is created and `app_replicas` is
+                not used. Check `kubernets.autoscale.AppAutoscale`.
             app_timeout [int]:
                 Timeout in seconds for requests at application.
             app_workers [int]:
@@ -103,6 +107,7 @@ class PumpWoodDescriptionMatcherMicroservice:
         # App
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.app_version = app_version
@@ -153,6 +158,9 @@ class PumpWoodDescriptionMatcherMicroservice:
                 limits_cpu=self.app_limits_cpu,
                 requests_memory=self.app_requests_memory,
                 requests_cpu=self.app_requests_cpu)
+        if self.app_autoscale is not None:
+            deployment_text_frmtd = self.app_autoscale.autoscale_deployment(
+                deployment_text_frmtd)
 
         list_return = [
             {'type': 'secrets',
@@ -5,23 +5,22 @@ end-points with most of the avaiable field types. They can be used to test
 default pumpwood end-points like list, retrieve, delete, list actions,
 execute actions.
 """
-import pkg_resources
 import os
 import base64
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import AppAutoscale
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_dummy_models/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_dummy_models/'
-    'resources/deploy__app.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+test_postgres = get_template(
     'microservices/pumpwood_dummy_models/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodDummyModelsMicroservice:
@@ -46,7 +45,8 @@ class PumpWoodDummyModelsMicroservice:
                  app_requests_memory: str = "20Mi",
                  app_requests_cpu: str = "1m",
                  test_db_version: str = None,
-                 test_db_repository: str = "gcr.io/repositorio-geral-170012"):
+                 test_db_repository: str = "gcr.io/repositorio-geral-170012",
+                 app_autoscale: Union[AppAutoscale, dict] = None):
         """
         Class Constructor.
 
@@ -78,6 +78,10 @@ class PumpWoodDummyModelsMicroservice:
                 If application is set as DEBUG mode. Values 'TRUE'/'FALSE'.
             app_replicas [int]:
                 Number of replicas for application pods.
+            app_autoscale [Union[AppAutoscale, dict]]:
+                Autoscale settings of the application, if set a
+                HorizontalPodAutoscaler is created and `app_replicas` is
+                not used. Check `kubernets.autoscale.AppAutoscale`.
             app_timeout [int]:
                 Timeout in seconds for requests at application.
             app_workers [int]:
@@ -101,6 +105,7 @@ class PumpWoodDummyModelsMicroservice:
         # App
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.app_version = app_version
@@ -145,6 +150,9 @@ class PumpWoodDummyModelsMicroservice:
                 limits_cpu=self.app_limits_cpu,
                 requests_memory=self.app_requests_memory,
                 requests_cpu=self.app_requests_cpu)
+        if self.app_autoscale is not None:
+            deployment_text_frmtd = self.app_autoscale.autoscale_deployment(
+                deployment_text_frmtd)
 
         deployment_postgres_text_f = None
         if self.test_db_version is not None:
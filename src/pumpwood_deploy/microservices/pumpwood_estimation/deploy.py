@@ -5,26 +5,24 @@ defining parameters associated with model and attributes that will be
 considered inputs and outputs of the models.
 """
 import os
-import pkg_resources
 import base64
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import AppAutoscale
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_estimation/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_estimation/'
-    'resources/deploy__app.yml').read().decode()
-worker_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+worker_deployment = get_template(
     'microservices/pumpwood_estimation/'
-    'resources/deploy__worker.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker.yml')
+test_postgres = get_template(
     'microservices/pumpwood_estimation/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodEstimationMicroservice:
@@ -55,7 +53,8 @@ class PumpWoodEstimationMicroservice:
                  worker_limits_memory: str = "60Gi",
                  worker_limits_cpu: str = "12000m",
                  worker_requests_memory: str = "20Mi",
-                 worker_requests_cpu: str = "1m"):
+                 worker_requests_cpu: str = "1m",
+                 app_autoscale: Union[AppAutoscale, dict] = None):
         """Class Constructor.
 
         Args:
@@ -90,6 +89,10 @@ class PumpWoodEstimationMicroservice:
                 If application is set as DEBUG mode. Values 'TRUE'/'FALSE'.
             app_replicas (int):
                 Number of replicas for application pods.
+            app_autoscale (Union[AppAutoscale, dict]):
+                Autoscale settings of the application, if set a
+                HorizontalPodAutoscaler is created and `app_replicas` is
+                not used. Check `kubernets.autoscale.AppAutoscale`.
             app_timeout (int):
                 Timeout in seconds for requests at application.
             app_workers (int):
@@ -140,6 +143,7 @@ class PumpWoodEstimationMicroservice:
         # App
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.app_version = app_version
@@ -194,6 +198,9 @@ class PumpWoodEstimationMicroservice:
                 limits_cpu=self.app_limits_cpu,
                 requests_memory=self.app_requests_memory,
                 requests_cpu=self.app_requests_cpu)
+        if self.app_autoscale is not None:
+            app_deployment_formated = self.app_autoscale.autoscale_deployment(
+                app_deployment_formated)
         # worker_deployment_text_formated = worker_deployment.format(
         #     repository=self.repository,
         #     version=self.worker_version,
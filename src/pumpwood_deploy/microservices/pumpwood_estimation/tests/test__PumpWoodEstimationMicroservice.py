@@ -15,7 +15,7 @@ class TestPumpWoodEstimationMicroservice(unittest.TestCase):
             app_version="xxxx",
             worker_version="xxx")
         results = deploy_obj.create_deployment_file()
-        self.assertEqual(len(results), 3)
+        self.assertEqual(len(results), 2)
         for x in results:
             validate_k8s_yml(
                 x["content"],
@@ -30,7 +30,7 @@ class TestPumpWoodEstimationMicroservice(unittest.TestCase):
             test_db_version='xxx')
 
         results = deploy_obj.create_deployment_file()
-        self.assertEqual(len(results), 4)
+        self.assertEqual(len(results), 3)
         for x in results:
             validate_k8s_yml(
                 x["content"],
@@ -1,25 +1,24 @@
 """PumpWood ETL Microservice Deploy."""
 import os
-import pkg_resources
 import base64
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import (
+    AppAutoscale, WorkerAutoscale)
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_etl/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_etl/'
-    'resources/deploy__app.yml').read().decode()
-worker_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+worker_deployment = get_template(
     'microservices/pumpwood_etl/'
-    'resources/deploy__worker.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker.yml')
+test_postgres = get_template(
     'microservices/pumpwood_etl/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodETLMicroservice:
@@ -52,7 +51,9 @@ class PumpWoodETLMicroservice:
                  worker_limits_memory: str = "60Gi",
                  worker_limits_cpu: str = "12000m",
                  worker_requests_memory: str = "20Mi",
-                 worker_requests_cpu: str = "1m"):
+                 worker_requests_cpu: str = "1m",
+                 app_autoscale: Union[AppAutoscale, dict] = None,
+                 worker_autoscale: Union[WorkerAutoscale, dict] = None):
         """
         __init__: Class constructor.
 
@@ -73,6 +74,13 @@ class PumpWoodETLMicroservice:
             db_host (str): Database connection host.
             db_port (str): Database connection port.
             db_database (str): Database connection database.
+            app_autoscale (Union[AppAutoscale, dict]): Autoscale settings of
+                the application, if set a HorizontalPodAutoscaler is created
+                and `app_replicas` is not used.
+            worker_autoscale (Union[WorkerAutoscale, dict]): Autoscale
+                settings of the worker by RabbitMQ queue length, if set a
+                KEDA ScaledObject is created and `worker_replicas` is not
+                used.
 
         Returns:
           PumpWoodDatalakeMicroservice: New Object
@@ -96,6 +104,7 @@ class PumpWoodETLMicroservice:
         self.app_version = app_version
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.app_limits_memory = app_limits_memory
@@ -106,6 +115,7 @@ class PumpWoodETLMicroservice:
         # Worker
         self.worker_version = worker_version
         self.worker_replicas = worker_replicas
+        self.worker_autoscale = WorkerAutoscale.from_arg(worker_autoscale)
         self.worker_limits_memory = worker_limits_memory
         self.worker_limits_cpu = worker_limits_cpu
         self.worker_requests_memory = worker_requests_memory
@@ -153,6 +163,10 @@ class PumpWoodETLMicroservice:
                 limits_cpu=self.app_limits_cpu,
                 requests_memory=self.app_requests_memory,
                 requests_cpu=self.app_requests_cpu)
+        if self.app_autoscale is not None:
+            deployment_queue_manager_text_frmtd = \
+                self.app_autoscale.autoscale_deployment(
+                    deployment_queue_manager_text_frmtd)
 
         worker_deployment_text_frmted = worker_deployment.format(
             repository=self.repository,
@@ -167,6 +181,10 @@ class PumpWoodETLMicroservice:
             limits_cpu=self.worker_limits_cpu,
             requests_memory=self.worker_requests_memory,
             requests_cpu=self.worker_requests_cpu)
+        if self.worker_autoscale is not None:
+            worker_deployment_text_frmted = \
+                self.worker_autoscale.autoscale_deployment(
+                    worker_deployment_text_frmted)
 
         list_return = [
             {'type': 'secrets', 'name': 'pumpwood_etl__secrets',
@@ -8,29 +8,27 @@ It also can be used for recursive queries.
 """
 import os
 import base64
-import pkg_resources
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import (
+    AppAutoscale, WorkerAutoscale)
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_graph_datalake/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_graph_datalake/'
-    'resources/deploy__app.yml').read().decode()
-worker_num_edges = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+worker_num_edges = get_template(
     'microservices/pumpwood_graph_datalake/'
-    'resources/deploy__worker_num_edges.yml').read().decode()
-worker_text_edges = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker_num_edges.yml')
+worker_text_edges = get_template(
     'microservices/pumpwood_graph_datalake/'
-    'resources/deploy__worker_text_edges.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker_text_edges.yml')
+test_postgres = get_template(
     'microservices/pumpwood_graph_datalake/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodGraphDatalakeMicroservice:
@@ -77,7 +75,10 @@ class PumpWoodGraphDatalakeMicroservice:
                  worker_text_limits_memory: str = "60Gi",
                  worker_text_limits_cpu: str = "12000m",
                  worker_text_requests_memory: str = "20Mi",
-                 worker_text_requests_cpu: str = "1m"):
+                 worker_text_requests_cpu: str = "1m",
+                 app_autoscale: Union[AppAutoscale, dict] = None,
+                 worker_num_autoscale: Union[WorkerAutoscale, dict] = None,
+                 worker_text_autoscale: Union[WorkerAutoscale, dict] = None):
         """
         __init__.
 
@@ -134,6 +135,10 @@ class PumpWoodGraphDatalakeMicroservice:
                 Set debug for application container.
             app_replicas [int]:
                 Number of replicas associated with application.
+            app_autoscale [Union[AppAutoscale, dict]]:
+                Autoscale settings of the application, if set a
+                HorizontalPodAutoscaler is created and `app_replicas` is
+                not used. Check `kubernets.autoscale.AppAutoscale`.
             app_timeout [int]:
                 Set in seconds timeout associated with application.
             app_workers [int]:
@@ -162,6 +167,10 @@ class PumpWoodGraphDatalakeMicroservice:
             worker_num_replicas [str]:
                 Number of replicas associated with worker for numerical edges
                 container.
+            worker_num_autoscale [Union[WorkerAutoscale, dict]]:
+                Autoscale settings of the worker by RabbitMQ queue length, if
+                set a KEDA ScaledObject is created and `worker_num_replicas`
+                is not used.
             worker_num_n_parallel [str]:
                 Number of parallel requests when uploading data to database.
             worker_num_chunk_size [int]:
@@ -195,6 +204,10 @@ class PumpWoodGraphDatalakeMicroservice:
             worker_text_replicas [str]:
                 Number of replicas associated with worker for text edges
                 container.
+            worker_text_autoscale [Union[WorkerAutoscale, dict]]:
+                Autoscale settings of the worker by RabbitMQ queue length, if
+                set a KEDA ScaledObject is created and `worker_text_replicas`
+                is not used.
             worker_text_n_parallel [str]:
                 Number of parallel requests when uploading data to database.
             worker_text_chunk_size [int]:
@@ -239,6 +252,7 @@ class PumpWoodGraphDatalakeMicroservice:
         self.repository = repository.rstrip("/")
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.app_version = app_version
@@ -256,6 +270,8 @@ class PumpWoodGraphDatalakeMicroservice:
         self.worker_num_version = worker_num_version
         self.worker_num_debug = worker_num_debug
         self.worker_num_replicas = worker_num_replicas
+        self.worker_num_autoscale = \
+            WorkerAutoscale.from_arg(worker_num_autoscale)
         self.worker_num_n_parallel = worker_num_n_parallel
         self.worker_num_chunk_size = worker_num_chunk_size
         self.worker_num_query_limit = worker_num_query_limit
@@ -268,6 +284,8 @@ class PumpWoodGraphDatalakeMicroservice:
         self.worker_text_version = worker_text_version
         self.worker_text_debug = worker_text_debug
         self.worker_text_replicas = worker_text_replicas
+        self.worker_text_autoscale = \
+            WorkerAutoscale.from_arg(worker_text_autoscale)
         self.worker_text_n_parallel = worker_text_n_parallel
         self.worker_text_chunk_size = worker_text_chunk_size
         self.worker_text_query_limit = worker_text_query_limit
@@ -320,8 +338,11 @@ class PumpWoodGraphDatalakeMicroservice:
                 db_host=self.db_host,
                 db_port=self.db_port,
                 db_database=self.db_database)
+        if self.app_autoscale is not None:
+            app_deployment_frmtd = self.app_autoscale.autoscale_deployment(
+                app_deployment_frmtd)
 
-        # Dataloader text edges
+        # Dataloader numerical edges
         worker_deployment_num_frmted = worker_num_edges.format(
             repository=self.repository,
             version=self.worker_num_version,
@@ -330,25 +351,6 @@ class PumpWoodGraphDatalakeMicroservice:
             db_host=self.db_host,
             db_port=self.db_port,
             db_database=self.db_database,
-            n_parallel=self.worker_text_n_parallel,
-            chunk_size=self.worker_text_chunk_size,
-            query_limit=self.worker_text_query_limit,
-            replicas=self.worker_text_replicas,
-            requests_memory=self.worker_text_requests_memory,
-            requests_cpu=self.worker_text_requests_cpu,
-            limits_cpu=self.worker_text_limits_cpu,
-            limits_memory=self.worker_text_limits_memory,
-            debug=self.worker_text_debug)
-
-        # Dataloader numerical edges
-        worker_deployment_text_frmted = worker_text_edges.format(
-            repository=self.repository,
-            version=self.worker_text_version,
-            bucket_name=self.bucket_name,
-            db_username=self.db_username,
-            db_host=self.db_host,
-            db_port=self.db_port,
-            db_database=self.db_database,
             n_parallel=self.worker_num_n_parallel,
             chunk_size=self.worker_num_chunk_size,
             query_limit=self.worker_num_query_limit,
@@ -358,6 +360,33 @@ class PumpWoodGraphDatalakeMicroservice:
             limits_cpu=self.worker_num_limits_cpu,
             limits_memory=self.worker_num_limits_memory,
             debug=self.worker_num_debug)
+        if self.worker_num_autoscale is not None:
+            worker_deployment_num_frmted = \
+                self.worker_num_autoscale.autoscale_deployment(
+                    worker_deployment_num_frmted)
+
+        # Dataloader text edges
+        worker_deployment_text_frmted = worker_text_edges.format(
+            repository=self.repository,
+            version=self.worker_text_version,
+            bucket_name=self.bucket_name,
+            db_username=self.db_username,
+            db_host=self.db_host,
+            db_port=self.db_port,
+            db_database=self.db_database,
+            n_parallel=self.worker_text_n_parallel,
+            chunk_size=self.worker_text_chunk_size,
+            query_limit=self.worker_text_query_limit,
+            replicas=self.worker_text_replicas,
+            requests_memory=self.worker_text_requests_memory,
+            requests_cpu=self.worker_text_requests_cpu,
+            limits_cpu=self.worker_text_limits_cpu,
+            limits_memory=self.worker_text_limits_memory,
+            debug=self.worker_text_debug)
+        if self.worker_text_autoscale is not None:
+            worker_deployment_text_frmted = \
+                self.worker_text_autoscale.autoscale_deployment(
+                    worker_deployment_text_frmted)
 
         list_return = [{
             'type': 'secrets',
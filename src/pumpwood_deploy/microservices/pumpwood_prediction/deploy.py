@@ -1,29 +1,27 @@
 """PumpWood Prediction Microservice Deploy."""
 import os
-import pkg_resources
 import base64
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import (
+    AppAutoscale, WorkerAutoscale)
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_prediction/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_prediction/'
-    'resources/deploy__app.yml').read().decode()
-worker_rawdata = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+worker_rawdata = get_template(
     'microservices/pumpwood_prediction/'
-    'resources/deploy__worker_raw_data.yml').read().decode()
-worker_dataloader = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker_raw_data.yml')
+worker_dataloader = get_template(
     'microservices/pumpwood_prediction/'
-    'resources/deploy__worker_dataloader.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker_dataloader.yml')
+test_postgres = get_template(
     'microservices/pumpwood_prediction/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodPredictionMicroservice:
@@ -64,7 +62,10 @@ class PumpWoodPredictionMicroservice:
                  dataloader_limits_memory: str = "60Gi",
                  dataloader_limits_cpu: str = "12000m",
                  dataloader_requests_memory: str = "20Mi",
-                 dataloader_requests_cpu: str = "1m"):
+                 dataloader_requests_cpu: str = "1m",
+                 app_autoscale: Union[AppAutoscale, dict] = None,
+                 raw_autoscale: Union[WorkerAutoscale, dict] = None,
+                 dataloader_autoscale: Union[WorkerAutoscale, dict] = None):
         """__init__."""
         self._microservice_password = base64.b64encode(
             microservice_password.encode()).decode()
@@ -87,6 +88,7 @@ class PumpWoodPredictionMicroservice:
         # App
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.repository = repository.rstrip("/")
@@ -98,6 +100,7 @@ class PumpWoodPredictionMicroservice:
 
         # Raw data
         self.raw_replicas = raw_replicas
+        self.raw_autoscale = WorkerAutoscale.from_arg(raw_autoscale)
         self.worker_rawdata_version = worker_rawdata_version
         self.raw_limits_memory = raw_limits_memory
         self.raw_limits_cpu = raw_limits_cpu
@@ -107,6 +110,8 @@ class PumpWoodPredictionMicroservice:
         # Dataloader
         self.worker_dataloader_version = worker_dataloader_version
         self.dataloader_replicas = dataloader_replicas
+        self.dataloader_autoscale = WorkerAutoscale.from_arg(
+            dataloader_autoscale)
         self.dataloader_limits_memory = dataloader_limits_memory
         self.dataloader_limits_cpu = dataloader_limits_cpu
         self.dataloader_requests_memory = dataloader_requests_memory
@@ -149,6 +154,10 @@ class PumpWoodPredictionMicroservice:
             limits_cpu=self.app_limits_cpu,
             requests_memory=self.app_requests_memory,
             requests_cpu=self.app_requests_cpu)
+        if self.app_autoscale is not None:
+            deployment_app_text_formated = \
+                self.app_autoscale.autoscale_deployment(
+                    deployment_app_text_formated)
 
         deployment_rawdata_text_formated = worker_rawdata.format(
             repository=self.repository,
@@ -167,6 +176,10 @@ class PumpWoodPredictionMicroservice:
             limits_cpu=self.raw_limits_cpu,
             requests_memory=self.raw_requests_memory,
             requests_cpu=self.raw_requests_cpu)
+        if self.raw_autoscale is not None:
+            deployment_rawdata_text_formated = \
+                self.raw_autoscale.autoscale_deployment(
+                    deployment_rawdata_text_formated)
 
         deployment_dataloader_text_formated = worker_dataloader.format(
             repository=self.repository,
@@ -181,6 +194,10 @@ class PumpWoodPredictionMicroservice:
             limits_cpu=self.dataloader_limits_cpu,
             requests_memory=self.dataloader_requests_memory,
             requests_cpu=self.dataloader_requests_cpu)
+        if self.dataloader_autoscale is not None:
+            deployment_dataloader_text_formated = \
+                self.dataloader_autoscale.autoscale_deployment(
+                    deployment_dataloader_text_formated)
 
         list_return = [
             {'type': 'secrets', 'name': 'pumpwood_prediction__secrets',
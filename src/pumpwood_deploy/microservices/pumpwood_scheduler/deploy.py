@@ -1,25 +1,24 @@
 """PumpWood Scheduler Microservice Deploy."""
 import os
-import pkg_resources
 import base64
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import (
+    AppAutoscale, WorkerAutoscale)
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_scheduler/'
-    'resources/secrets.yml').read().decode()
-app_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+app_deployment = get_template(
     'microservices/pumpwood_scheduler/'
-    'resources/deploy__app.yml').read().decode()
-worker_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+worker_deployment = get_template(
     'microservices/pumpwood_scheduler/'
-    'resources/deploy__worker.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker.yml')
+test_postgres = get_template(
     'microservices/pumpwood_scheduler/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodSchedulerMicroservice:
@@ -50,7 +49,9 @@ class PumpWoodSchedulerMicroservice:
                  worker_limits_memory: str = "60Gi",
                  worker_limits_cpu: str = "12000m",
                  worker_requests_memory: str = "20Mi",
-                 worker_requests_cpu: str = "1m"):
+                 worker_requests_cpu: str = "1m",
+                 app_autoscale: Union[AppAutoscale, dict] = None,
+                 worker_autoscale: Union[WorkerAutoscale, dict] = None):
         """__init__: Class constructor."""
         self._db_password = base64.b64encode(db_password.encode()).decode()
         self._microservice_password = base64.b64encode(
@@ -69,6 +70,7 @@ class PumpWoodSchedulerMicroservice:
         self.app_version = app_version
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
         self.app_limits_memory = app_limits_memory
@@ -79,6 +81,7 @@ class PumpWoodSchedulerMicroservice:
         # Worker
         self.worker_version = worker_version
         self.worker_replicas = worker_replicas
+        self.worker_autoscale = WorkerAutoscale.from_arg(worker_autoscale)
         self.worker_limits_memory = worker_limits_memory
         self.worker_limits_cpu = worker_limits_cpu
         self.worker_requests_memory = worker_requests_memory
@@ -124,6 +127,10 @@ class PumpWoodSchedulerMicroservice:
                 limits_cpu=self.app_limits_cpu,
                 requests_memory=self.app_requests_memory,
                 requests_cpu=self.app_requests_cpu)
+        if self.app_autoscale is not None:
+            deployment_app_text_frmtd = \
+                self.app_autoscale.autoscale_deployment(
+                    deployment_app_text_frmtd)
         deployment_worker_text_formated = worker_deployment.format(
             repository=self.repository,
             version=self.worker_version,
@@ -137,6 +144,10 @@ class PumpWoodSchedulerMicroservice:
             limits_cpu=self.worker_limits_cpu,
             requests_memory=self.worker_requests_memory,
             requests_cpu=self.worker_requests_cpu)
+        if self.worker_autoscale is not None:
+            deployment_worker_text_formated = \
+                self.worker_autoscale.autoscale_deployment(
+                    deployment_worker_text_formated)
 
         list_return = [
             {'type': 'secrets', 'name': 'pumpwood_scheduler__secrets',
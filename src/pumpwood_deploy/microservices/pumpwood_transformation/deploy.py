@@ -1,29 +1,27 @@
 """PumpWood DataLake Microservice Deploy."""
 import os
-import pkg_resources
 import base64
+from typing import Union
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.kubernets.autoscale import (
+    AppAutoscale, WorkerAutoscale)
 
 
-secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+secrets = get_template(
     'microservices/pumpwood_transformation/'
-    'resources/secrets.yml').read().decode()
-transformation_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets.yml')
+transformation_deployment = get_template(
     'microservices/pumpwood_transformation/'
-    'resources/deploy__app.yml').read().decode()
-transformation_worker_estimation = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__app.yml')
+transformation_worker_estimation = get_template(
     'microservices/pumpwood_transformation/'
-    'resources/deploy__worker_estimation.yml').read().decode()
-transformation_worker_prediction = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker_estimation.yml')
+transformation_worker_prediction = get_template(
     'microservices/pumpwood_transformation/'
-    'resources/deploy__worker_transformation.yml').read().decode()
-test_postgres = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__worker_transformation.yml')
+test_postgres = get_template(
     'microservices/pumpwood_transformation/'
-    'resources/postgres__test.yml').read().decode()
+    'resources/postgres__test.yml')
 
 
 class PumpWoodTransformationMicroservice:
@@ -58,7 +56,12 @@ class PumpWoodTransformationMicroservice:
                  worker_transformation_limits_memory: str = "60Gi",
                  worker_transformation_limits_cpu: str = "12000m",
                  worker_transformation_requests_memory: str = "20Mi",
-                 worker_transformation_requests_cpu: str = "1m"):
+                 worker_transformation_requests_cpu: str = "1m",
+                 app_autoscale: Union[AppAutoscale, dict] = None,
+                 worker_estimation_autoscale: Union[
+                     WorkerAutoscale, dict] = None,
+                 worker_transformation_autoscale: Union[
+                     WorkerAutoscale, dict] = None):
         """
         __init__: Class constructor.
 
@@ -82,6 +85,17 @@ class PumpWoodTransformationMicroservice:
           db_host (str): Database connection host.
           db_port (str): Database connection port.
           db_database (str): Database connection database.
+          app_autoscale (Union[AppAutoscale, dict]): Autoscale settings of the
+            application, if set a HorizontalPodAutoscaler is created and
+            `app_replicas` is not used.
+          worker_estimation_autoscale (Union[WorkerAutoscale, dict]):
+            Autoscale settings of the estimation worker by RabbitMQ queue
+            length, if set a KEDA ScaledObject is created and
+            `worker_estimation_replicas` is not used.
+          worker_transformation_autoscale (Union[WorkerAutoscale, dict]):
+            Autoscale settings of the transformation worker by RabbitMQ
+            queue length, if set a KEDA ScaledObject is created and
+            `worker_transformation_replicas` is not used.
         Returns:
           PumpWoodDatalakeMicroservice: New Object
 
@@ -103,6 +117,7 @@ class PumpWoodTransformationMicroservice:
         self.app_version = app_version
         self.app_debug = app_debug
         self.app_replicas = app_replicas
+        self.app_autoscale = AppAutoscale.from_arg(app_autoscale)
         self.app_timeout = app_timeout
         self.app_workers = app_workers
 
@@ -116,6 +131,8 @@ class PumpWoodTransformationMicroservice:
             app_requests_cpu
         self.worker_estimation_replicas = \
             worker_estimation_replicas
+        self.worker_estimation_autoscale = \
+            WorkerAutoscale.from_arg(worker_estimation_autoscale)
         self.worker_estimation_limits_memory = \
             worker_estimation_limits_memory
         self.worker_estimation_limits_cpu = \
@@ -126,6 +143,8 @@ class PumpWoodTransformationMicroservice:
             worker_estimation_requests_cpu
         self.worker_transformation_replicas = \
             worker_transformation_replicas
+        self.worker_transformation_autoscale = \
+            WorkerAutoscale.from_arg(worker_transformation_autoscale)
         self.worker_transformation_limits_memory = \
             worker_transformation_limits_memory
         self.worker_transformation_limits_cpu = \
@@ -178,6 +197,10 @@ class PumpWoodTransformationMicroservice:
                 limits_cpu=self.app_limits_cpu,
                 requests_memory=self.app_requests_memory,
                 requests_cpu=self.app_requests_cpu)
+        if self.app_autoscale is not None:
+            transformation_deployment_formated = \
+                self.app_autoscale.autoscale_deployment(
+                    transformation_deployment_formated)
 
         worker_estimation_formated = transformation_worker_estimation.format(
             repository=self.repository,
@@ -192,6 +215,10 @@ class PumpWoodTransformationMicroservice:
             limits_cpu=self.worker_estimation_limits_cpu,
             requests_memory=self.worker_estimation_requests_memory,
             requests_cpu=self.worker_estimation_requests_cpu)
+        if self.worker_estimation_autoscale is not None:
+            worker_estimation_formated = \
+                self.worker_estimation_autoscale.autoscale_deployment(
+                    worker_estimation_formated)
 
         worker_prediction_formated = transformation_worker_prediction.format(
             repository=self.repository,
@@ -206,6 +233,10 @@ class PumpWoodTransformationMicroservice:
             limits_cpu=self.worker_transformation_limits_cpu,
             requests_memory=self.worker_transformation_requests_memory,
             requests_cpu=self.worker_transformation_requests_cpu)
+        if self.worker_transformation_autoscale is not None:
+            worker_prediction_formated = \
+                self.worker_transformation_autoscale.autoscale_deployment(
+                    worker_prediction_formated)
 
         list_return = [
             {'type': 'secrets', 'name': 'pumpwood_transformation__secrets',
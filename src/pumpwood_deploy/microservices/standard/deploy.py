@@ -1,52 +1,45 @@
 """Create standard deploy and secrets."""
 import base64
-import pkg_resources
+from urllib.parse import quote
+from pumpwood_deploy.template_registry import get_template
 
 
-kong_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+kong_deployment = get_template(
     'microservices/standard/'
-    'resources/deploy__kong.yml').read().decode()
-rabbitmq_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__kong.yml')
+rabbitmq_deployment = get_template(
     'microservices/standard/'
-    'resources/deploy__rabbitmq.yml').read().decode()
-rabbitmq_secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__rabbitmq.yml')
+rabbitmq_secrets = get_template(
     'microservices/standard/'
-    'resources/secrets__rabbitmq.yml').read().decode()
-model_secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets__rabbitmq.yml')
+model_secrets = get_template(
     'microservices/standard/'
-    'resources/secrets__model_microservices.yml').read().decode()
-rabbitmq_secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets__model_microservices.yml')
+rabbitmq_secrets = get_template(
     'microservices/standard/'
-    'resources/secrets__rabbitmq.yml').read().decode()
-hash_salt = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets__rabbitmq.yml')
+hash_salt = get_template(
     'microservices/standard/'
-    'resources/secret__salt.yml').read().decode()
-kong_postgres_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secret__salt.yml')
+kong_postgres_deployment = get_template(
     'microservices/standard/'
-    'resources/postgres__kong.yml').read().decode()
-azure__storage_key_secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/postgres__kong.yml')
+azure__storage_key_secrets = get_template(
     'microservices/standard/'
-    'resources/secrets__azure_storage.yml').read().decode()
-gcp__storage_key_secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets__azure_storage.yml')
+gcp__storage_key_secrets = get_template(
     'microservices/standard/'
-    'resources/secrets__gpc_storage_empty.yml').read().decode()
-aws__storage_key_secrets = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets__gpc_storage_empty.yml')
+aws__storage_key_secrets = get_template(
     'microservices/standard/'
-    'resources/secrets__aws_storage.yml').read().decode()
-storage_config_map = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/secrets__aws_storage.yml')
+storage_config_map = get_template(
     'microservices/standard/'
-    'resources/config_map__storage.yml').read().decode()
+    'resources/config_map__storage.yml')
+rabbitmq_keda_auth = get_template(
+    'microservices/standard/'
+    'resources/keda__rabbitmq_auth.yml')
 
 
 class StandardMicroservices:
@@ -56,11 +49,15 @@ class StandardMicroservices:
 
     """
 
+    namespaced_render = True
+    """RabbitMQ secrets have the namespace at the `amqp_uri` host."""
+
     def __init__(self, hash_salt: str, rabbit_password: str,
                  model_user_password: str, storage_type: str,
                  storage_deploy_args: str, kong_db_disk_name: str = None,
                  kong_db_disk_size: str = None,
-                 kong_repository: str = "gcr.io/repositorio-geral-170012"):
+                 kong_repository: str = "gcr.io/repositorio-geral-170012",
+                 rabbitmq_keda: bool = False):
         """__init__.
 
         Args:
@@ -98,6 +95,11 @@ class StandardMicroservices:
                 Kong postgres disk name, usually not set for test purposes.
             kong_db_disk_size (str):
                 Kong postgres disk size, usually not set for test purposes.
+            rabbitmq_keda (bool):
+                Create KEDA TriggerAuthentication `rabbitmq-main-keda` used
+                to autoscale queue workers by RabbitMQ queue length. It
+                needs KEDA installed at the cluster, check
+                `kubernets.autoscale.WorkerAutoscale`.
         """
         self.kong_repository = kong_repository
         self._gcp_credential_file = None
@@ -161,6 +163,8 @@ class StandardMicroservices:
             hash_salt.encode()).decode()
         self._rabbit_password = base64.b64encode(
             rabbit_password.encode()).decode()
+        self._rabbit_amqp_password = quote(rabbit_password, safe='')
+        self.rabbitmq_keda = rabbitmq_keda
         self._model_user_password = base64.b64encode(
             model_user_password.encode()).decode()
 
@@ -178,9 +182,17 @@ class StandardMicroservices:
             kube_client:
                 Client to communicate with Kubernets cluster.
         """
-        # RabbitMQ
+        # RabbitMQ, KEDA operator connects from other namespace so the
+        # host must have the namespace of the deploy
+        rabbitmq_host = "rabbitmq-main"
+        if kube_client is not None:
+            rabbitmq_host = "rabbitmq-main.{}.svc.cluster.local".format(
+                kube_client.k8_namespace)
+        amqp_uri = "amqp://pumpwood:{}@{}:5672/".format(
+            self._rabbit_amqp_password, rabbitmq_host)
         secrets_text_formated = rabbitmq_secrets.format(
-            password=self._rabbit_password)
+            password=self._rabbit_password,
+            amqp_uri=base64.b64encode(amqp_uri.encode()).decode())
 
         # Hash Salt
         hash_salt_formated = hash_salt.format(
@@ -211,7 +223,7 @@ class StandardMicroservices:
         # GCP
         gcp_bucket_secrets = {
             'type': 'secrets', 'name': 'gcp--storage-key',
-            'content': gcp__storage_key_secrets, 'sleep': 5}
+            'content': gcp__storage_key_secrets.read(), 'sleep': 5}
         if self._gcp_credential_file is not None:
             gcp_bucket_secrets = {
                 'type': 'secrets_file', 'name': 'gcp--storage-key',
@@ -233,7 +245,7 @@ class StandardMicroservices:
             {'type': 'secrets', 'name': 'rabbitmq__secrets',
              'content': secrets_text_formated, 'sleep': 5},
             {'type': 'deploy', 'name': 'rabbitmq__deployment',
-             'content': rabbitmq_deployment, 'sleep': 0},
+             'content': rabbitmq_deployment.read(), 'sleep': 0},
 
             # Hash salt
             {'type': 'secrets', 'name': 'hash_salt__secrets',
@@ -259,13 +271,17 @@ class StandardMicroservices:
             {'type': 'secrets', 'name': 'microsservice_model__secrets',
              'content': microservice_model_secrets_formated, 'sleep': 5}]
 
+        if self.rabbitmq_keda:
+            deploy_list.append(
+                {'type': 'deploy', 'name': 'rabbitmq__keda_auth',
+                 'content': rabbitmq_keda_auth.read(), 'sleep': 0})
         if kong_postgres_volume_formated is not None:
             deploy_list.append(
                 {'type': 'volume', 'name': 'load_balancer__volume',
                  'content': kong_postgres_volume_formated, 'sleep': 10})
         deploy_list.extend([
             {'type': 'deploy', 'name': 'load_balancer__postgres',
-             'content': kong_postgres_deployment, 'sleep': 0},
+             'content': kong_postgres_deployment.read(), 'sleep': 0},
             {'type': 'deploy', 'name': 'load_balancer__app',
              'content': kong_deployment_fmt, 'sleep': 0}])
         return deploy_list
@@ -14,7 +14,7 @@ class TestStandardMicroservices(unittest.TestCase):
             rabbit_password="xxx",
             model_user_password="xxx",
             storage_type="google_bucket",
-            storage_deploy_args={"credential_file": "credential.json"})
+            storage_deploy_args={"credential_file": "key-storage.json"})
         results = deploy_obj.create_deployment_file()
         self.assertEqual(len(results), 10)
         for x in results:
@@ -1,17 +1,15 @@
 """Class to deploy Frontend Microservices."""
-import pkg_resources
 import base64
 from typing import List
+from pumpwood_deploy.template_registry import get_template
 
 
-deployment_yml = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+deployment_yml = get_template(
     'microservices/streamlit/' +
-    'resources/deploy__frontend.yml').read().decode()
-secrets_yml = pkg_resources.resource_stream(
-    'pumpwood_deploy',
+    'resources/deploy__frontend.yml')
+secrets_yml = get_template(
     'microservices/streamlit/' +
-    'resources/secrets.yml').read().decode()
+    'resources/secrets.yml')
 
 
 class PumpwoodStreamlitMicroservices:
@@ -0,0 +1,318 @@
+"""Streaming pipeline of rendered manifests.
+
+`iter_manifests` renders the microservices one at a time and yields each
+rendered manifest as soon as it is ready, the whole stack is never kept in
+memory. Manifests are consumed by sinks:
+
+- **DirectorySink:** one yml file for each manifest.
+- **MultiDocumentSink:** a single multi-document yml file.
+- **StdoutSink:** multi-document yml at stdout (ex.: `| kubectl apply -f -`).
+- **ApplySink:** apply to the cluster while later microservices are still
+  rendering, waiting only for the objects each manifest requires.
+
+Example:
+```python
+deploy.stream_manifests(sinks=[
+    DirectorySink('outputs/manifests'),
+    ApplySink(deploy.kube_client, wait_mode="ready")])
+```
+"""
+import os
+import sys
+import stat
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Iterator, List
+from pumpwood_deploy.kubernets.dependency_graph import manifest_references
+from pumpwood_deploy.kubernets.manifest_cache import deploy_item_hash
+from pumpwood_deploy.kubernets.file_objects import (
+    secret_from_files, configmap_from_content, to_manifest)
+from pumpwood_deploy.kubernets.readiness import WAIT_DEFAULT_TIMEOUT
+from pumpwood_deploy.kubernets.autoscale import check_autoscaled_requests
+from pumpwood_deploy.template_registry import get_template
+from pumpwood_deploy.manifest import ManifestPatch, patch_deploy_item
+
+
+server_side_apply_template = get_template(
+    'kubernets/bash_templates/kubectl_apply_server_side.sh')
+"""@private"""
+
+
+def render_deploy_item(deploy_item: dict, namespace: str) -> dict:
+    """Render a deploy item as a manifest.
+
+    Args:
+        deploy_item (dict):
+            A deploy item returned by `create_deployment_file` function of
+            the microservices objects.
+        namespace (str):
+            Default namespace of the deploy.
+
+    Returns:
+        Return a dictionary with keys `name`, `type`, `namespace`,
+        `content` (yml manifest), `sleep`, `timeout`, `provides`,
+        `requires` and `hash`.
+    """
+    item_type = deploy_item['type']
+    if item_type == 'secrets_file':
+        paths = deploy_item['path']
+        paths = [paths] if isinstance(paths, str) else paths
+        content = to_manifest(secret_from_files(
+            name=deploy_item['name'], paths=paths))
+    elif item_type == 'configmap_file':
+        if 'content' in deploy_item:
+            file_content = deploy_item['content']
+        else:
+            with open(deploy_item['file_path'], 'rb') as file:
+                file_content = file.read()
+        keyname = deploy_item.get('keyname') or deploy_item['file_name']
+        content = to_manifest(configmap_from_content(
+            name=deploy_item['name'], keyname=keyname,
+            content=file_content))
+    elif item_type in [
+            'secrets', 'deploy', 'volume', 'configmap', 'services']:
+        content = deploy_item['content']
+    else:
+        raise Exception('Type not implemented: %s' % (item_type, ))
+
+    manifest = {
+        'name': deploy_item['name'], 'type': item_type,
+        'namespace': deploy_item.get('namespace', namespace),
+        'content': content, 'sleep': deploy_item.get('sleep'),
+        'timeout': deploy_item.get('timeout'),
+        'hash': deploy_item_hash(deploy_item=deploy_item, namespace=namespace)}
+    manifest.update(manifest_references(
+        deploy_item=deploy_item, namespace=namespace))
+    return manifest
+
+
+def iter_manifests(microservices: list, kube_client, namespace: str,
+                   patches: List[ManifestPatch] = None,
+                   patches_of: Callable[[object], List[ManifestPatch]] = None
+                   ) -> Iterator[dict]:
+    """Render microservices yielding one manifest at a time.
+
+    Args:
+        microservices (list):
+            Microservice objects in deploy order.
+        kube_client (Kubernets):
+            Kubernets client used to create provider specific manifests.
+        namespace (str):
+            Default namespace of the deploy.
+        patches (List[ManifestPatch]):
+            Patches applied to the rendered manifests, check
+            `pumpwood_deploy.manifest`.
+        patches_of (Callable[[object], List[ManifestPatch]]):
+            Function that receives a microservice and returns its patches,
+            if set it is used instead of `patches`. Check
+            `DeployPumpWood.microservice_patches`.
+
+    Yields:
+        Manifests rendered by `render_deploy_item`, in the order they are
+        returned by the microservices.
+    """
+    for microservice in microservices:
+        deploy_items = microservice.create_deployment_file(
+            kube_client=kube_client)
+        microservice_patches = (
+            patches if patches_of is None else patches_of(microservice))
+        for deploy_item in deploy_items:
+            deploy_item = patch_deploy_item(
+                deploy_item, microservice_patches)
+            check_autoscaled_requests(deploy_item)
+            yield render_deploy_item(deploy_item, namespace=namespace)
+
+
+class ManifestSink:
+    """Base class of the sinks of rendered manifests."""
+
+    def write(self, manifest: dict):
+        """Receive a rendered manifest.
+
+        Args:
+            manifest (dict):
+                Manifest rendered by `render_deploy_item`.
+        """
+        raise NotImplementedError('write must be implemented by the sink')
+
+    def close(self):
+        """Finish the sink, called after the last manifest."""
+
+    def __enter__(self):
+        """Use sink as a context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close sink at context exit."""
+        self.close()
+
+
+class DirectorySink(ManifestSink):
+    """Write each manifest as a yml file at a directory."""
+
+    path: str
+    """Directory of the manifests."""
+    files: List[str]
+    """Path of the files written."""
+
+    def __init__(self, path: str):
+        """__init__.
+
+        Args:
+            path (str):
+                Directory of the manifests, files are named
+                `{counter}__{name}.yml`.
+        """
+        self.path = path
+        self.files = []
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, manifest: dict):
+        """Write manifest to a new file."""
+        file_path = os.path.join(self.path, '{:03d}__{}.yml'.format(
+            len(self.files), manifest['name']))
+        with open(file_path, 'w') as file:
+            file.write(manifest['content'])
+        self.files.append(file_path)
+
+
+class MultiDocumentSink(ManifestSink):
+    """Write all manifests to a single multi-document yml."""
+
+    def __init__(self, file):
+        """__init__.
+
+        Args:
+            file (str|file object):
+                Path of the file or an open text file object, file objects
+                are not closed by the sink.
+        """
+        self._should_close = isinstance(file, str)
+        self.file = open(file, 'w') if self._should_close else file
+        self.count = 0
+
+    def write(self, manifest: dict):
+        """Append manifest documents to the file."""
+        content = manifest['content'].strip('\n')
+        if content.startswith('---'):
+            content = content[3:].lstrip('\n')
+        self.file.write('---\n# {}\n{}\n'.format(manifest['name'], content))
+        self.count += 1
+
+    def close(self):
+        """Close file if it was opened by the sink."""
+        if self._should_close:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class StdoutSink(MultiDocumentSink):
+    """Write all manifests to stdout as a multi-document yml."""
+
+    def __init__(self):
+        """__init__."""
+        super().__init__(sys.stdout)
+
+
+class ApplySink(ManifestSink):
+    """Apply manifests to the cluster as they are rendered.
+
+    Each manifest is applied by a pool of workers as soon as it is
+    received. Manifests wait only for the earlier manifests that provide
+    objects they require (secrets, config maps, volumes, PGBouncers...), so
+    applies start while later microservices are still rendering.
+    """
+
+    def __init__(self, kube_client, max_workers: int = 4,
+                 wait_mode: str = "sleep",
+                 wait_timeout: int = WAIT_DEFAULT_TIMEOUT,
+                 output_path: str = 'outputs/stream_output',
+                 field_manager: str = "pumpwood-deploy"):
+        """__init__.
+
+        Args:
+            kube_client (Kubernets):
+                Kubernets client used to apply the manifests.
+            max_workers (int):
+                Maximum number of manifests applied at the same time.
+            wait_mode (str):
+                How to wait after each apply, check
+                `Kubernets.run_deploy_command`.
+            wait_timeout (int):
+                Time in seconds to wait for the objects to be ready when
+                `wait_mode="ready"`.
+            output_path (str):
+                Directory where manifests and apply scripts are written for
+                auditing and for the kubectl backend.
+            field_manager (str):
+                Field manager used on server-side apply.
+        """
+        self.kube_client = kube_client
+        self.wait_mode = wait_mode
+        self.wait_timeout = wait_timeout
+        self.output_path = output_path
+        self.field_manager = field_manager
+        self.results = {}
+        os.makedirs(os.path.join(output_path, 'resources'), exist_ok=True)
+        self._count = 0
+        self._providers = {}
+        self._futures = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _write_files(self, manifest: dict) -> dict:
+        """Write manifest and apply script and create deploy command."""
+        file_name = 'resources/{:03d}__{}.yml'.format(
+            self._count, manifest['name'])
+        with open(os.path.join(self.output_path, file_name), 'w') as file:
+            file.write(manifest['content'])
+        file_name_sh = os.path.join(self.output_path, '{:03d}__{}.sh'.format(
+            self._count, manifest['name']))
+        with open(file_name_sh, 'w') as file:
+            file.write(server_side_apply_template.format(
+                file=file_name, namespace=manifest['namespace'],
+                field_manager=self.field_manager))
+        os.chmod(file_name_sh, stat.S_IRWXU)
+        self._count += 1
+        return {
+            'command': 'run', 'file': file_name_sh,
+            'sleep': manifest['sleep'], 'timeout': manifest['timeout'],
+            'name': manifest['name'], 'namespace': manifest['namespace'],
+            'type': manifest['type'],
+            'manifest': os.path.join(self.output_path, file_name),
+            'provides': manifest['provides'],
+            'requires': manifest['requires'], 'hash': manifest['hash']}
+
+    def _apply(self, cmd: dict, dependencies: List[Future]) -> bool:
+        # Dependencies were submitted before, so they are already running
+        # at other workers or finished, waiting them can not deadlock
+        for dependency in dependencies:
+            dependency.result()
+        success = self.kube_client.run_deploy_command(
+            cmd, wait_mode=self.wait_mode, wait_timeout=self.wait_timeout)
+        self.results[cmd['name']] = success
+        return success
+
+    def write(self, manifest: dict):
+        """Submit manifest to be applied after its dependencies."""
+        cmd = self._write_files(manifest)
+        dependencies = []
+        for key in cmd['requires']:
+            future = self._providers.get(tuple(key))
+            if future is not None and future not in dependencies:
+                dependencies.append(future)
+        future = self._executor.submit(self._apply, cmd, dependencies)
+        for key in cmd['provides']:
+            self._providers[tuple(key)] = future
+        self._futures.append(future)
+
+    def close(self):
+        """Wait all applies to finish.
+
+        Raises:
+            Exception:
+                Errors raised applying the manifests are raised again after
+                all applies finish.
+        """
+        self._executor.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
@@ -0,0 +1,171 @@
+"""Named sizing profiles for the resources of the microservices.
+
+Templates default to almost no requests (`1m` CPU, `20Mi` memory) and very
+high limits (`12000m` CPU, `60Gi` memory), so pods are scheduled without a
+real reservation. Sizing profiles set realistic requests and limits for each
+component of the microservices, found by the `type` label of the pod
+template:
+
+- **app:** pods labeled `type: app`.
+- **worker:** pods labeled `type: worker`.
+- **db:** pods labeled `type: db` or `type: db-no-bouncer`.
+
+Sizing is opt-in, it is set for all microservices or for one of them at
+`DeployPumpWood.set_sizing`. Patches added with `DeployPumpWood.add_patch`
+are applied after sizing and win over it.
+
+Example:
+```python
+deploy.set_sizing(app='medium', worker='small', db='guaranteed')
+deploy.set_sizing(app='large', microservice=datalake)
+```
+"""
+from typing import Dict, Union
+from pumpwood_deploy.manifest import ManifestPatch, K8sObject, Selector
+
+
+COMPONENT_TYPES = {
+    'app': ['app'],
+    'worker': ['worker'],
+    'db': ['db', 'db-no-bouncer']}
+"""Values of the `type` label of the pods of each component."""
+
+
+class SizingProfile:
+    """Requests and limits of the containers of a component."""
+
+    __slots__ = ('requests', 'limits')
+
+    def __init__(self, requests: dict, limits: dict):
+        """__init__.
+
+        Args:
+            requests (dict):
+                Requests of the containers, ex.:
+                `{'cpu': '500m', 'memory': '1Gi'}`.
+            limits (dict):
+                Limits of the containers, set equal to requests for the
+                `Guaranteed` QoS class.
+        """
+        self.requests = requests
+        self.limits = limits
+
+    @property
+    def qos_class(self) -> str:
+        """QoS class of pods with this profile at all containers."""
+        cpu_memory = ['cpu', 'memory']
+        if all(self.limits.get(r) is not None for r in cpu_memory) and all(
+                self.requests.get(r, self.limits[r]) == self.limits[r]
+                for r in cpu_memory):
+            return 'Guaranteed'
+        if self.requests or self.limits:
+            return 'Burstable'
+        return 'BestEffort'
+
+    def __repr__(self) -> str:
+        """Representation of the profile."""
+        return 'SizingProfile(requests={!r}, limits={!r})'.format(
+            self.requests, self.limits)
+
+
+SIZING_PROFILES = {
+    'small': SizingProfile(
+        requests={'cpu': '100m', 'memory': '256Mi'},
+        limits={'cpu': '1000m', 'memory': '1Gi'}),
+    'medium': SizingProfile(
+        requests={'cpu': '500m', 'memory': '1Gi'},
+        limits={'cpu': '2000m', 'memory': '4Gi'}),
+    'large': SizingProfile(
+        requests={'cpu': '2000m', 'memory': '4Gi'},
+        limits={'cpu': '4000m', 'memory': '8Gi'}),
+    'guaranteed': SizingProfile(
+        requests={'cpu': '2000m', 'memory': '4Gi'},
+        limits={'cpu': '2000m', 'memory': '4Gi'})}
+"""Named profiles, `guaranteed` has the `Guaranteed` QoS class and the
+others are `Burstable`."""
+
+
+def get_profile(profile: Union[str, SizingProfile]) -> SizingProfile:
+    """Get a profile by name.
+
+    Args:
+        profile (Union[str, SizingProfile]):
+            Name at `SIZING_PROFILES` or a custom profile.
+
+    Returns:
+        Sizing profile.
+
+    Raises:
+        Exception:
+            'Sizing profile not found [{}], options: {}'.
+    """
+    if isinstance(profile, SizingProfile):
+        return profile
+    if profile not in SIZING_PROFILES:
+        raise Exception('Sizing profile not found [{}], options: {}'.format(
+            profile, list(SIZING_PROFILES.keys())))
+    return SIZING_PROFILES[profile]
+
+
+def pod_component(obj: K8sObject) -> str:
+    """Component of an object by the `type` label of its pods.
+
+    Args:
+        obj (K8sObject):
+            Object with a pod template.
+
+    Returns:
+        `app`, `worker`, `db` or None if the object is not of a sized
+        component.
+    """
+    spec = obj.data.get('spec') or {}
+    template_metadata = (spec.get('template') or {}).get('metadata') or {}
+    pod_type = (template_metadata.get('labels') or {}).get(
+        'type', obj.labels.get('type'))
+    for component, types in COMPONENT_TYPES.items():
+        if pod_type in types:
+            return component
+    return None
+
+
+class SizingPatch(ManifestPatch):
+    """Set resources of the containers using the profile of the component."""
+
+    __slots__ = ('profiles', )
+
+    def __init__(self, profiles: Dict[str, Union[str, SizingProfile]],
+                 selector: Selector = None):
+        """__init__.
+
+        Args:
+            profiles (Dict[str, Union[str, SizingProfile]]):
+                Profile of each component (`app`, `worker` and `db`),
+                components not set are not changed.
+            selector (Selector):
+                Objects the patch will be applied to.
+
+        Raises:
+            Exception:
+                'Sizing component not found [{}], options: {}'.
+        """
+        super().__init__(selector=selector)
+        for component in profiles.keys():
+            if component not in COMPONENT_TYPES:
+                raise Exception(
+                    'Sizing component not found [{}], options: {}'.format(
+                        component, list(COMPONENT_TYPES.keys())))
+        self.profiles = {
+            component: get_profile(profile)
+            for component, profile in profiles.items()
+            if profile is not None}
+
+    def apply(self, obj: K8sObject) -> bool:
+        """Set resources of the containers of the object."""
+        profile = self.profiles.get(pod_component(obj))
+        if profile is None:
+            return False
+        changed = False
+        for container in obj.containers(init=True):
+            changed = container.set_resources(
+                requests=profile.requests, limits=profile.limits) or changed
+        return changed
@@ -0,0 +1,113 @@
+"""Lazy registry of the templates shipped with the package.
+
+Templates (yml manifests and bash scripts) are read from package resources
+and compiled only on first use and cached, so importing the deploy modules
+does not read every template of every microservice.
+
+Example:
+```python
+from pumpwood_deploy.template_registry import get_template
+
+secrets = get_template('microservices/postgres/resources/secrets.yml')
+secrets.format(name='postgres', ...)
+```
+"""
+import pkgutil
+import threading
+from jinja2 import Template
+
+try:
+    from importlib.resources import files as _resource_files
+except ImportError:
+    _resource_files = None
+
+
+_registry = {}
+"""@private"""
+_registry_lock = threading.Lock()
+"""@private"""
+
+
+def _read_resource(package: str, path: str) -> str:
+    """Read a resource file from a package."""
+    if _resource_files is not None:
+        return _resource_files(package).joinpath(path).read_bytes().decode()
+    return pkgutil.get_data(package, path).decode()
+
+
+class LazyTemplate:
+    """Template read from package resources on first use."""
+
+    package: str
+    """Package of the template."""
+    path: str
+    """Path of the template relative to the package."""
+
+    def __init__(self, path: str, package: str = 'pumpwood_deploy'):
+        """__init__.
+
+        Args:
+            path (str):
+                Path of the template relative to the package.
+            package (str):
+                Package of the template.
+        """
+        self.package = package
+        self.path = path
+        self._content = None
+        self._jinja_template = None
+        self._lock = threading.Lock()
+
+    def read(self) -> str:
+        """Return the content of the template."""
+        if self._content is None:
+            with self._lock:
+                if self._content is None:
+                    self._content = _read_resource(self.package, self.path)
+        return self._content
+
+    def format(self, *args, **kwargs) -> str:
+        """Fill template using `str.format`."""
+        return self.read().format(*args, **kwargs)
+
+    def render(self, *args, **kwargs) -> str:
+        """Fill template using jinja2, template is compiled once."""
+        if self._jinja_template is None:
+            jinja_template = Template(self.read())
+            with self._lock:
+                if self._jinja_template is None:
+                    self._jinja_template = jinja_template
+        return self._jinja_template.render(*args, **kwargs)
+
+    def __str__(self) -> str:
+        """Return the content of the template."""
+        return self.read()
+
+    def __repr__(self) -> str:
+        """Representation of the template."""
+        return "LazyTemplate({!r}, package={!r})".format(
+            self.path, self.package)
+
+
+def get_template(path: str, package: str = 'pumpwood_deploy'
+                 ) -> LazyTemplate:
+    """Get a template from the registry.
+
+    Templates are not read when registered, only on first `read`,
+    `format` or `render` call. The same object is returned for the same
+    path, so its content is read and compiled only once.
+
+    Args:
+        path (str):
+            Path of the template relative to the package.
+        package (str):
+            Package of the template.
+
+    Returns:
+        Return a LazyTemplate object.
+    """
+    key = (package, path)
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = LazyTemplate(path=path, package=package)
+        return _registry[key]
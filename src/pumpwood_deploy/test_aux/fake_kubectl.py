@@ -0,0 +1,653 @@
+"""Local stand-in for kubectl and K8s API to test deploy orchestration.
+
+`FakeCluster` keeps the state of a fake cluster at a directory, so it can be
+shared by the test process and the `kubectl` processes called by the deploy
+bash scripts. It records the applied objects and simulates:
+
+- **apply latency:** each apply sleeps `apply_latency` seconds.
+- **PVC bind delay:** claims are `Pending` for `pvc_bind_delay` seconds.
+- **pod readiness:** rollouts complete and services get endpoints
+  `ready_delay` seconds after the workload is applied.
+- **transient failures:** applies fail with probability `failure_rate`
+  (seeded, reproducible) or for the first n applies of an object set at
+  `transient_failures`.
+
+Example:
+```python
+cluster = FakeCluster(state_dir='outputs/fake_cluster', apply_latency=0.05)
+with cluster.on_path():
+    # kubectl, aws, gcloud and az calls use the fake cluster
+    deploy.deploy_microservices(wait_mode="ready")
+print(cluster.applied())
+```
+
+For `k8_backend="api"` use `FakeApiClient` as `Kubernets.api_client`. The
+module can also be called as kubectl with
+`python -m pumpwood_deploy.test_aux.fake_kubectl` with the state directory
+set at `FAKE_KUBECTL_STATE` enviroment variable.
+"""
+import os
+import sys
+import json
+import stat
+import time
+import copy
+import base64
+import random
+import yaml
+from contextlib import contextmanager
+from typing import List, Tuple
+from pumpwood_deploy.kubernets.api_client import KubernetsApiClient
+from pumpwood_deploy.kubernets.readiness import WORKLOAD_KINDS
+
+
+STATE_ENV_VAR = 'FAKE_KUBECTL_STATE'
+"""Enviroment variable with the state directory used by the fake kubectl."""
+
+CLUSTER_SCOPED_KINDS = ['Namespace', 'PersistentVolume', 'StorageClass']
+"""Kinds that are not namespaced at the fake cluster."""
+
+FAKE_CLIS = ['aws', 'gcloud', 'az']
+"""Cloud CLIs replaced by a command that always succeeds."""
+
+KUBECTL_SCRIPT = """#!/bin/sh
+PYTHONPATH="{python_path}:$PYTHONPATH" exec "{python}" -m \
+pumpwood_deploy.test_aux.fake_kubectl "$@"
+"""
+"""Script that calls this module as kubectl."""
+
+CLI_SCRIPT = """#!/bin/sh
+exit 0
+"""
+"""Script used as cloud CLIs."""
+
+VALUE_FLAGS = [
+    '-f', '--filename', '-n', '--namespace', '-o', '--output',
+    '--field-manager', '--context']
+"""kubectl flags that receive a value."""
+
+
+class FakeApplyError(Exception):
+    """Transient failure injected at an apply."""
+
+
+def _parse_args(args: List[str]) -> Tuple[List[str], dict]:
+    """Split kubectl arguments in positional arguments and flags."""
+    positional = []
+    flags = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.startswith('-') and '=' in arg:
+            key, value = arg.split('=', 1)
+            flags[key] = value
+        elif arg in VALUE_FLAGS and i + 1 < len(args):
+            flags[arg] = args[i + 1]
+            i += 1
+        elif arg.startswith('-'):
+            flags[arg] = True
+        else:
+            positional.append(arg)
+        i += 1
+    return positional, flags
+
+
+def _labels_match(selector: dict, labels: dict) -> bool:
+    """Check if all selector labels are set at labels."""
+    return bool(selector) and all(
+        labels.get(k) == v for k, v in selector.items())
+
+
+class FakeCluster:
+    """Fake K8s cluster with state persisted at a directory."""
+
+    state_dir: str
+    """Directory with configuration and state of the cluster."""
+    apply_latency: float
+    """Time in seconds each apply takes."""
+    get_latency: float
+    """Time in seconds each get/list takes."""
+    pvc_bind_delay: float
+    """Time in seconds a PersistentVolumeClaim takes to be bound."""
+    ready_delay: float
+    """Time in seconds a workload takes to be ready after apply."""
+    failure_rate: float
+    """Probability of an apply to fail."""
+    transient_failures: dict
+    """Number of times the first applies of an object (by name) fail."""
+    seed: int
+    """Seed used to draw the failures."""
+
+    def __init__(self, state_dir: str, apply_latency: float = 0.0,
+                 get_latency: float = 0.0, pvc_bind_delay: float = 0.0,
+                 ready_delay: float = 0.0, failure_rate: float = 0.0,
+                 transient_failures: dict = None, seed: int = 0):
+        """__init__.
+
+        Configuration is saved at `state_dir` and the state of the cluster
+        is reset.
+
+        Args:
+            state_dir (str):
+                Directory with configuration and state of the cluster.
+            apply_latency (float):
+                Time in seconds each apply takes.
+            get_latency (float):
+                Time in seconds each get/list takes.
+            pvc_bind_delay (float):
+                Time in seconds a PersistentVolumeClaim takes to be bound.
+            ready_delay (float):
+                Time in seconds a workload takes to be ready after apply,
+                services get endpoints when their pods are ready.
+            failure_rate (float):
+                Probability of an apply to fail, failures are drawn using
+                `seed` and the number of the apply, so runs are
+                reproducible.
+            transient_failures (dict):
+                Number of times the first applies of an object fail, by
+                object name.
+            seed (int):
+                Seed used to draw the failures.
+        """
+        self.state_dir = state_dir
+        self.apply_latency = apply_latency
+        self.get_latency = get_latency
+        self.pvc_bind_delay = pvc_bind_delay
+        self.ready_delay = ready_delay
+        self.failure_rate = failure_rate
+        self.transient_failures = transient_failures or {}
+        self.seed = seed
+
+        os.makedirs(state_dir, exist_ok=True)
+        with open(os.path.join(state_dir, 'config.json'), 'w') as file:
+            json.dump(self._config(), file)
+        self._save_state({
+            'context': 'fake-cluster', 'namespace': 'default',
+            'namespaces': ['default'], 'objects': {}, 'applies': [],
+            'apply_calls': 0, 'failures': {}})
+
+    def _config(self) -> dict:
+        return {
+            'apply_latency': self.apply_latency,
+            'get_latency': self.get_latency,
+            'pvc_bind_delay': self.pvc_bind_delay,
+            'ready_delay': self.ready_delay,
+            'failure_rate': self.failure_rate,
+            'transient_failures': self.transient_failures,
+            'seed': self.seed}
+
+    @classmethod
+    def from_state_dir(cls, state_dir: str) -> 'FakeCluster':
+        """Load a cluster created at other process without reseting it.
+
+        Args:
+            state_dir (str):
+                Directory with configuration and state of the cluster.
+
+        Returns:
+            FakeCluster using the state at the directory.
+        """
+        with open(os.path.join(state_dir, 'config.json'), 'r') as file:
+            config = json.load(file)
+        cluster = cls.__new__(cls)
+        cluster.state_dir = state_dir
+        for key, value in config.items():
+            setattr(cluster, key, value)
+        return cluster
+
+    ###########################################################################
+    # State
+    def _state_path(self) -> str:
+        return os.path.join(self.state_dir, 'state.json')
+
+    def _save_state(self, state: dict):
+        temp_path = self._state_path() + '.tmp.{}'.format(os.getpid())
+        with open(temp_path, 'w') as file:
+            json.dump(state, file)
+        os.replace(temp_path, self._state_path())
+
+    def _load_state(self) -> dict:
+        with open(self._state_path(), 'r') as file:
+            return json.load(file)
+
+    @contextmanager
+    def _locked_state(self):
+        """Load state with an exclusive lock and save it at exit."""
+        import fcntl
+
+        with open(os.path.join(self.state_dir, 'state.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                state = self._load_state()
+                yield state
+                self._save_state(state)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _key(kind: str, name: str, namespace: str) -> str:
+        if kind in CLUSTER_SCOPED_KINDS:
+            namespace = ''
+        return '{}/{}/{}'.format(namespace, kind, name)
+
+    ###########################################################################
+    # Cluster operations
+    def create_namespace(self, namespace: str) -> bool:
+        """Create a namespace.
+
+        Args:
+            namespace (str):
+                Name of the namespace.
+
+        Returns:
+            Return False if namespace already exists.
+        """
+        with self._locked_state() as state:
+            if namespace in state['namespaces']:
+                return False
+            state['namespaces'].append(namespace)
+            return True
+
+    def _should_fail(self, state: dict, name: str) -> bool:
+        """Draw if an apply will fail, updating failure counters."""
+        state['apply_calls'] += 1
+        failures = state['failures'].get(name, 0)
+        should_fail = failures < self.transient_failures.get(name, 0)
+        if not should_fail and self.failure_rate > 0:
+            # Failures are simulated, not used for security
+            rng = random.Random('{}:{}'.format( # NOQA
+                self.seed, state['apply_calls']))
+            should_fail = rng.random() < self.failure_rate
+        if should_fail:
+            state['failures'][name] = failures + 1
+        return should_fail
+
+    def apply(self, documents: List[dict], namespace: str = None,
+              field_manager: str = None, server_side: bool = False):
+        """Apply objects to the fake cluster.
+
+        Args:
+            documents (List[dict]):
+                Objects to be applied.
+            namespace (str):
+                Namespace used if not set at the object, if None current
+                namespace is used.
+            field_manager (str):
+                Field manager of the apply, recorded at `applied`.
+            server_side (bool):
+                If False, `kubectl.kubernetes.io/last-applied-configuration`
+                annotation is set as client-side apply does.
+
+        Raises:
+            FakeApplyError:
+                'fake transient failure applying [%s]'. Injected failure,
+                objects of the call are not applied.
+        """
+        time.sleep(self.apply_latency)
+        documents = [d for d in documents if isinstance(d, dict)]
+        with self._locked_state() as state:
+            namespace = namespace or state['namespace']
+            for document in documents:
+                name = (document.get('metadata') or {}).get('name')
+                if self._should_fail(state, name):
+                    # Counters must be saved even on failure
+                    self._save_state(state)
+                    msg = 'fake transient failure applying [{}]'.format(
+                        name)
+                    raise FakeApplyError(msg)
+
+            now = time.time()
+            for document in documents:
+                document = copy.deepcopy(document)
+                metadata = document.setdefault('metadata', {})
+                kind = document.get('kind')
+                obj_namespace = metadata.get('namespace', namespace)
+                if kind not in CLUSTER_SCOPED_KINDS:
+                    metadata['namespace'] = obj_namespace
+                if not server_side:
+                    last_applied = copy.deepcopy(document)
+                    last_applied['metadata'].pop('namespace', None)
+                    metadata.setdefault('annotations', {})[
+                        'kubectl.kubernetes.io/last-applied-configuration'
+                    ] = json.dumps(last_applied, sort_keys=True)
+                # API server stores stringData encoded at data
+                if kind == 'Secret' and 'stringData' in document:
+                    data = document.setdefault('data', {})
+                    for key, value in document.pop('stringData').items():
+                        data[key] = base64.b64encode(
+                            str(value).encode()).decode()
+
+                key = self._key(kind, metadata['name'], obj_namespace)
+                previous = state['objects'].get(key)
+                changed = (
+                    previous is None or
+                    previous['object'].get('spec') != document.get('spec'))
+                generation = 1 if previous is None else (
+                    previous['generation'] + int(changed))
+                metadata['generation'] = generation
+                state['objects'][key] = {
+                    'object': document, 'generation': generation,
+                    'applied_at': (
+                        now if changed else previous['applied_at'])}
+                state['applies'].append({
+                    'time': now, 'namespace': metadata.get('namespace'),
+                    'kind': kind, 'name': metadata['name'],
+                    'field_manager': field_manager, 'changed': changed})
+
+    def _with_status(self, entry: dict, now: float) -> dict:
+        """Return object with status simulated from time since apply."""
+        obj = copy.deepcopy(entry['object'])
+        elapsed = now - entry['applied_at']
+        kind = obj.get('kind')
+        if kind == 'PersistentVolumeClaim':
+            obj['status'] = {
+                'phase': (
+                    'Bound' if elapsed >= self.pvc_bind_delay
+                    else 'Pending')}
+        elif kind in WORKLOAD_KINDS:
+            replicas = (obj.get('spec') or {}).get('replicas', 1)
+            ready = replicas if elapsed >= self.ready_delay else 0
+            obj['status'] = {
+                'observedGeneration': entry['generation'],
+                'replicas': replicas, 'updatedReplicas': ready,
+                'availableReplicas': ready, 'readyReplicas': ready,
+                'desiredNumberScheduled': 1,
+                'updatedNumberScheduled': min(ready, 1),
+                'numberAvailable': min(ready, 1)}
+        return obj
+
+    def _endpoints(self, state: dict, name: str, namespace: str,
+                   now: float) -> dict:
+        """Simulate Endpoints of a service from ready workloads."""
+        service = state['objects'].get(self._key('Service', name, namespace))
+        if service is None:
+            return None
+        selector = (service['object'].get('spec') or {}).get('selector')
+        addresses = []
+        for entry in state['objects'].values():
+            obj = entry['object']
+            if obj.get('kind') not in WORKLOAD_KINDS or \
+                    obj['metadata'].get('namespace') != namespace:
+                continue
+            template = (obj.get('spec') or {}).get('template') or {}
+            labels = (template.get('metadata') or {}).get('labels') or {}
+            is_ready = now - entry['applied_at'] >= self.ready_delay
+            if is_ready and _labels_match(selector, labels):
+                addresses.append({'ip': '10.0.0.{}'.format(
+                    len(addresses) + 1)})
+        return {
+            'apiVersion': 'v1', 'kind': 'Endpoints',
+            'metadata': {'name': name, 'namespace': namespace},
+            'subsets': [{'addresses': addresses}] if addresses else []}
+
+    def get_object(self, kind: str, name: str, namespace: str = None
+                   ) -> dict:
+        """Fetch an object from the fake cluster.
+
+        Args:
+            kind (str):
+                Kind of the object.
+            name (str):
+                Name of the object.
+            namespace (str):
+                Namespace of the object, if None current namespace is used.
+
+        Returns:
+            Object with simulated status or None if not found.
+        """
+        time.sleep(self.get_latency)
+        state = self._load_state()
+        namespace = namespace or state['namespace']
+        now = time.time()
+        if kind == 'Endpoints':
+            return self._endpoints(state, name, namespace, now)
+        entry = state['objects'].get(self._key(kind, name, namespace))
+        if entry is None:
+            return None
+        return self._with_status(entry, now)
+
+    def list_objects(self, kind: str, namespace: str = None) -> List[dict]:
+        """List all objects of a kind at a namespace.
+
+        Args:
+            kind (str):
+                Kind of the objects.
+            namespace (str):
+                Namespace of the objects, if None current namespace is used.
+
+        Returns:
+            Objects with simulated status.
+        """
+        time.sleep(self.get_latency)
+        state = self._load_state()
+        namespace = namespace or state['namespace']
+        now = time.time()
+        items = []
+        for entry in state['objects'].values():
+            obj = entry['object']
+            if obj.get('kind') != kind:
+                continue
+            if kind not in CLUSTER_SCOPED_KINDS and \
+                    obj['metadata'].get('namespace') != namespace:
+                continue
+            items.append(self._with_status(entry, now))
+        return items
+
+    def applied(self) -> List[dict]:
+        """Return all applies recorded at the fake cluster.
+
+        Returns:
+            List of applies with `time`, `namespace`, `kind`, `name`,
+            `field_manager` and `changed` (if object spec changed).
+        """
+        return self._load_state()['applies']
+
+    def objects(self) -> List[dict]:
+        """Return all objects at the fake cluster."""
+        return [
+            e['object'] for e in self._load_state()['objects'].values()]
+
+    ###########################################################################
+    # kubectl
+    def _resolve_kind(self, state: dict, kind_arg: str) -> str:
+        """Map kubectl kind argument (ex.: `deployments`) to a kind."""
+        kind_arg = kind_arg.lower()
+        short_names = {
+            'deploy': 'Deployment', 'pvc': 'PersistentVolumeClaim',
+            'pv': 'PersistentVolume', 'cm': 'ConfigMap', 'svc': 'Service',
+            'ns': 'Namespace', 'ep': 'Endpoints', 'sts': 'StatefulSet',
+            'ds': 'DaemonSet'}
+        if kind_arg in short_names:
+            return short_names[kind_arg]
+        kinds = set(e['object'].get('kind') for e in state['objects'].values())
+        kinds.update(WORKLOAD_KINDS + ['Endpoints'])
+        for kind in kinds:
+            if kind_arg in (kind.lower(), kind.lower() + 's'):
+                return kind
+        return kind_arg
+
+    def kubectl(self, args: List[str]) -> Tuple[int, str, str]:
+        """Run a kubectl command at the fake cluster.
+
+        Supported commands: `apply -f`, `create namespace`, `get` (single
+        object or list, `-o json`), `delete` and `config` (`current-context`,
+        `use-context`, `set-context`).
+
+        Args:
+            args (List[str]):
+                kubectl arguments.
+
+        Returns:
+            Return a tuple with return code, stdout and stderr.
+        """
+        positional, flags = _parse_args(args)
+        namespace = flags.get('--namespace', flags.get('-n'))
+        command = positional[0] if positional else None
+
+        if command == 'config':
+            with self._locked_state() as state:
+                sub_command = positional[1] if len(positional) > 1 else None
+                if sub_command == 'current-context':
+                    return 0, state['context'] + '\n', ''
+                if sub_command == 'use-context':
+                    state['context'] = positional[2]
+                    return 0, '', ''
+                if sub_command == 'set-context':
+                    if namespace is not None:
+                        state['namespace'] = namespace
+                    return 0, '', ''
+
+        elif command == 'create' and positional[1:2] == ['namespace']:
+            if not self.create_namespace(positional[2]):
+                return 1, '', (
+                    'Error from server (AlreadyExists): namespaces "{}" '
+                    'already exists\n').format(positional[2])
+            return 0, 'namespace/{} created\n'.format(positional[2]), ''
+
+        elif command == 'apply':
+            path = flags.get('-f', flags.get('--filename'))
+            if path is None:
+                return 1, '', 'error: must specify -f\n'
+            if path == '-':
+                content = sys.stdin.read()
+            else:
+                with open(path, 'r') as file:
+                    content = file.read()
+            documents = [
+                d for d in yaml.safe_load_all(content) if isinstance(d, dict)]
+            try:
+                self.apply(
+                    documents, namespace=namespace,
+                    field_manager=flags.get('--field-manager'),
+                    server_side='--server-side' in flags)
+            except FakeApplyError as e:
+                return 1, '', 'Error from server (InternalError): {}\n'.format(
+                    e)
+            return 0, ''.join(
+                '{}/{} configured\n'.format(
+                    d['kind'].lower(), d['metadata']['name'])
+                for d in documents), ''
+
+        elif command == 'get' and len(positional) >= 2:
+            state = self._load_state()
+            kind = self._resolve_kind(state, positional[1])
+            if len(positional) >= 3:
+                obj = self.get_object(kind, positional[2], namespace)
+                if obj is None:
+                    if '--ignore-not-found' in flags:
+                        return 0, '', ''
+                    return 1, '', (
+                        'Error from server (NotFound): {} "{}" not '
+                        'found\n').format(positional[1], positional[2])
+                return 0, json.dumps(obj), ''
+            items = self.list_objects(kind, namespace)
+            return 0, json.dumps({
+                'apiVersion': 'v1', 'kind': 'List', 'items': items}), ''
+
+        elif command == 'delete' and len(positional) >= 3:
+            with self._locked_state() as state:
+                kind = self._resolve_kind(state, positional[1])
+                key = self._key(
+                    kind, positional[2], namespace or state['namespace'])
+                if state['objects'].pop(key, None) is None:
+                    return 1, '', 'Error from server (NotFound)\n'
+                return 0, '', ''
+
+        return 1, '', 'fake kubectl: unsupported command {}\n'.format(args)
+
+    @contextmanager
+    def on_path(self):
+        """Put fake `kubectl` and cloud CLIs at the beginning of PATH.
+
+        Subprocesses started inside the context (bash scripts of the
+        deploy, `Kubernets` kubectl calls and logins) will use the fake
+        cluster.
+        """
+        bin_dir = os.path.join(self.state_dir, 'bin')
+        os.makedirs(bin_dir, exist_ok=True)
+        package_parent = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        scripts = [('kubectl', KUBECTL_SCRIPT.format(
+            python=sys.executable, python_path=package_parent))]
+        scripts.extend((cli, CLI_SCRIPT) for cli in FAKE_CLIS)
+        for name, content in scripts:
+            path = os.path.join(bin_dir, name)
+            with open(path, 'w') as file:
+                file.write(content)
+            os.chmod(path, stat.S_IRWXU)
+
+        old_env = {
+            k: os.environ.get(k) for k in ['PATH', STATE_ENV_VAR]}
+        os.environ['PATH'] = bin_dir + os.pathsep + old_env['PATH']
+        os.environ[STATE_ENV_VAR] = os.path.abspath(self.state_dir)
+        try:
+            yield bin_dir
+        finally:
+            for key, value in old_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+class FakeApiClient(KubernetsApiClient):
+    """API backend client that applies objects at a `FakeCluster`."""
+
+    def __init__(self, cluster: FakeCluster, namespace: str,
+                 field_manager: str = "pumpwood-deploy"):
+        """__init__.
+
+        Args:
+            cluster (FakeCluster):
+                Fake cluster that will receive the objects.
+            namespace (str):
+                Default namespace for namespaced objects.
+            field_manager (str):
+                Field manager used on server-side apply.
+        """
+        self.cluster = cluster
+        self.namespace = namespace
+        self.field_manager = field_manager
+
+    def create_namespace(self, namespace: str):
+        """Create a namespace if it does not exist."""
+        self.cluster.create_namespace(namespace)
+
+    def apply_object(self, body: dict, namespace: str = None) -> dict:
+        """Apply an object using server-side apply."""
+        namespace = self.namespace if namespace is None else namespace
+        self.cluster.apply(
+            [body], namespace=namespace, field_manager=self.field_manager,
+            server_side=True)
+        return body
+
+    def get_object(self, kind: str, name: str, namespace: str = None,
+                   api_version: str = None) -> dict:
+        """Fetch an object from the fake cluster."""
+        namespace = self.namespace if namespace is None else namespace
+        return self.cluster.get_object(kind, name, namespace)
+
+    def list_objects(self, kind: str, namespace: str = None,
+                     api_version: str = None) -> List[dict]:
+        """List all objects of a kind at the fake cluster."""
+        namespace = self.namespace if namespace is None else namespace
+        return self.cluster.list_objects(kind, namespace)
+
+
+def main():
+    """Run as kubectl using the cluster at `FAKE_KUBECTL_STATE`."""
+    state_dir = os.environ.get(STATE_ENV_VAR)
+    if state_dir is None:
+        sys.stderr.write(
+            'fake kubectl: {} enviroment variable not set\n'.format(
+                STATE_ENV_VAR))
+        sys.exit(1)
+    cluster = FakeCluster.from_state_dir(state_dir)
+    return_code, stdout, stderr = cluster.kubectl(sys.argv[1:])
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    sys.exit(return_code)
+
+
+if __name__ == '__main__':
+    main()
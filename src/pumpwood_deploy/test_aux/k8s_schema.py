@@ -0,0 +1,255 @@
+"""Offline validation of K8s manifests using bundled schemas.
+
+Manifests are validated in-process against a subset of the Kubernetes
+OpenAPI schemas shipped at `test_aux/k8s_schemas.json`, without `kubectl`
+or a cluster context. Schemas are compiled to validation functions on first
+use and cached, so validating all manifests of a deploy is a single pass
+over the parsed documents.
+
+Example:
+```python
+from pumpwood_deploy.test_aux.k8s_schema import validate_manifests
+
+validate_manifests([x['content'] for x in deploy_files])
+```
+"""
+import json
+import threading
+import yaml
+from typing import List, Callable
+from pumpwood_deploy.template_registry import get_template
+
+
+SCHEMAS_PATH = 'test_aux/k8s_schemas.json'
+"""Path of the bundled schemas relative to the package."""
+
+_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+_TYPE_CHECKS = {
+    'object': lambda x: isinstance(x, dict),
+    'array': lambda x: isinstance(x, list),
+    'string': lambda x: isinstance(x, str),
+    'integer': lambda x: isinstance(x, int) and not isinstance(x, bool),
+    'number': lambda x: (
+        isinstance(x, (int, float)) and not isinstance(x, bool)),
+    'boolean': lambda x: isinstance(x, bool),
+    'null': lambda x: x is None}
+"""@private"""
+
+
+class SchemaValidator:
+    """Validate K8s objects using JSON schemas of each kind.
+
+    Supports the subset of JSON schema used by Kubernetes OpenAPI
+    definitions: `type`, `properties`, `required`, `additionalProperties`,
+    `items`, `enum` and `$ref` to `#/definitions/`. Properties set to null
+    are treated as not set, as done by `kubectl`.
+    """
+
+    def __init__(self, schemas: dict):
+        """__init__.
+
+        Args:
+            schemas (dict):
+                Dictionary with `definitions` (schemas by name) and `kinds`
+                (reference of the schema by apiVersion and kind).
+        """
+        self.definitions = schemas['definitions']
+        self.kinds = schemas['kinds']
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_package(cls) -> 'SchemaValidator':
+        """Create validator with the schemas bundled with the package."""
+        return cls(json.loads(get_template(SCHEMAS_PATH).read()))
+
+    def _definition(self, name: str) -> Callable:
+        """Return compiled validation function of a definition."""
+        validator = self._compiled.get(name)
+        if validator is None:
+            with self._lock:
+                validator = self._compiled.get(name)
+                if validator is None:
+                    # Placeholder resolves recursive definitions lazily
+                    self._compiled[name] = (
+                        lambda value, path, errors:
+                            self._compiled[name](value, path, errors))
+                    validator = self._compile(self.definitions[name])
+                    self._compiled[name] = validator
+        return validator
+
+    def _compile(self, schema: dict) -> Callable:
+        """Compile a schema to a function `(value, path, errors)`."""
+        if '$ref' in schema:
+            name = schema['$ref'].rsplit('/', 1)[-1]
+            if name not in self.definitions:
+                raise Exception(
+                    'Schema definition not found: {}'.format(name))
+            return lambda value, path, errors: self._definition(name)(
+                value, path, errors)
+
+        checks = []
+        types = schema.get('type')
+        if types is not None:
+            types = [types] if isinstance(types, str) else types
+            type_checks = [_TYPE_CHECKS[t] for t in types]
+            type_names = ' or '.join(types)
+
+            def check_type(value, path, errors):
+                if not any(check(value) for check in type_checks):
+                    errors.append('{}: expected {}, got {}'.format(
+                        path, type_names, type(value).__name__))
+                    return False
+                return True
+            checks.append(check_type)
+
+        if 'enum' in schema:
+            enum = schema['enum']
+
+            def check_enum(value, path, errors):
+                if value not in enum:
+                    errors.append('{}: {!r} is not one of {}'.format(
+                        path, value, enum))
+                    return False
+                return True
+            checks.append(check_enum)
+
+        properties = {
+            key: self._compile(value)
+            for key, value in schema.get('properties', {}).items()}
+        required = schema.get('required', [])
+        additional = schema.get('additionalProperties', True)
+        if isinstance(additional, dict):
+            additional = self._compile(additional)
+        if properties or required or additional is not True:
+            def check_object(value, path, errors):
+                if not isinstance(value, dict):
+                    return True
+                for key in required:
+                    if value.get(key) is None:
+                        errors.append('{}: missing required field "{}"'.format(
+                            path, key))
+                for key, item in value.items():
+                    if item is None:
+                        continue
+                    item_path = '{}.{}'.format(path, key) if path else key
+                    validator = properties.get(key)
+                    if validator is not None:
+                        validator(item, item_path, errors)
+                    elif additional is False:
+                        errors.append('{}: unknown field "{}"'.format(
+                            path or '.', key))
+                    elif additional is not True:
+                        additional(item, item_path, errors)
+                return True
+            checks.append(check_object)
+
+        if 'items' in schema:
+            items = self._compile(schema['items'])
+
+            def check_array(value, path, errors):
+                if not isinstance(value, list):
+                    return True
+                for i, item in enumerate(value):
+                    items(item, '{}[{}]'.format(path, i), errors)
+                return True
+            checks.append(check_array)
+
+        def validate(value, path, errors):
+            for check in checks:
+                if not check(value, path, errors):
+                    return
+        return validate
+
+    def validate_object(self, obj: dict) -> List[str]:
+        """Validate a K8s object.
+
+        Args:
+            obj (dict):
+                Parsed K8s object.
+
+        Returns:
+            List of errors, empty if object is valid.
+        """
+        if not isinstance(obj, dict):
+            return ['document is not an object']
+        api_version = obj.get('apiVersion')
+        kind = obj.get('kind')
+        if api_version is None or kind is None:
+            return ['apiVersion and kind must be set']
+        schema = self.kinds.get(api_version, {}).get(kind)
+        if schema is None:
+            return ['no schema for {} {}'.format(api_version, kind)]
+        errors = []
+        self._compile(schema)(obj, '', errors)
+        return errors
+
+    def validate(self, content: str) -> List[str]:
+        """Validate all documents of a yml manifest.
+
+        Args:
+            content (str):
+                Multi-document yml manifest.
+
+        Returns:
+            List of errors prefixed by kind and name of the object, empty
+            if all objects are valid.
+        """
+        try:
+            documents = list(yaml.load_all(content, Loader=_LOADER))
+        except yaml.YAMLError as e:
+            return ['invalid yml: {}'.format(e)]
+        errors = []
+        for i, document in enumerate(documents):
+            if document is None:
+                continue
+            if isinstance(document, dict):
+                metadata = document.get('metadata') or {}
+                prefix = '{}/{}'.format(
+                    document.get('kind'), metadata.get('name'))
+            else:
+                prefix = 'document[{}]'.format(i)
+            errors.extend(
+                '{} {}'.format(prefix, error)
+                for error in self.validate_object(document))
+        return errors
+
+
+_validator = None
+"""@private"""
+_validator_lock = threading.Lock()
+"""@private"""
+
+
+def get_validator() -> SchemaValidator:
+    """Return the validator of the bundled schemas, created once."""
+    global _validator
+    if _validator is None:
+        with _validator_lock:
+            if _validator is None:
+                _validator = SchemaValidator.from_package()
+    return _validator
+
+
+def validate_manifests(contents: List[str]):
+    """Validate many yml manifests in one pass.
+
+    Args:
+        contents (List[str]):
+            Multi-document yml manifests.
+
+    Raises:
+        Exception:
+            If any manifest is not valid, listing the errors of all
+            manifests.
+    """
+    validator = get_validator()
+    errors = []
+    for i, content in enumerate(contents):
+        errors.extend(
+            'manifest[{}] {}'.format(i, error)
+            for error in validator.validate(content))
+    if errors:
+        raise Exception(
+            "File is not a valid YML K8s:\n" + "\n".join(errors))
@@ -0,0 +1,178 @@
+"""Microservices used at the tests of the deploy orchestration.
+
+`StubMicroservice` renders small manifests chosen by `resources`, so tests
+of rendering, patches and deploy do not depend on the templates of the
+real microservices. `auth_microservice` creates a
+`PumpWoodAuthMicroservice` with test arguments for tests that need real
+manifests.
+
+Example:
+```python
+deploy.microsservices_to_deploy = [
+    StubMicroservice('a', resources=['secret', 'deployment']),
+    StubMicroservice('b', resources=['app', 'worker'])]
+```
+"""
+import yaml
+from typing import List
+from pumpwood_deploy.microservices.pumpwood_auth.deploy import (
+    PumpWoodAuthMicroservice)
+
+
+POD_TYPES = ['app', 'worker', 'db', 'static']
+"""Resources rendered as a Deployment labeled with the pod type."""
+
+
+def auth_microservice(**kwargs) -> PumpWoodAuthMicroservice:
+    """Auth microservice with test arguments.
+
+    Args:
+        **kwargs:
+            Other arguments of `PumpWoodAuthMicroservice`.
+    """
+    return PumpWoodAuthMicroservice(
+        secret_key="8540",
+        email_host_user="teste1",
+        email_host_password="teste2",
+        bucket_name="test-pumpwood",
+        app_version="0.90",
+        static_version="0.5",
+        **kwargs)
+
+
+class StubMicroservice:
+    """Microservice with small manifests chosen by `resources`."""
+
+    name: str
+    """Name used at the deploy items and objects."""
+    resources: List[str]
+    """Resources rendered, in order."""
+    value: str
+    """Value of the config map."""
+    fail: bool
+    """If the render raises."""
+    renders: int
+    """Number of times the microservice was rendered."""
+
+    def __init__(self, name: str, resources: List[str] = None,
+                 value: str = 'value', fail: bool = False):
+        """__init__.
+
+        Args:
+            name (str):
+                Name used at the deploy items and objects.
+            resources (List[str]):
+                Resources rendered as deploy items, default
+                `['deployment']`:
+                - `secret`: Secret `{name}-secrets`, item `{name}__secrets`.
+                - `configmap`: ConfigMap `{name}-config` with `value`,
+                  item `{name}__config`.
+                - `configmap_file`: config map `{name}-files` created
+                  from a `config.json` file.
+                - `deployment`: Deployment `{name}` that uses the secret
+                  and config map of the microservice, item
+                  `{name}__deploy`.
+                - `app`, `worker`, `db` and `static`: Deployment
+                  `{name}-{type}` labeled with the pod type, with an init
+                  container and resources, item `{name}__{type}`.
+            value (str):
+                Value of the config map, change it to change the content.
+            fail (bool):
+                If True the render raises 'render failed'.
+        """
+        self.name = name
+        self.resources = ['deployment'] if resources is None else resources
+        self.value = value
+        self.fail = fail
+        self.renders = 0
+
+    def deployment_yml(self, name: str, pod_type: str = None) -> str:
+        """Deployment of the microservice.
+
+        Args:
+            name (str):
+                Name of the Deployment and its container.
+            pod_type (str):
+                Value of the `type` label of the pods, None to not set.
+        """
+        labels = {'name': name}
+        if pod_type is not None:
+            labels['type'] = pod_type
+        env_from = []
+        if 'secret' in self.resources:
+            env_from.append(
+                {'secretRef': {'name': self.name + '-secrets'}})
+        if 'configmap' in self.resources:
+            env_from.append(
+                {'configMapRef': {'name': self.name + '-config'}})
+        container = {
+            'name': name, 'image': 'pumpwood/{}:1.0'.format(name),
+            'resources': {
+                'requests': {'cpu': '1m', 'memory': '20Mi'},
+                'limits': {'cpu': '12000m', 'memory': '60Gi'}}}
+        if env_from:
+            container['envFrom'] = env_from
+        pod_spec = {'containers': [container]}
+        if pod_type is not None:
+            pod_spec['initContainers'] = [
+                {'name': 'init', 'image': 'busybox'}]
+        return yaml.safe_dump({
+            'apiVersion': 'apps/v1', 'kind': 'Deployment',
+            'metadata': {'name': name},
+            'spec': {
+                'replicas': 1,
+                'selector': {'matchLabels': {'name': name}},
+                'template': {
+                    'metadata': {'labels': labels},
+                    'spec': pod_spec}}}, sort_keys=False)
+
+    def deploy_item(self, resource: str) -> dict:
+        """Deploy item of a resource of the microservice."""
+        if resource == 'secret':
+            return {
+                'type': 'secrets', 'name': self.name + '__secrets',
+                'content': yaml.safe_dump({
+                    'apiVersion': 'v1', 'kind': 'Secret',
+                    'metadata': {'name': self.name + '-secrets'},
+                    'stringData': {'password': 'abc'}}),
+                'sleep': 0}
+        if resource == 'configmap':
+            return {
+                'type': 'deploy', 'name': self.name + '__config',
+                'content': yaml.safe_dump({
+                    'apiVersion': 'v1', 'kind': 'ConfigMap',
+                    'metadata': {'name': self.name + '-config'},
+                    'data': {'key': self.value}}),
+                'sleep': 0}
+        if resource == 'configmap_file':
+            return {
+                'type': 'configmap_file', 'name': self.name + '-files',
+                'file_name': 'config.json', 'content': '{"a": 1}',
+                'sleep': 0}
+        if resource == 'deployment':
+            return {
+                'type': 'deploy', 'name': self.name + '__deploy',
+                'content': self.deployment_yml(self.name), 'sleep': 0}
+        if resource in POD_TYPES:
+            return {
+                'type': 'deploy',
+                'name': '{}__{}'.format(self.name, resource),
+                'content': self.deployment_yml(
+                    '{}-{}'.format(self.name, resource), pod_type=resource),
+                'sleep': 0}
+        raise Exception('Stub resource [{}] not implemented'.format(resource))
+
+    def create_deployment_file(self, kube_client=None, **kwargs
+                               ) -> List[dict]:
+        """Create deploy items of the resources.
+
+        Args:
+            kube_client (Kubernets):
+                Not used, set for compatibility.
+            **kwargs (dict):
+                Other arguments, set for compatibility.
+        """
+        self.renders += 1
+        if self.fail:
+            raise Exception('render failed')
+        return [self.deploy_item(r) for r in self.resources]
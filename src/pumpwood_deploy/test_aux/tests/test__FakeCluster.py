@@ -0,0 +1,179 @@
+"""Test fake kubectl and K8s API stand-in."""
+import os
+import json
+import stat
+import time
+import tempfile
+import unittest
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+from pumpwood_deploy.kubernets.readiness import ReadinessWaiter
+from pumpwood_deploy.test_aux.fake_kubectl import (
+    FakeCluster, FakeApiClient, FakeApplyError)
+
+
+MANIFEST = """
+apiVersion: v1
+kind: PersistentVolumeClaim
+metadata:
+  name: postgres-data
+spec:
+  resources:
+    requests:
+      storage: 10Gi
+---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: postgres
+spec:
+  replicas: 2
+  template:
+    metadata:
+      labels:
+        type: postgres
+---
+apiVersion: v1
+kind: Service
+metadata:
+  name: postgres
+spec:
+  selector:
+    type: postgres
+"""
+
+
+class TestFakeCluster(unittest.TestCase):
+    """Test fake cluster simulation, kubectl and API stand-ins."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_dir = os.path.join(self.temp_dir.name, 'cluster')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test__readiness_delays(self):
+        cluster = FakeCluster(
+            self.state_dir, pvc_bind_delay=0.1, ready_delay=0.2)
+        api_client = FakeApiClient(cluster, namespace='pw')
+        api_client.apply_manifest(MANIFEST)
+        self.assertEqual(
+            cluster.get_object('PersistentVolumeClaim', 'postgres-data',
+                               'pw')['status']['phase'], 'Pending')
+        self.assertEqual(
+            cluster.get_object('Endpoints', 'postgres', 'pw')['subsets'], [])
+
+        start = time.time()
+        ReadinessWaiter(get_object=cluster.get_object,
+                        poll_interval=0.02).wait({'provides': [
+                            ('pw', 'PersistentVolumeClaim', 'postgres-data'),
+                            ('pw', 'Deployment', 'postgres'),
+                            ('pw', 'Service', 'postgres')]}, timeout=5)
+        self.assertGreaterEqual(time.time() - start, 0.15)
+        deployment = api_client.get_object('Deployment', 'postgres')
+        self.assertEqual(deployment['status']['availableReplicas'], 2)
+        deployment = api_client.get_object(
+            'Deployment', 'postgres', namespace='pw', api_version='apps/v1')
+        self.assertEqual(deployment['metadata']['name'], 'postgres')
+
+        # Apply without changes does not restart the rollout
+        api_client.apply_manifest(MANIFEST)
+        self.assertEqual(
+            cluster.get_object('Deployment', 'postgres', 'pw')[
+                'metadata']['generation'], 1)
+        self.assertEqual(
+            [a['changed'] for a in cluster.applied()],
+            [True, True, True, False, False, False])
+        self.assertEqual(len(api_client.list_objects('Deployment')), 1)
+
+    def test__transient_failures(self):
+        cluster = FakeCluster(
+            self.state_dir, transient_failures={'postgres': 1})
+        document = {
+            'apiVersion': 'v1', 'kind': 'ConfigMap',
+            'metadata': {'name': 'postgres'}}
+        with self.assertRaises(FakeApplyError):
+            cluster.apply([document], namespace='pw')
+        self.assertIsNone(cluster.get_object('ConfigMap', 'postgres', 'pw'))
+        cluster.apply([document], namespace='pw')
+        self.assertIsNotNone(
+            cluster.get_object('ConfigMap', 'postgres', 'pw'))
+
+        # Failures drawn with same seed are reproducible
+        results = []
+        for _ in range(2):
+            cluster = FakeCluster(
+                self.state_dir, failure_rate=0.5, seed=10)
+            failures = []
+            for _ in range(20):
+                try:
+                    cluster.apply([document], namespace='pw')
+                    failures.append(False)
+                except FakeApplyError:
+                    failures.append(True)
+            results.append(failures)
+        self.assertEqual(results[0], results[1])
+        self.assertIn(True, results[0])
+        self.assertIn(False, results[0])
+
+    def test__kubectl(self):
+        cluster = FakeCluster(self.state_dir)
+        manifest = os.path.join(self.temp_dir.name, 'postgres.yml')
+        with open(manifest, 'w') as file:
+            file.write(MANIFEST)
+
+        self.assertEqual(
+            cluster.kubectl(['create', 'namespace', 'pw'])[0], 0)
+        self.assertEqual(
+            cluster.kubectl(['create', 'namespace', 'pw'])[0], 1)
+        return_code, _, _ = cluster.kubectl([
+            'apply', '--server-side', '--field-manager=pumpwood-deploy',
+            '-f', manifest, '--namespace=pw'])
+        self.assertEqual(return_code, 0)
+
+        return_code, stdout, _ = cluster.kubectl([
+            'get', 'deployment', 'postgres', '--namespace=pw',
+            '--output=json'])
+        self.assertEqual(json.loads(stdout)['spec']['replicas'], 2)
+        self.assertEqual(cluster.kubectl([
+            'get', 'secret', 'missing', '--namespace=pw',
+            '--ignore-not-found', '-o', 'json']), (0, '', ''))
+        return_code, stdout, _ = cluster.kubectl([
+            'get', 'services', '-n', 'pw', '-o', 'json'])
+        self.assertEqual(len(json.loads(stdout)['items']), 1)
+        self.assertEqual(
+            set(a['field_manager'] for a in cluster.applied()),
+            set(['pumpwood-deploy']))
+
+    def test__on_path(self):
+        cluster = FakeCluster(self.state_dir, apply_latency=0.05)
+        manifest = os.path.join(self.temp_dir.name, 'postgres.yml')
+        with open(manifest, 'w') as file:
+            file.write(MANIFEST)
+        script = os.path.join(self.temp_dir.name, 'postgres.sh')
+        with open(script, 'w') as file:
+            file.write('kubectl apply -f {} --namespace=pw\n'.format(
+                manifest))
+        os.chmod(script, stat.S_IRWXU)
+
+        kubernets = Kubernets(
+            k8_provider='aws', k8_namespace='pw',
+            k8_deploy_args={'region': 'us-east-1', 'cluster_name': 'fake'},
+            login_cache_path=os.path.join(
+                self.temp_dir.name, 'login_cache.json'))
+        with cluster.on_path():
+            kubernets.run_deploy_commmands([{
+                'command': 'run', 'file': script, 'sleep': 0,
+                'name': 'postgres', 'namespace': 'pw'}])
+            self.assertEqual(
+                len(kubernets.list_objects('PersistentVolumeClaim')), 1)
+        self.assertEqual(kubernets.context, 'fake-cluster')
+        self.assertEqual(
+            [(a['kind'], a['namespace']) for a in cluster.applied()], [
+                ('PersistentVolumeClaim', 'pw'), ('Deployment', 'pw'),
+                ('Service', 'pw')])
+        # Client-side apply sets last applied configuration
+        service = cluster.get_object('Service', 'postgres', 'pw')
+        self.assertIn(
+            'kubectl.kubernetes.io/last-applied-configuration',
+            service['metadata']['annotations'])
@@ -0,0 +1,95 @@
+"""Test offline validation of K8s manifests."""
+import unittest
+from pumpwood_deploy.test_aux.k8s_schema import (
+    get_validator, validate_manifests)
+
+
+DEPLOYMENT = """
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: pumpwood-auth-app
+spec:
+  replicas: {replicas}
+  selector:
+    matchLabels:
+      endpoint: pumpwood-auth-app
+  template:
+    metadata:
+      labels:
+        endpoint: pumpwood-auth-app
+    spec:
+      containers:
+      - name: pumpwood-auth-app
+        image: pumpwood-auth-app:1.0
+        imagePullPolicy: IfNotPresent
+        resources:
+          requests:
+            cpu: 1
+            memory: 1Gi
+        env:
+        - name: DB_PORT
+          value: {port}
+        ports:
+        - containerPort: 5000
+---
+apiVersion: v1
+kind: Service
+metadata:
+  name: pumpwood-auth-app
+spec:
+  type: ClusterIP
+  ports:
+  - port: 5000
+    targetPort: 5000
+  selector:
+    endpoint: pumpwood-auth-app
+"""
+
+
+class TestSchemaValidator(unittest.TestCase):
+    """Test offline validation of K8s manifests."""
+
+    def test__valid(self):
+        errors = get_validator().validate(
+            DEPLOYMENT.format(replicas=1, port='"5432"'))
+        self.assertEqual(errors, [])
+
+    def test__type_errors(self):
+        errors = get_validator().validate(
+            DEPLOYMENT.format(replicas='"1"', port=5432))
+        self.assertEqual(errors, [
+            'Deployment/pumpwood-auth-app spec.replicas: expected '
+            'integer, got str',
+            'Deployment/pumpwood-auth-app '
+            'spec.template.spec.containers[0].env[0].value: expected '
+            'string, got int'])
+
+    def test__unknown_and_required_fields(self):
+        errors = get_validator().validate(
+            "apiVersion: v1\n"
+            "kind: Service\n"
+            "metadata:\n"
+            "  name: app\n"
+            "spec:\n"
+            "  type: Internal\n"
+            "  ports:\n"
+            "  - targetPort: 5000\n"
+            "    prot: TCP\n")
+        self.assertEqual(len(errors), 3)
+        self.assertIn('is not one of', errors[0])
+        self.assertIn('missing required field "port"', errors[1])
+        self.assertIn('unknown field "prot"', errors[2])
+
+    def test__unknown_kind(self):
+        errors = get_validator().validate(
+            "apiVersion: v1\nkind: Foo\nmetadata:\n  name: foo\n")
+        self.assertEqual(errors, ['Foo/foo no schema for v1 Foo'])
+
+    def test__validate_manifests(self):
+        validate_manifests([
+            DEPLOYMENT.format(replicas=i, port='"5432"') for i in range(5)])
+        with self.assertRaisesRegex(Exception, r'manifest\[1\] .*replicas'):
+            validate_manifests([
+                DEPLOYMENT.format(replicas=1, port='"5432"'),
+                DEPLOYMENT.format(replicas='xx', port='"5432"')])
@@ -0,0 +1,125 @@
+"""Test database connection budget of the stack."""
+import os
+import shutil
+import tempfile
+import unittest
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.connection_budget import (
+    ConnectionBudget, format_connections_report)
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+from pumpwood_deploy.manifest import EnvPatch, Selector
+from pumpwood_deploy.microservices.postgres.deploy import (
+    PostgresDatabase, PGBouncerDatabase)
+from pumpwood_deploy.test_aux.microservices import auth_microservice
+
+
+AUTOSCALED = {
+    'app_workers': 10, 'app_requests_cpu': '500m',
+    'app_autoscale': {'min_replicas': 2, 'max_replicas': 20}}
+"""Auth arguments with 10 workers and up to 20 replicas."""
+
+
+class TestConnectionBudget(unittest.TestCase):
+    """Test connection graph and budget checks."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        deploy = DeployPumpWood.__new__(DeployPumpWood)
+        deploy.kube_client = Kubernets(
+            k8_provider='aws',
+            k8_deploy_args={'region': 'us-east-1', 'cluster_name': 'pw'},
+            k8_namespace='pumpwood', login_cache_path=os.path.join(
+                self.temp_dir.name, 'login_cache.json'))
+        deploy.namespace = 'pumpwood'
+        deploy.microsservices_to_deploy = []
+        deploy.patches = []
+        deploy.sizing = {}
+        deploy.microservice_sizing = {}
+        deploy.workers_formula = None
+        deploy.connection_budget = ConnectionBudget()
+        deploy.output_path = os.path.join(self.temp_dir.name, 'outputs')
+        deploy.render_cache = None
+        self.deploy = deploy
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test__pgbouncer_database(self):
+        self.deploy.microsservices_to_deploy = [
+            PostgresDatabase(
+                db_username='pumpwood', db_password='test-password',
+                name='postgres-main', disk_size='10Gi',
+                disk_name='postgres-main', keystore_path=os.path.join(
+                    self.temp_dir.name, 'keystore')),
+            PGBouncerDatabase(
+                name='postgres-pumpwood-auth', postgres_secret='postgres-main',
+                postgres_database='pumpwood_auth',
+                postgres_host='postgres-main'),
+            auth_microservice(**AUTOSCALED)]
+        plan = self.deploy.connections_report(print_report=False)
+
+        self.assertEqual(len(plan['clients']), 1)
+        self.assertEqual(plan['clients'][0]['connections'], 200)
+        bouncer = plan['pgbouncers']['postgres-pumpwood-auth']
+        self.assertEqual(bouncer['postgres'], 'postgres-main')
+        self.assertEqual(bouncer['client_connections'], 200)
+        self.assertEqual(bouncer['server_connections'], 20)
+        server = plan['postgres']['postgres-main']
+        self.assertEqual(server['max_connections'], 1000)
+        self.assertEqual(server['server_connections'], 20)
+        self.assertEqual(len(plan['problems']), 1)
+        self.assertIn('max_client_conn', plan['problems'][0])
+        self.assertEqual(
+            plan['suggestions'], [
+                'Set PGBOUNCER_MAX_CLIENT_CONN of [postgres-pumpwood-auth] '
+                'to at least 200'])
+        self.assertIn('postgres/postgres-main', format_connections_report(
+            plan))
+
+        # Exceeded budgets are returned with the deploy commands
+        results = self.deploy.create_deploy_files()
+        self.assertEqual(results['connection_problems'], plan['problems'])
+        self.deploy.set_connection_budget(False)
+        results = self.deploy.create_deploy_files()
+        self.assertEqual(results['connection_problems'], [])
+
+        # Strict budget fails before files are created
+        self.deploy.set_connection_budget({'strict': True})
+        shutil.rmtree(self.deploy.output_path)
+        with self.assertRaises(Exception):
+            self.deploy.create_deploy_files()
+        self.assertFalse(os.path.exists(os.path.join(
+            self.deploy.output_path, 'deploy_output', 'resources',
+            '000__postgres_sole__postgres-main__secrets.yml')))
+
+    def test__test_database(self):
+        self.deploy.microsservices_to_deploy = [
+            auth_microservice(test_db_version='0.0', **AUTOSCALED)]
+        self.deploy.add_patch(EnvPatch(
+            {'PGBOUNCER_MAX_CLIENT_CONN': 500,
+             'PGBOUNCER_DEFAULT_POOL_SIZE': 150},
+            containers=['pgbouncer'], selector=Selector(kinds=['Deployment'])))
+        plan = self.deploy.connections_report(print_report=False)
+
+        # Bouncer and Postgres run at the same pod
+        bouncer = plan['pgbouncers']['postgres-pumpwood-auth']
+        self.assertEqual(bouncer['postgres'], 'postgres-pumpwood-auth')
+        self.assertEqual(bouncer['server_connections'], 150)
+        server = plan['postgres']['postgres-pumpwood-auth']
+        self.assertEqual(server['max_connections'], 100)
+        self.assertEqual(len(plan['problems']), 1)
+        self.assertIn('Postgres', plan['problems'][0])
+        self.assertEqual(
+            plan['suggestions'], [
+                "Set PGBOUNCER_DEFAULT_POOL_SIZE of "
+                "['postgres-pumpwood-auth'] to at most 97"])
+
+    def test__external_database(self):
+        self.deploy.microsservices_to_deploy = [
+            auth_microservice(db_host='db.example.com', **AUTOSCALED)]
+        plan = self.deploy.connections_report(print_report=False)
+        server = plan['postgres']['db.example.com']
+        self.assertIsNone(server['max_connections'])
+        self.assertEqual(server['server_connections'], 200)
+        self.assertEqual(plan['problems'], [])
+        self.assertEqual(self.deploy.connection_budget.check(plan), [])
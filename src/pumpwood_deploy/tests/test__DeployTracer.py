@@ -0,0 +1,41 @@
+"""Test deploy timing trace."""
+import os
+import json
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pumpwood_deploy.trace import DeployTracer
+
+
+class TestDeployTracer(unittest.TestCase):
+    """Test spans, Chrome trace and summary."""
+
+    def test__spans(self):
+        tracer = DeployTracer()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(
+                lambda i: tracer.add_span(
+                    'apply-%d' % i, category='apply', start=i, end=2 * i),
+                range(10)))
+        with tracer.span('secrets', category='wait', mode='sleep'):
+            pass
+        self.assertEqual(len(tracer.spans), 11)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'trace', 'deploy_trace.json')
+            tracer.save(path)
+            with open(path, 'r') as file:
+                trace = json.load(file)
+        events = trace['traceEvents']
+        self.assertEqual(len(events), 11)
+        self.assertTrue(all(e['ph'] == 'X' for e in events))
+
+        summary = tracer.summary(top=3)
+        self.assertIn('apply-9', summary)
+        self.assertNotIn('apply-5', summary)
+
+    def test__disabled(self):
+        tracer = DeployTracer(enabled=False)
+        with tracer.span('secrets', category='wait'):
+            pass
+        self.assertEqual(tracer.spans, [])
@@ -0,0 +1,86 @@
+"""Test fan-out deploy of a stack to many namespaces."""
+import os
+import tempfile
+import unittest
+import yaml
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.fanout import FanOutDeploy, DeployTarget
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+from pumpwood_deploy.manifest import ReplicasPatch
+from pumpwood_deploy.test_aux.fake_kubectl import FakeCluster
+from pumpwood_deploy.test_aux.microservices import StubMicroservice
+
+
+class TestFanOutDeploy(unittest.TestCase):
+    """Test fan-out deploy of a stack to many namespaces."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = self.temp_dir.name
+        self.stack_microservices = [
+            StubMicroservice('a'), StubMicroservice('b')]
+        stack = DeployPumpWood.__new__(DeployPumpWood)
+        stack.kube_client = Kubernets(
+            k8_provider='aws',
+            k8_deploy_args={'region': 'us-east-1', 'cluster_name': 'pw'},
+            k8_namespace='pumpwood', login_cache_path=os.path.join(
+                self.path, 'login_cache.json'))
+        stack.namespace = 'pumpwood'
+        stack.microsservices_to_deploy = list(self.stack_microservices)
+        stack.patches = []
+        stack.sizing = {}
+        stack.microservice_sizing = {}
+        stack.workers_formula = None
+        stack.connection_budget = None
+        stack.output_path = os.path.join(self.path, 'outputs')
+        stack.render_cache = None
+        self.stack = stack
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test__unique_namespaces(self):
+        with self.assertRaisesRegex(Exception, 'same namespace'):
+            FanOutDeploy(self.stack, targets=[
+                DeployTarget('dev', k8_namespace='dev'),
+                DeployTarget('dev2', k8_namespace='dev')])
+
+    def test__deploy(self):
+        cluster = FakeCluster(os.path.join(self.path, 'cluster'))
+        fanout = FanOutDeploy(self.stack, output_path=os.path.join(
+            self.path, 'targets'), targets=[
+                DeployTarget('dev'),
+                DeployTarget(
+                    'client1', patches=[ReplicasPatch(3)],
+                    microservices=[StubMicroservice('c')]),
+                DeployTarget(
+                    'broken',
+                    microservices=[StubMicroservice('x', fail=True)])])
+        with cluster.on_path():
+            report = fanout.deploy(max_targets=3)
+
+        self.assertEqual(
+            {k: r['status'] for k, r in report.items()},
+            {'dev': 'ok', 'client1': 'ok', 'broken': 'failed'})
+        self.assertEqual(report['broken']['error'], 'render failed')
+        # Stack microservices are rendered once for all targets
+        self.assertEqual(
+            [m.renders for m in self.stack_microservices], [1, 1])
+        self.assertEqual(fanout.render_cache.hits, 4)
+
+        objects = {
+            (o['metadata']['namespace'], o['metadata']['name']):
+            o['spec']['replicas'] for o in cluster.objects()
+            if o['kind'] == 'Deployment'}
+        self.assertEqual(objects, {
+            ('dev', 'a'): 1, ('dev', 'b'): 1, ('client1', 'a'): 3,
+            ('client1', 'b'): 3, ('client1', 'c'): 3})
+        manifest = os.path.join(
+            self.path, 'targets', 'dev', 'deploy_output', 'resources',
+            '000__a__deploy.yml')
+        with open(manifest) as file:
+            self.assertEqual(yaml.safe_load(file)['metadata']['name'], 'a')
+        self.assertTrue(os.path.exists(os.path.join(
+            self.path, 'targets', 'client1', 'deploy_state.json')))
+        self.assertTrue(os.path.exists(os.path.join(
+            self.path, 'targets', 'client1', 'deploy_trace.json')))
@@ -0,0 +1,26 @@
+"""Test lazy template registry."""
+import unittest
+from pumpwood_deploy.template_registry import get_template, LazyTemplate
+
+
+class TestLazyTemplate(unittest.TestCase):
+    """Test templates are loaded on first use and cached."""
+
+    def test__lazy_load(self):
+        template = LazyTemplate(
+            'kubernets/bash_templates/kubectl_apply.sh')
+        self.assertIsNone(template._content)
+        content = template.format(file='a.yml', namespace='pumpwood')
+        self.assertIn('a.yml', content)
+        self.assertIn('--namespace=pumpwood', content)
+        self.assertIsNotNone(template._content)
+
+    def test__registry(self):
+        path = 'microservices/api_gateway/resources/service__external.yml'
+        template = get_template(path)
+        self.assertIs(template, get_template(path))
+        content = template.render(
+            public_ip='10.0.0.1', firewall_ips=['10.0.0.2/32'])
+        self.assertIn('loadBalancerIP: 10.0.0.1', content)
+        self.assertIn('- 10.0.0.2/32', content)
+        self.assertEqual(str(template), template.read())
@@ -0,0 +1,111 @@
+"""Test manifest object model and structured patches."""
+import unittest
+import yaml
+from pumpwood_deploy.manifest import (
+    Manifest, Selector, ResourcesPatch, EnvPatch, AffinityPatch,
+    ReplicasPatch, patch_content, patch_deploy_item)
+
+
+MANIFEST = """
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: pumpwood-auth-app
+  labels:
+    function: app
+spec:
+  replicas: 1
+  template:
+    spec:
+      containers:
+      - name: pumpwood-auth-app
+        env:
+        - name: N_WORKERS
+          value: "2"
+      - name: sidecar
+---
+apiVersion: v1
+kind: Service
+metadata:
+  name: pumpwood-auth-app
+spec:
+  ports:
+  - port: 5000
+---
+apiVersion: batch/v1
+kind: CronJob
+metadata:
+  name: backup
+spec:
+  jobTemplate:
+    spec:
+      template:
+        spec:
+          containers:
+          - name: backup
+"""
+
+
+class TestManifest(unittest.TestCase):
+    """Test manifest object model and structured patches."""
+
+    def test__parse(self):
+        manifest = Manifest.parse(MANIFEST)
+        self.assertEqual(
+            [o.kind for o in manifest],
+            ['Deployment', 'Service', 'CronJob'])
+        self.assertEqual(
+            [c.name for c in manifest.objects[2].containers()], ['backup'])
+        self.assertEqual(manifest.objects[1].containers(), [])
+
+    def test__unchanged_keeps_content(self):
+        content = patch_content(MANIFEST, [
+            ReplicasPatch(1, selector=Selector(names=['pumpwood-*']))])
+        self.assertIs(content, MANIFEST)
+
+    def test__resources_and_env(self):
+        content = patch_content(MANIFEST, [
+            ResourcesPatch(
+                requests={'cpu': '100m'}, limits={'memory': '1Gi'},
+                containers=['*-app']),
+            EnvPatch({'N_WORKERS': 4, 'DEBUG': 'FALSE'},
+                     containers=['*-app'])])
+        docs = list(yaml.safe_load_all(content))
+        containers = docs[0]['spec']['template']['spec']['containers']
+        self.assertEqual(containers[0]['resources'], {
+            'requests': {'cpu': '100m'}, 'limits': {'memory': '1Gi'}})
+        self.assertEqual(containers[0]['env'], [
+            {'name': 'N_WORKERS', 'value': '4'},
+            {'name': 'DEBUG', 'value': 'FALSE'}])
+        self.assertNotIn('resources', containers[1])
+        self.assertEqual(docs[1], yaml.safe_load(MANIFEST.split('---')[1]))
+
+    def test__selector(self):
+        content = patch_content(MANIFEST, [
+            ReplicasPatch(3, selector=Selector(labels={'function': 'app'})),
+            AffinityPatch(
+                node_selector={'pool': 'jobs'},
+                tolerations=[{'key': 'jobs', 'effect': 'NoSchedule'}],
+                selector=Selector(kinds=['CronJob']))])
+        docs = list(yaml.safe_load_all(content))
+        self.assertEqual(docs[0]['spec']['replicas'], 3)
+        self.assertNotIn(
+            'nodeSelector', docs[0]['spec']['template']['spec'])
+        pod_spec = docs[2]['spec']['jobTemplate']['spec']['template']['spec']
+        self.assertEqual(pod_spec['nodeSelector'], {'pool': 'jobs'})
+        self.assertEqual(len(pod_spec['tolerations']), 1)
+
+    def test__patch_deploy_item(self):
+        patches = [ReplicasPatch(2)]
+        file_item = {
+            'type': 'secrets_file', 'name': 'key', 'path': 'key.json',
+            'sleep': 0}
+        self.assertIs(patch_deploy_item(file_item, patches), file_item)
+        deploy_item = {
+            'type': 'deploy', 'name': 'auth', 'content': MANIFEST,
+            'sleep': 0}
+        patched = patch_deploy_item(deploy_item, patches)
+        self.assertEqual(deploy_item['content'], MANIFEST)
+        self.assertEqual(
+            next(yaml.safe_load_all(patched['content']))['spec']['replicas'],
+            2)
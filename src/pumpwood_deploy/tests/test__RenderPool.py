@@ -0,0 +1,76 @@
+"""Test rendering the stack with thread and process pools."""
+import os
+import pickle
+import tempfile
+import unittest
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+from pumpwood_deploy.microservices.pumpwood_datalake.deploy import (
+    PumpWoodDatalakeMicroservice)
+from pumpwood_deploy.test_aux.microservices import auth_microservice
+
+
+def read_files(path: str) -> dict:
+    """Content of the files created at a directory by relative path."""
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            file_path = os.path.join(root, name)
+            with open(file_path) as file:
+                files[os.path.relpath(file_path, path)] = file.read()
+    return files
+
+
+class TestRenderPool(unittest.TestCase):
+    """Test rendering the stack with thread and process pools."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = self.temp_dir.name
+        deploy = DeployPumpWood.__new__(DeployPumpWood)
+        deploy.kube_client = Kubernets(
+            k8_provider='aws',
+            k8_deploy_args={'region': 'us-east-1', 'cluster_name': 'pw'},
+            k8_namespace='pumpwood', login_cache_path=os.path.join(
+                self.path, 'login_cache.json'))
+        deploy.namespace = 'pumpwood'
+        deploy.microsservices_to_deploy = [
+            auth_microservice(),
+            PumpWoodDatalakeMicroservice(
+                bucket_name="test-pumpwood", app_version="0.1",
+                worker_version="0.1")]
+        deploy.patches = []
+        deploy.sizing = {}
+        deploy.microservice_sizing = {}
+        deploy.workers_formula = None
+        deploy.connection_budget = None
+        deploy.render_cache = None
+        self.deploy = deploy
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test__pickle_client(self):
+        kube_client = self.deploy.kube_client
+        kube_client.context = 'pw'
+        kube_client._connected = True
+        unpickled = pickle.loads(pickle.dumps(kube_client))
+        self.assertEqual(unpickled.k8_namespace, 'pumpwood')
+        self.assertIsNone(unpickled.context)
+        self.assertFalse(unpickled._connected)
+        with unpickled._connect_lock, unpickled.login_cache._lock:
+            pass
+
+    def test__process_pool(self):
+        results = {}
+        for render_pool in ['thread', 'process']:
+            self.deploy.output_path = os.path.join(self.path, render_pool)
+            cmds = self.deploy.create_deploy_files(
+                render_workers=2, render_pool=render_pool)
+            results[render_pool] = (
+                [c['file'] for c in cmds['microservice_cmds']],
+                read_files(self.deploy.output_path))
+        self.assertEqual(
+            [os.path.basename(f) for f in results['thread'][0]],
+            [os.path.basename(f) for f in results['process'][0]])
+        self.assertEqual(results['thread'][1], results['process'][1])
@@ -0,0 +1,112 @@
+"""Test resuming a deploy that failed midway."""
+import os
+import json
+import tempfile
+import unittest
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+from pumpwood_deploy.kubernets.manifest_cache import DeployCheckpoint
+from pumpwood_deploy.test_aux.fake_kubectl import FakeCluster
+from pumpwood_deploy.test_aux.microservices import StubMicroservice
+
+
+class TestResumeDeploy(unittest.TestCase):
+    """Test resuming a deploy that failed midway."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = self.temp_dir.name
+        deploy = DeployPumpWood.__new__(DeployPumpWood)
+        deploy.kube_client = Kubernets(
+            k8_provider='aws',
+            k8_deploy_args={'region': 'us-east-1', 'cluster_name': 'pw'},
+            k8_namespace='pumpwood', login_cache_path=os.path.join(
+                self.path, 'login_cache.json'))
+        deploy.namespace = 'pumpwood'
+        deploy.microsservices_to_deploy = [
+            StubMicroservice(name, resources=['configmap'])
+            for name in ['a', 'b', 'c']]
+        deploy.patches = []
+        deploy.sizing = {}
+        deploy.microservice_sizing = {}
+        deploy.workers_formula = None
+        deploy.connection_budget = None
+        deploy.output_path = os.path.join(self.path, 'outputs')
+        deploy.render_cache = None
+        self.deploy = deploy
+        self.kwargs = {
+            'max_workers': 1,
+            'state_path': os.path.join(self.path, 'deploy_state.json'),
+            'save_trace': False,
+            'checkpoint_path': os.path.join(self.path, 'checkpoint.json')}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def applied_names(self, cluster: FakeCluster) -> list:
+        return [a['name'] for a in cluster.applied()]
+
+    def test__resume(self):
+        cluster = FakeCluster(
+            os.path.join(self.path, 'cluster'),
+            transient_failures={'b-config': 1})
+        with cluster.on_path():
+            self.deploy.deploy_microservices(**self.kwargs)
+        self.assertEqual(
+            self.applied_names(cluster), ['a-config', 'c-config'])
+
+        # Failed command is kept pending at the checkpoint
+        with open(self.kwargs['checkpoint_path']) as file:
+            checkpoint = json.load(file)
+        self.assertEqual(
+            sorted(checkpoint['resources']),
+            ['pumpwood/a__config', 'pumpwood/c__config'])
+
+        with cluster.on_path():
+            self.deploy.resume(**self.kwargs)
+        self.assertEqual(
+            self.applied_names(cluster), ['a-config', 'c-config', 'b-config'])
+        self.assertFalse(os.path.exists(self.kwargs['checkpoint_path']))
+
+    def test__resume_changed(self):
+        checkpoint = DeployCheckpoint(path=self.kwargs['checkpoint_path'])
+        cmds = self.deploy.create_deploy_files()['microservice_cmds']
+        for c in cmds:
+            checkpoint.update(c)
+        self.deploy.microsservices_to_deploy[0].value = 'changed'
+
+        cluster = FakeCluster(os.path.join(self.path, 'cluster'))
+        with cluster.on_path():
+            self.deploy.resume(**self.kwargs)
+        self.assertEqual(self.applied_names(cluster), ['a-config'])
+
+    def test__new_deploy_clears_checkpoint(self):
+        checkpoint = DeployCheckpoint(path=self.kwargs['checkpoint_path'])
+        for c in self.deploy.create_deploy_files()['microservice_cmds']:
+            checkpoint.update(c)
+
+        cluster = FakeCluster(os.path.join(self.path, 'cluster'))
+        with cluster.on_path():
+            self.deploy.deploy_microservices(**self.kwargs)
+        self.assertEqual(
+            self.applied_names(cluster), ['a-config', 'b-config', 'c-config'])
+
+    def test__concurrent_dependency_failure(self):
+        self.deploy.microsservices_to_deploy = [
+            StubMicroservice(name, resources=['configmap', 'deployment'])
+            for name in ['a', 'b']]
+        kwargs = dict(self.kwargs, max_workers=2)
+        cluster = FakeCluster(
+            os.path.join(self.path, 'cluster'),
+            transient_failures={'b-config': 1})
+        with cluster.on_path():
+            with self.assertRaises(Exception):
+                self.deploy.deploy_microservices(**kwargs)
+        # Deployment that uses the failed config map is not applied
+        self.assertNotIn('b', self.applied_names(cluster))
+
+        with cluster.on_path():
+            self.deploy.resume(**kwargs)
+        self.assertEqual(
+            sorted(self.applied_names(cluster)),
+            ['a', 'a-config', 'b', 'b-config'])
@@ -0,0 +1,139 @@
+"""Test sizing profiles of the microservices resources."""
+import os
+import tempfile
+import unittest
+import yaml
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.kubernets.autoscale import AppAutoscale
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+from pumpwood_deploy.microservices.pumpwood_datalake.deploy import (
+    PumpWoodDatalakeMicroservice)
+from pumpwood_deploy.sizing import SizingPatch, SizingProfile
+from pumpwood_deploy.manifest import Manifest
+from pumpwood_deploy.test_aux.kubenets import validate_k8s_yml
+from pumpwood_deploy.test_aux.microservices import (
+    StubMicroservice, POD_TYPES)
+
+
+def resources(content: str) -> dict:
+    """Resources of the containers by type label."""
+    obj = yaml.safe_load(content)
+    pod_type = obj['spec']['template']['metadata']['labels']['type']
+    spec = obj['spec']['template']['spec']
+    return pod_type, [
+        c.get('resources') for c in
+        spec.get('initContainers', []) + spec['containers']]
+
+
+class TestSizing(unittest.TestCase):
+    """Test sizing profiles are applied by the pod type."""
+
+    def test__sizing_patch(self):
+        datalake = StubMicroservice('datalake', resources=['db', 'worker'])
+        db, worker = [
+            Manifest.parse(d['content']).objects[0]
+            for d in datalake.create_deployment_file()]
+        changed = SizingPatch({'app': 'small', 'db': 'guaranteed'}).apply(
+            db)
+        self.assertTrue(changed)
+        for container in db.containers(init=True):
+            self.assertEqual(container.data['resources'], {
+                'requests': {'cpu': '2000m', 'memory': '4Gi'},
+                'limits': {'cpu': '2000m', 'memory': '4Gi'}})
+
+        self.assertFalse(SizingPatch({'app': 'small'}).apply(worker))
+
+    def test__qos_class(self):
+        self.assertEqual(
+            SizingPatch({'db': 'guaranteed'}).profiles['db'].qos_class,
+            'Guaranteed')
+        self.assertEqual(
+            SizingPatch({'app': 'medium'}).profiles['app'].qos_class,
+            'Burstable')
+        self.assertEqual(SizingProfile({}, {}).qos_class, 'BestEffort')
+
+    def test__invalid(self):
+        with self.assertRaises(Exception):
+            SizingPatch({'app': 'huge'})
+        with self.assertRaises(Exception):
+            SizingPatch({'cache': 'small'})
+
+    def test__deploy_sizing(self):
+        datalake = StubMicroservice('datalake', resources=POD_TYPES)
+        auth = StubMicroservice('auth', resources=POD_TYPES)
+        deploy = DeployPumpWood.__new__(DeployPumpWood)
+        deploy.kube_client = None
+        deploy.namespace = 'pumpwood'
+        deploy.microsservices_to_deploy = [datalake, auth]
+        deploy.patches = []
+        deploy.sizing = {}
+        deploy.microservice_sizing = {}
+        deploy.workers_formula = None
+        deploy.set_sizing(app='medium', worker='small')
+        deploy.set_sizing(
+            app='large', db='guaranteed', microservice=datalake)
+
+        results = {}
+        for manifest in deploy.iter_manifests():
+            validate_k8s_yml(manifest['content'])
+            pod_type, containers = resources(manifest['content'])
+            name = manifest['name'].split('__')[0]
+            results[name, pod_type] = containers[-1]
+
+        self.assertEqual(
+            results['datalake', 'app']['requests'],
+            {'cpu': '2000m', 'memory': '4Gi'})
+        self.assertEqual(
+            results['datalake', 'worker']['limits'],
+            {'cpu': '1000m', 'memory': '1Gi'})
+        self.assertEqual(
+            results['datalake', 'db']['limits'],
+            {'cpu': '2000m', 'memory': '4Gi'})
+        self.assertEqual(
+            results['auth', 'app']['requests'],
+            {'cpu': '500m', 'memory': '1Gi'})
+        # Template resources are kept if no profile is set
+        self.assertEqual(
+            results['auth', 'db']['requests'],
+            {'cpu': '1m', 'memory': '20Mi'})
+        self.assertEqual(
+            results['auth', 'static']['limits'],
+            {'cpu': '12000m', 'memory': '60Gi'})
+
+    def test__sizing_autoscale(self):
+        # Default app_requests_cpu is set by the sizing profile
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        deploy = DeployPumpWood.__new__(DeployPumpWood)
+        deploy.kube_client = Kubernets(
+            k8_provider='aws',
+            k8_deploy_args={'region': 'us-east-1', 'cluster_name': 'pw'},
+            k8_namespace='pumpwood', login_cache_path=os.path.join(
+                temp_dir.name, 'login_cache.json'))
+        deploy.namespace = 'pumpwood'
+        deploy.microsservices_to_deploy = [PumpWoodDatalakeMicroservice(
+            bucket_name="test-pumpwood", app_version="0.1",
+            worker_version="0.1", app_autoscale=AppAutoscale())]
+        deploy.patches = []
+        deploy.sizing = {}
+        deploy.microservice_sizing = {}
+        deploy.workers_formula = None
+        deploy.connection_budget = None
+        deploy.output_path = os.path.join(temp_dir.name, 'outputs')
+        deploy.render_cache = None
+        with self.assertRaisesRegex(Exception, 'below min_cpu_request'):
+            list(deploy.iter_manifests())
+        with self.assertRaisesRegex(Exception, 'below min_cpu_request'):
+            deploy.create_deploy_files(render_workers=1)
+
+        deploy.set_sizing(app='medium')
+        app = [
+            m for m in deploy.iter_manifests()
+            if m['name'] == 'pumpwood_datalake__deploy'][0]
+        documents = {
+            d['kind']: d for d in yaml.safe_load_all(app['content'])}
+        self.assertIn('HorizontalPodAutoscaler', documents)
+        deployment = documents['Deployment']
+        container = deployment['spec']['template']['spec']['containers'][0]
+        self.assertEqual(container['resources']['requests']['cpu'], '500m')
+        deploy.create_deploy_files(render_workers=1)
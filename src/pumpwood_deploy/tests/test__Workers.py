@@ -0,0 +1,121 @@
+"""Test number of app workers derived from the pod resources."""
+import unittest
+from decimal import Decimal
+from pumpwood_deploy.deploy import DeployPumpWood
+from pumpwood_deploy.manifest import Manifest, EnvPatch
+from pumpwood_deploy.workers import (
+    WorkersFormula, AutoWorkersPatch, format_workers_report)
+from pumpwood_deploy.test_aux.kubenets import validate_k8s_yml
+from pumpwood_deploy.test_aux.microservices import auth_microservice
+
+
+APP = """
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app
+spec:
+  template:
+    metadata:
+      labels:
+        type: {type}
+    spec:
+      containers:
+      - name: app
+        resources:
+          requests:
+            cpu: 500m
+            memory: 1Gi
+          limits:
+            cpu: {cpu}
+            memory: {memory}
+        env:
+        - name: N_WORKERS
+          value: "10"
+"""
+
+
+def env_value(obj, name: str) -> str:
+    """Value of an env variable of the first container."""
+    container = obj.containers()[0]
+    return [
+        var['value'] for var in container.data['env']
+        if var['name'] == name][0]
+
+
+class TestWorkers(unittest.TestCase):
+    """Test auto workers patch and workers report."""
+
+    def test__formula(self):
+        formula = WorkersFormula()
+        self.assertEqual(formula.workers(cpu=Decimal('0.5')), 2)
+        self.assertEqual(formula.workers(cpu=Decimal(2)), 5)
+        # Memory bound: (1Gi - 256Mi) / 256Mi
+        self.assertEqual(
+            formula.workers(cpu=Decimal(4), memory=Decimal(2 ** 30)), 3)
+        self.assertEqual(formula.workers(cpu=Decimal(100)), 16)
+        self.assertEqual(formula.workers(memory=Decimal(2 ** 20)), 1)
+        self.assertIsNone(formula.workers())
+        custom = WorkersFormula.from_arg(
+            {'workers_per_cpu': 4, 'extra_workers': 0})
+        self.assertEqual(custom.workers(cpu=Decimal(2)), 8)
+        with self.assertRaises(Exception):
+            WorkersFormula(min_workers=4, max_workers=2)
+        with self.assertRaises(Exception):
+            WorkersFormula(worker_memory='a lot')
+
+    def test__patch(self):
+        obj = Manifest.parse(APP.format(
+            type='app', cpu='2000m', memory='4Gi')).objects[0]
+        self.assertTrue(AutoWorkersPatch().apply(obj))
+        self.assertEqual(env_value(obj, 'N_WORKERS'), '5')
+
+        # Request is used when there is no limit
+        obj = Manifest.parse(APP.format(
+            type='app', cpu='null', memory='null')).objects[0]
+        self.assertTrue(AutoWorkersPatch().apply(obj))
+        self.assertEqual(env_value(obj, 'N_WORKERS'), '2')
+
+        worker = Manifest.parse(APP.format(
+            type='worker', cpu='2000m', memory='4Gi')).objects[0]
+        self.assertFalse(AutoWorkersPatch().apply(worker))
+
+    def test__workers_report(self):
+        autoscaled = auth_microservice(
+            app_requests_cpu="500m",
+            app_autoscale={'min_replicas': 2, 'max_replicas': 8})
+        deploy = DeployPumpWood.__new__(DeployPumpWood)
+        deploy.kube_client = None
+        deploy.namespace = 'pumpwood'
+        deploy.microsservices_to_deploy = [autoscaled]
+        deploy.patches = []
+        deploy.sizing = {}
+        deploy.microservice_sizing = {}
+        deploy.workers_formula = None
+
+        # Without auto workers app_workers is kept
+        report = deploy.workers_report(print_report=False)
+        result = report['PumpWoodAuthMicroservice'][0]
+        self.assertEqual(result['workers'], 10)
+
+        deploy.set_sizing(app='medium')
+        deploy.set_auto_workers()
+        for manifest in deploy.iter_manifests():
+            validate_k8s_yml(manifest['content'])
+        report = deploy.workers_report(print_report=False)
+        result = report['PumpWoodAuthMicroservice'][0]
+        self.assertEqual(result['deployment'], 'pumpwood-auth-app')
+        self.assertEqual(result['workers'], 5)
+        self.assertEqual(result['replicas'], 2)
+        self.assertEqual(result['max_replicas'], 8)
+        self.assertEqual(result['concurrency'], 10)
+        self.assertEqual(result['max_concurrency'], 40)
+        table = format_workers_report(report)
+        self.assertIn('2-8', table)
+        self.assertIn('10-40', table)
+
+        # Patches added by the user win over auto workers
+        deploy.add_patch(EnvPatch({'N_WORKERS': 3}))
+        report = deploy.workers_report(print_report=False)
+        self.assertEqual(
+            report['PumpWoodAuthMicroservice'][0]['workers'], 3)
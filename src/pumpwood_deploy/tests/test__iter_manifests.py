@@ -0,0 +1,88 @@
+"""Test streaming pipeline of rendered manifests."""
+import io
+import os
+import tempfile
+import unittest
+import yaml
+from pumpwood_deploy.kubernets.kubernets import Kubernets
+from pumpwood_deploy.pipeline import (
+    iter_manifests, DirectorySink, MultiDocumentSink, ApplySink)
+from pumpwood_deploy.test_aux.fake_kubectl import FakeCluster, FakeApiClient
+from pumpwood_deploy.test_aux.microservices import StubMicroservice
+
+
+RESOURCES = ['secret', 'deployment', 'configmap_file']
+"""Secret, a deployment that uses it and a config map from file."""
+
+
+class TestIterManifests(unittest.TestCase):
+    """Test manifests are streamed to the sinks."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test__lazy_render(self):
+        manifests = iter_manifests(
+            [StubMicroservice('a', resources=RESOURCES),
+             StubMicroservice('b', resources=RESOURCES, fail=True)],
+            kube_client=None, namespace='pw')
+        first = next(manifests)
+        self.assertEqual(first['name'], 'a__secrets')
+        self.assertEqual(first['provides'], [('pw', 'Secret', 'a-secrets')])
+        config_map = [next(manifests), next(manifests)][1]
+        self.assertEqual(
+            yaml.safe_load(config_map['content'])['data'],
+            {'config.json': '{"a": 1}'})
+        # Next microservice is only rendered when its manifests are needed
+        with self.assertRaises(Exception):
+            next(manifests)
+
+    def test__file_sinks(self):
+        directory = os.path.join(self.temp_dir.name, 'manifests')
+        stream = io.StringIO()
+        with DirectorySink(directory) as directory_sink, \
+                MultiDocumentSink(stream) as stream_sink:
+            for manifest in iter_manifests(
+                    [StubMicroservice(name, resources=RESOURCES)
+                     for name in ['a', 'b']],
+                    kube_client=None, namespace='pw'):
+                directory_sink.write(manifest)
+                stream_sink.write(manifest)
+
+        self.assertEqual(sorted(os.listdir(directory))[:2], [
+            '000__a__secrets.yml', '001__a__deploy.yml'])
+        documents = list(yaml.safe_load_all(stream.getvalue()))
+        self.assertEqual(
+            [d['kind'] for d in documents],
+            ['Secret', 'Deployment', 'ConfigMap'] * 2)
+
+    def test__apply_sink(self):
+        cluster = FakeCluster(
+            os.path.join(self.temp_dir.name, 'cluster'), apply_latency=0.02)
+        kubernets = Kubernets.__new__(Kubernets)
+        kubernets.k8_namespace = 'pw'
+        kubernets.api_client = FakeApiClient(cluster, namespace='pw')
+        kubernets._connected = True
+
+        sink = ApplySink(
+            kubernets, max_workers=4, output_path=os.path.join(
+                self.temp_dir.name, 'stream_output'))
+        with sink:
+            for manifest in iter_manifests(
+                    [StubMicroservice(
+                        'app-{}'.format(i), resources=RESOURCES)
+                     for i in range(5)],
+                    kube_client=None, namespace='pw'):
+                sink.write(manifest)
+
+        self.assertEqual(len(sink.results), 15)
+        self.assertTrue(all(sink.results.values()))
+        applied = [(a['kind'], a['name']) for a in cluster.applied()]
+        for i in range(5):
+            # Deployments are applied after the secrets they use
+            self.assertLess(
+                applied.index(('Secret', 'app-{}-secrets'.format(i))),
+                applied.index(('Deployment', 'app-{}'.format(i))))
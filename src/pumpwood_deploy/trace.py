@@ -0,0 +1,165 @@
+"""Timing trace of the deploy pipeline.
+
+Spans are recorded for each step of the deploy (render of each microservice,
+file writes, apply and wait of each resource) and can be exported as a
+[Chrome trace](https://ui.perfetto.dev/) JSON file or summarized as a table
+of the slowest steps.
+
+Example:
+```python
+tracer = DeployTracer()
+with tracer.span('render pumpwood-auth', category='render'):
+    ...
+tracer.save('outputs/deploy_trace.json')
+print(tracer.summary())
+```
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import List
+
+
+class DeployTracer:
+    """Thread safe recorder of deploy spans."""
+
+    enabled: bool
+    """If False spans are not recorded."""
+    spans: List[dict]
+    """Recorded spans with keys `name`, `category`, `start`, `end`, `pid`,
+       `tid` and `args`."""
+    start_time: float
+    """Epoch time the tracer was created."""
+
+    def __init__(self, enabled: bool = True):
+        """__init__.
+
+        Args:
+            enabled (bool):
+                If False spans are not recorded, used to avoid checking if
+                a tracer was passed.
+        """
+        self.enabled = enabled
+        self.spans = []
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, category: str, start: float, end: float,
+                 pid: int = None, tid: int = None, **args):
+        """Record a span measured elsewhere (ex.: at a worker process).
+
+        Args:
+            name (str):
+                Name of the step.
+            category (str):
+                Category of the step, ex.: `render`, `write`, `apply`,
+                `wait`.
+            start (float):
+                Epoch time the step started.
+            end (float):
+                Epoch time the step finished.
+            pid (int):
+                Process that performed the step, default current process.
+            tid (int):
+                Thread that performed the step, default current thread.
+            **args (dict):
+                Extra information of the step.
+        """
+        if not self.enabled:
+            return
+        span = {
+            'name': name, 'category': category, 'start': start, 'end': end,
+            'pid': os.getpid() if pid is None else pid,
+            'tid': threading.get_ident() if tid is None else tid,
+            'args': args}
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        """Context manager that records the time spent inside it.
+
+        Args:
+            name (str):
+                Name of the step.
+            category (str):
+                Category of the step.
+            **args (dict):
+                Extra information of the step.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_span(
+                name=name, category=category, start=start, end=time.time(),
+                **args)
+
+    def to_chrome_trace(self) -> dict:
+        """Return spans using Chrome trace event format."""
+        with self._lock:
+            spans = list(self.spans)
+        events = []
+        for span in spans:
+            events.append({
+                'name': span['name'], 'cat': span['category'], 'ph': 'X',
+                'ts': int((span['start'] - self.start_time) * 1e6),
+                'dur': int((span['end'] - span['start']) * 1e6),
+                'pid': span['pid'], 'tid': span['tid'],
+                'args': span['args']})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path: str):
+        """Save spans as a Chrome trace JSON file.
+
+        Args:
+            path (str):
+                Path of the trace file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.to_chrome_trace(), file, default=str)
+
+    def summary(self, top: int = 10) -> str:
+        """Create a table with total time by category and slowest steps.
+
+        Args:
+            top (int):
+                Number of slowest steps to be listed.
+
+        Returns:
+            Text table of the summary.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        if not spans:
+            return '## No deploy steps traced'
+
+        wall_time = (
+            max(s['end'] for s in spans) - min(s['start'] for s in spans))
+        categories = {}
+        for span in spans:
+            categories.setdefault(span['category'], []).append(
+                span['end'] - span['start'])
+
+        lines = ['## Deploy trace, wall time %.2fs' % (wall_time, )]
+        lines.append('{:<12} {:>6} {:>10} {:>10}'.format(
+            'category', 'steps', 'total(s)', 'max(s)'))
+        for category, durations in sorted(
+                categories.items(), key=lambda x: -sum(x[1])):
+            lines.append('{:<12} {:>6} {:>10.2f} {:>10.2f}'.format(
+                category, len(durations), sum(durations), max(durations)))
+
+        lines.append('## Slowest steps')
+        lines.append('{:<12} {:>10}  {}'.format(
+            'category', 'time(s)', 'step'))
+        slowest = sorted(spans, key=lambda s: s['start'] - s['end'])[:top]
+        for span in slowest:
+            lines.append('{:<12} {:>10.2f}  {}'.format(
+                span['category'], span['end'] - span['start'],
+                span['name']))
+        return '\n'.join(lines)
@@ -1,24 +1,19 @@
 """PumpWood DataLake Microservice Deploy."""
 import os
 import base64
-import pkg_resources
+from pumpwood_deploy.template_registry import get_template
 
 
-coordinator_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'trino/resources/deploy__coordenator.yml').read().decode()
-worker_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'trino/resources/deploy__worker.yml').read().decode()
-hive_deployment = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'trino/resources/deploy__hive.yml').read().decode()
-postgres__test = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'trino/resources/postgres__test.yml').read().decode()
-secrets_trino = pkg_resources.resource_stream(
-    'pumpwood_deploy',
-    'trino/resources/secrets.yml').read().decode()
+coordinator_deployment = get_template(
+    'trino/resources/deploy__coordenator.yml')
+worker_deployment = get_template(
+    'trino/resources/deploy__worker.yml')
+hive_deployment = get_template(
+    'trino/resources/deploy__hive.yml')
+postgres__test = get_template(
+    'trino/resources/postgres__test.yml')
+secrets_trino = get_template(
+    'trino/resources/secrets.yml')
 
 
 class TrinoMicroservice:
@@ -10,11 +10,17 @@ class TestTrinoMicroservice(unittest.TestCase):
     def test__create_files(self):
         deploy_obj = TrinoMicroservice(
             shared_secret="xxxx",
-            catalog_dir_zip_path="xxxx")
+            catalog_dir_zip_path="xxxx",
+            bucket_name="xxxx")
         results = deploy_obj.create_deployment_file()
-        self.assertEqual(len(results), 4)
+        self.assertEqual(len(results), 5)
         for x in results:
-            if x["type"] != "secrets_file":
+            if x["type"] == "secrets_file":
+                continue
+            # Hive metastore objects are not named after trino
+            if x["name"] == "trino__hive_metastore":
+                validate_k8s_yml(x["content"])
+            else:
                 validate_k8s_yml(
                     x["content"],
                     microservice_name="trino")
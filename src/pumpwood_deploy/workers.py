@@ -0,0 +1,318 @@
+"""Number of app workers derived from the resources of the pods.
+
+Apps render `app_workers` (default 10) at the `N_WORKERS` env variable
+(`GRANIAN_WORKERS` for granian apps) whatever the resources of the pod, so
+small pods oversubscribe the CPU and large pods sit idle. With auto workers
+the variable is computed from the resources of each app container:
+
+- **CPU:** `workers_per_cpu * cpu + extra_workers`, using the CPU limit or
+  the request if no limit is set.
+- **Memory:** `(memory - memory_reserve) / worker_memory`, using the memory
+  limit or the request if no limit is set.
+
+The smaller of both, clipped to `[min_workers, max_workers]`, is used.
+Auto workers is opt-in, it is set at `DeployPumpWood.set_auto_workers` and
+is applied after sizing profiles (`pumpwood_deploy.sizing`), patches added
+with `DeployPumpWood.add_patch` are applied after it and win over it.
+
+Example:
+```python
+deploy.set_sizing(app='medium')
+deploy.set_auto_workers(WorkersFormula(worker_memory='300Mi'))
+deploy.workers_report()
+```
+"""
+import math
+from decimal import Decimal
+from typing import Dict, List, Tuple, Union
+from pumpwood_deploy.kubernets.diff import parse_quantity
+from pumpwood_deploy.manifest import (
+    ManifestPatch, K8sObject, Manifest, Container, Selector)
+from pumpwood_deploy.sizing import pod_component
+
+
+WORKERS_ENV = ['N_WORKERS', 'GRANIAN_WORKERS']
+"""Env variables with the number of workers of the app servers."""
+
+
+def _container_resource(container: Container, resource: str) -> Decimal:
+    """Limit of a resource of the container, or its request if no limit."""
+    resources = container.data.get('resources') or {}
+    for key in ['limits', 'requests']:
+        value = parse_quantity((resources.get(key) or {}).get(resource))
+        if value:
+            return value
+    return None
+
+
+def _container_workers_env(container: Container) -> Dict[str, str]:
+    """Workers env variables of the container with a literal value."""
+    return {
+        var['name']: var['value']
+        for var in container.data.get('env') or []
+        if var.get('name') in WORKERS_ENV and 'value' in var}
+
+
+class WorkersFormula:
+    """Formula of the number of workers of an app container."""
+
+    workers_per_cpu: float
+    """Workers for each CPU core."""
+    extra_workers: int
+    """Workers added to the CPU workers."""
+    worker_memory: str
+    """Memory used by each worker."""
+    memory_reserve: str
+    """Memory of the container not used by the workers."""
+    min_workers: int
+    """Minimum number of workers."""
+    max_workers: int
+    """Maximum number of workers."""
+
+    def __init__(self, workers_per_cpu: float = 2, extra_workers: int = 1,
+                 worker_memory: str = '256Mi', memory_reserve: str = '256Mi',
+                 min_workers: int = 1, max_workers: int = 16):
+        """__init__.
+
+        Defaults follow gunicorn recommendation of `2 * cores + 1` sync
+        workers.
+
+        Args:
+            workers_per_cpu (float):
+                Workers for each CPU core, use less than 2 for CPU bound
+                apps and more for apps that wait on IO.
+            extra_workers (int):
+                Workers added to the CPU workers.
+            worker_memory (str):
+                Memory used by each worker, K8s quantity ex.: `256Mi`.
+            memory_reserve (str):
+                Memory of the container not used by the workers (master
+                process, caches), K8s quantity.
+            min_workers (int):
+                Minimum number of workers.
+            max_workers (int):
+                Maximum number of workers.
+
+        Raises:
+            Exception:
+                'min_workers must be at least 1 and not greater than
+                max_workers'.
+            Exception:
+                'worker_memory must be a positive K8s quantity'.
+        """
+        if min_workers < 1 or max_workers < min_workers:
+            raise Exception(
+                'min_workers must be at least 1 and not greater than '
+                'max_workers')
+        worker_memory_bytes = parse_quantity(worker_memory)
+        if worker_memory_bytes is None or worker_memory_bytes <= 0:
+            raise Exception('worker_memory must be a positive K8s quantity')
+        self.workers_per_cpu = workers_per_cpu
+        self.extra_workers = extra_workers
+        self.worker_memory = worker_memory
+        self.memory_reserve = memory_reserve
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+
+    @classmethod
+    def from_arg(cls, formula: Union['WorkersFormula', dict, None]
+                 ) -> 'WorkersFormula':
+        """Create formula from an object, a dictionary or None (defaults)."""
+        if isinstance(formula, cls):
+            return formula
+        return cls(**(formula or {}))
+
+    def cpu_workers(self, cpu: Decimal) -> int:
+        """Workers that the CPU cores support."""
+        return math.floor(
+            Decimal(str(self.workers_per_cpu)) * cpu + self.extra_workers)
+
+    def memory_workers(self, memory: Decimal) -> int:
+        """Workers that fit the memory."""
+        reserve = parse_quantity(self.memory_reserve) or 0
+        return math.floor(
+            (memory - reserve) / parse_quantity(self.worker_memory))
+
+    def workers(self, cpu: Decimal = None, memory: Decimal = None) -> int:
+        """Number of workers of a container.
+
+        Args:
+            cpu (Decimal):
+                CPU cores of the container, None if not set.
+            memory (Decimal):
+                Memory of the container in bytes, None if not set.
+
+        Returns:
+            Number of workers or None if neither CPU nor memory is set.
+        """
+        candidates = []
+        if cpu is not None:
+            candidates.append(self.cpu_workers(cpu))
+        if memory is not None:
+            candidates.append(self.memory_workers(memory))
+        if not candidates:
+            return None
+        return max(self.min_workers, min(
+            [self.max_workers] + candidates))
+
+    def container_workers(self, container: Container) -> int:
+        """Number of workers of a container using its resources."""
+        return self.workers(
+            cpu=_container_resource(container, 'cpu'),
+            memory=_container_resource(container, 'memory'))
+
+
+class AutoWorkersPatch(ManifestPatch):
+    """Set workers env of app containers using a `WorkersFormula`."""
+
+    __slots__ = ('formula', )
+
+    def __init__(self, formula: WorkersFormula = None,
+                 selector: Selector = None):
+        """__init__.
+
+        Args:
+            formula (WorkersFormula):
+                Formula of the number of workers, if None default formula
+                is used.
+            selector (Selector):
+                Objects the patch will be applied to.
+        """
+        super().__init__(selector=selector)
+        self.formula = WorkersFormula.from_arg(formula)
+
+    def apply(self, obj: K8sObject) -> bool:
+        """Set workers env of the app containers of the object."""
+        if pod_component(obj) != 'app':
+            return False
+        changed = False
+        for container in obj.containers():
+            env = _container_workers_env(container)
+            if not env:
+                continue
+            n_workers = self.formula.container_workers(container)
+            if n_workers is None:
+                continue
+            changed = container.set_env(
+                {name: n_workers for name in env}) or changed
+        return changed
+
+
+def autoscaled_replicas(manifest: Manifest) -> Dict[str, Tuple[int, int]]:
+    """Replicas range of the deployments scaled by autoscalers.
+
+    Args:
+        manifest (Manifest):
+            Manifest with HorizontalPodAutoscalers or KEDA ScaledObjects.
+
+    Returns:
+        Tuple (min_replicas, max_replicas) by name of the scaled
+        deployment.
+    """
+    autoscaled = {}
+    for obj in manifest:
+        spec = obj.data.get('spec') or {}
+        target = (spec.get('scaleTargetRef') or {}).get('name')
+        if obj.kind == 'HorizontalPodAutoscaler':
+            autoscaled[target] = (
+                spec.get('minReplicas', 1), spec['maxReplicas'])
+        elif obj.kind == 'ScaledObject':
+            autoscaled[target] = (
+                spec.get('minReplicaCount', 0),
+                spec.get('maxReplicaCount', 100))
+    return autoscaled
+
+
+def container_workers(container: Container) -> int:
+    """Number of workers of a container, 1 if it has no workers env."""
+    env = _container_workers_env(container)
+    if not env:
+        return 1
+    return int(list(env.values())[0])
+
+
+def manifest_workers(content: str) -> List[dict]:
+    """Workers of the app containers of a rendered manifest.
+
+    Args:
+        content (str):
+            Rendered manifest, autoscalers at the same manifest are used to
+            find the maximum number of replicas.
+
+    Returns:
+        A dictionary for each container with a workers env variable, with
+        keys `deployment`, `container`, `cpu`, `memory`, `workers`,
+        `replicas`, `max_replicas`, `concurrency` and `max_concurrency`.
+        CPU is in cores and memory in bytes, None if not set. Replicas of
+        autoscaled deployments are the minimum replicas of the autoscaler.
+    """
+    manifest = Manifest.parse(content)
+    autoscaled = autoscaled_replicas(manifest)
+
+    results = []
+    for obj in manifest:
+        if obj.kind not in ['Deployment', 'StatefulSet']:
+            continue
+        spec = obj.data.get('spec') or {}
+        replicas = spec.get('replicas', 1)
+        replicas, max_replicas = autoscaled.get(
+            obj.name, (replicas, replicas))
+        for container in obj.containers():
+            if not _container_workers_env(container):
+                continue
+            workers = container_workers(container)
+            cpu = _container_resource(container, 'cpu')
+            memory = _container_resource(container, 'memory')
+            results.append({
+                'deployment': obj.name, 'container': container.name,
+                'cpu': cpu, 'memory': memory, 'workers': workers,
+                'replicas': replicas, 'max_replicas': max_replicas,
+                'concurrency': workers * replicas,
+                'max_concurrency': workers * max_replicas})
+    return results
+
+
+def format_workers_report(report: Dict[str, List[dict]]) -> str:
+    """Format a workers report as a table.
+
+    Args:
+        report (Dict[str, List[dict]]):
+            Results of `manifest_workers` by microservice, check
+            `DeployPumpWood.workers_report`.
+
+    Returns:
+        Table with workers, replicas and concurrency of each app container.
+    """
+    header = [
+        'microservice', 'container', 'cpu', 'memory', 'workers',
+        'replicas', 'concurrency']
+    rows = []
+    for microservice, results in report.items():
+        for result in results:
+            replicas = str(result['replicas'])
+            concurrency = str(result['concurrency'])
+            if result['replicas'] != result['max_replicas']:
+                replicas = '{}-{}'.format(
+                    result['replicas'], result['max_replicas'])
+                concurrency = '{}-{}'.format(
+                    result['concurrency'], result['max_concurrency'])
+            rows.append([
+                microservice, result['container'],
+                '-' if result['cpu'] is None else
+                '{:g}'.format(float(result['cpu'])),
+                '-' if result['memory'] is None else
+                '{:.0f}Mi'.format(float(result['memory']) / 2 ** 20),
+                str(result['workers']), replicas, concurrency])
+
+    widths = [
+        max([len(header[i])] + [len(r[i]) for r in rows])
+        for i in range(len(header))]
+    lines = ['### Workers report']
+    for row in [header] + rows:
+        lines.append('  '.join(
+            cell.ljust(width) for cell, width in zip(row, widths)))
+    total = sum(
+        r['max_concurrency'] for results in report.values()
+        for r in results)
+    lines.append('max concurrency of the stack {}'.format(total))
+    return '\n'.join(lines)